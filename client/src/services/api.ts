@@ -1,7 +1,7 @@
-import type { Writer } from '../types/user';
-import type { Order } from '../types/order';
+import type { Writer, WriterMetrics } from '../types/user';
+import type { Order, UploadedFile } from '../types/order';
 import type { PODOrder } from '../types/pod';
-import type { Review } from '../types/review';
+import type { Review, ReviewStats } from '../types/review';
 import type { 
   Invoice, 
   Fine, 
@@ -12,9 +12,13 @@ import type {
   TransactionLog 
 } from '../types/financial';
 import type { Notification } from '../types/notification';
+import type { ChatMessage, MessageThread } from '../types/message';
 
 const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:5001/api';
 
+// Tries per create call when the network drops; retries reuse the Idempotency-Key
+const CREATE_ATTEMPTS = 3;
+
 class ApiService {
   private static instance: ApiService;
   private updateCallbacks: Map<string, Set<() => void>> = new Map();
@@ -91,11 +95,38 @@ class ApiService {
   }
 
   // Generic CRUD operations
+  // List endpoints return summaries unless asked for view=full; the contexts
+  // keep whole records in memory, so find() asks for full rows by default.
   async find<T>(collection: string, params?: Record<string, string>): Promise<T[]> {
-    const queryString = params ? '?' + new URLSearchParams(params).toString() : '';
+    const queryString = '?' + new URLSearchParams({ view: 'full', ...params }).toString();
     return this.request<T[]>(`/${collection}${queryString}`);
   }
 
+  // One page of a list endpoint. Filters use the server syntax, e.g.
+  // { status: 'in:Available,Assigned', 'deadline<': '2025-06-01', sort: '-deadline', limit: '50' }
+  async findPage<T>(collection: string, params: Record<string, string>, cursor?: string) {
+    const query = new URLSearchParams({ view: 'summary', count: 'estimate', ...params });
+    if (cursor) query.set('cursor', cursor);
+    const response = await fetch(`${API_BASE_URL}/${collection}?${query.toString()}`, {
+      headers: { 'Content-Type': 'application/json' },
+    });
+    if (!response.ok) {
+      const error = await response.json().catch(() => ({ error: 'Request failed' }));
+      throw new Error(error.error || `HTTP ${response.status}`);
+    }
+    const total = response.headers.get('X-Total-Count');
+    return {
+      items: (await response.json()) as T[],
+      nextCursor: response.headers.get('X-Next-Cursor') ?? undefined,
+      total: total !== null ? Number(total) : undefined,
+      totalIsEstimate: response.headers.get('X-Count-Estimated') === 'true',
+    };
+  }
+
+  async findSummaries<T>(collection: string, params?: Record<string, string>): Promise<T[]> {
+    return this.find<T>(collection, { ...params, view: 'summary' });
+  }
+
   async findOne<T>(collection: string, id: string): Promise<T | undefined> {
     try {
       return await this.request<T>(`/${collection}/${id}`);
@@ -108,11 +139,27 @@ class ApiService {
     return this.findOne<T>(collection, id);
   }
 
-  async create<T extends { id: string }>(collection: string, item: T): Promise<T> {
-    const result = await this.request<T>(`/${collection}`, {
+  // Creates carry an Idempotency-Key, so a retry after a dropped connection gets the
+  // original response back instead of inserting the row a second time.
+  private async createWithKey<T>(endpoint: string, body: unknown, idempotencyKey = crypto.randomUUID()): Promise<T> {
+    const options = {
       method: 'POST',
-      body: JSON.stringify(item),
-    });
+      headers: { 'Idempotency-Key': idempotencyKey },
+      body: JSON.stringify(body),
+    };
+    for (let attempt = 1; ; attempt++) {
+      try {
+        return await this.request<T>(endpoint, options);
+      } catch (error) {
+        // fetch rejects with a TypeError when the network fails; HTTP errors are not retried
+        if (!(error instanceof TypeError) || attempt >= CREATE_ATTEMPTS) throw error;
+        await new Promise(resolve => setTimeout(resolve, 500 * attempt));
+      }
+    }
+  }
+
+  async create<T extends { id: string }>(collection: string, item: T, idempotencyKey?: string): Promise<T> {
+    const result = await this.createWithKey<T>(`/${collection}`, item, idempotencyKey);
     this.notifyCollectionSubscribers(collection);
     return result;
   }
@@ -168,9 +215,305 @@ class ApiService {
     return this.update<Order>('orders', id, updates);
   }
 
+  // Partial update: JSON-Patch style ops, e.g. { op: 'add', path: '/revisionRequests/-', value }
+  // Returns only the changed fields, not the whole order
+  async patchOrder(
+    id: string,
+    operations: Array<{ op: 'add' | 'replace' | 'remove'; path: string; value?: unknown }>
+  ): Promise<{ id: string; updatedAt: string; changes: Partial<Order>; appended: Record<string, unknown[]> } | null> {
+    try {
+      const result = await this.request<{ id: string; updatedAt: string; changes: Partial<Order>; appended: Record<string, unknown[]> }>(`/orders/${id}`, {
+        method: 'PATCH',
+        body: JSON.stringify(operations),
+      });
+      this.notifyCollectionSubscribers('orders');
+      return result;
+    } catch (error) {
+      console.error('Failed to patch order:', error);
+      return null;
+    }
+  }
+
+  // Atomic claim: fails with 409 if another writer got there first or the writer is at capacity
+  async pickOrder(id: string, writerId: string, writerName?: string): Promise<Order> {
+    const result = await this.request<Order>(`/orders/${id}/pick`, {
+      method: 'POST',
+      body: JSON.stringify({ writerId, writerName }),
+    });
+    this.notifyCollectionSubscribers('orders');
+    return result;
+  }
+
+  // Writers ranked by the server-side matching engine for an order
+  async getOrderCandidates(id: string, params?: { limit?: number; language?: string; timezone?: string; includeFull?: boolean }) {
+    const query = new URLSearchParams();
+    if (params?.limit) query.set('limit', String(params.limit));
+    if (params?.language) query.set('language', params.language);
+    if (params?.timezone) query.set('timezone', params.timezone);
+    if (params?.includeFull) query.set('includeFull', 'true');
+    const queryString = query.toString() ? `?${query.toString()}` : '';
+    return this.request<{
+      orderId: string;
+      candidates: Array<{
+        writerId: string;
+        writerName: string;
+        score: number;
+        activeOrders: number;
+        maxConcurrentOrders: number;
+        components: Record<string, number>;
+      }>;
+    }>(`/orders/${id}/candidates${queryString}`);
+  }
+
+  async autoAssignOrders(params?: { orderIds?: string[]; maxOrders?: number; language?: string; assignedBy?: string; assignedByName?: string; dryRun?: boolean }) {
+    return this.request<{
+      assigned: Array<{ orderId: string; writerId: string; writerName: string; score: number }>;
+      skipped: string[];
+      unassigned: string[];
+      dryRun: boolean;
+      stats: { orders: number; writers: number; solveMs: number; commitMs: number };
+    }>('/orders/auto-assign', {
+      method: 'POST',
+      body: JSON.stringify(params ?? {}),
+    });
+  }
+
+  async appendToOrder(id: string, field: 'revisionRequests' | 'bids' | 'fineHistory' | 'clientMessages' | 'adminMessages', item: unknown) {
+    return this.patchOrder(id, [{ op: 'add', path: `/${field}/-`, value: item }]);
+  }
+
+  // File storage - streams the File as the request body, no multipart encoding
+  async uploadFile(file: File, params?: { orderId?: string; uploadedBy?: string }) {
+    const query = new URLSearchParams();
+    if (params?.orderId) query.set('orderId', params.orderId);
+    if (params?.uploadedBy) query.set('uploadedBy', params.uploadedBy);
+    const queryString = query.toString() ? `?${query.toString()}` : '';
+    return this.request<UploadedFile & { sha256: string; deduplicated: boolean }>(`/files${queryString}`, {
+      method: 'POST',
+      body: file,
+      headers: {
+        'Content-Type': file.type || 'application/octet-stream',
+        'X-Filename': encodeURIComponent(file.name),
+      },
+    });
+  }
+
+  // Resumable upload in chunks; survives dropped connections and page reloads.
+  // The session id is kept in localStorage per file, so calling this again with
+  // the same File picks up where the last attempt stopped.
+  async uploadResumable(
+    file: File,
+    params?: {
+      orderId?: string;
+      target?: 'originalFiles' | 'revisionFiles' | 'podFiles';
+      uploadedBy?: string;
+      chunkSize?: number;
+      onProgress?: (uploadedBytes: number, totalBytes: number) => void;
+    }
+  ): Promise<UploadedFile & { sha256: string }> {
+    type UploadSession = {
+      id: string;
+      chunkSize: number;
+      chunkCount: number;
+      status: 'uploading' | 'complete' | 'aborted';
+      missingChunks: number[];
+    };
+    const storageKey = `upload:${params?.orderId ?? ''}:${params?.target ?? ''}:${file.name}:${file.size}:${file.lastModified}`;
+
+    let session: UploadSession | undefined;
+    const savedId = localStorage.getItem(storageKey);
+    if (savedId) {
+      session = await this.request<UploadSession>(`/uploads/${savedId}`).catch(() => undefined);
+      if (session && session.status === 'aborted') session = undefined;
+    }
+    if (!session) {
+      session = await this.request<UploadSession>('/uploads', {
+        method: 'POST',
+        body: JSON.stringify({
+          filename: file.name,
+          size: file.size,
+          contentType: file.type || 'application/octet-stream',
+          chunkSize: params?.chunkSize,
+          orderId: params?.orderId,
+          target: params?.target,
+          uploadedBy: params?.uploadedBy,
+        }),
+      });
+      localStorage.setItem(storageKey, session.id);
+    }
+
+    const missing = new Set(session.missingChunks);
+    let uploaded = file.size - [...missing].reduce(
+      (total, index) => total + Math.min(session!.chunkSize, file.size - index * session!.chunkSize), 0
+    );
+    params?.onProgress?.(uploaded, file.size);
+
+    for (const index of session.missingChunks) {
+      const chunk = file.slice(index * session.chunkSize, (index + 1) * session.chunkSize);
+      const digest = await crypto.subtle.digest('SHA-256', await chunk.arrayBuffer());
+      const checksum = Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+
+      // Retry each chunk with backoff instead of restarting the whole file
+      for (let attempt = 0; ; attempt++) {
+        try {
+          await this.request(`/uploads/${session.id}/chunks/${index}`, {
+            method: 'PUT',
+            body: chunk,
+            headers: { 'Content-Type': 'application/octet-stream', 'X-Chunk-SHA256': checksum },
+          });
+          break;
+        } catch (error) {
+          if (attempt >= 4) throw error;
+          await new Promise(resolve => setTimeout(resolve, 500 * 2 ** attempt));
+        }
+      }
+      uploaded += chunk.size;
+      params?.onProgress?.(uploaded, file.size);
+    }
+
+    const result = await this.request<{ file: UploadedFile & { sha256: string } }>(`/uploads/${session.id}/finalize`, {
+      method: 'POST',
+    });
+    localStorage.removeItem(storageKey);
+    if (params?.orderId) {
+      this.notifyCollectionSubscribers(params?.target === 'podFiles' ? 'pod-orders' : 'orders');
+    }
+    return result.file;
+  }
+
+  // ZIP of an order's files, order JSON and activity history; use as a download link
+  orderBundleUrl(orderId: string) {
+    return `${API_BASE_URL}/orders/${orderId}/bundle`;
+  }
+
+  // ZIP of several orders, by id and/or list filters, e.g. { status: 'Completed', 'completedAt>': '2025-06-01' }
+  ordersBundleUrl(selection: { ids?: string[] } & Record<string, string | string[] | undefined>) {
+    const query = new URLSearchParams();
+    for (const [key, value] of Object.entries(selection)) {
+      if (key === 'ids' && Array.isArray(value)) query.set('ids', value.join(','));
+      else if (typeof value === 'string') query.set(key, value);
+    }
+    return `${API_BASE_URL}/orders/bundle?${query.toString()}`;
+  }
+
+  // Precomputed on the server from running totals; omit writerId for platform-wide stats
+  async getReviewStats(writerId?: string) {
+    const queryString = writerId ? `?${new URLSearchParams({ writerId }).toString()}` : '';
+    return this.request<ReviewStats & { writerId: string | null; categoryCounts: Record<string, number> }>(`/reviews/stats${queryString}`);
+  }
+
+  // Merit score, rates and rank kept current by the server as orders, fines and reviews change
+  async getWriterMetrics(writerId: string) {
+    return this.request<WriterMetrics>(`/writers/${encodeURIComponent(writerId)}/metrics`);
+  }
+
+  // Highest merit first; pass nextCursor back for the following page
+  async getLeaderboard(params: { limit?: number; status?: string; minCompleted?: number } = {}, cursor?: string) {
+    const query = Object.fromEntries(
+      Object.entries({ limit: 50, ...params }).filter(([, value]) => value !== undefined).map(([key, value]) => [key, String(value)])
+    );
+    return this.findPage<WriterMetrics & { rank: number; writerName: string }>('writers/leaderboard', query, cursor);
+  }
+
+  // Financial statements; `to` is exclusive, omit writerId for platform-wide
+  async getStatementSummary(params: { from: string; to: string; writerId?: string; sections?: string }) {
+    const query = new URLSearchParams(Object.entries(params).filter(([, value]) => value) as [string, string][]);
+    return this.request<{
+      from: string;
+      to: string;
+      writerId: string | null;
+      sections: Record<string, { count: number; total: number; byStatus: Record<string, { count: number; total: number }> }>;
+    }>(`/financial/statement?${query.toString()}`);
+  }
+
+  statementExportUrl(params: { from: string; to: string; writerId?: string; sections?: string; format?: 'csv' | 'parquet' }) {
+    const query = new URLSearchParams(Object.entries(params).filter(([, value]) => value) as [string, string][]);
+    return `${API_BASE_URL}/financial/statement/export?${query.toString()}`;
+  }
+
+  // Pays approved withdrawals server-side in one transaction. Reuse the same key when
+  // retrying so a lost response never pays twice; the settlement CSV is at settlementUrl.
+  async createPayoutBatch(
+    idempotencyKey: string,
+    params: { method?: string; currency?: string; writerIds?: string[]; withdrawalIds?: string[]; approvedBefore?: string; limit?: number; processedBy?: string; notes?: string } = {}
+  ) {
+    return this.request<{
+      id: string;
+      idempotencyKey: string;
+      status: string;
+      method: string | null;
+      currency: string;
+      withdrawalCount: number;
+      totalAmount: number;
+      settlementFileId: string | null;
+      settlementUrl: string | null;
+      createdBy: string | null;
+      notes: string | null;
+      createdAt: string;
+    }>('/financial/payout-batches', {
+      method: 'POST',
+      headers: { 'Idempotency-Key': idempotencyKey },
+      body: JSON.stringify(params),
+    });
+  }
+
+  // Invoices completed orders server-side; 'incremental' covers completions since the last run,
+  // 'backfill' a completedAt range. Orders that already have an invoice are skipped.
+  async generateInvoices(
+    params: { mode?: 'incremental' | 'backfill'; from?: string; to?: string; dryRun?: boolean } = {}
+  ) {
+    return this.request<{
+      created: number;
+      amount: number;
+      batches: number;
+      from: string | null;
+      to: string | null;
+      watermark: string | null;
+      dryRun?: boolean;
+    }>('/financial/invoices/generate', {
+      method: 'POST',
+      body: JSON.stringify(params),
+    });
+  }
+
+  // Platform balance kept server-side by the outbox relay; pendingEvents > 0 means
+  // some recent changes are not reflected yet.
+  async getPlatformBalance() {
+    return this.request<{
+      totalFunds: number;
+      availableFunds: number;
+      pendingWithdrawals: number;
+      reservedFunds: number;
+      totalWithdrawn: number;
+      lastUpdated: string | null;
+      pendingEvents: number;
+    }>('/financial/balance');
+  }
+
+  // Resolves when one of the tables changed after `since` (a /sync watermark), or with [] after `timeout` seconds
+  async waitForChanges(since: string, tables?: string[], timeout = 25) {
+    const params = new URLSearchParams({ since, timeout: String(timeout) });
+    if (tables?.length) params.set('tables', tables.join(','));
+    return this.request<{ changed: string[] }>(`/sync/wait?${params.toString()}`);
+  }
+
+  // Server-Sent Events for a user's new and updated notifications; close() the source to stop
+  notificationStream(userId: string, onNotification: (notification: Notification) => void) {
+    const source = new EventSource(`${API_BASE_URL}/notifications/stream?userId=${encodeURIComponent(userId)}`);
+    source.addEventListener('notification', (event) => onNotification(JSON.parse((event as MessageEvent).data)));
+    return source;
+  }
+
+  fileUrl(fileId: string) {
+    return `${API_BASE_URL}/files/${fileId}`;
+  }
+
   // Specialized methods for writers
-  async getWriters(): Promise<Writer[]> {
-    return this.find<Writer>('writers');
+  async getWriters(filters?: { status?: string; specialization?: string; language?: string }): Promise<Writer[]> {
+    const params = filters
+      ? Object.fromEntries(Object.entries(filters).filter(([, value]) => value)) as Record<string, string>
+      : undefined;
+    return this.find<Writer>('writers', params);
   }
 
   async getWriter(id: string): Promise<Writer | undefined> {
@@ -225,11 +568,8 @@ class ApiService {
     return this.request<Invoice[]>(`/financial/invoices${params ? '?' + new URLSearchParams(params).toString() : ''}`);
   }
 
-  async createInvoice(invoice: Invoice): Promise<Invoice> {
-    return this.request<Invoice>('/financial/invoices', {
-      method: 'POST',
-      body: JSON.stringify(invoice),
-    });
+  async createInvoice(invoice: Invoice, idempotencyKey?: string): Promise<Invoice> {
+    return this.createWithKey<Invoice>('/financial/invoices', invoice, idempotencyKey);
   }
 
   async getFines(writerId?: string): Promise<Fine[]> {
@@ -238,11 +578,8 @@ class ApiService {
     return this.request<Fine[]>(`/financial/fines${params ? '?' + new URLSearchParams(params).toString() : ''}`);
   }
 
-  async createFine(fine: Fine): Promise<Fine> {
-    return this.request<Fine>('/financial/fines', {
-      method: 'POST',
-      body: JSON.stringify(fine),
-    });
+  async createFine(fine: Fine, idempotencyKey?: string): Promise<Fine> {
+    return this.createWithKey<Fine>('/financial/fines', fine, idempotencyKey);
   }
 
   async getPayments(writerId?: string): Promise<Payment[]> {
@@ -251,11 +588,8 @@ class ApiService {
     return this.request<Payment[]>(`/financial/payments${params ? '?' + new URLSearchParams(params).toString() : ''}`);
   }
 
-  async createPayment(payment: Payment): Promise<Payment> {
-    return this.request<Payment>('/financial/payments', {
-      method: 'POST',
-      body: JSON.stringify(payment),
-    });
+  async createPayment(payment: Payment, idempotencyKey?: string): Promise<Payment> {
+    return this.createWithKey<Payment>('/financial/payments', payment, idempotencyKey);
   }
 
   async getWithdrawals(writerId?: string, status?: string): Promise<WithdrawalRequest[]> {
@@ -265,11 +599,8 @@ class ApiService {
     return this.request<WithdrawalRequest[]>(`/financial/withdrawals${params ? '?' + new URLSearchParams(params).toString() : ''}`);
   }
 
-  async createWithdrawal(withdrawal: WithdrawalRequest): Promise<WithdrawalRequest> {
-    return this.request<WithdrawalRequest>('/financial/withdrawals', {
-      method: 'POST',
-      body: JSON.stringify(withdrawal),
-    });
+  async createWithdrawal(withdrawal: WithdrawalRequest, idempotencyKey?: string): Promise<WithdrawalRequest> {
+    return this.createWithKey<WithdrawalRequest>('/financial/withdrawals', withdrawal, idempotencyKey);
   }
 
   // Specialized methods for notifications
@@ -321,18 +652,39 @@ class ApiService {
     if (!activity.createdAt) {
       activity.createdAt = new Date().toISOString();
     }
-    return this.request<any>('/order-activities', {
-      method: 'POST',
-      body: JSON.stringify(activity),
-    });
+    return this.createWithKey<any>('/order-activities', activity);
   }
 
   // Specialized methods for messages
-  async getMessages(userId?: string, relatedOrderId?: string): Promise<any[]> {
-    const params: Record<string, string> = {};
+  // A user's inbox is getThreads; getThreadMessages pages one conversation, newest first.
+  async getThreads(userId: string, options: { cursor?: string; limit?: number; unreadOnly?: boolean } = {}) {
+    const query = new URLSearchParams({ userId });
+    if (options.cursor) query.set('cursor', options.cursor);
+    if (options.limit) query.set('limit', String(options.limit));
+    if (options.unreadOnly) query.set('unreadOnly', 'true');
+    return this.request<{ threads: MessageThread[]; nextCursor: string | null }>(`/messages/threads?${query.toString()}`);
+  }
+
+  async getThreadMessages(threadId: string, options: { cursor?: string; limit?: number } = {}) {
+    const query = new URLSearchParams();
+    if (options.cursor) query.set('cursor', options.cursor);
+    if (options.limit) query.set('limit', String(options.limit));
+    return this.request<{ messages: ChatMessage[]; nextCursor: string | null }>(`/messages/threads/${threadId}/messages?${query.toString()}`);
+  }
+
+  async markThreadRead(threadId: string, userId: string): Promise<MessageThread> {
+    return this.request<MessageThread>(`/messages/threads/${threadId}/read`, {
+      method: 'PUT',
+      body: JSON.stringify({ userId }),
+    });
+  }
+
+  // One page of a user's sent and received messages, newest first; pass nextCursor for the next page
+  async getMessages(userId?: string, relatedOrderId?: string, cursor?: string) {
+    const params: Record<string, string> = { sort: '-createdAt', limit: '50' };
     if (userId) params.userId = userId;
     if (relatedOrderId) params.relatedOrderId = relatedOrderId;
-    return this.find<any>('messages', params);
+    return this.findPage<ChatMessage>('messages', params, cursor);
   }
 
   async createMessage(message: any): Promise<any> {
@@ -347,12 +699,10 @@ class ApiService {
 
   async createFinancial<T extends { id: string }>(
     subCollection: string, 
-    item: T
+    item: T,
+    idempotencyKey?: string
   ): Promise<T> {
-    return this.request<T>(`/financial/${subCollection}`, {
-      method: 'POST',
-      body: JSON.stringify(item),
-    });
+    return this.createWithKey<T>(`/financial/${subCollection}`, item, idempotencyKey);
   }
 
   async updateFinancial<T extends { id: string }>(
@@ -166,6 +166,7 @@ export interface WithdrawalRequest {
   paidAt?: string;
   paymentReference?: string;
   invoiceId?: string;
+  payoutBatchId?: string;
   notes?: string;
 }
 
@@ -0,0 +1,31 @@
+export interface ChatMessage {
+  id: string;
+  threadId: string | null; // null for messages without two participants (e.g. broadcasts)
+  senderId: string;
+  senderName?: string;
+  senderRole?: string;
+  recipientId: string;
+  recipientName?: string;
+  recipientRole?: string;
+  subject?: string;
+  content: string;
+  relatedOrderId?: string;
+  isRead: boolean;
+  readAt?: string;
+  createdAt: string;
+}
+
+export interface MessageThread {
+  id: string;
+  participants: { id: string; name?: string; role?: string }[];
+  relatedOrderId?: string;
+  subject?: string;
+  lastMessageId?: string;
+  lastMessageAt?: string;
+  lastMessagePreview?: string;
+  lastSenderId?: string;
+  messageCount: number;
+  createdAt: string;
+  unreadCount?: number; // Only when the thread is fetched for a participant (userId)
+  lastReadAt?: string;
+}
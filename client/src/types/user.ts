@@ -153,6 +153,31 @@ export interface WriterStats {
   }>;
 }
 
+// Served from the server's writer_metrics table (GET /api/writers/<id>/metrics)
+export interface WriterMetrics {
+  writerId: string;
+  writerName?: string;
+  meritScore: number; // 0-100
+  rank?: number;
+  completionRate: number;
+  onTimeDeliveryRate: number;
+  revisionRate: number;
+  rejectionRate: number;
+  averageRating: number;
+  totalOrders: number;
+  completedOrders: number;
+  onTimeOrders: number;
+  revisedOrders: number;
+  revisionCount: number;
+  averageRevisionScore: number | null;
+  rejectedOrders: number;
+  totalEarnings: number;
+  fineCount: number;
+  fineTotal: number;
+  totalReviews: number;
+  updatedAt: string | null;
+}
+
 export interface WriterActivity {
   writerId: string;
   writerName: string;
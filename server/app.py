@@ -1,66 +1,146 @@
+"""
+Application factory.
+
+    create_app(config)   a configured app with every blueprint registered;
+                         `config` overrides the settings read from the environment
+
+Nothing is built at import time. Blueprints and models are imported inside
+the factory, and the CLI commands in cli.py are only imported when a `flask`
+command asks for one, so web workers never load cli.py or seed_db.py.
+wsgi.py builds the app once for gunicorn (see gunicorn.conf.py), so with
+preload_app the workers fork from a fully imported master.
+"""
 from flask import Flask, jsonify, request
+from flask.cli import AppGroup
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from dotenv import load_dotenv
+import importlib
 import os
 from db import db
+import ratelimit
 
 load_dotenv()
 
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///writers_admin.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
-
-# Enable CORS for all routes with proper preflight handling
-CORS(app, 
-     resources={r"/api/*": {
-         "origins": "*",
-         "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-         "allow_headers": ["Content-Type", "Authorization"]
-     }},
-     supports_credentials=True)
-
-# Initialize db with app
-db.init_app(app)
+BLUEPRINTS = (
+    'auth', 'users', 'writers', 'orders', 'pod_orders', 'reviews', 'financial', 'notifications', 'messages', 'misc',
+    'order_activities', 'sync', 'files', 'uploads'
+)
 
-# Import models (they import db from db.py)
-from models import *
+# `flask <name>` -> command object in cli.py, imported on first use
+CLI_COMMANDS = {
+    'reset-db': 'reset_db',
+    'seed': 'seed',
+    'init-db': 'init_db',
+    'users': 'users',
+    'writers': 'writers',
+    'orders': 'orders',
+    'db': 'db_cmd',
+    'uploads': 'uploads_cmd',
+    'files': 'files_cmd',
+    'idempotency': 'idempotency_cmd',
+    'ratings': 'ratings_cmd',
+    'merit': 'merit_cmd',
+    'statements': 'statements_cmd',
+    'invoices': 'invoices_cmd',
+    'outbox': 'outbox_cmd'
+}
 
-# Import routes
-from routes import auth, users, writers, orders, pod_orders, reviews, financial, notifications, messages, misc, order_activities
+class LazyCommands(AppGroup):
+    """app.cli that imports a command from cli.py only when it is looked up"""
+    def __init__(self, commands, module='cli', **kwargs):
+        super().__init__(**kwargs)
+        self.lazy_commands = commands
+        self.module = module
+    
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_commands))
+    
+    def get_command(self, ctx, name):
+        if name in self.lazy_commands and name not in self.commands:
+            self.add_command(getattr(importlib.import_module(self.module), self.lazy_commands[name]), name)
+        return super().get_command(ctx, name)
 
-# Register blueprints
-app.register_blueprint(auth.bp)
-app.register_blueprint(users.bp)
-app.register_blueprint(writers.bp)
-app.register_blueprint(orders.bp)
-app.register_blueprint(pod_orders.bp)
-app.register_blueprint(reviews.bp)
-app.register_blueprint(financial.bp)
-app.register_blueprint(notifications.bp)
-app.register_blueprint(messages.bp)
-app.register_blueprint(misc.bp)
-app.register_blueprint(order_activities.bp)
+def default_config():
+    """Settings from the environment (.env is loaded on import)"""
+    storage_root = os.getenv('STORAGE_ROOT', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads'))
+    return {
+        'SQLALCHEMY_DATABASE_URI': os.getenv('DATABASE_URL', 'sqlite:///writers_admin.db'),
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        'SECRET_KEY': os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production'),
+        # File storage (see storage.py)
+        'STORAGE_BACKEND': os.getenv('STORAGE_BACKEND', 'local'),
+        'STORAGE_ROOT': storage_root,
+        'MAX_UPLOAD_BYTES': int(os.getenv('MAX_UPLOAD_BYTES', 500 * 1024 * 1024)),
+        'S3_BUCKET': os.getenv('S3_BUCKET'),
+        'S3_PREFIX': os.getenv('S3_PREFIX', 'objects/'),
+        'S3_ENDPOINT_URL': os.getenv('S3_ENDPOINT_URL'),
+        # Let nginx/Apache serve downloads via X-Sendfile instead of streaming them through Python
+        'USE_X_SENDFILE': os.getenv('USE_X_SENDFILE', 'false').lower() == 'true',
+        # Resumable uploads keep their chunks here until finalized (see uploads.py)
+        'UPLOAD_SESSION_ROOT': os.getenv('UPLOAD_SESSION_ROOT', os.path.join(storage_root, 'sessions')),
+        'UPLOAD_SESSION_TTL_HOURS': int(os.getenv('UPLOAD_SESSION_TTL_HOURS', 24)),
+        # Token buckets per client address and route (see ratelimit.py); RATE_LIMITS is JSON,
+        # e.g. {"orders": "10/second burst 20", "files": null}, merged over the defaults
+        'RATE_LIMIT_ENABLED': os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true',
+        'RATE_LIMITS': os.getenv('RATE_LIMITS', '{}'),
+        'RATE_LIMIT_STORE': os.getenv('RATE_LIMIT_STORE', 'memory'),
+        'RATE_LIMIT_REDIS_URL': os.getenv('RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/0'),
+        # Proxies (nginx, load balancers) in front of the app whose X-Forwarded-For is trusted;
+        # 0 means clients connect directly. Rate limits key on the address this yields.
+        'PROXY_FIX_X_FOR': int(os.getenv('PROXY_FIX_X_FOR', 0))
+    }
 
-@app.route('/api/health')
-def health():
-    return {'status': 'ok', 'message': 'Writers Admin API is running'}
-
-# Handle OPTIONS requests for all API routes to fix CORS preflight
-@app.before_request
-def handle_preflight():
-    if request.method == "OPTIONS":
-        response = jsonify({})
-        response.headers.add("Access-Control-Allow-Origin", "*")
-        response.headers.add('Access-Control-Allow-Headers', "*")
-        response.headers.add('Access-Control-Allow-Methods', "*")
-        return response
-
-# Import CLI commands
-import cli
+def create_app(config=None):
+    """Build the app: configuration, CORS, database, blueprints, rate limits and (lazy) CLI commands"""
+    app = Flask(__name__)
+    app.config.from_mapping(default_config())
+    if config:
+        app.config.from_mapping(config)
+    
+    # Enable CORS for all routes with proper preflight handling
+    CORS(app,
+         resources={r"/api/*": {
+             "origins": "*",
+             "methods": ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
+             "allow_headers": ["Content-Type", "Authorization", "Prefer", "If-Match", "Range", "X-Filename", "X-Chunk-SHA256", "Idempotency-Key"],
+             "expose_headers": ["ETag", "X-Next-Cursor", "X-Total-Count", "X-Count-Estimated", "Content-Range", "Accept-Ranges", "Content-Disposition", "Upload-Offset", "Location", "Idempotent-Replay", "Retry-After"]
+         }},
+         supports_credentials=True)
+    
+    # Take the client address from the trusted proxies' X-Forwarded-For
+    if app.config['PROXY_FIX_X_FOR']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
+    
+    # Initialize db with app; importing models registers the tables on db.metadata
+    db.init_app(app)
+    import models  # noqa: F401
+    
+    for name in BLUEPRINTS:
+        app.register_blueprint(importlib.import_module(f'routes.{name}').bp)
+    
+    @app.route('/api/health')
+    def health():
+        return {'status': 'ok', 'message': 'Writers Admin API is running'}
+    
+    # Handle OPTIONS requests for all API routes to fix CORS preflight
+    @app.before_request
+    def handle_preflight():
+        if request.method == "OPTIONS":
+            response = jsonify({})
+            response.headers.add("Access-Control-Allow-Origin", "*")
+            response.headers.add('Access-Control-Allow-Headers', "*")
+            response.headers.add('Access-Control-Allow-Methods', "*")
+            return response
+    
+    ratelimit.init_app(app)
+    
+    app.cli = LazyCommands(CLI_COMMANDS, name=app.name)
+    return app
 
 if __name__ == '__main__':
+    import migrator
+    app = create_app()
     with app.app_context():
-        db.create_all()
+        migrator.upgrade()
     app.run(debug=True, port=5001)
-
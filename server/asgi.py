@@ -0,0 +1,265 @@
+"""
+ASGI entry point:
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5001 --workers 4
+
+Serves the same API as wsgi.py. Every blueprint runs unchanged: requests are
+handed to the Flask app on a thread pool of WSGI_THREADS (a2wsgi). The
+long-lived endpoints of live.py are served on the event loop instead, so an
+open connection costs a coroutine rather than one of those threads:
+
+    GET /api/sync/wait              long-poll for sync table changes
+    GET /api/notifications/stream   Server-Sent Events for a user's notifications
+
+They take from the same rate-limit buckets as the Flask endpoints they
+stand in for, and read through an async SQLAlchemy engine on the same
+database (aiosqlite for SQLite, asyncpg for PostgreSQL). One ChangeFeed per process
+polls the latest change of every sync table each POLL_INTERVAL and wakes
+the connections waiting on it, so a thousand idle clients cost one small
+query per interval instead of a thousand.
+"""
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime
+from urllib.parse import parse_qsl
+
+from a2wsgi import WSGIMiddleware
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from werkzeug.datastructures import Headers
+
+from app import create_app
+from db import db
+import live
+import ratelimit
+
+log = logging.getLogger(__name__)
+
+# Threads running the Flask blueprints
+WSGI_THREADS = int(os.getenv('ASGI_WSGI_THREADS', 16))
+
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg'
+}
+
+def async_url(url):
+    """The app's database URL with the async driver for its backend"""
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"No async driver configured for {backend} databases")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+class ChangeFeed:
+    """The latest change of every sync table, polled once for all waiting connections"""
+    def __init__(self, sessions, interval=live.POLL_INTERVAL):
+        self.sessions = sessions
+        self.interval = interval
+        self.latest = {}
+        self.recent = frozenset()  # rows changed within the sync overlap (see live.changed_tables)
+        self.generation = 0  # bumped whenever `latest` moves or `recent` gains a row
+        self.polls = 0
+        self._changed = asyncio.Condition()
+    
+    async def poll(self):
+        after = datetime.utcnow() - live.sync_overlap()
+        async with self.sessions() as session:
+            latest = live.latest_by_table(await session.execute(live.latest_changes_query()))
+            recent = live.recent_rows(await session.execute(live.recent_changes_query(after)))
+        self.polls += 1
+        # Rows also age out of `recent`; only a new one is a change
+        moved = latest != self.latest or not recent <= self.recent
+        self.latest, self.recent = latest, recent
+        if moved:
+            async with self._changed:
+                self.generation += 1
+                self._changed.notify_all()
+    
+    async def run(self):
+        failing = False
+        while True:
+            try:
+                await self.poll()
+            except Exception:  # keep polling through a database hiccup
+                # Logged when polls start failing, not on every tick while the database is down
+                if not failing:
+                    log.exception('Change feed poll failed; retrying every %.1fs', self.interval)
+                failing = True
+            else:
+                if failing:
+                    log.info('Change feed poll recovered')
+                failing = False
+            await asyncio.sleep(self.interval)
+    
+    async def wait(self, seen, timeout):
+        """Wait until `generation` moves past `seen`; False on timeout"""
+        async with self._changed:
+            try:
+                await asyncio.wait_for(self._changed.wait_for(lambda: self.generation != seen), timeout)
+                return True
+            except asyncio.TimeoutError:
+                return False
+
+class Request:
+    def __init__(self, scope):
+        self.scope = scope
+        self.args = dict(parse_qsl(scope.get('query_string', b'').decode('latin-1')))
+        # Case-insensitive, as Flask's: clients send lower-case names (HTTP/2 always does)
+        self.headers = Headers([(name.decode('latin-1'), value.decode('latin-1')) for name, value in scope['headers']])
+    
+    def cors_headers(self):
+        # Same answer flask-cors gives the blueprints (any origin, with credentials)
+        origin = self.headers.get('Origin')
+        if not origin:
+            return []
+        return [(b'access-control-allow-origin', origin.encode('latin-1')),
+                (b'access-control-allow-credentials', b'true'),
+                (b'vary', b'Origin')]
+
+async def send_json(send, request, status, payload, headers=()):
+    body = json.dumps(payload).encode()
+    await send({'type': 'http.response.start', 'status': status, 'headers': [
+        (b'content-type', b'application/json'), (b'content-length', str(len(body)).encode()),
+        *request.cors_headers(), *headers
+    ]})
+    await send({'type': 'http.response.body', 'body': body})
+
+async def disconnected(receive):
+    """Returns once the client has gone away"""
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+async def until_disconnected(receive, work):
+    """Run `work` until it finishes or the client disconnects, whichever is first"""
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.ensure_future(disconnected(receive))
+    done, _ = await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    for pending in (task, watcher):
+        pending.cancel()
+    if task in done and not task.cancelled() and task.exception():
+        raise task.exception()
+
+async def wait_for_changes(api, request, receive, send):
+    try:
+        table_keys, since, timeout = live.parse_wait(request.args)
+    except ValueError as e:
+        return await send_json(send, request, 400, {'error': str(e)})
+    
+    async def wait():
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        known = api.feed.recent
+        while True:
+            seen = api.feed.generation
+            changed = live.changed_tables(api.feed.latest, table_keys, since, api.feed.recent, known)
+            remaining = deadline - loop.time()
+            if changed or remaining <= 0 or not await api.feed.wait(seen, remaining):
+                return await send_json(send, request, 200, {'changed': changed})
+    
+    await until_disconnected(receive, wait())
+
+async def stream_notifications(api, request, receive, send):
+    try:
+        cursor = live.NotificationCursor(*live.stream_start(request.args, request.headers))
+    except ValueError as e:
+        return await send_json(send, request, 400, {'error': str(e)})
+    
+    async def stream():
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'), (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'), *request.cors_headers()
+        ]})
+        while True:
+            seen = api.feed.generation
+            async with api.sessions() as session:
+                notifications = (await session.scalars(cursor.query())).all()
+            for notification in cursor.unsent(notifications):
+                await send({'type': 'http.response.body', 'body': live.notification_event(notification).encode(),
+                            'more_body': True})
+            if not await api.feed.wait(seen, live.KEEPALIVE):
+                await send({'type': 'http.response.body', 'body': live.SSE_KEEPALIVE.encode(), 'more_body': True})
+    
+    await until_disconnected(receive, stream())
+
+ROUTES = {
+    ('GET', '/api/sync/wait'): wait_for_changes,
+    ('GET', '/api/notifications/stream'): stream_notifications
+}
+
+class AsyncAPI:
+    """ASGI app: ROUTES on the event loop, every other request through the Flask app"""
+    def __init__(self, flask_app, routes=ROUTES, threads=WSGI_THREADS):
+        self.flask_app = flask_app
+        self.routes = routes
+        # The Flask endpoint each route stands in for, so it shares that endpoint's rate limit
+        urls = flask_app.url_map.bind('')
+        self.endpoints = {key: urls.match(key[1], method=key[0])[0] for key in routes}
+        self.wsgi = WSGIMiddleware(flask_app, workers=threads)
+        self.engine = None
+        self.sessions = None
+        self.feed = None
+        self._feed_task = None
+    
+    async def startup(self):
+        if self.engine is not None:
+            return
+        with self.flask_app.app_context():
+            url = async_url(db.engine.url)
+        self.engine = create_async_engine(url)
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.feed = ChangeFeed(self.sessions)
+        await self.feed.poll()
+        self._feed_task = asyncio.ensure_future(self.feed.run())
+    
+    async def shutdown(self):
+        if self._feed_task is not None:
+            self._feed_task.cancel()
+        if self.engine is not None:
+            await self.engine.dispose()
+        self.engine = None
+    
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await self.startup()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        handler = self.routes.get((scope.get('method'), scope.get('path', '').rstrip('/'))) if scope['type'] == 'http' else None
+        if handler is None:
+            return await self.wsgi(scope, receive, send)
+        request = Request(scope)
+        limited = self.rate_limited(request)
+        if limited is not None:
+            body, retry_after = limited
+            return await send_json(send, request, 429, body, [(b'retry-after', retry_after.encode())])
+        await self.startup()  # for servers that skip the lifespan protocol
+        await handler(self, request, receive, send)
+    
+    def rate_limited(self, request):
+        """(429 body, Retry-After) if the client is over the route's limit, as ratelimit.py decides for Flask"""
+        limiter = self.flask_app.extensions.get('ratelimit')
+        if limiter is None:
+            return None
+        scope = request.scope
+        endpoint = self.endpoints[(scope['method'], scope['path'].rstrip('/'))]
+        retry_after = limiter.retry_after(endpoint, endpoint.rpartition('.')[0] or None, self.client_address(request))
+        return None if retry_after is None else ratelimit.too_many_requests(retry_after)
+    
+    def client_address(self, request):
+        """The address ProxyFix gives the Flask routes: PROXY_FIX_X_FOR entries from the end of X-Forwarded-For"""
+        trusted = self.flask_app.config['PROXY_FIX_X_FOR']
+        forwarded = [address.strip() for address in request.headers.get('X-Forwarded-For', '').split(',') if address.strip()]
+        if trusted and len(forwarded) >= trusted:
+            return forwarded[-trusted]
+        return (request.scope.get('client') or (None,))[0]
+
+app = AsyncAPI(create_app())
@@ -0,0 +1,224 @@
+"""
+Batch auto-assignment of Available orders to writers.
+
+solve() is a capacity-constrained greedy assignment over the matching
+engine's feature vectors. Orders are taken in deadline order. Each one goes
+to the highest-scoring writer who still has a free slot, and that writer's
+availability score drops as their slots fill, which spreads work out. This
+is the same fitness as GET /api/orders/<id>/candidates, so a batch run agrees
+with what an admin would see one order at a time.
+
+apply_plan() commits a plan in one transaction. Each writer's orders are
+claimed with one conditional UPDATE that re-checks status and capacity, so
+orders taken concurrently are reported as skipped instead of being
+double-assigned. All activity rows are inserted in bulk.
+"""
+import json
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import bindparam, func, insert, select, update
+
+from db import db
+import merit
+from models import Order, OrderActivity, ACTIVE_ORDER_STATUSES
+from matching import WEIGHTS, order_terms, specialization_scores, writer_index
+
+def active_orders_subquery(writer_id):
+    """Scalar subquery counting a writer's orders that use up a concurrency slot"""
+    return select(func.count()).select_from(Order).where(
+        Order.writer_id == writer_id,
+        Order.status.in_(ACTIVE_ORDER_STATUSES)
+    ).scalar_subquery()
+
+def solve(orders, features, language=None):
+    """
+    Assign `orders` to writers. Returns (plan, unassigned_ids) where plan is a
+    list of dicts {orderId, writerId, writerName, score}.
+    """
+    writer_count = len(features['ids'])
+    if writer_count == 0:
+        return [], [o.id for o in orders]
+    
+    max_orders = np.maximum(features['max_orders'], 1)
+    remaining = (features['max_orders'] - features['active_orders']).astype(int)
+    
+    eligible = features['valid'].copy()
+    if language:
+        column = features['lang_vocab'].get(language.strip().lower())
+        eligible &= features['langs'][:, column] if column is not None else False
+    remaining[~eligible] = 0
+    remaining = np.maximum(remaining, 0)
+    
+    # Order-independent part of the score, kept current as slots fill up
+    static = (
+        WEIGHTS['rating'] * np.clip(features['rating'] / 5.0, 0.0, 1.0) +
+        WEIGHTS['successRate'] * np.clip(features['success_rate'] / 100.0, 0.0, 1.0) +
+        WEIGHTS['timezone'] * 0.5
+    )
+    writer_score = static + WEIGHTS['availability'] * (remaining / max_orders)
+    writer_score[remaining <= 0] = -np.inf
+    
+    # Most orders share a handful of subjects, so cache the specialization column per subject
+    spec_cache = {}
+    
+    plan = []
+    unassigned = []
+    by_deadline = sorted(orders, key=lambda o: (o.deadline is None, o.deadline or datetime.max, o.created_at or datetime.max))
+    for order in by_deadline:
+        key = frozenset(order_terms(order))
+        spec = spec_cache.get(key)
+        if spec is None:
+            spec = WEIGHTS['specialization'] * specialization_scores(order, features['specs'], features['spec_vocab'])
+            spec_cache[key] = spec
+        
+        score = spec + writer_score
+        row = int(np.argmax(score))
+        if not np.isfinite(score[row]):
+            unassigned.append(order.id)
+            continue
+        
+        plan.append({
+            'orderId': order.id,
+            'writerId': features['ids'][row],
+            'writerName': features['names'][row],
+            'score': round(float(score[row]), 4)
+        })
+        remaining[row] -= 1
+        if remaining[row] <= 0:
+            writer_score[row] = -np.inf
+        else:
+            writer_score[row] = static[row] + WEIGHTS['availability'] * (remaining[row] / max_orders[row])
+    
+    return plan, unassigned
+
+def _claim_statement():
+    """
+    UPDATE claiming a group of orders for one writer, built once per batch and
+    executed with bind parameters. The capacity check covers the whole group,
+    so either there is room for all of them or nothing is claimed; RETURNING
+    reports which ids were actually still Available.
+    """
+    orders = Order.__table__
+    return (
+        update(orders)
+        .where(
+            orders.c.id.in_(bindparam('order_ids', expanding=True)),
+            orders.c.status == 'Available',
+            active_orders_subquery(bindparam('claim_writer')) + bindparam('group_size') <= bindparam('max_orders')
+        )
+        .values(
+            status='Assigned',
+            writer_id=bindparam('claim_writer'),
+            assigned_writer=bindparam('claim_writer_name'),
+            assigned_at=bindparam('now'),
+            assigned_by=bindparam('assigned_by'),
+            assignment_notes='Auto-assigned',
+            updated_at=bindparam('now'),
+            version=orders.c.version + 1
+        )
+        .returning(orders.c.id)
+    )
+
+def apply_plan(plan, assigned_by, assigned_by_name):
+    """
+    Commit a plan in one transaction. Returns (assigned, skipped) lists of
+    plan entries; skipped ones were taken or filled up concurrently.
+    
+    Orders are claimed one UPDATE per writer, re-checking status and capacity
+    in the statement itself. If a writer filled up since the plan was made,
+    their orders are retried one by one so as many as still fit go through.
+    """
+    now = datetime.utcnow()
+    statement = _claim_statement()
+    
+    by_writer = {}
+    for entry in plan:
+        by_writer.setdefault(entry['writerId'], []).append(entry)
+    
+    def claim(order_ids, entry):
+        result = db.session.execute(statement, {
+            'order_ids': order_ids,
+            'group_size': len(order_ids),
+            'max_orders': entry['maxOrders'],
+            'claim_writer': entry['writerId'],
+            'claim_writer_name': entry['writerName'],
+            'assigned_by': assigned_by,
+            'now': now
+        })
+        return {row[0] for row in result}
+    
+    claimed = set()
+    try:
+        for entries in by_writer.values():
+            ids = [entry['orderId'] for entry in entries]
+            won = claim(ids, entries[0])
+            if not won and len(ids) > 1:
+                for order_id in ids:
+                    won |= claim([order_id], entries[0])
+            claimed |= won
+        
+        assigned = [entry for entry in plan if entry['orderId'] in claimed]
+        skipped = [entry for entry in plan if entry['orderId'] not in claimed]
+        
+        if assigned:
+            db.session.execute(insert(OrderActivity), [{
+                'id': f"ACT-{uuid.uuid4().hex[:8].upper()}",
+                'order_id': entry['orderId'],
+                'order_number': entry.get('orderNumber'),
+                'action_type': 'assign',
+                'action_by': assigned_by,
+                'action_by_name': assigned_by_name,
+                'action_by_role': 'admin',
+                'old_status': 'Available',
+                'new_status': 'Assigned',
+                'description': f"Order auto-assigned to {entry['writerName']}",
+                'action_metadata': json.dumps({'autoAssign': True, 'score': entry['score']}),
+                'created_at': now
+            } for entry in assigned])
+            # Same for the merit metrics, recounted in this transaction
+            merit.recount(entry['writerId'] for entry in assigned)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    
+    # The claims bypassed the ORM, so tell the matching index about the new load
+    writer_index.mark_dirty(*{entry['writerId'] for entry in assigned})
+    return assigned, skipped
+
+def auto_assign(orders, assigned_by, assigned_by_name, language=None, dry_run=False):
+    """Solve and (unless dry_run) commit. Returns a result dict for the API."""
+    features = writer_index.snapshot()
+    
+    began = time.perf_counter()
+    plan, unassigned = solve(orders, features, language=language)
+    solve_ms = (time.perf_counter() - began) * 1000
+    
+    rows = {writer_id: row for row, writer_id in enumerate(features['ids'])}
+    numbers = {o.id: o.order_number for o in orders}
+    for entry in plan:
+        entry['maxOrders'] = int(features['max_orders'][rows[entry['writerId']]])
+        entry['orderNumber'] = numbers.get(entry['orderId'])
+    
+    skipped = []
+    commit_ms = 0.0
+    if not dry_run and plan:
+        began = time.perf_counter()
+        plan, skipped = apply_plan(plan, assigned_by, assigned_by_name)
+        commit_ms = (time.perf_counter() - began) * 1000
+    
+    return {
+        'assigned': [{k: e[k] for k in ('orderId', 'writerId', 'writerName', 'score')} for e in plan],
+        'skipped': [e['orderId'] for e in skipped],
+        'unassigned': unassigned,
+        'dryRun': dry_run,
+        'stats': {
+            'orders': len(orders),
+            'writers': len(features['ids']),
+            'solveMs': round(solve_ms, 2),
+            'commitMs': round(commit_ms, 2)
+        }
+    }
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Benchmark for idle long-lived connections: sync (WSGI) vs async (ASGI).
+
+Starts the API twice on a throwaway database:
+    sync    the Flask app on Werkzeug's threaded server (what `python app.py`
+            runs), where every open connection holds a thread that polls
+            the database
+    asgi    asgi.py on uvicorn, where the same URLs are coroutines woken by
+            one shared change feed
+
+and for each opens --connections long-polls on /api/sync/wait. While they
+idle it records the server's threads and resident memory, how many
+database polls it makes per second, and how long /api/health takes. Then it
+creates one notification and times how long it takes for every waiting
+client to be answered.
+
+Usage: python benchmarks/bench_asgi.py [--connections 1000] [--idle 5]
+Needs uvicorn, a2wsgi and aiosqlite (requirements.txt).
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+DB_FILE = os.path.join(tempfile.gettempdir(), 'bench_asgi.db')
+if os.path.exists(DB_FILE):
+    os.remove(DB_FILE)
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_FILE}'
+os.environ['RATE_LIMIT_ENABLED'] = 'false'
+
+from app import create_app  # noqa: E402
+from db import db  # noqa: E402
+import migrator  # noqa: E402
+
+HOST = '127.0.0.1'
+
+# Counts the server's database polls: every long-poll check reads the tombstones table
+COUNT_POLLS = """
+import sqlite3, sys
+statements = 0
+def trace(statement):
+    global statements
+    if 'tombstones' in statement:
+        statements += 1
+_connect = sqlite3.connect
+def connect(*args, **kwargs):
+    connection = _connect(*args, **kwargs)
+    connection.set_trace_callback(trace)
+    return connection
+sqlite3.connect = sqlite3.dbapi2.connect = connect
+import threading, time
+def report():
+    while True:
+        time.sleep(0.5)
+        with open(sys.argv[1], 'w') as out:
+            out.write(str(statements))
+threading.Thread(target=report, daemon=True).start()
+"""
+
+SERVERS = {
+    'sync': COUNT_POLLS + """
+from werkzeug.serving import run_simple
+from app import create_app
+run_simple('{host}', {port}, create_app(), threaded=True)
+""",
+    'asgi': COUNT_POLLS + """
+import uvicorn
+uvicorn.run('asgi:app', host='{host}', port={port}, log_level='warning', backlog=4096)
+"""
+}
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind((HOST, 0))
+        return probe.getsockname()[1]
+
+def server_stats(pid):
+    with open(f'/proc/{pid}/status') as status:
+        fields = dict(line.split(':', 1) for line in status)
+    return int(fields['Threads']), int(fields['VmRSS'].split()[0]) / 1024
+
+def read_polls(path):
+    try:
+        with open(path) as counter:
+            return int(counter.read() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+async def request(port, path, method='GET', body=None):
+    reader, writer = await asyncio.open_connection(HOST, port)
+    payload = json.dumps(body).encode() if body is not None else b''
+    head = f"{method} {path} HTTP/1.1\r\nHost: {HOST}\r\nConnection: close\r\nContent-Length: {len(payload)}\r\n"
+    if body is not None:
+        head += "Content-Type: application/json\r\n"
+    writer.write(head.encode() + b"\r\n" + payload)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    status = int(response.split(b' ', 2)[1])
+    return status, response.split(b'\r\n\r\n', 1)[1]
+
+async def long_poll(port, since, answered):
+    status, body = await request(port, f'/api/sync/wait?since={since}&tables=notifications&timeout=60')
+    answered.append((time.perf_counter(), status, json.loads(body)))
+
+async def run_mode(mode, args):
+    port = free_port()
+    counter = tempfile.NamedTemporaryFile(delete=False).name
+    code = SERVERS[mode].format(host=HOST, port=port)
+    server = subprocess.Popen([sys.executable, '-c', code, counter], cwd=SERVER_DIR, env=os.environ.copy(),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        for _ in range(100):
+            try:
+                if (await request(port, '/api/health'))[0] == 200:
+                    break
+            except OSError:
+                await asyncio.sleep(0.1)
+        threads_before, memory_before = server_stats(server.pid)
+        # Each mode waits for changes after its own start, not the previous mode's notification
+        since = json.loads((await request(port, '/api/sync?tables=notifications'))[1])['watermark']
+        
+        answered = []
+        began = time.perf_counter()
+        waiters = []
+        for n in range(args.connections):
+            waiters.append(asyncio.ensure_future(long_poll(port, since, answered)))
+            if n % 100 == 99:
+                await asyncio.sleep(0.05)  # let the server accept as we go
+        await asyncio.sleep(args.idle)
+        opened = time.perf_counter() - began
+        
+        polls_before = read_polls(counter)
+        await asyncio.sleep(2)
+        polls_per_second = (read_polls(counter) - polls_before) / 2
+        threads, memory = server_stats(server.pid)
+        health = []
+        for _ in range(10):
+            started = time.perf_counter()
+            await request(port, '/api/health')
+            health.append((time.perf_counter() - started) * 1000)
+        
+        created = time.perf_counter()
+        await request(port, '/api/notifications', 'POST', {'userId': 'bench', 'type': 'info', 'title': 'wake up'})
+        await asyncio.wait_for(asyncio.gather(*waiters), timeout=90)
+        latencies = sorted(at - created for at, _, _ in answered)
+        woken = sum(1 for _, status, body in answered if status == 200 and body['changed'] == ['notifications'])
+        print(f"{mode:<5} {threads_before:>4} -> {threads:<5} {memory_before:>5.0f} -> {memory:<5.0f} "
+              f"{polls_per_second:>9.0f} {statistics.median(health):>10.1f} "
+              f"{latencies[len(latencies) // 2] * 1000:>10.0f} {latencies[-1] * 1000:>10.0f}   {woken}/{args.connections}"
+              f"   (opened in {opened:.1f}s)")
+        return woken == args.connections
+    finally:
+        server.terminate()
+        server.wait()
+        os.remove(counter)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--idle', type=float, default=5.0, help='seconds to let the connections settle')
+    args = parser.parse_args()
+    
+    try:
+        with create_app().app_context():
+            db.create_all()
+            migrator.stamp_head()
+        
+        print(f"🔌 {args.connections} idle long-polls on /api/sync/wait\n")
+        print(f"{'mode':<5} {'threads':<13} {'RSS MiB':<13} {'polls/s':>9} {'health ms':>10} "
+              f"{'wake p50':>10} {'wake max':>10}   answered")
+        results = [asyncio.run(run_mode(mode, args)) for mode in ('sync', 'asgi')]
+        print(f"\n{'✅' if all(results) else '❌'} every long-poll was answered with the change in both modes")
+    finally:
+        os.remove(DB_FILE)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark for batch auto-assignment (POST /api/orders/auto-assign).
+
+Seeds N Available orders and M writers with random specializations, load and
+capacity, runs the solver and the single-transaction commit, and reports
+solve / commit time, how many orders found a specialist, and whether any
+writer ended up over max_concurrent_orders.
+
+Usage: python benchmarks/bench_auto_assign.py [--orders 5000] [--writers 2000]
+Runs against a throwaway SQLite file, never the real database.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_FILE = os.path.join(tempfile.mkdtemp(), 'bench_auto_assign.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_FILE}'
+os.environ['RATE_LIMIT_ENABLED'] = 'false'
+
+from app import create_app  # noqa: E402
+from db import db  # noqa: E402
+from models import Order, OrderActivity, Writer, ACTIVE_ORDER_STATUSES  # noqa: E402
+from sqlalchemy import func  # noqa: E402
+
+app = create_app()
+
+SUBJECTS = ['Nursing', 'Business Administration', 'Marketing', 'Psychology', 'Computer Science', 'History',
+            'Economics', 'Law', 'Literature', 'Biology', 'Chemistry', 'Sociology', 'Education', 'Finance']
+
+def seed(order_count, writer_count):
+    rng = random.Random(7)
+    now = datetime.utcnow()
+    with app.app_context():
+        db.create_all()
+        db.session.bulk_insert_mappings(Writer, [{
+            'id': f'writer-{n}',
+            'email': f'writer{n}@bench.local',
+            'name': f'Writer {n}',
+            'status': 'active',
+            'specializations': json.dumps(rng.sample(SUBJECTS, rng.randint(1, 3))),
+            'rating': round(rng.uniform(3, 5), 2),
+            'success_rate': round(rng.uniform(60, 100), 1),
+            'max_concurrent_orders': rng.randint(1, 5)
+        } for n in range(writer_count)])
+        db.session.bulk_insert_mappings(Order, [{
+            'id': f'ORD-L{n:06d}',
+            'title': f'Load order {n}',
+            'status': 'In Progress',
+            'writer_id': f'writer-{rng.randrange(writer_count)}',
+            'version': 1
+        } for n in range(writer_count // 2)])
+        db.session.bulk_insert_mappings(Order, [{
+            'id': f'ORD-A{n:06d}',
+            'title': f'Bench order {n}',
+            'subject': rng.choice(SUBJECTS),
+            'status': 'Available',
+            'deadline': now + timedelta(hours=rng.randint(6, 240)),
+            'created_at': now,
+            'version': 1
+        } for n in range(order_count)])
+        db.session.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', type=int, default=5000)
+    parser.add_argument('--writers', type=int, default=2000)
+    args = parser.parse_args()
+    
+    seed(args.orders, args.writers)
+    client = app.test_client()
+    
+    began = time.perf_counter()
+    preview = client.post('/api/orders/auto-assign', json={'dryRun': True, 'maxOrders': args.orders}).get_json()
+    print(f"🔍 dry run: {len(preview['assigned'])} planned, {len(preview['unassigned'])} unassigned, "
+          f"solve {preview['stats']['solveMs']:.1f}ms, round trip {(time.perf_counter() - began) * 1000:.1f}ms")
+    
+    began = time.perf_counter()
+    result = client.post('/api/orders/auto-assign', json={'maxOrders': args.orders}).get_json()
+    elapsed = (time.perf_counter() - began) * 1000
+    print(f"⚡ {len(result['assigned'])} of {args.orders} orders assigned to {args.writers} writers")
+    print(f"   solve {result['stats']['solveMs']:.1f}ms, commit {result['stats']['commitMs']:.1f}ms, "
+          f"round trip {elapsed:.1f}ms")
+    specialist = sum(1 for a in result['assigned'] if a['score'] >= 0.35)
+    print(f"   {specialist / max(len(result['assigned']), 1):.1%} went to a specialist")
+    
+    with app.app_context():
+        load = dict(db.session.query(Order.writer_id, func.count()).filter(
+            Order.status.in_(ACTIVE_ORDER_STATUSES)
+        ).group_by(Order.writer_id).all())
+        capacity = dict(db.session.query(Writer.id, Writer.max_concurrent_orders).all())
+        over = [w for w, count in load.items() if count > capacity.get(w, 0)]
+        # Seeded load ignores capacity, so only writers who received work count
+        over = [w for w in over if w in {a['writerId'] for a in result['assigned']}]
+        activities = OrderActivity.query.filter_by(action_type='assign').count()
+    
+    ok = not over and activities == len(result['assigned'])
+    print(f"{'✅' if ok else '❌'} integrity: {len(over)} writers over capacity, "
+          f"{activities} activities for {len(result['assigned'])} assignments")
+    
+    os.remove(DB_FILE)
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
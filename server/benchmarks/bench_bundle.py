@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark for ZIP bundle export (GET /api/orders/bundle).
+
+Creates completed orders that each carry several stored files, streams the
+bundle for all of them and reports throughput and peak Python memory
+(tracemalloc), then opens the result with zipfile to check every file made it
+through intact.
+
+Usage: python benchmarks/bench_bundle.py [--orders 40] [--files 3] [--mb 4]
+Runs against a throwaway SQLite file and storage root, never the real ones.
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORK_DIR = tempfile.mkdtemp()
+DB_FILE = os.path.join(WORK_DIR, 'bench_bundle.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_FILE}'
+os.environ['RATE_LIMIT_ENABLED'] = 'false'
+os.environ['STORAGE_ROOT'] = os.path.join(WORK_DIR, 'uploads')
+
+from app import create_app  # noqa: E402
+from db import db  # noqa: E402
+from files import record_file  # noqa: E402
+from models import Order, OrderActivity  # noqa: E402
+from storage import get_storage  # noqa: E402
+
+app = create_app()
+
+def seed(order_count, files_per_order, megabytes):
+    storage = get_storage()
+    now = datetime.utcnow()
+    digests = {}
+    for n in range(order_count):
+        entries = []
+        for f in range(files_per_order):
+            data = os.urandom(megabytes * 1024 * 1024)
+            sha256, size, _ = storage.put_stream(io.BytesIO(data))
+            stored = record_file(sha256, size, f'chapter-{f}.docx', 'application/octet-stream', related_order_id=f'ORD-{n:05d}')
+            db.session.flush()
+            entries.append(stored.to_dict())
+            digests[sha256] = size
+        db.session.add(Order(
+            id=f'ORD-{n:05d}', order_number=f'{n:04d}', title=f'Order {n}', description='Bundle benchmark',
+            subject='History', pages=5, words=1375, deadline=now + timedelta(days=3), status='Completed',
+            price_kes=1750, cpp=350, total_price_kes=1750, completed_at=now - timedelta(days=n % 30),
+            original_files=json.dumps(entries[:1]), revision_files=json.dumps(entries[1:])
+        ))
+        db.session.add(OrderActivity(id=f'ACT-{n:05d}', order_id=f'ORD-{n:05d}', action_type='complete',
+                                     action_by='admin', description='Completed'))
+    db.session.commit()
+    return digests
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', type=int, default=40)
+    parser.add_argument('--files', type=int, default=3)
+    parser.add_argument('--mb', type=int, default=4)
+    args = parser.parse_args()
+    
+    with app.app_context():
+        db.create_all()
+        digests = seed(args.orders, args.files, args.mb)
+    total_mb = args.orders * args.files * args.mb
+    print(f"📦 {args.orders} orders, {args.orders * args.files} files, {total_mb}MB of documents")
+    
+    client = app.test_client()
+    output = os.path.join(WORK_DIR, 'bundle.zip')
+    tracemalloc.start()
+    began = time.perf_counter()
+    response = client.get('/api/orders/bundle?status=Completed', buffered=False)
+    largest = 0
+    with open(output, 'wb') as f:
+        for chunk in response.response:
+            largest = max(largest, len(chunk))
+            f.write(chunk)
+    response.close()
+    elapsed = time.perf_counter() - began
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"⬇️  bundle: {os.path.getsize(output) / 1e6:.0f}MB in {elapsed:.2f}s ({total_mb / elapsed:.0f}MB/s), "
+          f"peak Python memory {peak / 1e6:.1f}MB, largest chunk {largest / 1e6:.1f}MB")
+    
+    with zipfile.ZipFile(output) as archive:
+        manifest = json.loads(archive.read('manifest.json'))
+        intact = all(
+            hashlib.sha256(archive.read(entry['path'])).hexdigest() == entry['sha256']
+            for entry in manifest['files']
+        )
+        print(f"{'✅' if intact and len(manifest['files']) == args.orders * args.files else '❌'} "
+              f"{len(manifest['orders'])} orders, {len(manifest['files'])} files verified, "
+              f"{len(manifest['missing'])} missing")
+    
+    shutil.rmtree(WORK_DIR)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the writer matching engine (GET /api/orders/<id>/candidates).
+
+Seeds N writers with random specializations, languages, ratings, load and
+timezones, then measures the cold index build, an incremental refresh after
+a few writers change, and warm ranking latency.
+
+Usage: python benchmarks/bench_candidates.py [--writers 10000] [--rounds 200]
+Runs against a throwaway SQLite file, never the real database.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_FILE = os.path.join(tempfile.mkdtemp(), 'bench_candidates.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_FILE}'
+os.environ['RATE_LIMIT_ENABLED'] = 'false'
+
+from app import create_app  # noqa: E402
+from db import db  # noqa: E402
+from models import Order, Writer  # noqa: E402
+from matching import writer_index  # noqa: E402
+
+app = create_app()
+
+SUBJECTS = ['Nursing', 'Business Administration', 'Marketing', 'Psychology', 'Computer Science', 'History',
+            'Economics', 'Law', 'Literature', 'Biology', 'Chemistry', 'Sociology', 'Education', 'Finance']
+LANGUAGES = ['English', 'Swahili', 'French', 'Spanish', 'German', 'Arabic']
+TIMEZONES = ['Africa/Nairobi', 'Europe/London', 'America/New_York', 'Asia/Kolkata', 'Australia/Sydney', None]
+
+def seed(writer_count):
+    rng = random.Random(42)
+    with app.app_context():
+        db.create_all()
+        db.session.bulk_insert_mappings(Writer, [{
+            'id': f'writer-{n}',
+            'email': f'writer{n}@bench.local',
+            'name': f'Writer {n}',
+            'status': 'active' if rng.random() > 0.05 else 'suspended',
+            'specializations': json.dumps(rng.sample(SUBJECTS, rng.randint(1, 4))),
+            'languages': json.dumps(rng.sample(LANGUAGES, rng.randint(1, 3))),
+            'timezone': rng.choice(TIMEZONES),
+            'rating': round(rng.uniform(3, 5), 2),
+            'success_rate': round(rng.uniform(60, 100), 1),
+            'max_concurrent_orders': rng.randint(1, 5)
+        } for n in range(writer_count)])
+        db.session.bulk_insert_mappings(Order, [{
+            'id': f'ORD-L{n:06d}',
+            'title': f'Load order {n}',
+            'status': 'In Progress',
+            'writer_id': f'writer-{rng.randrange(writer_count)}',
+            'version': 1
+        } for n in range(writer_count)])
+        db.session.add(Order(id='ORD-TARGET', title='Target', subject='Nursing', status='Available'))
+        db.session.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--writers', type=int, default=10000)
+    parser.add_argument('--rounds', type=int, default=200)
+    args = parser.parse_args()
+    
+    seed(args.writers)
+    with app.app_context():
+        order = Order.query.get('ORD-TARGET')
+        
+        began = time.perf_counter()
+        writer_index.refresh()
+        print(f"🏗️  cold build of {args.writers} writers: {(time.perf_counter() - began) * 1000:.1f}ms")
+        
+        for writer in Writer.query.limit(20):
+            writer.rating = 5.0
+        db.session.commit()
+        began = time.perf_counter()
+        writer_index.refresh()
+        print(f"🔁 incremental refresh of 20 writers: {(time.perf_counter() - began) * 1000:.2f}ms")
+        
+        samples = []
+        for n in range(args.rounds):
+            language = LANGUAGES[n % len(LANGUAGES)] if n % 2 else None
+            began = time.perf_counter()
+            top = writer_index.rank(order, limit=10, language=language, timezone='Africa/Nairobi')
+            samples.append(time.perf_counter() - began)
+        samples.sort()
+        print(f"⚡ rank {args.writers} writers: p50 {samples[len(samples) // 2] * 1000:.2f}ms, "
+              f"p99 {samples[int(len(samples) * 0.99) - 1] * 1000:.2f}ms")
+        print(f"   top candidate: {top[0]['writerId']} score {top[0]['score']}")
+        
+        client = app.test_client()
+        began = time.perf_counter()
+        for _ in range(50):
+            client.get('/api/orders/ORD-TARGET/candidates?timezone=Africa/Nairobi')
+        print(f"🌐 endpoint round trip: {(time.perf_counter() - began) / 50 * 1000:.2f}ms avg")
+    
+    os.remove(DB_FILE)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for deferred Order columns.
+
+Seeds N orders whose text and JSON columns look like production rows, then
+lists them three ways and reports peak Python memory (tracemalloc) and time:
+  deferred  - Order.query.all(), long columns left in the database
+  full row  - Order.query.options(FULL_ROW).all(), the pre-deferral behaviour
+  summary   - deferred load plus to_summary_dict(), i.e. GET /api/orders
+
+Usage: python benchmarks/bench_deferred_columns.py [--orders 50000]
+Runs against a throwaway SQLite file, never the real database.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_FILE = os.path.join(tempfile.mkdtemp(), 'bench_deferred.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_FILE}'
+
+from app import create_app  # noqa: E402
+from db import db  # noqa: E402
+from models import Order, FULL_ROW  # noqa: E402
+
+app = create_app()
+
+LOREM = ('Write a well-researched paper using at least five scholarly sources, APA 7th edition, '
+         'with an introduction, literature review, discussion and conclusion. ') * 4
+
+def seed(count):
+    files = json.dumps([{'id': f'F{n}', 'filename': f'draft-{n}.docx', 'size': 48213, 'url': f'/uploads/draft-{n}.docx'}
+                        for n in range(3)])
+    messages = json.dumps([{'id': f'M{n}', 'message': LOREM[:160], 'sentAt': '2025-01-01T10:00:00'} for n in range(4)])
+    with app.app_context():
+        db.create_all()
+        for start in range(0, count, 10000):
+            db.session.bulk_insert_mappings(Order, [{
+                'id': f'ORD-{n:06d}', 'title': f'Order {n}', 'description': LOREM, 'requirements': LOREM,
+                'subject': 'Nursing', 'pages': 5, 'price_kes': 350.0, 'status': 'In Progress',
+                'writer_id': f'writer-{n % 500}', 'attachments': files, 'original_files': files,
+                'client_messages': messages, 'admin_messages': messages, 'revision_requests': messages,
+                'submission_notes': LOREM[:200], 'version': 1
+            } for n in range(start, min(start + 10000, count))])
+        db.session.commit()
+
+def measure(label, load):
+    with app.app_context():
+        gc.collect()
+        tracemalloc.start()
+        began = time.perf_counter()
+        result = load()
+        elapsed = time.perf_counter() - began
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"   {label:<9} {len(result):>6} rows  peak {peak / 1e6:7.1f}MB  {elapsed * 1000:7.0f}ms")
+        db.session.remove()
+    return peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', type=int, default=50000)
+    args = parser.parse_args()
+    
+    seed(args.orders)
+    print(f"📋 listing {args.orders} orders")
+    full = measure('full row', lambda: Order.query.options(FULL_ROW).all())
+    deferred = measure('deferred', lambda: Order.query.all())
+    measure('summary', lambda: [order.to_summary_dict() for order in Order.query.all()])
+    print(f"✅ deferred columns cut peak memory {full / deferred:.1f}x")
+    
+    os.remove(DB_FILE)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark for Idempotency-Key handling.
+
+Times POST /api/financial/payments through the test client without a key,
+with a fresh key per request (claim, run the view, store the response) and
+replaying a key that already has a response. Then retries every keyed
+request and checks that no payment was created twice, and times a purge
+of expired keys.
+
+Usage: python benchmarks/bench_idempotency.py [--requests 2000]
+Runs against a throwaway SQLite file, never the real database.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_FILE = os.path.join(tempfile.gettempdir(), 'bench_idempotency.db')
+if os.path.exists(DB_FILE):
+    os.remove(DB_FILE)
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_FILE}'
+os.environ['RATE_LIMIT_ENABLED'] = 'false'
+
+from sqlalchemy import func  # noqa: E402
+
+from app import create_app  # noqa: E402
+from db import db  # noqa: E402
+from models import IdempotencyKey, Payment  # noqa: E402
+import idempotency  # noqa: E402
+
+app = create_app()
+
+def payment(n):
+    return {'writerId': f'W{n % 100}', 'writerName': f'Writer {n % 100}', 'amount': 1000 + n, 'type': 'earning'}
+
+def timed(client, count, headers_for):
+    began = time.perf_counter()
+    for n in range(count):
+        response = client.post('/api/financial/payments', json=payment(n), headers=headers_for(n))
+        assert response.status_code == 201, response.status_code
+    return (time.perf_counter() - began) / count * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+    count = args.requests
+    
+    try:
+        with app.app_context():
+            db.create_all()
+        client = app.test_client()
+        
+        plain_ms = timed(client, count, lambda n: {})
+        keyed_ms = timed(client, count, lambda n: {'Idempotency-Key': f'pay-{n}'})
+        replay_ms = timed(client, count, lambda n: {'Idempotency-Key': f'pay-{n}'})
+        print(f"⏱️  per request: no key {plain_ms:.2f}ms, new key {keyed_ms:.2f}ms "
+              f"(+{keyed_ms - plain_ms:.2f}ms), replay {replay_ms:.2f}ms")
+        
+        with app.app_context():
+            payments = db.session.query(func.count(Payment.id)).scalar()
+            keys, stored = db.session.query(func.count(IdempotencyKey.key), func.sum(func.length(IdempotencyKey.body))).one()
+            print(f"🗄️  {keys} keys, {stored / keys:.0f} bytes of response each")
+            
+            began = time.perf_counter()
+            removed = idempotency.purge_expired(datetime.utcnow() + idempotency.TTL + timedelta(seconds=1))
+            print(f"🧹 purged {removed} expired keys in {(time.perf_counter() - began) * 1000:.0f}ms")
+        
+        ok = payments == 2 * count and keys == removed == count
+        print(f"{'✅' if ok else '❌'} {payments} payments from {2 * count} first requests, none from {count} replays")
+    finally:
+        os.remove(DB_FILE)
+
+if __name__ == '__main__':
+    main()
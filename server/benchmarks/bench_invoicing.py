@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the invoicing engine.
+
+Seeds completed orders, then compares invoicing a sample of them the old
+way (look for an existing invoice, build an Invoice from the order, commit,
+once per order) with a month-end backfill of the rest. Runs the backfill
+and an incremental run again to check that no order is invoiced twice.
+
+Usage: python benchmarks/bench_invoicing.py [--orders 50000] [--sample 500]
+Runs against a throwaway SQLite file, never the real database.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_FILE = os.path.join(tempfile.gettempdir(), 'bench_invoicing.db')
+if os.path.exists(DB_FILE):
+    os.remove(DB_FILE)
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_FILE}'
+
+from sqlalchemy import func, insert  # noqa: E402
+
+from app import create_app  # noqa: E402
+from db import db  # noqa: E402
+from models import Invoice, Order, Writer  # noqa: E402
+import invoicing  # noqa: E402
+
+app = create_app()
+
+def order_row(n, now):
+    completed_at = now - timedelta(minutes=n)
+    return {
+        'id': f'ORD-{n:06d}', 'order_number': f'{n:06d}', 'title': f'Order {n}', 'pages': random.randint(1, 20),
+        'cpp': random.choice((None, 300.0, 350.0, 400.0)), 'fine_amount': random.choice((0, 0, 0, 150.0)),
+        'writer_id': f'W{n % 500:04d}', 'status': random.choice(('Completed', 'Approved')),
+        'deadline': completed_at + timedelta(hours=6), 'completed_at': completed_at, 'version': 1
+    }
+
+def invoice_one(order_id):
+    """The old way: one existence check, one ORM insert and one commit per order"""
+    if Invoice.query.filter_by(order_id=order_id, type=invoicing.INVOICE_TYPE).first():
+        return
+    order = db.session.get(Order, order_id)
+    writer = db.session.get(Writer, order.writer_id)
+    amount = max(0.0, (order.pages or 0) * (order.cpp or 350) - (order.fine_amount or 0))
+    db.session.add(Invoice(id=f'INV-{order.id}', order_id=order.id, order_title=order.title, writer_id=order.writer_id,
+                           writer_name=writer.name, amount=round(amount, 2), currency='KES', status='pending',
+                           type=invoicing.INVOICE_TYPE, order_pages=order.pages, order_deadline=order.deadline,
+                           order_completed_at=order.completed_at))
+    db.session.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', type=int, default=50000)
+    parser.add_argument('--sample', type=int, default=500)
+    args = parser.parse_args()
+    
+    try:
+        with app.app_context():
+            db.create_all()
+            random.seed(11)
+            now = datetime.utcnow()
+            db.session.execute(insert(Writer), [
+                {'id': f'W{n:04d}', 'name': f'Writer {n}', 'email': f'w{n}@example.com', 'status': 'active'}
+                for n in range(500)
+            ])
+            total = args.orders + args.sample
+            for offset in range(0, total, 10000):
+                db.session.execute(insert(Order), [order_row(n, now) for n in range(offset, min(offset + 10000, total))])
+            db.session.commit()
+            print(f"📦 {total} completed orders")
+            
+            sample = [f'ORD-{n:06d}' for n in random.sample(range(total), args.sample)]
+            began = time.perf_counter()
+            for order_id in sample:
+                invoice_one(order_id)
+            one_by_one = time.perf_counter() - began
+            rate = args.sample / one_by_one
+            print(f"🐢 one at a time: {rate:.0f} invoices/s (~{args.orders / rate:.1f}s for {args.orders})")
+            
+            preview = invoicing.backfill(dry_run=True)
+            began = time.perf_counter()
+            result = invoicing.backfill()
+            elapsed = time.perf_counter() - began
+            print(f"🚀 backfill: {result['created']} invoices in {elapsed * 1000:.0f}ms "
+                  f"({result['created'] / elapsed:.0f} invoices/s, {result['batches']} batches)")
+            
+            began = time.perf_counter()
+            again = invoicing.backfill()
+            incremental = invoicing.run_incremental()
+            print(f"🔁 backfill + incremental again: {(time.perf_counter() - began) * 1000:.0f}ms, "
+                  f"{again['created'] + incremental['created']} new invoices")
+            
+            invoices, distinct = db.session.query(func.count(Invoice.id), func.count(func.distinct(Invoice.order_id))).one()
+            ok = (invoices == distinct == total and result['created'] == preview['created'] == args.orders
+                  and abs(result['amount'] - preview['amount']) < 0.01 and again['created'] == incremental['created'] == 0)
+            print(f"{'✅' if ok else '❌'} {invoices} invoices for {distinct} orders, KES {result['amount']:,.2f} billed by the backfill")
+    finally:
+        os.remove(DB_FILE)
+
+if __name__ == '__main__':
+    main()
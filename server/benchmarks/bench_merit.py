@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark for materialized writer merit scores.
+
+Seeds orders across many writers, then compares serving the top of the
+leaderboard from writer_metrics against what the bidding UI did: load every
+order and score each writer from them. Also times one writer's metrics,
+order updates with the metric listeners running, and `flask merit rebuild`.
+
+Usage: python benchmarks/bench_merit.py [--orders 200000] [--writers 2000]
+Runs against a throwaway SQLite file, never the real database.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_FILE = os.path.join(tempfile.gettempdir(), 'bench_merit.db')
+if os.path.exists(DB_FILE):
+    os.remove(DB_FILE)
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_FILE}'
+
+from sqlalchemy import insert, select  # noqa: E402
+
+from app import create_app  # noqa: E402
+from db import db  # noqa: E402
+from merit import merit_score, order_contributions  # noqa: E402
+from models import Order, Writer  # noqa: E402
+import merit  # noqa: E402
+
+app = create_app()
+
+STATUSES = ('Completed', 'Completed', 'Completed', 'Approved', 'Revision', 'Rejected', 'In Progress', 'Assigned')
+
+def order_row(n, writer_count, now):
+    deadline = now - timedelta(days=random.randint(1, 300))
+    status = random.choice(STATUSES)
+    revisions = random.choice((0, 0, 0, 1, 2))
+    return {
+        'id': f'ORD-{n}', 'order_number': f'{n:06d}', 'title': f'Order {n}', 'pages': random.randint(1, 20),
+        'writer_id': f'W{n % writer_count:05d}', 'status': status, 'deadline': deadline,
+        'completed_at': deadline + timedelta(hours=random.randint(-72, 12)) if status in ('Completed', 'Approved') else None,
+        'revision_count': revisions, 'revision_score': 10 - 2 * revisions, 'version': 1
+    }
+
+def seed(order_count, writer_count):
+    random.seed(7)
+    now = datetime.utcnow()
+    db.session.execute(insert(Writer), [
+        {'id': f'W{n:05d}', 'name': f'Writer {n}', 'email': f'w{n}@example.com', 'status': 'active',
+         'rating': round(random.uniform(3, 5), 2), 'total_reviews': random.randint(0, 50)}
+        for n in range(writer_count)
+    ])
+    # Core inserts skip the ORM listeners, like a bulk import would; rebuild() catches up
+    for offset in range(0, order_count, 10000):
+        db.session.execute(insert(Order), [order_row(n, writer_count, now) for n in range(offset, min(offset + 10000, order_count))])
+    db.session.commit()
+
+def score_on_read(limit):
+    """The old way: every order comes back and each writer is scored from them"""
+    writers = {row.id: row for row in db.session.execute(select(Writer.id, Writer.rating, Writer.total_reviews))}
+    totals = {}
+    columns = (Order.writer_id, Order.status, Order.deadline, Order.completed_at, Order.revision_count,
+               Order.revision_score, Order.total_price_kes, Order.pages)
+    for row in db.session.execute(select(*columns)):
+        counters = totals.setdefault(row[0], dict.fromkeys(merit.COUNTERS, 0))
+        for name, value in order_contributions(*row).items():
+            counters[name] += value
+    scores = []
+    for writer_id, counters in totals.items():
+        writer = writers[writer_id]
+        scores.append((merit_score(dict(counters, rating=writer.rating, total_reviews=writer.total_reviews)), writer_id))
+    return sorted(scores, reverse=True)[:limit]
+
+def timed(samples, run):
+    began = time.perf_counter()
+    for n in range(samples):
+        run(n)
+    return (time.perf_counter() - began) / samples * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', type=int, default=200000)
+    parser.add_argument('--writers', type=int, default=2000)
+    args = parser.parse_args()
+    
+    with app.app_context():
+        db.create_all()
+        seed(args.orders, args.writers)
+        print(f"📦 {args.orders} orders for {args.writers} writers")
+        
+        began = time.perf_counter()
+        rows = merit.rebuild()
+        db.session.commit()
+        print(f"🔄 rebuild: metrics for {rows} writers in {(time.perf_counter() - began) * 1000:.0f}ms")
+        
+        scan_ms = timed(3, lambda n: score_on_read(50))
+        read_ms = timed(200, lambda n: merit.leaderboard(50))
+        print(f"🏆 top 50: score on read {scan_ms:.0f}ms vs leaderboard index {read_ms:.2f}ms")
+        read_ms = timed(200, lambda n: merit.writer_metrics(f'W{(n * 37) % args.writers:05d}'))
+        print(f"📖 one writer's metrics with rank: {read_ms:.2f}ms")
+        
+        order_ids = [f'ORD-{n}' for n in random.sample(range(args.orders), 500)]
+        
+        def complete_order(n):
+            order = db.session.get(Order, order_ids[n])
+            order.status = 'Completed'
+            order.completed_at = order.deadline - timedelta(hours=1) if order.deadline else datetime.utcnow()
+            db.session.commit()
+        print(f"✍️  complete order with metric upkeep: {timed(len(order_ids), complete_order):.2f}ms")
+        
+        # Both order by score, then writer id, descending
+        top = [(entry['meritScore'], entry['writerId']) for entry in merit.leaderboard(50)[0]]
+        ok = top == score_on_read(50)
+        print(f"{'✅' if ok else '❌'} leaderboard matches scores recomputed from orders")
+    
+    os.remove(DB_FILE)
+
+if __name__ == '__main__':
+    main()
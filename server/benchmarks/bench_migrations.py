@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark for schema migrations.
+
+Builds a large fixture at the latest schema (orders, writers, reviews,
+messages, invoices, notifications, withdrawals), downgrades it to the base
+schema and then times every migration on the way back up, one step at a
+time. The per-step time is roughly how long that step holds its tables on a
+database of this size, so check it before running `flask db upgrade` in
+production (or use `flask db rehearse` on a copy of the real database).
+Finishes by checking that the upgraded schema matches db.create_all().
+
+Usage: python benchmarks/bench_migrations.py [--orders 100000]
+Runs against a throwaway SQLite file, never the real database.
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_FILE = os.path.join(tempfile.gettempdir(), 'bench_migrations.db')
+STORAGE_DIR = tempfile.mkdtemp(prefix='bench_migrations_')
+if os.path.exists(DB_FILE):
+    os.remove(DB_FILE)
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_FILE}'
+os.environ['STORAGE_ROOT'] = STORAGE_DIR
+
+from sqlalchemy import insert, inspect  # noqa: E402
+
+from app import create_app  # noqa: E402
+from db import db  # noqa: E402
+from models import Invoice, Message, Notification, Order, Review, WithdrawalRequest, Writer  # noqa: E402
+import migrator  # noqa: E402
+
+app = create_app()
+
+CHUNK = 10000
+
+def insert_rows(model, count, row):
+    for offset in range(0, count, CHUNK):
+        db.session.execute(insert(model), [row(n) for n in range(offset, min(offset + CHUNK, count))])
+    db.session.commit()
+
+def build_fixture(orders, now):
+    writers = max(1, orders // 50)
+    insert_rows(Writer, writers, lambda n: {
+        'id': f'W{n:05d}', 'name': f'Writer {n}', 'email': f'w{n}@example.com', 'status': 'active',
+        'specializations': '["Nursing", "History"]', 'languages': '["English"]'
+    })
+    insert_rows(Order, orders, lambda n: {
+        'id': f'ORD-{n:07d}', 'order_number': f'{n:07d}', 'title': f'Order {n}', 'pages': random.randint(1, 20),
+        'writer_id': f'W{n % writers:05d}', 'status': random.choice(('Available', 'In Progress', 'Completed')),
+        'deadline': now + timedelta(hours=n % 72), 'created_at': now - timedelta(minutes=n), 'version': 1
+    })
+    insert_rows(Review, orders // 5, lambda n: {
+        'id': f'REV-{n:07d}', 'order_id': f'ORD-{n:07d}', 'writer_id': f'W{n % writers:05d}',
+        'rating': random.randint(1, 5), 'created_at': now - timedelta(minutes=n)
+    })
+    insert_rows(Message, orders // 5, lambda n: {
+        'id': f'MSG-{n:07d}', 'sender_id': 'admin', 'sender_name': 'Admin', 'sender_role': 'admin',
+        'recipient_id': f'W{n % writers:05d}', 'recipient_role': 'writer', 'content': f'Message {n}',
+        'is_read': n % 3 == 0, 'created_at': now - timedelta(minutes=n)
+    })
+    insert_rows(Invoice, orders // 2, lambda n: {
+        'id': f'INV-{n:07d}', 'order_id': f'ORD-{n:07d}', 'writer_id': f'W{n % writers:05d}', 'amount': 1000.0,
+        'status': 'pending', 'created_at': now - timedelta(minutes=n), 'updated_at': now - timedelta(minutes=n)
+    })
+    insert_rows(Notification, orders // 2, lambda n: {
+        'id': f'NTF-{n:07d}', 'user_id': f'W{n % writers:05d}', 'type': 'info', 'title': 'Hello',
+        'created_at': now - timedelta(minutes=n), 'updated_at': now - timedelta(minutes=n)
+    })
+    insert_rows(WithdrawalRequest, orders // 10, lambda n: {
+        'id': f'WD-{n:07d}', 'writer_id': f'W{n % writers:05d}', 'amount': 500.0, 'status': 'pending',
+        'requested_at': now - timedelta(minutes=n)
+    })
+    return writers
+
+def schema():
+    inspector = inspect(db.session.connection())
+    return {table: ({column['name'] for column in inspector.get_columns(table)},
+                    {index['name'] for index in inspector.get_indexes(table)})
+            for table in inspector.get_table_names()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', type=int, default=100000)
+    args = parser.parse_args()
+    
+    try:
+        with app.app_context():
+            db.create_all()
+            migrator.stamp_head()
+            expected = schema()
+            random.seed(3)
+            began = time.perf_counter()
+            writers = build_fixture(args.orders, datetime.utcnow())
+            size = os.path.getsize(DB_FILE) / (1024 * 1024)
+            print(f"📦 {args.orders} orders, {writers} writers and related rows ({size:.0f} MiB) "
+                  f"in {time.perf_counter() - began:.1f}s")
+            
+            began = time.perf_counter()
+            base = migrator.discover()[0].version
+            reverted = migrator.downgrade(base, echo=lambda message: None)
+            print(f"⬇️  downgraded {len(reverted)} steps to {base} in {time.perf_counter() - began:.1f}s")
+            
+            print(f"\n{'step':<40} {'seconds':>8}")
+            total = 0.0
+            for migration in migrator.pending():
+                (_, seconds), = migrator.upgrade(migration.version, echo=lambda message: None)
+                total += seconds
+                print(f"{migration.version} {migration.name:<35} {seconds:>8.2f}")
+            print(f"{'total':<40} {total:>8.2f}\n")
+            
+            recorded = sum(1 for row in migrator.applied().values() if row.duration_ms is not None)
+            ok = schema() == expected and migrator.current_version() == migrator.head() and recorded == len(reverted)
+            print(f"{'✅' if ok else '❌'} schema matches db.create_all() at {migrator.current_version()}, "
+                  f"{recorded} timings recorded in schema_migrations")
+    finally:
+        os.remove(DB_FILE)
+        shutil.rmtree(STORAGE_DIR, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark for payout batches.
+
+Seeds approved withdrawals, then compares paying a sample of them the old
+way (withdrawal update, Payment and TransactionLog, one commit each, as the
+separate API calls did) with paying the rest through one payout batch.
+Also retries the batch with the same idempotency key and checks that
+nothing was paid twice and the settlement file lists every withdrawal.
+
+Usage: python benchmarks/bench_payouts.py [--withdrawals 10000] [--sample 500]
+Runs against a throwaway SQLite file and storage directory, never the real ones.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_FILE = os.path.join(tempfile.gettempdir(), 'bench_payouts.db')
+STORAGE_DIR = tempfile.mkdtemp(prefix='bench_payouts_')
+if os.path.exists(DB_FILE):
+    os.remove(DB_FILE)
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_FILE}'
+os.environ['STORAGE_ROOT'] = STORAGE_DIR
+
+from sqlalchemy import func, insert  # noqa: E402
+
+from app import create_app  # noqa: E402
+from db import db  # noqa: E402
+from models import Payment, StoredFile, TransactionLog, WithdrawalRequest  # noqa: E402
+import payouts  # noqa: E402
+from storage import get_storage  # noqa: E402
+
+app = create_app()
+
+METHODS = ('mobile_money', 'mobile_money', 'bank_transfer', 'paypal')
+
+def withdrawal_row(n, now):
+    method = random.choice(METHODS)
+    account = {'mobileNumber': f'+2547{n:08d}'} if method == 'mobile_money' else (
+        {'bankName': 'KCB', 'accountNumber': f'{n:012d}'} if method == 'bank_transfer' else {'paypalEmail': f'w{n}@example.com'})
+    return {
+        'id': f'WD-{n:06d}', 'writer_id': f'W{n % 3000:05d}', 'writer_name': f'Writer {n % 3000}',
+        'amount': round(random.uniform(500, 50000), 2), 'currency': 'KES', 'status': 'approved', 'method': method,
+        'account_details': json.dumps(account), 'approved_by': 'admin', 'approved_at': now - timedelta(minutes=n),
+        'requested_at': now - timedelta(days=1)
+    }
+
+def pay_one(withdrawal_id):
+    """The old way: three writes, each committed on its own"""
+    now = datetime.utcnow()
+    withdrawal = db.session.get(WithdrawalRequest, withdrawal_id)
+    withdrawal.status = 'paid'
+    withdrawal.paid_by = 'admin'
+    withdrawal.paid_at = now
+    db.session.commit()
+    db.session.add(Payment(id=str(uuid.uuid4()), writer_id=withdrawal.writer_id, writer_name=withdrawal.writer_name,
+                           amount=withdrawal.amount, currency='KES', type='withdrawal', status='completed',
+                           method=withdrawal.method))
+    db.session.commit()
+    db.session.add(TransactionLog(id=str(uuid.uuid4()), type='withdrawal_paid', amount=withdrawal.amount,
+                                  currency='KES', performed_by='admin', related_entity_id=withdrawal.id))
+    db.session.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--withdrawals', type=int, default=10000)
+    parser.add_argument('--sample', type=int, default=500)
+    args = parser.parse_args()
+    
+    try:
+        with app.app_context():
+            db.create_all()
+            random.seed(5)
+            now = datetime.utcnow()
+            total = args.withdrawals + args.sample
+            db.session.execute(insert(WithdrawalRequest), [withdrawal_row(n, now) for n in range(total)])
+            db.session.commit()
+            print(f"💸 {total} approved withdrawals")
+            
+            # Oldest approvals go first in a batch, so the sample is taken from the newest
+            sample = [f'WD-{n:06d}' for n in range(total - args.sample, total)]
+            began = time.perf_counter()
+            for withdrawal_id in sample:
+                pay_one(withdrawal_id)
+            one_by_one = time.perf_counter() - began
+            rate = args.sample / one_by_one
+            print(f"🐢 one at a time: {rate:.0f} withdrawals/s "
+                  f"(~{args.withdrawals / rate:.1f}s for {args.withdrawals}, {3 * args.withdrawals} commits)")
+            
+            began = time.perf_counter()
+            batch, created = payouts.create_batch('payday-bench', {'processedBy': 'admin'}, created_by='admin')
+            elapsed = time.perf_counter() - began
+            print(f"🚀 payout batch: {batch.withdrawal_count} withdrawals in {elapsed * 1000:.0f}ms "
+                  f"({batch.withdrawal_count / elapsed:.0f} withdrawals/s, one commit)")
+            
+            began = time.perf_counter()
+            replay, created_again = payouts.create_batch('payday-bench', {'processedBy': 'admin'}, created_by='admin')
+            print(f"🔁 retry with the same key: {(time.perf_counter() - began) * 1000:.1f}ms, "
+                  f"{'new batch' if created_again else 'same batch returned'}")
+            
+            payments = db.session.query(func.count(Payment.id)).scalar()
+            logs = db.session.query(func.count(TransactionLog.id)).scalar()
+            paid = WithdrawalRequest.query.filter_by(status='paid').count()
+            stored = db.session.get(StoredFile, batch.settlement_file_id)
+            with get_storage().open(stored.sha256) as source:
+                settlement = list(csv.DictReader(io.TextIOWrapper(source, encoding='utf-8')))
+            ok = (not created_again and replay.id == batch.id and paid == total and payments == total and logs == total
+                  and len(settlement) == batch.withdrawal_count == args.withdrawals)
+            print(f"{'✅' if ok else '❌'} {paid} paid, {payments} payments, {logs} logs, "
+                  f"{len(settlement)} settlement rows ({stored.size / 1024:.0f} KiB)")
+    finally:
+        os.remove(DB_FILE)
+        shutil.rmtree(STORAGE_DIR, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
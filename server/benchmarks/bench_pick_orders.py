@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark for POST /api/orders/<id>/pick under a flash of new orders.
+
+Writer threads repeatedly list Available orders and try to claim a random
+one until nothing is left or they reach max_concurrent_orders. Reports claim
+throughput, lost races and how evenly orders were spread across writers
+(Jain's fairness index: 1.0 = perfectly even), then checks that every order
+was claimed exactly once and no writer went over capacity.
+
+Usage: python benchmarks/bench_pick_orders.py [--orders 300] [--writers 24] [--max-concurrent 20]
+Runs against a throwaway SQLite file, never the real database.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_FILE = os.path.join(tempfile.mkdtemp(), 'bench_pick.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_FILE}'
+os.environ['RATE_LIMIT_ENABLED'] = 'false'
+
+from app import create_app  # noqa: E402
+from db import db  # noqa: E402
+from models import Order, OrderActivity, Writer  # noqa: E402
+import metrics  # noqa: E402
+
+app = create_app()
+
+def seed(order_count, writer_count, max_concurrent):
+    with app.app_context():
+        db.create_all()
+        for n in range(writer_count):
+            db.session.add(Writer(id=f'writer-{n}', email=f'writer{n}@bench.local', name=f'Writer {n}',
+                                  status='active', max_concurrent_orders=max_concurrent))
+        for n in range(order_count):
+            db.session.add(Order(id=f'ORD-B{n:05d}', order_number=None,
+                                 title=f'Bench order {n}', pages=1, status='Available'))
+        db.session.commit()
+
+def jain_index(values):
+    total = sum(values)
+    squares = sum(v * v for v in values)
+    return (total * total) / (len(values) * squares) if squares else 1.0
+
+def run(writer_count):
+    claims = {f'writer-{n}': 0 for n in range(writer_count)}
+    latencies = []
+    lock = threading.Lock()
+    start = threading.Barrier(writer_count)
+    
+    def writer(writer_id):
+        client = app.test_client()
+        rng = random.Random(writer_id)
+        start.wait()
+        while True:
+            available = client.get('/api/orders?status=Available').get_json()
+            if not available:
+                return
+            order = rng.choice(available)
+            began = time.perf_counter()
+            response = client.post(f"/api/orders/{order['id']}/pick", json={'writerId': writer_id})
+            elapsed = time.perf_counter() - began
+            with lock:
+                latencies.append(elapsed)
+                if response.status_code == 200:
+                    claims[writer_id] += 1
+            if response.status_code == 409 and 'maximum' in response.get_json().get('error', ''):
+                return
+    
+    threads = [threading.Thread(target=writer, args=(w,)) for w in claims]
+    began = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return claims, latencies, time.perf_counter() - began
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', type=int, default=300)
+    parser.add_argument('--writers', type=int, default=24)
+    parser.add_argument('--max-concurrent', type=int, default=20)
+    args = parser.parse_args()
+    
+    seed(args.orders, args.writers, args.max_concurrent)
+    print(f"🏁 {args.writers} writers (max {args.max_concurrent} each) racing for {args.orders} orders...")
+    claims, latencies, elapsed = run(args.writers)
+    
+    counters = metrics.snapshot()['counters']
+    claimed = sum(claims.values())
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0
+    
+    print(f"  claimed:     {claimed} orders in {elapsed:.2f}s ({claimed / elapsed:.0f} claims/s)")
+    print(f"  attempts:    {len(latencies)} (lost races: {counters.get('orders.pick.lost', 0)}, "
+          f"at capacity: {counters.get('orders.pick.at_capacity', 0)})")
+    print(f"  latency:     p50 {p50:.2f}ms, p99 {p99:.2f}ms")
+    print(f"  per writer:  min {min(claims.values())}, max {max(claims.values())}, "
+          f"fairness {jain_index(list(claims.values())):.3f}")
+    
+    with app.app_context():
+        assigned = Order.query.filter(Order.status == 'Assigned').count()
+        picks = OrderActivity.query.filter_by(action_type='pick').count()
+        over_capacity = [w for w, n in claims.items() if n > args.max_concurrent]
+        expected = min(args.orders, args.writers * args.max_concurrent)
+    
+    ok = assigned == claimed == picks == expected and not over_capacity
+    print(f"  integrity:   assigned={assigned} activities={picks} expected={expected} over_capacity={len(over_capacity)}")
+    print('✅ Every order claimed exactly once' if ok else '❌ Integrity check failed')
+    os.remove(DB_FILE)
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark for incremental writer rating aggregation.
+
+Seeds reviews across many writers, then compares reading one writer's
+rating stats from writer_rating_stats against recomputing them from the
+reviews table (what every average used to cost), times review inserts with
+the aggregate listeners running, and times a full `flask ratings rebuild`.
+
+Usage: python benchmarks/bench_ratings.py [--reviews 200000] [--writers 2000]
+Runs against a throwaway SQLite file, never the real database.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_FILE = os.path.join(tempfile.gettempdir(), 'bench_ratings.db')
+if os.path.exists(DB_FILE):
+    os.remove(DB_FILE)
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_FILE}'
+
+from sqlalchemy import func, insert  # noqa: E402
+
+from app import create_app  # noqa: E402
+from db import db  # noqa: E402
+from models import Review, Writer  # noqa: E402
+import ratings  # noqa: E402
+
+app = create_app()
+
+CATEGORIES = ('quality', 'communication', 'timeliness', 'professionalism', 'overall')
+
+def review_row(n, writer_count):
+    rating = random.randint(1, 5)
+    return {
+        'id': f'REV-{n}', 'writer_id': f'W{n % writer_count:05d}', 'rating': rating, 'status': 'published',
+        'categories': json.dumps([{'category': c, 'rating': max(1, min(5, rating + random.randint(-1, 1)))} for c in CATEGORIES])
+    }
+
+def seed(review_count, writer_count):
+    random.seed(11)
+    db.session.execute(insert(Writer), [
+        {'id': f'W{n:05d}', 'name': f'Writer {n}', 'email': f'w{n}@example.com', 'status': 'active'}
+        for n in range(writer_count)
+    ])
+    # Core inserts skip the ORM listeners, like a bulk import would; rebuild() catches up
+    for offset in range(0, review_count, 10000):
+        db.session.execute(insert(Review), [review_row(n, writer_count) for n in range(offset, min(offset + 10000, review_count))])
+    db.session.commit()
+
+def scan_stats(writer_id=None):
+    """The old way: aggregate the reviews on read"""
+    totals = db.session.query(func.avg(Review.rating), func.count())
+    rows = db.session.query(Review.categories)
+    if writer_id:
+        totals = totals.filter(Review.writer_id == writer_id)
+        rows = rows.filter(Review.writer_id == writer_id)
+    average, count = totals.one()
+    categories = {}
+    for (raw,) in rows:
+        for entry in json.loads(raw):
+            categories.setdefault(entry['category'], []).append(entry['rating'])
+    return average, count, {c: sum(v) / len(v) for c, v in categories.items()}
+
+def timed(samples, run):
+    began = time.perf_counter()
+    for n in range(samples):
+        run(n)
+    return (time.perf_counter() - began) / samples * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reviews', type=int, default=200000)
+    parser.add_argument('--writers', type=int, default=2000)
+    args = parser.parse_args()
+    
+    with app.app_context():
+        db.create_all()
+        seed(args.reviews, args.writers)
+        print(f"⭐ {args.reviews} reviews for {args.writers} writers")
+        
+        began = time.perf_counter()
+        writers, rows = ratings.rebuild()
+        db.session.commit()
+        print(f"🔄 rebuild: {rows} stat rows for {writers} writers in {(time.perf_counter() - began) * 1000:.0f}ms")
+        
+        def writer_id(n):
+            return f'W{(n * 37) % args.writers:05d}'
+        
+        scan_ms = timed(200, lambda n: scan_stats(writer_id(n)))
+        read_ms = timed(200, lambda n: ratings.rating_summary(writer_id(n)))
+        print(f"📖 one writer's stats: scan {scan_ms:.2f}ms vs precomputed {read_ms:.2f}ms")
+        scan_ms = timed(3, lambda n: scan_stats())
+        read_ms = timed(20, lambda n: ratings.rating_summary())
+        print(f"🌍 platform-wide stats: scan {scan_ms:.0f}ms vs precomputed {read_ms:.2f}ms")
+        
+        def add_review(n):
+            db.session.add(Review(id=f'NEW-{n}', **{k: v for k, v in review_row(n, args.writers).items() if k != 'id'}))
+            db.session.commit()
+        print(f"✍️  create review with aggregate upkeep: {timed(500, add_review):.2f}ms")
+        
+        writer = db.session.get(Writer, 'W00000')
+        average, count, _ = scan_stats('W00000')
+        ok = abs(writer.rating - round(average, 2)) < 0.006 and writer.total_reviews == count
+        print(f"{'✅' if ok else '❌'} writers.rating matches a fresh scan ({writer.rating} over {writer.total_reviews} reviews)")
+    
+    os.remove(DB_FILE)
+
+if __name__ == '__main__':
+    main()
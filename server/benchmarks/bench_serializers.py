@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark for summary vs full serializers (?view=summary|full).
+
+Seeds N orders, POD orders and writers with realistic text and JSON columns,
+then times to_summary_dict() against to_dict() over the whole list and
+compares the JSON payload size, plus one end-to-end GET per view.
+
+Usage: python benchmarks/bench_serializers.py [--rows 20000]
+Runs against a throwaway SQLite file, never the real database.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_FILE = os.path.join(tempfile.mkdtemp(), 'bench_serializers.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_FILE}'
+os.environ['RATE_LIMIT_ENABLED'] = 'false'
+
+from app import create_app  # noqa: E402
+from db import db  # noqa: E402
+from models import Order, PODOrder, Writer  # noqa: E402
+
+app = create_app()
+
+SUBJECTS = ['Nursing', 'Business Administration', 'Marketing', 'Psychology', 'Computer Science', 'History']
+LOREM = ('Write a well-researched paper using at least five scholarly sources, APA 7th edition, '
+         'with an introduction, literature review, discussion and conclusion. ') * 4
+
+def seed(count):
+    rng = random.Random(3)
+    files = json.dumps([{'id': f'F{n}', 'filename': f'draft-{n}.docx', 'size': 48213, 'url': f'/uploads/draft-{n}.docx'}
+                        for n in range(3)])
+    messages = json.dumps([{'id': f'M{n}', 'message': LOREM[:160], 'sentAt': '2025-01-01T10:00:00'} for n in range(4)])
+    with app.app_context():
+        db.create_all()
+        db.session.bulk_insert_mappings(Order, [{
+            'id': f'ORD-{n:06d}', 'title': f'Order {n}', 'description': LOREM, 'requirements': LOREM,
+            'subject': rng.choice(SUBJECTS), 'pages': rng.randint(1, 20), 'price_kes': 350.0, 'cpp': 350.0,
+            'status': 'In Progress', 'writer_id': f'writer-{n % 500}', 'attachments': files,
+            'original_files': files, 'client_messages': messages, 'admin_messages': messages,
+            'submission_notes': LOREM[:200], 'version': 1
+        } for n in range(count)])
+        db.session.bulk_insert_mappings(PODOrder, [{
+            'id': f'POD-{n:06d}', 'title': f'POD {n}', 'description': LOREM, 'status': 'In Progress',
+            'client_messages': messages, 'uploaded_files': files, 'delivery_notes': LOREM[:200], 'version': 1
+        } for n in range(count)])
+        db.session.bulk_insert_mappings(Writer, [{
+            'id': f'writer-{n}', 'email': f'writer{n}@bench.local', 'name': f'Writer {n}', 'status': 'active',
+            'address': json.dumps({'street': '1 Moi Ave', 'city': 'Nairobi', 'country': 'Kenya'}),
+            'education': json.dumps([{'degree': 'BSc Nursing', 'institution': 'University of Nairobi', 'year': 2018}]),
+            'experience': json.dumps([{'role': 'Academic writer', 'years': 4, 'notes': LOREM[:120]}]),
+            'specializations': json.dumps(rng.sample(SUBJECTS, 2)), 'languages': json.dumps(['English']),
+            'payment_details': json.dumps({'mpesa': '+254700000000', 'bank': {'name': 'KCB', 'account': '1234567890'}}),
+            'documents': json.dumps([{'type': 'id', 'url': f'/uploads/id-{n}.pdf'}, {'type': 'cv', 'url': f'/uploads/cv-{n}.pdf'}]),
+            'bio': LOREM[:300]
+        } for n in range(count)])
+        db.session.commit()
+
+def measure(rows, method):
+    began = time.perf_counter()
+    payload = [getattr(row, method)() for row in rows]
+    elapsed = time.perf_counter() - began
+    return elapsed * 1000, len(json.dumps(payload))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20000)
+    args = parser.parse_args()
+    
+    seed(args.rows)
+    with app.app_context():
+        for model in (Order, PODOrder, Writer):
+            rows = model.query.all()
+            full_ms, full_bytes = measure(rows, 'to_dict')
+            summary_ms, summary_bytes = measure(rows, 'to_summary_dict')
+            print(f"📦 {model.__tablename__} x{len(rows)}")
+            print(f"   full    {full_ms:8.1f}ms {full_bytes / 1e6:7.2f}MB")
+            print(f"   summary {summary_ms:8.1f}ms {summary_bytes / 1e6:7.2f}MB "
+                  f"({full_ms / summary_ms:.1f}x faster, {full_bytes / summary_bytes:.1f}x smaller)")
+    
+    client = app.test_client()
+    for view in ('full', 'summary'):
+        began = time.perf_counter()
+        response = client.get(f'/api/orders?view={view}')
+        print(f"🌐 GET /api/orders?view={view}: {(time.perf_counter() - began) * 1000:.0f}ms, "
+              f"{len(response.data) / 1e6:.2f}MB")
+    
+    os.remove(DB_FILE)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark for application startup.
+
+Times, each in a fresh interpreter (median of --runs):
+    import app         importing the module: Flask and SQLAlchemy, no models or routes
+    create_app()       what a web worker pays: config, models, every blueprint
+    + cli commands     what every worker paid when app.py imported cli.py
+                       (and seed_db, statements, outbox, ...) at import time
+    flask db --help    a CLI invocation, which loads only the command it runs
+
+Then checks that create_app() does not import cli / seed_db, and measures
+copy-on-write sharing the way gunicorn's preload_app uses it: the parent
+builds the app once and forks --workers children that each serve requests,
+with and without gc.freeze() before the fork, and reports how much memory
+each child ended up with that it no longer shares with the parent.
+
+Usage: python benchmarks/bench_startup.py [--runs 7] [--workers 4] [--requests 200]
+Runs against a throwaway SQLite file, never the real database.
+"""
+import argparse
+import gc
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+DB_FILE = os.path.join(tempfile.gettempdir(), 'bench_startup.db')
+if os.path.exists(DB_FILE):
+    os.remove(DB_FILE)
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_FILE}'
+os.environ['RATE_LIMIT_ENABLED'] = 'false'
+
+SNIPPETS = {
+    'import app': "import app",
+    'create_app()': "from app import create_app; create_app()",
+    'create_app() + cli commands': "from app import create_app; create_app(); import cli",
+}
+
+def time_snippet(snippet, runs):
+    code = f"import time; began = time.perf_counter(); {snippet}; print(time.perf_counter() - began)"
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', code], cwd=SERVER_DIR, capture_output=True, text=True, check=True)
+        samples.append(float(output.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+def time_command(command, runs):
+    samples = []
+    for _ in range(runs):
+        began = time.perf_counter()
+        subprocess.run(command, cwd=SERVER_DIR, capture_output=True, check=True)
+        samples.append(time.perf_counter() - began)
+    return statistics.median(samples)
+
+def private_kib():
+    """Memory this process has written since the fork (no longer shared with the parent)"""
+    with open('/proc/self/smaps_rollup') as rollup:
+        fields = dict(line.split(':', 1) for line in rollup if ':' in line)
+    return sum(int(fields[name].split()[0]) for name in ('Private_Dirty', 'Private_Clean') if name in fields)
+
+def fork_workers(app, workers, requests, freeze):
+    """Fork like gunicorn with preload_app; returns each child's private memory in KiB"""
+    gc.collect()
+    if freeze:
+        gc.freeze()
+    children = []
+    for _ in range(workers):
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_end)
+            client = app.test_client()
+            for n in range(requests):
+                client.get('/api/orders' if n % 2 else '/api/writers')
+            gc.collect()
+            os.write(write_end, str(private_kib()).encode())
+            os._exit(0)
+        os.close(write_end)
+        children.append((pid, read_end))
+    sizes = []
+    for pid, read_end in children:
+        with os.fdopen(read_end) as pipe:
+            sizes.append(int(pipe.read()))
+        os.waitpid(pid, 0)
+    if freeze:
+        gc.unfreeze()
+    return sizes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+    
+    try:
+        results = {label: time_snippet(snippet, args.runs) for label, snippet in SNIPPETS.items()}
+        for label, seconds in results.items():
+            print(f"⏱️  {label:<30} {seconds * 1000:7.1f}ms")
+        cli_cost = results['create_app() + cli commands'] - results['create_app()']
+        print(f"   workers no longer pay {cli_cost * 1000:.1f}ms for the CLI commands")
+        command = time_command([sys.executable, '-m', 'flask', '--app', 'app', 'db', '--help'], args.runs)
+        print(f"⏱️  {'flask db --help':<30} {command * 1000:7.1f}ms (whole process)")
+        
+        from sqlalchemy.orm import configure_mappers
+        from app import create_app
+        from db import db
+        app = create_app()
+        configure_mappers()
+        with app.app_context():
+            db.create_all()
+        lazy = 'cli' not in sys.modules and 'seed_db' not in sys.modules
+        
+        if os.path.exists('/proc/self/smaps_rollup') and hasattr(os, 'fork'):
+            print(f"\n🍴 {args.workers} forked workers, {args.requests} requests each (private KiB per worker)")
+            for freeze in (False, True):
+                sizes = fork_workers(app, args.workers, args.requests, freeze)
+                label = 'gc.freeze() before fork' if freeze else 'plain fork'
+                print(f"   {label:<25} {statistics.mean(sizes):8.0f} KiB")
+        else:
+            print("\n🍴 skipping the fork test (needs Linux /proc)")
+        
+        print(f"{'✅' if lazy else '❌'} create_app() left cli and seed_db unimported")
+    finally:
+        if os.path.exists(DB_FILE):
+            os.remove(DB_FILE)
+
+if __name__ == '__main__':
+    main()
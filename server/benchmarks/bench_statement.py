@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark for financial statement export (GET /api/financial/statement/export).
+
+Seeds a year of invoices, fines, payments, withdrawals and transaction logs,
+then compares peak Python memory (tracemalloc) of streaming the platform-wide
+CSV against the old approach of pulling every /api/financial/* list in full.
+
+Usage: python benchmarks/bench_statement.py [--rows 200000]
+Runs against a throwaway SQLite file, never the real database.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_FILE = os.path.join(tempfile.gettempdir(), 'bench_statement.db')
+if os.path.exists(DB_FILE):
+    os.remove(DB_FILE)
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_FILE}'
+os.environ['RATE_LIMIT_ENABLED'] = 'false'
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import create_app  # noqa: E402
+from db import db  # noqa: E402
+from models import Fine, Invoice, Payment, TransactionLog, WithdrawalRequest  # noqa: E402
+
+app = create_app()
+
+LISTS = ('invoices', 'fines', 'payments', 'withdrawals', 'transactionLogs')
+
+def seed(rows):
+    """`rows` spread over the five tables and the year 2025"""
+    random.seed(7)
+    start = datetime(2025, 1, 1)
+    per_table = rows // 5
+    
+    def when():
+        return start + timedelta(seconds=random.randrange(365 * 86400))
+    
+    def writer():
+        n = random.randrange(500)
+        return {'writer_id': f'W{n:04d}', 'writer_name': f'Writer {n}'}
+    
+    tables = {
+        Invoice: lambda i: {'id': f'INV-{i}', 'amount': 1750.0, 'status': 'paid', 'type': 'order', 'order_id': f'ORD-{i}',
+                            'order_title': 'Essay on economic history', 'created_at': when(), **writer()},
+        Fine: lambda i: {'id': f'FIN-{i}', 'amount': 200.0, 'status': 'applied', 'reason': 'Late submission',
+                         'applied_at': when(), **writer()},
+        Payment: lambda i: {'id': f'PAY-{i}', 'amount': 1750.0, 'status': 'completed', 'type': 'order_payment',
+                            'reference': f'REF{i}', 'created_at': when(), **writer()},
+        WithdrawalRequest: lambda i: {'id': f'WD-{i}', 'amount': 5000.0, 'status': 'paid', 'method': 'mpesa',
+                                      'requested_at': when(), **writer()},
+        TransactionLog: lambda i: {'id': f'TX-{i}', 'type': 'payout', 'amount': 5000.0, 'description': 'Writer payout',
+                                   'related_entity_id': f'WD-{i}', 'performed_at': when()},
+    }
+    for model, make in tables.items():
+        for offset in range(0, per_table, 10000):
+            db.session.execute(insert(model), [make(i) for i in range(offset, min(offset + 10000, per_table))])
+    db.session.commit()
+    return per_table * 5
+
+def measure(label, run):
+    tracemalloc.start()
+    began = time.perf_counter()
+    size = run()
+    elapsed = time.perf_counter() - began
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label}: {size / 1e6:.1f}MB in {elapsed:.2f}s, peak Python memory {peak / 1e6:.1f}MB")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000)
+    args = parser.parse_args()
+    
+    with app.app_context():
+        db.create_all()
+        total = seed(args.rows)
+    print(f"💰 {total} ledger rows across {len(LISTS)} tables")
+    
+    client = app.test_client()
+    
+    def stream_csv():
+        response = client.get('/api/financial/statement/export?from=2025-01-01&to=2026-01-01', buffered=False)
+        size = sum(len(chunk) for chunk in response.response)
+        response.close()
+        return size
+    
+    def full_lists():
+        return sum(len(client.get(f'/api/financial/{name}').data) for name in LISTS)
+    
+    measure('📄 streamed CSV statement', stream_csv)
+    measure('📚 every /api/financial list in full', full_lists)
+    
+    os.remove(DB_FILE)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Stress test for optimistic concurrency on orders.
+
+1. Concurrent picks: many writer threads race to claim the same Available
+   orders through PUT /api/orders/<id> with the version they read. Every
+   order must end up with exactly one winner, and the stored writer must be
+   that winner.
+2. Concurrent increments: threads read-modify-write revisionCount and retry
+   on 409. The final count must equal the number of successful writes, so
+   no update is lost.
+
+Usage: python benchmarks/stress_order_versions.py [--orders 20] [--writers 16] [--increments 25]
+Runs against a throwaway SQLite file, never the real database.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_FILE = os.path.join(tempfile.mkdtemp(), 'stress_versions.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{DB_FILE}'
+os.environ['RATE_LIMIT_ENABLED'] = 'false'
+
+from app import create_app  # noqa: E402
+from db import db  # noqa: E402
+import metrics  # noqa: E402
+
+app = create_app()
+
+def create_orders(client, count):
+    ids = []
+    for i in range(count):
+        response = client.post('/api/orders', json={'title': f'Stress order {i}', 'pages': 1, 'status': 'Available'})
+        ids.append(response.get_json()['id'])
+    return ids
+
+def run_picks(order_ids, writer_count):
+    winners = {order_id: [] for order_id in order_ids}
+    lock = threading.Lock()
+    start = threading.Barrier(writer_count)
+    
+    def writer(writer_id):
+        client = app.test_client()
+        start.wait()
+        for order_id in order_ids:
+            order = client.get(f'/api/orders/{order_id}').get_json()
+            if order['status'] != 'Available':
+                continue
+            response = client.put(f'/api/orders/{order_id}', json={
+                'status': 'Assigned',
+                'writerId': writer_id,
+                'pickedBy': 'writer',
+                'version': order['version']
+            })
+            if response.status_code == 200:
+                with lock:
+                    winners[order_id].append(writer_id)
+    
+    threads = [threading.Thread(target=writer, args=(f'writer-{n}',)) for n in range(writer_count)]
+    began = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - began
+    
+    client = app.test_client()
+    failures = 0
+    for order_id, claimed in winners.items():
+        stored = client.get(f'/api/orders/{order_id}').get_json()['writerId']
+        if len(claimed) != 1 or stored != claimed[0]:
+            failures += 1
+            print(f"  ✗ {order_id}: winners={claimed} stored={stored}")
+    return failures, elapsed
+
+def run_increments(order_id, thread_count, increments):
+    successes = [0]
+    lock = threading.Lock()
+    
+    def worker():
+        client = app.test_client()
+        done = 0
+        while done < increments:
+            order = client.get(f'/api/orders/{order_id}').get_json()
+            response = client.patch(f'/api/orders/{order_id}', json=[
+                {'op': 'replace', 'path': '/revisionCount', 'value': order['revisionCount'] + 1}
+            ], headers={'If-Match': f'"{order["version"]}"'})
+            if response.status_code == 200:
+                done += 1
+        with lock:
+            successes[0] += done
+    
+    threads = [threading.Thread(target=worker) for _ in range(thread_count)]
+    began = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - began
+    
+    final = app.test_client().get(f'/api/orders/{order_id}').get_json()['revisionCount']
+    return final, successes[0], elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', type=int, default=20)
+    parser.add_argument('--writers', type=int, default=16)
+    parser.add_argument('--increments', type=int, default=25)
+    args = parser.parse_args()
+    
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    
+    print(f"🏁 {args.writers} writers racing for {args.orders} orders...")
+    order_ids = create_orders(client, args.orders)
+    failures, elapsed = run_picks(order_ids, args.writers)
+    print(f"  picks: {args.orders - failures}/{args.orders} orders with exactly one winner in {elapsed:.2f}s")
+    
+    print(f"🔁 {args.writers} threads x {args.increments} versioned increments...")
+    counter_id = create_orders(client, 1)[0]
+    final, successes, elapsed = run_increments(counter_id, args.writers, args.increments)
+    print(f"  increments: final={final} successful_writes={successes} in {elapsed:.2f}s")
+    
+    counters = metrics.snapshot()['counters']
+    print(f"📊 conflicts={counters.get('orders.version_conflicts', 0)} writes={counters.get('orders.writes', 0)}")
+    
+    ok = failures == 0 and final == successes
+    print('✅ No lost updates' if ok else '❌ Lost updates detected')
+    os.remove(DB_FILE)
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
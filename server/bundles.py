@@ -0,0 +1,146 @@
+"""
+Streaming ZIP export of orders with their files and history.
+
+stream_bundle() writes a ZIP straight into the response as it is built:
+zipfile is given a write-only sink instead of a file, so it emits local
+headers with data descriptors and never seeks back, and every chunk it
+produces is yielded to the client and dropped. Files are copied from the
+storage backend CHUNK_SIZE bytes at a time, so memory stays flat however
+many orders or gigabytes are exported.
+
+Layout:
+    manifest.json                       orders, files (with sha256) and anything missing
+    <order number>/order.json           full order record
+    <order number>/activities.json      OrderActivity history, oldest first
+    <order number>/original/<file>      originalFiles
+    <order number>/revisions/<file>     revisionFiles
+
+Only files held by server storage (/api/files/<id>) can be included; older
+entries that point at browser blob: URLs are listed under "missing".
+"""
+import json
+import os
+import zipfile
+from datetime import datetime
+
+from db import db
+from models import FULL_ROW, OrderActivity, StoredFile
+from storage import CHUNK_SIZE, StorageError, get_storage
+
+# Folders inside each order directory, per JSON column
+FILE_FOLDERS = (('original', 'original_files'), ('revisions', 'revision_files'))
+
+# Orders are loaded in batches of this size while streaming
+BATCH_SIZE = 50
+
+class _ZipSink:
+    """Write-only file object that collects what zipfile writes until drained"""
+    
+    def __init__(self):
+        self._chunks = []
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def _stored_file_id(entry):
+    """Id of the StoredFile behind an UploadedFile entry, if it has one"""
+    url = entry.get('url') or ''
+    if url.startswith('/api/files/'):
+        return url[len('/api/files/'):].split('/')[0]
+    if str(entry.get('id', '')).startswith('FILE-'):
+        return entry['id']
+    return None
+
+def _unique_name(name, used):
+    """Keep two uploads called report.docx apart as report.docx / report (2).docx"""
+    name = os.path.basename(name or 'file') or 'file'
+    stem, ext = os.path.splitext(name)
+    candidate, n = name, 2
+    while candidate.lower() in used:
+        candidate = f"{stem} ({n}){ext}"
+        n += 1
+    used.add(candidate.lower())
+    return candidate
+
+def _zip_info(path, timestamp=None, compress=True):
+    when = timestamp or datetime.utcnow()
+    info = zipfile.ZipInfo(path, date_time=max(when, datetime(1980, 1, 1)).timetuple()[:6])
+    info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+    return info
+
+def _write_json(archive, path, value, timestamp=None):
+    archive.writestr(_zip_info(path, timestamp), json.dumps(value, indent=2, default=str))
+
+def bundle_filename(orders_query):
+    """Download name: the order number for one order, a dated name for several"""
+    first = orders_query.limit(2).all()
+    if len(first) == 1:
+        return f"order-{first[0].order_number or first[0].id}.zip"
+    return f"orders-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.zip"
+
+def stream_bundle(orders_query):
+    """Generator of ZIP bytes for every order matched by `orders_query`"""
+    storage = get_storage()
+    sink = _ZipSink()
+    manifest = {'generatedAt': datetime.utcnow().isoformat(), 'orders': [], 'files': [], 'missing': []}
+    used_folders = set()
+    
+    with zipfile.ZipFile(sink, 'w', allowZip64=True) as archive:
+        for order in orders_query.options(FULL_ROW).yield_per(BATCH_SIZE):
+            folder = _unique_name(order.order_number or order.id, used_folders)
+            manifest['orders'].append({'id': order.id, 'orderNumber': order.order_number, 'folder': folder})
+            
+            _write_json(archive, f"{folder}/order.json", order.to_dict(), order.updated_at)
+            activities = OrderActivity.query.filter_by(order_id=order.id).order_by(OrderActivity.created_at).all()
+            _write_json(archive, f"{folder}/activities.json", [a.to_dict() for a in activities], order.updated_at)
+            yield sink.drain()
+            
+            for subfolder, column in FILE_FOLDERS:
+                entries = json.loads(getattr(order, column) or '[]')
+                ids = [file_id for file_id in (_stored_file_id(e) for e in entries) if file_id]
+                stored = {f.id: f for f in StoredFile.query.filter(StoredFile.id.in_(ids))} if ids else {}
+                used_names = set()
+                
+                for entry in entries:
+                    record = stored.get(_stored_file_id(entry))
+                    name = entry.get('originalName') or entry.get('filename')
+                    if record is None:
+                        manifest['missing'].append({'orderId': order.id, 'folder': subfolder, 'name': name,
+                                                    'reason': 'not in server storage'})
+                        continue
+                    
+                    path = f"{folder}/{subfolder}/{_unique_name(name or record.original_name, used_names)}"
+                    try:
+                        source = storage.open(record.sha256)
+                    except (OSError, StorageError):
+                        manifest['missing'].append({'orderId': order.id, 'folder': subfolder, 'name': name,
+                                                    'reason': 'blob missing from storage'})
+                        continue
+                    
+                    # Documents are mostly compressed already (docx, pdf), so store them as-is
+                    info = _zip_info(path, record.created_at, compress=False)
+                    info.file_size = record.size
+                    with source, archive.open(info, 'w', force_zip64=record.size > zipfile.ZIP64_LIMIT) as target:
+                        while True:
+                            chunk = source.read(CHUNK_SIZE)
+                            if not chunk:
+                                break
+                            target.write(chunk)
+                            yield sink.drain()
+                    yield sink.drain()
+                    manifest['files'].append({'path': path, 'fileId': record.id, 'sha256': record.sha256, 'size': record.size})
+            
+            # Nothing from this batch needs to stay in the identity map
+            db.session.expunge(order)
+        
+        _write_json(archive, 'manifest.json', manifest)
+    yield sink.drain()
@@ -4,14 +4,28 @@ Usage: flask [command] [options]
 """
 import click
 from flask.cli import with_appcontext
-from app import app
 from db import db
 from models import User, Writer, Order, PODOrder, Review, Invoice, Fine, Payment
 from seed_db import seed_database
+from uploads import expire_sessions
+from files import collect_orphans
+from idempotency import purge_expired
+import statements
+import invoicing
+import outbox
+import ratings
+import merit
+import migrator
 import json
-from datetime import datetime
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from contextlib import nullcontext
+from datetime import datetime, timedelta
 
-@app.cli.command()
+@click.command()
 @click.option('--force', is_flag=True, help='Force reset without confirmation')
 @with_appcontext
 def reset_db(force):
@@ -27,9 +41,10 @@ def reset_db(force):
     
     click.echo('📦 Creating tables...')
     db.create_all()
+    migrator.stamp_head()
     click.echo('✅ Database reset complete!')
 
-@app.cli.command()
+@click.command()
 @with_appcontext
 def seed():
     """Seed the database with initial data from db.json"""
@@ -40,13 +55,14 @@ def seed():
     except Exception as e:
         click.echo(f'❌ Error seeding database: {e}', err=True)
 
-@app.cli.command()
+@click.command()
 @with_appcontext
 def init_db():
     """Initialize database (reset + seed)"""
     click.echo('🔄 Initializing database...')
     db.drop_all()
     db.create_all()
+    migrator.stamp_head()
     click.echo('✅ Tables created.')
     
     try:
@@ -55,7 +71,7 @@ def init_db():
     except Exception as e:
         click.echo(f'❌ Error: {e}', err=True)
 
-@app.cli.group()
+@click.group()
 def users():
     """User management commands"""
     pass
@@ -102,7 +118,7 @@ def create_user(name, email, password, role):
     db.session.commit()
     click.echo(f'✅ User created: {name} ({email})')
 
-@app.cli.group()
+@click.group()
 def writers():
     """Writer management commands"""
     pass
@@ -127,7 +143,7 @@ def list_writers():
         click.echo(f"  Total Earnings: KES {writer.total_earnings:,.2f}")
         click.echo('')
 
-@app.cli.group()
+@click.group()
 def orders():
     """Order management commands"""
     pass
@@ -178,9 +194,9 @@ def order_stats():
     click.echo(f"  Completed: {completed}")
     click.echo('')
 
-@app.cli.group()
+@click.group('db')
 def db_cmd():
-    """Database management commands"""
+    """Database management and schema migration commands"""
     pass
 
 @db_cmd.command('info')
@@ -197,6 +213,255 @@ def db_info():
     click.echo(f"  Invoices: {Invoice.query.count()}")
     click.echo('')
 
+@db_cmd.command('status')
+@with_appcontext
+def db_status():
+    """Show applied and pending migrations"""
+    done = migrator.applied()
+    click.echo(f"\n🗂️  Schema version: {migrator.current_version() or 'none'}\n")
+    for migration in migrator.discover():
+        record = done.get(migration.version)
+        if record is None:
+            click.echo(f"  ⏳ {migration.version} {migration.description}")
+        else:
+            took = f", {record.duration_ms:.0f}ms" if record.duration_ms is not None else ''
+            click.echo(f"  ✅ {migration.version} {migration.description} "
+                       f"({record.applied_at:%Y-%m-%d %H:%M}{took})")
+    click.echo('')
+
+@db_cmd.command('upgrade')
+@click.option('--to', 'target', help='Stop after this version (default: latest)')
+@with_appcontext
+def db_upgrade(target):
+    """Apply pending migrations"""
+    try:
+        results = migrator.upgrade(target, echo=click.echo)
+    except migrator.MigrationError as e:
+        raise click.ClickException(str(e))
+    total = sum(seconds for _, seconds in results)
+    click.echo(f"✅ Applied {len(results)} migration(s) in {total:.2f}s, "
+               f"now at {migrator.current_version() or 'none'}")
+
+@db_cmd.command('downgrade')
+@click.option('--to', 'target', required=True, help="Version to go back to ('base' undoes everything)")
+@click.option('--force', is_flag=True, help='Skip confirmation')
+@with_appcontext
+def db_downgrade(target, force):
+    """Undo migrations newer than a version"""
+    if not force and not click.confirm(f'⚠️  Downgrading to {target} may drop columns and tables. Continue?'):
+        click.echo('Cancelled.')
+        return
+    try:
+        results = migrator.downgrade(None if target == 'base' else target, echo=click.echo)
+    except migrator.MigrationError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"✅ Reverted {len(results)} migration(s), now at {migrator.current_version() or 'none'}")
+
+@db_cmd.command('stamp')
+@click.argument('version', default='head')
+@with_appcontext
+def db_stamp(version):
+    """Mark migrations up to VERSION as applied without running them"""
+    try:
+        if version == 'head':
+            migrator.stamp_head()
+        else:
+            migrator.stamp(version)
+    except migrator.MigrationError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"✅ Stamped {migrator.current_version()}")
+
+@db_cmd.command('rehearse')
+@click.option('--to', 'target', help='Stop after this version (default: latest)')
+@with_appcontext
+def db_rehearse(target):
+    """Time pending migrations against a copy of the SQLite database"""
+    if db.engine.dialect.name != 'sqlite' or not db.engine.url.database:
+        raise click.ClickException('Rehearsal copies the database file, so it needs a file-backed SQLite DATABASE_URL')
+    source = db.engine.url.database
+    size = os.path.getsize(source) / (1024 * 1024)
+    handle, copy = tempfile.mkstemp(suffix='.db', prefix='rehearse_')
+    os.close(handle)
+    try:
+        click.echo(f"📋 Copying {source} ({size:.1f} MiB)...")
+        shutil.copyfile(source, copy)
+        command = [sys.executable, '-m', 'flask', '--app', 'app', 'db', 'upgrade']
+        if target:
+            command += ['--to', target]
+        environment = {**os.environ, 'DATABASE_URL': f'sqlite:///{copy}'}
+        completed = subprocess.run(command, env=environment, cwd=os.path.dirname(os.path.abspath(__file__)))
+        if completed.returncode != 0:
+            raise click.ClickException('Rehearsal failed; the real database was not touched')
+    finally:
+        os.remove(copy)
+
+@click.group('uploads')
+def uploads_cmd():
+    """Resumable upload management commands"""
+    pass
+
+@uploads_cmd.command('cleanup')
+@with_appcontext
+def uploads_cleanup():
+    """Delete expired upload sessions and their chunks"""
+    removed = expire_sessions()
+    click.echo(f'🧹 Removed {removed} expired upload session(s)')
+
+@click.group('files')
+def files_cmd():
+    """Stored file commands"""
+    pass
+
+@files_cmd.command('gc')
+@click.option('--grace-minutes', type=int, default=60, help='Keep blobs orphaned more recently than this')
+@with_appcontext
+def files_gc(grace_minutes):
+    """Delete blobs no stored file has referenced for the grace period"""
+    removed = collect_orphans(timedelta(minutes=grace_minutes))
+    click.echo(f'🧹 Removed {removed} orphaned blob(s)')
+
+@click.group('idempotency')
+def idempotency_cmd():
+    """Idempotency key commands"""
+    pass
+
+@idempotency_cmd.command('purge')
+@with_appcontext
+def idempotency_purge():
+    """Delete expired idempotency keys and their stored responses"""
+    removed = purge_expired()
+    click.echo(f'🧹 Removed {removed} expired idempotency key(s)')
+
+@click.group('ratings')
+def ratings_cmd():
+    """Writer rating aggregate commands"""
+    pass
+
+@ratings_cmd.command('rebuild')
+@with_appcontext
+def rebuild_ratings():
+    """Recompute writer rating stats from all reviews"""
+    click.echo('🔄 Rebuilding writer rating stats...')
+    writers, rows = ratings.rebuild()
+    db.session.commit()
+    click.echo(f'✅ {rows} stat rows for {writers} writer(s); writers.rating and total_reviews resynced')
+
+@click.group('merit')
+def merit_cmd():
+    """Writer merit score commands"""
+    pass
+
+@merit_cmd.command('rebuild')
+@with_appcontext
+def rebuild_merit():
+    """Recompute writer metrics and merit scores from orders, fines and ratings"""
+    click.echo('🔄 Rebuilding writer metrics...')
+    rows = merit.rebuild()
+    db.session.commit()
+    click.echo(f'✅ Metrics and merit scores for {rows} writer(s)')
+
+@click.group('statements')
+def statements_cmd():
+    """Financial statement commands"""
+    pass
+
+@statements_cmd.command('export')
+@click.option('--from', 'start', required=True, help='Start date (ISO, inclusive)')
+@click.option('--to', 'end', required=True, help='End date (ISO, exclusive)')
+@click.option('--writer', help='Writer ID (default: platform-wide)')
+@click.option('--sections', help='Comma-separated sections (default: all)')
+@click.option('--format', 'export_format', type=click.Choice(['csv', 'parquet']), default='csv')
+@click.option('--output', '-o', help='Output file (default: statement-<scope>-<from>-<to>.<format>, - for stdout)')
+@with_appcontext
+def export_statement(start, end, writer, sections, export_format, output):
+    """Export a financial statement for a date range"""
+    try:
+        start, end = statements.parse_range(start, end)
+        section_names = statements.parse_sections(sections, writer)
+    except statements.StatementError as e:
+        raise click.BadParameter(str(e))
+    if export_format == 'parquet' and not statements.parquet_available():
+        raise click.UsageError('Parquet export requires pyarrow (pip install pyarrow)')
+    
+    output = output or statements.statement_filename(start, end, writer, export_format)
+    if export_format == 'csv':
+        chunks = statements.export_csv(start, end, writer, section_names)
+        target = nullcontext(click.get_text_stream('stdout')) if output == '-' else open(output, 'w', newline='', encoding='utf-8')
+    else:
+        chunks = statements.export_parquet(start, end, writer, section_names)
+        target = nullcontext(click.get_binary_stream('stdout')) if output == '-' else open(output, 'wb')
+    
+    with target as stream:
+        for chunk in chunks:
+            stream.write(chunk)
+    if output != '-':
+        click.echo(f'✅ Statement written to {output}')
+
+@click.group('invoices')
+def invoices_cmd():
+    """Invoice generation commands"""
+    pass
+
+@invoices_cmd.command('generate')
+@with_appcontext
+def generate_invoices():
+    """Invoice orders completed since the last run (cron-friendly)"""
+    result = invoicing.run_incremental()
+    click.echo(f"✅ {result['created']} invoice(s), KES {result['amount']:,.2f}; watermark now {result['watermark']}")
+
+@invoices_cmd.command('backfill')
+@click.option('--from', 'start', help='Completed after (ISO, default: beginning)')
+@click.option('--to', 'end', help='Completed up to (ISO, inclusive, default: now)')
+@click.option('--dry-run', is_flag=True, help='Only count what would be invoiced')
+@with_appcontext
+def backfill_invoices(start, end, dry_run):
+    """Invoice every uninvoiced completed order in a range"""
+    try:
+        start, end = invoicing.parse_bound(start), invoicing.parse_bound(end)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    click.echo('🧾 Counting uninvoiced orders...' if dry_run else '🧾 Generating invoices...')
+    result = invoicing.backfill(start, end, dry_run=dry_run)
+    verb = 'would be created' if dry_run else 'created'
+    click.echo(f"✅ {result['created']} invoice(s) {verb}, KES {result['amount']:,.2f} in {result['batches']} batch(es)")
+
+@click.group('outbox')
+def outbox_cmd():
+    """Transactional outbox commands"""
+    pass
+
+@outbox_cmd.command('relay')
+@click.option('--follow', is_flag=True, help='Keep running and poll for new events')
+@click.option('--interval', type=float, default=1.0, help='Seconds between polls when idle (with --follow)')
+@with_appcontext
+def outbox_relay(follow, interval):
+    """Apply pending outbox events (logs, platform balance, notifications)"""
+    if follow:
+        click.echo(f'📮 Relaying outbox events (polling every {interval}s, Ctrl+C to stop)...')
+        outbox.follow(interval, on_batch=lambda count: click.echo(f'✅ Applied {count} event(s)'))
+        return
+    count = outbox.relay()
+    click.echo(f'✅ Applied {count} event(s)')
+
+@outbox_cmd.command('status')
+@with_appcontext
+def outbox_status():
+    """Show pending and parked outbox events"""
+    state = outbox.status()
+    age = f", oldest {state['oldestPendingAgeSeconds']}s old" if state['pending'] else ''
+    click.echo(f"📮 {state['pending']} pending{age}, {state['processed']} processed, {len(state['parked'])} parked")
+    for event in state['parked']:
+        click.echo(f"   ⚠️  #{event['id']} {event['topic']} {event['aggregateId']}: {event['lastError']}")
+
+@outbox_cmd.command('rebuild-balance')
+@with_appcontext
+def outbox_rebuild_balance():
+    """Drain the outbox, then recompute the platform balance from funds and withdrawals"""
+    balance = outbox.rebuild_balance()
+    click.echo(f'✅ Funds KES {balance.total_funds:,.2f}, reserved KES {balance.reserved_funds:,.2f}, '
+               f'withdrawn KES {balance.total_withdrawn:,.2f}, available KES {balance.available_funds:,.2f}')
+
 if __name__ == '__main__':
-    app.cli()
+    from app import create_app
+    create_app().cli()
 
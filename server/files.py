@@ -0,0 +1,64 @@
+"""
+Stored file metadata.
+
+A stored_files row is one upload: original name, type, uploader and the
+order it belongs to, pointing at a blob in storage.py by SHA-256. Several
+rows can share a blob, so deleting a row never deletes bytes directly:
+
+    record_file()      add the row for a blob that is already stored
+    remove_file()      delete a row; queue its blob in orphan_blobs if it was the last one
+    collect_orphans()  delete queued blobs nothing has claimed for ORPHAN_GRACE (`flask files gc`)
+
+Used by the file routes, resumable uploads (uploads.py) and payout
+settlement files (payouts.py).
+"""
+import uuid
+from datetime import datetime, timedelta
+
+from db import db
+from models import OrphanBlob, StoredFile
+from storage import get_storage
+
+# How long a blob stays after its last file is deleted. An upload of the same
+# bytes finds the blob before it commits its row; deleting the blob in that gap
+# would leave the new row pointing at nothing.
+ORPHAN_GRACE = timedelta(hours=1)
+
+def record_file(sha256, size, original_name, content_type, uploaded_by=None, related_order_id=None):
+    """Add the metadata row for a blob that is already in storage"""
+    stored = StoredFile(
+        id=f"FILE-{uuid.uuid4().hex[:12].upper()}",
+        sha256=sha256,
+        size=size,
+        original_name=original_name,
+        content_type=content_type or 'application/octet-stream',
+        uploaded_by=uploaded_by,
+        related_order_id=related_order_id
+    )
+    db.session.add(stored)
+    return stored
+
+def remove_file(stored):
+    """Delete a file's metadata row; the caller commits"""
+    sha256 = stored.sha256
+    db.session.delete(stored)
+    db.session.flush()
+    
+    # The blob may be shared with other uploads of the same content; if this was
+    # the last one, collect_orphans() removes it once nothing has claimed it again
+    if not StoredFile.query.filter_by(sha256=sha256).first():
+        db.session.merge(OrphanBlob(sha256=sha256, orphaned_at=datetime.utcnow()))
+
+def collect_orphans(grace=ORPHAN_GRACE, now=None):
+    """Delete blobs that have had no stored file for `grace`. Returns how many were deleted."""
+    cutoff = (now or datetime.utcnow()) - grace
+    removed = 0
+    for sha256 in db.session.scalars(db.select(OrphanBlob.sha256).where(OrphanBlob.orphaned_at <= cutoff)).all():
+        # Uploads of the same bytes since the delete own the blob again
+        in_use = StoredFile.query.filter_by(sha256=sha256).first() is not None
+        db.session.execute(db.delete(OrphanBlob).where(OrphanBlob.sha256 == sha256))
+        db.session.commit()
+        if not in_use:
+            get_storage().delete(sha256)
+            removed += 1
+    return removed
@@ -0,0 +1,36 @@
+"""
+Gunicorn settings: gunicorn -c gunicorn.conf.py wsgi:app
+
+The app is loaded once in the master (preload_app) and the workers fork from
+it. Before each fork the master moves every object it has into the garbage
+collector's permanent generation (gc.freeze), so collections in a worker do
+not touch, and therefore copy, the pages shared with the master. After the
+fork each worker drops any database connections inherited from the master.
+
+Workers are threaded (gthread): /api/sync/wait and /api/notifications/stream
+hold their thread for as long as the client waits, so a sync worker would be
+taken out by a single open long-poll. The timeout stays above the longest
+long-poll (live.MAX_LONG_POLL_TIMEOUT, 60 s). For many open streams use the
+ASGI mode (asgi.py) instead.
+"""
+import gc
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5001')
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+# Open long-polls and streams each hold one of these
+threads = int(os.getenv('GUNICORN_THREADS', 32))
+# Seconds; must exceed live.MAX_LONG_POLL_TIMEOUT
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 90))
+preload_app = True
+
+def pre_fork(server, worker):
+    gc.freeze()
+
+def post_fork(server, worker):
+    from db import db
+    with server.app.wsgi().app_context():
+        # Connections opened in the master must not be shared between processes
+        db.engine.dispose(close=False)
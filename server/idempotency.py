@@ -0,0 +1,130 @@
+"""
+Idempotency-Key support for POST endpoints.
+
+Mobile clients retry creates when a response is lost, and every retry used
+to insert another row with a fresh uuid4. A view wrapped with @idempotent
+reads the `Idempotency-Key` header (no header, no change in behaviour):
+
+    1. insert an idempotency_keys row for sha256(endpoint, key) holding a
+       hash of the body; the primary key makes a concurrent retry fail here
+    2. run the view and store its status, content type and body on the row
+    3. a later request with the same key gets the stored response back with
+       `Idempotent-Replay: true` and the view does not run
+
+A retry that arrives while the first request is still running gets 409, and
+reusing a key with a different body gets 422. 5xx responses and exceptions
+release the key so the client can try again. Rows expire after TTL; expired
+rows are deleted by the next request once PURGE_INTERVAL has passed, or by
+`flask idempotency purge`.
+"""
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import Response, jsonify, make_response, request
+from sqlalchemy.exc import IntegrityError
+
+from db import db
+from models import IdempotencyKey
+import metrics
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+# How long a stored response is replayed
+TTL = timedelta(hours=24)
+
+# How often (per process) a request also deletes expired keys
+PURGE_INTERVAL = timedelta(minutes=5)
+
+_purge_lock = threading.Lock()
+_next_purge = datetime.min
+
+def _digest(*parts):
+    return hashlib.sha256(b'\0'.join(parts)).hexdigest()
+
+def purge_expired(now=None):
+    """Delete expired keys; returns how many were removed"""
+    now = now or datetime.utcnow()
+    removed = IdempotencyKey.query.filter(IdempotencyKey.expires_at <= now).delete(synchronize_session=False)
+    db.session.commit()
+    return removed
+
+def _maybe_purge(now):
+    global _next_purge
+    with _purge_lock:
+        if now < _next_purge:
+            return
+        _next_purge = now + PURGE_INTERVAL
+    purge_expired(now)
+
+def _claim(key, request_hash, now):
+    """Insert the key; returns None if it is ours, otherwise the row that already holds it"""
+    for _ in range(2):
+        db.session.add(IdempotencyKey(key=key, request_hash=request_hash, created_at=now, expires_at=now + TTL))
+        try:
+            db.session.commit()
+            return None
+        except IntegrityError:
+            db.session.rollback()
+        record = db.session.get(IdempotencyKey, key)
+        if record is None:
+            continue  # released between our insert and the read
+        if record.expires_at > now:
+            return record
+        db.session.delete(record)
+        db.session.commit()
+    raise RuntimeError('Could not claim idempotency key')
+
+def _replay(record, request_hash):
+    if record.request_hash != request_hash:
+        return jsonify({'error': 'Idempotency key was already used for a different request'}), 422
+    if record.status_code is None:
+        return jsonify({'error': 'A request with this idempotency key is still in progress'}), 409
+    metrics.increment('idempotency.replays')
+    response = Response(record.body, status=record.status_code, content_type=record.content_type)
+    response.headers['Idempotent-Replay'] = 'true'
+    return response
+
+def _release(key):
+    db.session.rollback()
+    IdempotencyKey.query.filter_by(key=key).delete(synchronize_session=False)
+    db.session.commit()
+
+def idempotent(view):
+    """Replay the stored response for a repeated Idempotency-Key instead of running `view` again"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        client_key = request.headers.get(HEADER)
+        if not client_key:
+            return view(*args, **kwargs)
+        if len(client_key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters'}), 400
+        
+        now = datetime.utcnow()
+        _maybe_purge(now)
+        key = _digest(request.endpoint.encode(), client_key.encode())
+        request_hash = _digest(request.get_data())
+        existing = _claim(key, request_hash, now)
+        if existing is not None:
+            return _replay(existing, request_hash)
+        
+        try:
+            response = make_response(view(*args, **kwargs))
+        except BaseException:
+            _release(key)
+            raise
+        if response.status_code >= 500 or response.is_streamed:
+            _release(key)
+            return response
+        
+        db.session.rollback()  # in case the view left anything uncommitted
+        IdempotencyKey.query.filter_by(key=key).update({
+            'status_code': response.status_code,
+            'content_type': response.content_type,
+            'body': response.get_data(as_text=True)
+        }, synchronize_session=False)
+        db.session.commit()
+        return response
+    return wrapper
@@ -0,0 +1,168 @@
+"""
+Invoicing engine: order_completion invoices derived from completed orders.
+
+Every order that reaches Completed / Approved with a writer gets exactly one
+invoice for pages × cpp (DEFAULT_PAGE_PRICE_KES when the order has no cpp)
+less its fine_amount, never below zero. Title, pages, deadline, completion
+time and writer are copied from the order by the database, in batches of
+BATCH_SIZE orders with one INSERT ... SELECT and one commit per batch.
+
+Idempotent per order: the SELECT skips orders that already have an
+order_completion invoice (however it was made), and invoice ids are derived
+from the order id, so two runs racing on the same order collide on the
+primary key instead of double-billing. Re-running any range is safe.
+
+    run_incremental()    orders completed since the watermark (job_watermarks),
+                         looking back LOOKBACK for completions that committed late
+    backfill(start, end) every uninvoiced completed order in a range (month end,
+                         first deploy), optionally as a dry run
+"""
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, case, exists, func, literal, or_, select
+from sqlalchemy.exc import IntegrityError
+
+from db import db
+from models import COMPLETED_ORDER_STATUSES, DEFAULT_PAGE_PRICE_KES, Invoice, JobWatermark, Order, Writer
+from patching import parse_datetime
+
+INVOICE_TYPE = 'order_completion'
+WATERMARK = 'invoices.order_completion'
+
+# Orders invoiced per INSERT / commit
+BATCH_SIZE = 2000
+
+# Tries per batch when concurrent runs keep invoicing some of its orders first
+INSERT_ATTEMPTS = 5
+
+# Incremental runs re-check this far behind the watermark, for orders whose
+# completion committed after an earlier run had already moved past it
+LOOKBACK = timedelta(hours=1)
+
+orders = Order.__table__
+invoices = Invoice.__table__
+
+def parse_bound(value):
+    """ISO datetime -> naive UTC (completed_at is stored naive UTC); raises ValueError"""
+    bound = parse_datetime(value)
+    if bound is not None and bound.tzinfo is not None:
+        bound = bound.astimezone(timezone.utc).replace(tzinfo=None)
+    return bound
+
+def invoice_amount():
+    """SQL for pages × cpp - fine_amount, floored at zero"""
+    gross = func.coalesce(orders.c.pages, 0) * func.coalesce(func.nullif(orders.c.cpp, 0), DEFAULT_PAGE_PRICE_KES)
+    net = gross - func.coalesce(orders.c.fine_amount, 0)
+    return func.round(case((net > 0, net), else_=0.0), 2)
+
+def _uninvoiced(start=None, end=None):
+    """Conditions for completed orders in (start, end] that have no order_completion invoice"""
+    conditions = [
+        orders.c.status.in_(COMPLETED_ORDER_STATUSES),
+        orders.c.writer_id.isnot(None),
+        orders.c.completed_at.isnot(None),
+        ~exists().where(invoices.c.order_id == orders.c.id, invoices.c.type == INVOICE_TYPE)
+    ]
+    if start is not None:
+        conditions.append(orders.c.completed_at > start)
+    if end is not None:
+        conditions.append(orders.c.completed_at <= end)
+    return conditions
+
+def _insert_batch(order_ids, now):
+    """Invoice the given orders (those still uninvoiced); returns the new invoice amounts"""
+    writers = Writer.__table__
+    writer_name = select(writers.c.name).where(writers.c.id == orders.c.writer_id).scalar_subquery()
+    source = select(
+        literal('INV-') + orders.c.id,
+        orders.c.id,
+        orders.c.title,
+        orders.c.writer_id,
+        func.coalesce(orders.c.assigned_writer, writer_name),
+        invoice_amount(),
+        literal('KES'),
+        literal('pending'),
+        literal(INVOICE_TYPE),
+        orders.c.pages,
+        orders.c.deadline,
+        orders.c.completed_at,
+        literal(now),
+        literal(now)
+    ).where(orders.c.id.in_(order_ids), *_uninvoiced())
+    statement = invoices.insert().from_select(
+        ['id', 'order_id', 'order_title', 'writer_id', 'writer_name', 'amount', 'currency', 'status', 'type',
+         'order_pages', 'order_deadline', 'order_completed_at', 'created_at', 'updated_at'],
+        source
+    ).returning(invoices.c.amount)
+    return [amount for (amount,) in db.session.execute(statement)]
+
+def _commit_batch(order_ids):
+    """Insert and commit one batch, retrying what is left when another run got to some orders first"""
+    for attempt in range(INSERT_ATTEMPTS):
+        try:
+            # Stamped per batch: a stamp from the start of a long run would fall behind
+            # the watermark of a client syncing meanwhile (see routes.sync.SYNC_OVERLAP)
+            amounts = _insert_batch(order_ids, datetime.utcnow())
+            db.session.commit()
+            return amounts
+        except IntegrityError:
+            # The SELECT skips orders invoiced since, so each retry only tries what is left
+            db.session.rollback()
+            if attempt == INSERT_ATTEMPTS - 1:
+                raise
+
+def generate(start=None, end=None, dry_run=False):
+    """
+    Invoice every uninvoiced completed order with completed_at in (start, end],
+    oldest first. Returns {'created', 'amount', 'batches'}; with dry_run nothing
+    is written and 'created' / 'amount' are what a real run would produce.
+    """
+    if dry_run:
+        count, amount = db.session.execute(
+            select(func.count(), func.coalesce(func.sum(invoice_amount()), 0.0)).where(*_uninvoiced(start, end))
+        ).one()
+        return {'created': count, 'amount': round(amount, 2), 'batches': -(-count // BATCH_SIZE)}
+    
+    created, total, batches = 0, 0.0, 0
+    after = None
+    while True:
+        page = select(orders.c.id, orders.c.completed_at).where(*_uninvoiced(start, end))
+        if after is not None:
+            page = page.where(or_(
+                orders.c.completed_at > after[0],
+                and_(orders.c.completed_at == after[0], orders.c.id > after[1])
+            ))
+        rows = db.session.execute(page.order_by(orders.c.completed_at, orders.c.id).limit(BATCH_SIZE)).all()
+        if not rows:
+            break
+        amounts = _commit_batch([row.id for row in rows])
+        created += len(amounts)
+        total += sum(amounts)
+        batches += 1
+        after = (rows[-1].completed_at, rows[-1].id)
+    return {'created': created, 'amount': round(total, 2), 'batches': batches}
+
+def watermark():
+    """Position of the incremental run (None before the first run)"""
+    state = db.session.get(JobWatermark, WATERMARK)
+    return state.position if state else None
+
+def run_incremental(now=None):
+    """Invoice orders completed since the last run, then move the watermark to `now`"""
+    now = now or datetime.utcnow()
+    position = watermark()
+    start = position - LOOKBACK if position else None
+    result = generate(start, now)
+    
+    state = db.session.get(JobWatermark, WATERMARK) or JobWatermark(name=WATERMARK)
+    state.position = max(now, position) if position else now
+    db.session.add(state)
+    db.session.commit()
+    return {**result, 'from': start.isoformat() if start else None, 'to': now.isoformat(),
+            'watermark': state.position.isoformat()}
+
+def backfill(start=None, end=None, dry_run=False):
+    """Invoice every uninvoiced completed order in (start, end]; the watermark is left alone"""
+    result = generate(start, end, dry_run=dry_run)
+    return {**result, 'from': start.isoformat() if start else None, 'to': end.isoformat() if end else None,
+            'dryRun': dry_run, 'watermark': watermark().isoformat() if watermark() else None}
@@ -0,0 +1,244 @@
+"""
+Declarative list queries for collection endpoints.
+
+A ListQuery names, per model, which API keys may be filtered on and which
+may be sorted on, and turns the request's query string into SQL:
+
+    ?status=Available                      equality
+    ?status=in:Available,Assigned          any of
+    ?status=ne:Cancelled                   not equal
+    ?deadline<2025-06-01                   also <=, >, >= (or lt:/lte:/gt:/gte: prefixes)
+    ?sort=-deadline                        leading '-' for descending
+    ?limit=50&cursor=...                   keyset pagination
+    ?count=estimate|exact                  total in X-Total-Count
+
+Responses stay bare JSON arrays, so existing clients keep working; the next
+page cursor and counts travel in headers (X-Next-Cursor, X-Total-Count,
+X-Count-Estimated). Without limit or cursor every matching row is returned,
+as the endpoints always did.
+
+Values are coerced from the column type (int, float, datetime, text; a bool
+is true for true or 1 and false for anything else).
+Unknown plain parameters are ignored so legacy callers are unaffected, but
+an operator on a key that is not whitelisted is a 400.
+"""
+from datetime import timezone
+
+from flask import jsonify
+from sqlalchemy import Boolean, DateTime, Float, Integer, Numeric, and_, func, or_, select, text
+
+from db import db
+from patching import parse_datetime
+from utils import decode_cursor, encode_cursor, parse_limit
+
+# Query parameters that are never filters
+RESERVED = {'sort', 'limit', 'cursor', 'count', 'view'}
+
+# Filtered counts stop here and report "at least COUNT_CAP" instead of scanning everything
+COUNT_CAP = 10000
+
+OPERATORS = {
+    'eq': lambda column, value: column == value,
+    'ne': lambda column, value: column != value,
+    'lt': lambda column, value: column < value,
+    'lte': lambda column, value: column <= value,
+    'gt': lambda column, value: column > value,
+    'gte': lambda column, value: column >= value,
+    'in': lambda column, values: column.in_(values),
+}
+
+# Key suffixes left behind by ?deadline<=X (key 'deadline<', value X)
+SUFFIX_OPERATORS = {'<': 'lte', '>': 'gte'}
+
+class ListQueryError(ValueError):
+    """Bad filter, sort or cursor; routes turn it into a 400"""
+    pass
+
+def _coerce(column, raw):
+    column_type = column.property.columns[0].type
+    try:
+        if isinstance(column_type, Boolean):
+            # As lenient as the endpoints always were: anything but true/1 is false
+            return raw.lower() in ('true', '1')
+        if isinstance(column_type, Integer):
+            return int(raw)
+        if isinstance(column_type, (Float, Numeric)):
+            return float(raw)
+        if isinstance(column_type, DateTime):
+            value = parse_datetime(raw)
+            # Stored datetimes are naive UTC
+            if value is not None and value.tzinfo is not None:
+                value = value.astimezone(timezone.utc).replace(tzinfo=None)
+            return value
+    except (TypeError, ValueError):
+        raise ListQueryError(f"Invalid value for {column.key}: {raw}")
+    return raw
+
+def _parse_param(key, value):
+    """
+    Split one query parameter into (field, operator, raw value).
+    Handles ?status=in:a,b, ?deadline<=X (arrives as key 'deadline<') and
+    ?deadline<X (arrives as key 'deadline<X' with an empty value).
+    """
+    if key and key[-1] in SUFFIX_OPERATORS:
+        return key[:-1], SUFFIX_OPERATORS[key[-1]], value
+    if value == '':
+        for symbol, op in (('<', 'lt'), ('>', 'gt')):
+            if symbol in key:
+                field, _, raw = key.partition(symbol)
+                return field, op, raw
+    prefix, separator, rest = value.partition(':')
+    if separator and prefix in OPERATORS:
+        return key, prefix, rest
+    return key, 'eq', value
+
+class ListQuery:
+    """
+    filters: {apiKey: Model.column} that may be filtered on
+    sorts:   {apiKey: Model.column} that may be sorted on
+    default_sort: applied when paginating without an explicit sort, e.g. '-createdAt'
+    """
+    def __init__(self, model, filters, sorts=None, default_sort=None):
+        self.model = model
+        self.filters = filters
+        self.sorts = sorts or {}
+        self.default_sort = default_sort
+        self.key = model.id
+    
+    # Filtering
+    
+    def filter(self, query, args):
+        for key in args:
+            if key in RESERVED:
+                continue
+            for value in args.getlist(key):
+                field, op, raw = _parse_param(key, value)
+                column = self.filters.get(field)
+                if column is None:
+                    if op != 'eq' or field != key:
+                        raise ListQueryError(f"Unknown filter: {field}")
+                    continue
+                if value == '' and op == 'eq':
+                    continue  # ?status= means "no filter", as before
+                if op == 'in':
+                    values = [_coerce(column, v) for v in raw.split(',') if v != '']
+                    query = query.filter(OPERATORS['in'](column, values))
+                else:
+                    query = query.filter(OPERATORS[op](column, _coerce(column, raw)))
+        return query
+    
+    # Sorting and keyset pagination
+    
+    def _sort(self, args):
+        name = args.get('sort') or self.default_sort
+        if not name:
+            return None, False
+        descending = name.startswith('-')
+        column = self.sorts.get(name.lstrip('-'))
+        if column is None:
+            raise ListQueryError(f"Cannot sort by {name.lstrip('-')}")
+        return column, descending
+    
+    def _order(self, query, column, descending):
+        # NULLs always last, then the sort column, then the primary key as a tiebreak
+        query = query.order_by(None)
+        if column is None:
+            return query.order_by(self.key)
+        if descending:
+            return query.order_by(column.is_(None), column.desc(), self.key.desc())
+        return query.order_by(column.is_(None), column, self.key)
+    
+    def _after(self, column, descending, cursor):
+        """WHERE clause for rows after the cursor position"""
+        is_datetime = column is not None and isinstance(column.property.columns[0].type, DateTime)
+        try:
+            values = decode_cursor(cursor, datetime_positions=(0,) if is_datetime else ())
+            last_value, last_key = values
+        except (ValueError, TypeError):
+            raise ListQueryError('Invalid cursor')
+        
+        key_after = self.key < last_key if descending else self.key > last_key
+        if column is None:
+            return key_after
+        if last_value is None:
+            return and_(column.is_(None), key_after)
+        value_after = column < last_value if descending else column > last_value
+        return or_(column.is_(None), value_after, and_(column == last_value, key_after))
+    
+    # Counting
+    
+    def _estimate_table(self):
+        """Row count from planner statistics; None when the dialect has none"""
+        table = self.model.__tablename__
+        dialect = db.engine.dialect.name
+        if dialect == 'postgresql':
+            estimate = db.session.execute(
+                text("SELECT reltuples FROM pg_class WHERE relname = :table"), {'table': table}
+            ).scalar()
+            return int(estimate) if estimate and estimate > 0 else None
+        if dialect == 'sqlite':
+            # rowid only grows, so this is exact until rows are deleted
+            return db.session.execute(text(f"SELECT max(rowid) FROM {table}")).scalar() or 0
+        return None
+    
+    def count(self, query, mode, filtered):
+        """(count, estimated) for ?count=exact|estimate"""
+        if mode == 'exact':
+            return query.order_by(None).count(), False
+        if not filtered:
+            estimate = self._estimate_table()
+            if estimate is not None:
+                return estimate, True
+        capped = query.order_by(None).with_entities(self.key).limit(COUNT_CAP + 1).subquery()
+        total = db.session.execute(select(func.count()).select_from(capped)).scalar()
+        return min(total, COUNT_CAP), total > COUNT_CAP
+    
+    # Putting it together
+    
+    def respond(self, args, query=None, serialize=None, filtered=False):
+        """
+        Run the list query for request `args` and build the response.
+        `query` is the starting query (defaults to Model.query) so routes can
+        add loader options or custom filters; pass filtered=True when they
+        added filters, so ?count=estimate does not report the whole table.
+        `serialize` maps a row to JSON.
+        """
+        query = query if query is not None else self.model.query
+        serialize = serialize or (lambda row: row.to_dict())
+        try:
+            narrowed = self.filter(query, args)
+            paginate = 'limit' in args or 'cursor' in args
+            column, descending = self._sort(args) if (paginate or args.get('sort')) else (None, False)
+            
+            count_mode = args.get('count')
+            if count_mode not in (None, 'exact', 'estimate'):
+                raise ListQueryError('count must be exact or estimate')
+            total = None
+            if count_mode:
+                total = self.count(narrowed, count_mode, filtered or narrowed is not query)
+            
+            if paginate or column is not None:
+                narrowed = self._order(narrowed, column, descending)
+            if args.get('cursor'):
+                narrowed = narrowed.filter(self._after(column, descending, args['cursor']))
+        except ListQueryError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        next_cursor = None
+        if paginate:
+            limit = parse_limit(args.get('limit'))
+            rows = narrowed.limit(limit + 1).all()
+            if len(rows) > limit:
+                rows = rows[:limit]
+                last = rows[-1]
+                next_cursor = encode_cursor(getattr(last, column.key) if column is not None else None, last.id)
+        else:
+            rows = narrowed.all()
+        
+        response = jsonify([serialize(row) for row in rows])
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        if total is not None:
+            response.headers['X-Total-Count'] = str(total[0])
+            response.headers['X-Count-Estimated'] = 'true' if total[1] else 'false'
+        return response, 200
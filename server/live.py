@@ -0,0 +1,224 @@
+"""
+Long-poll and Server-Sent Events endpoints, shared by both serving modes.
+
+    GET /api/sync/wait?since=<watermark>[&tables=orders,invoices][&timeout=25]
+        returns {'changed': [...]} as soon as any requested sync table has a
+        row updated or deleted after `since`, or {'changed': []} after
+        `timeout` seconds; the client then fetches the rows from /api/sync
+    GET /api/notifications/stream?userId=<id>[&since=<watermark>]
+        text/event-stream: a `notification` event for every new or updated
+        notification of the user, with the sync watermark as the event id
+        (EventSource resends it as Last-Event-ID on reconnect)
+
+Both look back routes.sync.SYNC_OVERLAP from their position, as /api/sync
+does: a transaction can commit after rows stamped later than its own (the
+outbox relay stamps a batch when it starts). Rows are told apart by
+(id, updated_at), so a late commit still wakes a wait and is streamed once.
+
+Under WSGI (app.py, wsgi.py) the blueprints serve these by polling the
+database every POLL_INTERVAL, and each open connection holds a worker thread
+for its whole life. Under ASGI (asgi.py) the same URLs are served on the
+event loop from one shared poller per process; this module holds the
+statements, parsing and formatting both use.
+"""
+import json
+import time
+from datetime import datetime
+
+from sqlalchemy import func, literal, select, union_all
+
+from db import db
+from models import FULL_ROW, Notification, Tombstone
+from utils import decode_cursor, encode_cursor
+
+# How often changes are looked for
+POLL_INTERVAL = 1.0
+
+# A comment line is sent this often on idle streams so proxies keep them open
+KEEPALIVE = 15.0
+
+LONG_POLL_TIMEOUT = 25.0
+# gunicorn.conf.py keeps its worker timeout above this
+MAX_LONG_POLL_TIMEOUT = 60.0
+
+def sync_tables():
+    # Imported here: routes.sync imports this module
+    from routes.sync import SYNC_TABLES
+    return SYNC_TABLES
+
+def sync_overlap():
+    """
+    routes.sync.SYNC_OVERLAP. A row that commits late carries an updated_at
+    from before the position it is compared with, so waits and streams
+    re-read this window and tell rows apart by (id, updated_at).
+    """
+    from routes.sync import SYNC_OVERLAP
+    return SYNC_OVERLAP
+
+def parse_watermark(token):
+    """Sync watermark -> naive UTC datetime; raises ValueError"""
+    try:
+        return decode_cursor(token)[0]
+    except (ValueError, IndexError, TypeError):
+        raise ValueError('Invalid sync token')
+
+def parse_wait(args):
+    """Query args of /api/sync/wait -> (table keys, since, timeout); raises ValueError"""
+    if not args.get('since'):
+        raise ValueError('since is required')
+    since = parse_watermark(args['since'])
+    requested = args.get('tables')
+    table_keys = [t.strip() for t in requested.split(',') if t.strip()] if requested else list(sync_tables())
+    unknown = [t for t in table_keys if t not in sync_tables()]
+    if unknown:
+        raise ValueError(f"Unknown tables: {', '.join(unknown)}")
+    try:
+        timeout = float(args.get('timeout', LONG_POLL_TIMEOUT))
+    except ValueError:
+        raise ValueError('timeout must be a number of seconds')
+    return table_keys, since, min(max(timeout, 0.0), MAX_LONG_POLL_TIMEOUT)
+
+def latest_changes_query():
+    """(table name, latest updated_at / deleted_at) rows for every sync table"""
+    parts = [
+        select(literal(model.__tablename__).label('table_name'), func.max(model.updated_at).label('changed_at'))
+        for model in sync_tables().values()
+    ]
+    parts.append(
+        select(Tombstone.table_name, func.max(Tombstone.deleted_at))
+        .where(Tombstone.table_name.in_([model.__tablename__ for model in sync_tables().values()]))
+        .group_by(Tombstone.table_name)
+    )
+    return union_all(*parts)
+
+def latest_by_table(rows):
+    """Fold latest_changes_query() rows into {table name: latest change}"""
+    latest = {}
+    for table_name, changed_at in rows:
+        if isinstance(changed_at, str):  # SQLite returns max() of a DATETIME column as text
+            changed_at = datetime.fromisoformat(changed_at)
+        if changed_at is not None and (latest.get(table_name) is None or changed_at > latest[table_name]):
+            latest[table_name] = changed_at
+    return latest
+
+def recent_changes_query(after):
+    """(table name, row id, updated_at / deleted_at) of every sync table row changed after `after`"""
+    table_names = [model.__tablename__ for model in sync_tables().values()]
+    parts = [
+        select(literal(model.__tablename__).label('table_name'), model.id.label('row_id'),
+               model.updated_at.label('changed_at'))
+        .where(model.updated_at > after)
+        for model in sync_tables().values()
+    ]
+    parts.append(
+        select(Tombstone.table_name, Tombstone.record_id, Tombstone.deleted_at)
+        .where(Tombstone.deleted_at > after, Tombstone.table_name.in_(table_names))
+    )
+    return union_all(*parts)
+
+def recent_rows(rows):
+    """Fold recent_changes_query() rows into a frozenset of (table name, row id, changed at)"""
+    return frozenset(
+        (table_name, row_id, datetime.fromisoformat(changed_at) if isinstance(changed_at, str) else changed_at)
+        for table_name, row_id, changed_at in rows
+    )
+
+def changed_tables(latest, table_keys, since, recent=frozenset(), known=frozenset()):
+    """
+    Response keys of the tables changed after `since`, or with a row in
+    `recent` that was not in `known` when the wait began and changed within
+    the overlap before `since` (it committed late).
+    """
+    late = {table_name for table_name, _, changed_at in recent - known if changed_at > since - sync_overlap()}
+    changed = []
+    for key in table_keys:
+        table_name = sync_tables()[key].__tablename__
+        if (latest.get(table_name) or datetime.min) > since or table_name in late:
+            changed.append(key)
+    return changed
+
+def notifications_after(user_id, after):
+    """A user's notifications updated after `after`, oldest change first"""
+    return (select(Notification).options(FULL_ROW)
+            .where(Notification.user_id == user_id, Notification.updated_at > after)
+            .order_by(Notification.updated_at, Notification.id))
+
+class NotificationCursor:
+    """
+    Where one notification stream is: the newest change sent, and what was
+    sent within the overlap before it. Each read goes back the overlap, so
+    a notification that commits late is still sent, and only once.
+    """
+    def __init__(self, user_id, position):
+        self.user_id = user_id
+        self.position = position
+        self.sent = set()  # (id, updated_at) sent within the overlap before position
+    
+    def query(self):
+        return notifications_after(self.user_id, self.position - sync_overlap())
+    
+    def unsent(self, notifications):
+        """The notifications of one read that this stream has not sent yet"""
+        fresh = [n for n in notifications if (n.id, n.updated_at) not in self.sent]
+        for notification in fresh:
+            self.position = max(self.position, notification.updated_at)
+        self.sent.update((n.id, n.updated_at) for n in fresh)
+        floor = self.position - sync_overlap()
+        self.sent = {sent for sent in self.sent if sent[1] > floor}
+        return fresh
+
+def sse(event, data, event_id=None):
+    """One Server-Sent Events message"""
+    lines = [f"id: {event_id}"] if event_id else []
+    lines += [f"event: {event}", f"data: {json.dumps(data)}"]
+    return '\n'.join(lines) + '\n\n'
+
+SSE_KEEPALIVE = ': keepalive\n\n'
+
+def stream_start(args, headers):
+    """(user id, starting position) for a notification stream; raises ValueError"""
+    user_id = args.get('userId')
+    if not user_id:
+        raise ValueError('userId is required')
+    token = args.get('since') or headers.get('Last-Event-ID')
+    return user_id, parse_watermark(token) if token else datetime.utcnow()
+
+def notification_event(notification):
+    return sse('notification', notification.to_dict(), encode_cursor(notification.updated_at))
+
+# WSGI implementations: one thread per open connection, polling the database
+
+def read_changes():
+    """(latest change per table, rows changed within the overlap) as of now"""
+    after = datetime.utcnow() - sync_overlap()
+    latest = latest_by_table(db.session.execute(latest_changes_query()))
+    recent = recent_rows(db.session.execute(recent_changes_query(after)))
+    db.session.rollback()  # end the read so the next poll sees new commits
+    return latest, recent
+
+def wait_for_changes(table_keys, since, timeout):
+    """Block until a requested table changed after `since` or `timeout` passed"""
+    deadline = time.monotonic() + timeout
+    latest, known = read_changes()
+    recent = known
+    while True:
+        changed = changed_tables(latest, table_keys, since, recent, known)
+        if changed or time.monotonic() >= deadline:
+            return changed
+        time.sleep(min(POLL_INTERVAL, max(deadline - time.monotonic(), 0)))
+        latest, recent = read_changes()
+
+def notification_events(user_id, position):
+    """Generator of SSE messages for one user's notifications; runs until the client goes away"""
+    cursor = NotificationCursor(user_id, position)
+    last_sent = time.monotonic()
+    while True:
+        notifications = db.session.scalars(cursor.query()).all()
+        db.session.rollback()
+        for notification in cursor.unsent(notifications):
+            yield notification_event(notification)
+            last_sent = time.monotonic()
+        if time.monotonic() - last_sent >= KEEPALIVE:
+            yield SSE_KEEPALIVE
+            last_sent = time.monotonic()
+        time.sleep(POLL_INTERVAL)
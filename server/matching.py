@@ -0,0 +1,316 @@
+"""
+Writer matching engine for order assignment.
+
+Keeps a per-process index of feature vectors for active writers (rating,
+success rate, load against max_concurrent_orders, UTC offset, and
+specialization / language membership matrices) in numpy arrays, so ranking
+every writer for an order is a handful of vectorized operations.
+
+The index refreshes incrementally: when a transaction commits, the writers
+whose profile changed or who had an order move on/off their plate are
+marked dirty, and the next ranking call reloads only those rows. A full rebuild runs every
+FULL_REFRESH_SECONDS to pick up writes made by other worker processes.
+"""
+import threading
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session, object_session
+
+from db import db
+from models import Writer, Order, Review, ACTIVE_ORDER_STATUSES, writer_terms
+
+FULL_REFRESH_SECONDS = 300
+
+# Relative weight of each component in the final score (sums to 1)
+WEIGHTS = {
+    'specialization': 0.35,
+    'rating': 0.20,
+    'successRate': 0.15,
+    'availability': 0.20,
+    'timezone': 0.10
+}
+
+def _terms(raw):
+    """JSON array column -> set of normalized terms, normalized as in the writer term tables"""
+    return set(writer_terms(raw))
+
+def utc_offset_hours(timezone_name):
+    """Current UTC offset of an IANA timezone in hours, or None if unknown"""
+    if not timezone_name:
+        return None
+    try:
+        offset = datetime.now(ZoneInfo(timezone_name)).utcoffset()
+    except (KeyError, ValueError):  # ZoneInfoNotFoundError is a KeyError
+        return None
+    return offset.total_seconds() / 3600 if offset is not None else None
+
+def order_terms(order):
+    """Normalized subject/discipline of an order, matched against writer specializations"""
+    return _terms([v for v in (order.subject, order.discipline) if v])
+
+def specialization_scores(order, specs, spec_vocab):
+    """1.0 for each writer row whose specializations cover the order's subject or discipline"""
+    columns = [spec_vocab[t] for t in order_terms(order) if t in spec_vocab]
+    if not columns:
+        return np.zeros(specs.shape[0])
+    return specs[:, columns].any(axis=1).astype(float)
+
+class WriterFeatureIndex:
+    """Row-per-writer feature arrays with incremental refresh"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dirty = set()
+        self._reset()
+    
+    def _reset(self):
+        self.ids = []
+        self.names = []
+        self.rows = {}  # writer id -> row
+        self.valid = np.zeros(0, dtype=bool)
+        self.rating = np.zeros(0)
+        self.success_rate = np.zeros(0)
+        self.max_orders = np.zeros(0)
+        self.active_orders = np.zeros(0)
+        self.utc_offset = np.zeros(0)
+        self.has_timezone = np.zeros(0, dtype=bool)
+        self.spec_vocab = {}
+        self.lang_vocab = {}
+        self.specs = np.zeros((0, 0), dtype=bool)
+        self.langs = np.zeros((0, 0), dtype=bool)
+        self.built_at = None
+    
+    def mark_dirty(self, *writer_ids):
+        with self._lock:
+            self._dirty.update(w for w in writer_ids if w)
+    
+    def invalidate(self):
+        """Force a full rebuild on next use"""
+        with self._lock:
+            self.built_at = None
+    
+    # Loading
+    
+    def _load(self, writer_filter=None):
+        """Active writers (optionally a subset) with their current active order counts"""
+        query = Writer.query.with_entities(
+            Writer.id, Writer.name, Writer.status, Writer.rating, Writer.success_rate,
+            Writer.max_concurrent_orders, Writer.timezone, Writer.specializations, Writer.languages
+        )
+        counts = db.session.query(Order.writer_id, func.count()).filter(
+            Order.status.in_(ACTIVE_ORDER_STATUSES)
+        )
+        if writer_filter is not None:
+            query = query.filter(Writer.id.in_(writer_filter))
+            counts = counts.filter(Order.writer_id.in_(writer_filter))
+        active = dict(counts.group_by(Order.writer_id).all())
+        return query.all(), active
+    
+    def _vocab_columns(self, vocab, matrix, terms):
+        for term in terms:
+            if term not in vocab:
+                vocab[term] = len(vocab)
+        if len(vocab) > matrix.shape[1]:
+            grow = max(len(vocab) - matrix.shape[1], 16)
+            matrix = np.hstack([matrix, np.zeros((matrix.shape[0], grow), dtype=bool)])
+        return matrix, [vocab[t] for t in terms]
+    
+    def _ensure_rows(self, count):
+        if count <= len(self.valid):
+            return
+        grow = count - len(self.valid)
+        self.valid = np.concatenate([self.valid, np.zeros(grow, dtype=bool)])
+        for name in ('rating', 'success_rate', 'max_orders', 'active_orders', 'utc_offset'):
+            setattr(self, name, np.concatenate([getattr(self, name), np.zeros(grow)]))
+        self.has_timezone = np.concatenate([self.has_timezone, np.zeros(grow, dtype=bool)])
+        self.specs = np.vstack([self.specs, np.zeros((grow, self.specs.shape[1]), dtype=bool)])
+        self.langs = np.vstack([self.langs, np.zeros((grow, self.langs.shape[1]), dtype=bool)])
+    
+    def _apply(self, writers, active, seen_ids=None):
+        new_ids = [w.id for w in writers if w.id not in self.rows]
+        for writer_id in new_ids:
+            self.rows[writer_id] = len(self.ids)
+            self.ids.append(writer_id)
+            self.names.append(None)
+        self._ensure_rows(len(self.ids))
+        
+        for w in writers:
+            row = self.rows[w.id]
+            self.names[row] = w.name
+            self.valid[row] = w.status == 'active'
+            self.rating[row] = w.rating or 0.0
+            self.success_rate[row] = w.success_rate or 0.0
+            self.max_orders[row] = w.max_concurrent_orders or 3
+            self.active_orders[row] = active.get(w.id, 0)
+            offset = utc_offset_hours(w.timezone)
+            self.has_timezone[row] = offset is not None
+            self.utc_offset[row] = offset or 0.0
+            
+            self.specs, spec_cols = self._vocab_columns(self.spec_vocab, self.specs, _terms(w.specializations))
+            self.langs, lang_cols = self._vocab_columns(self.lang_vocab, self.langs, _terms(w.languages))
+            self.specs[row, :] = False
+            self.specs[row, spec_cols] = True
+            self.langs[row, :] = False
+            self.langs[row, lang_cols] = True
+        
+        # Writers we asked for but did not get back were deleted
+        if seen_ids is not None:
+            returned = {w.id for w in writers}
+            for writer_id in seen_ids - returned:
+                if writer_id in self.rows:
+                    self.valid[self.rows[writer_id]] = False
+    
+    def refresh(self):
+        """Full rebuild if stale, otherwise reload only dirty writers"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            if self.built_at is None or time.monotonic() - self.built_at > FULL_REFRESH_SECONDS:
+                writers, active = self._load()
+                self._reset()
+                self._apply(writers, active)
+                self.built_at = time.monotonic()
+            elif dirty:
+                writers, active = self._load(dirty)
+                self._apply(writers, active, seen_ids=dirty)
+    
+    def snapshot(self):
+        """Consistent copy of the feature arrays, for batch solvers that work outside the lock"""
+        self.refresh()
+        with self._lock:
+            return {
+                'ids': list(self.ids),
+                'names': list(self.names),
+                'valid': self.valid.copy(),
+                'rating': self.rating.copy(),
+                'success_rate': self.success_rate.copy(),
+                'max_orders': self.max_orders.copy(),
+                'active_orders': self.active_orders.copy(),
+                'utc_offset': self.utc_offset.copy(),
+                'has_timezone': self.has_timezone.copy(),
+                'spec_vocab': dict(self.spec_vocab),
+                'lang_vocab': dict(self.lang_vocab),
+                'specs': self.specs.copy(),
+                'langs': self.langs.copy()
+            }
+    
+    # Scoring
+    
+    def rank(self, order, limit=10, language=None, timezone=None, include_full=False, exclude=()):
+        """
+        Score every indexed writer for `order` and return the top `limit`
+        as dicts with the total score and its components.
+        """
+        self.refresh()
+        with self._lock:
+            if not self.ids:
+                return []
+            
+            specialization = specialization_scores(order, self.specs, self.spec_vocab)
+            
+            eligible = self.valid.copy()
+            if language:
+                column = self.lang_vocab.get(language.strip().lower())
+                if column is None:
+                    return []
+                eligible &= self.langs[:, column]
+            
+            remaining = self.max_orders - self.active_orders
+            if not include_full:
+                eligible &= remaining > 0
+            for writer_id in exclude:
+                if writer_id in self.rows:
+                    eligible[self.rows[writer_id]] = False
+            
+            availability = np.clip(remaining / np.maximum(self.max_orders, 1), 0.0, 1.0)
+            rating = np.clip(self.rating / 5.0, 0.0, 1.0)
+            success = np.clip(self.success_rate / 100.0, 0.0, 1.0)
+            
+            target_offset = utc_offset_hours(timezone) if timezone else None
+            if target_offset is None:
+                tz_score = np.full(len(self.ids), 0.5)
+            else:
+                diff = np.abs(self.utc_offset - target_offset)
+                diff = np.minimum(diff, 24 - diff)
+                tz_score = np.where(self.has_timezone, 1.0 - diff / 12.0, 0.5)
+            
+            score = (
+                WEIGHTS['specialization'] * specialization +
+                WEIGHTS['rating'] * rating +
+                WEIGHTS['successRate'] * success +
+                WEIGHTS['availability'] * availability +
+                WEIGHTS['timezone'] * tz_score
+            )
+            score = np.where(eligible, score, -1.0)
+            
+            count = min(limit, int(eligible.sum()))
+            if count == 0:
+                return []
+            top = np.argpartition(-score, count - 1)[:count]
+            top = top[np.argsort(-score[top], kind='stable')]
+            
+            return [{
+                'writerId': self.ids[row],
+                'writerName': self.names[row],
+                'score': round(float(score[row]), 4),
+                'activeOrders': int(self.active_orders[row]),
+                'maxConcurrentOrders': int(self.max_orders[row]),
+                'components': {
+                    'specialization': float(specialization[row]),
+                    'rating': round(float(rating[row]), 4),
+                    'successRate': round(float(success[row]), 4),
+                    'availability': round(float(availability[row]), 4),
+                    'timezone': round(float(tz_score[row]), 4)
+                }
+            } for row in top]
+
+writer_index = WriterFeatureIndex()
+
+# Incremental refresh hooks
+#
+# Mapper events run during the flush, before the transaction commits: a
+# rebuild in between would still read the old rows, and a rollback would
+# leave writers marked for changes that never happened. So the flush only
+# collects ids in session.info, and they reach the index after the commit.
+
+DIRTY_WRITERS = 'matching.dirty_writers'
+
+def _collect(target, *writer_ids):
+    object_session(target).info.setdefault(DIRTY_WRITERS, set()).update(w for w in writer_ids if w)
+
+def _writer_changed(mapper, connection, target):
+    _collect(target, target.id)
+
+def _order_changed(mapper, connection, target):
+    # Only status / writer changes move an order on or off a writer's plate
+    state = inspect(target)
+    writer_history = state.attrs.writer_id.history
+    if state.persistent and not writer_history.has_changes() and not state.attrs.status.history.has_changes():
+        return
+    _collect(target, target.writer_id, *(writer_history.deleted or ()))
+
+def _review_changed(mapper, connection, target):
+    # Review listeners rewrite writers.rating with Core, which _writer_changed never sees
+    _collect(target, target.writer_id, *(inspect(target).attrs.writer_id.history.deleted or ()))
+
+@event.listens_for(Session, 'after_commit')
+def _mark_committed(session):
+    if session.in_nested_transaction():
+        return  # a savepoint was released; the outer transaction can still roll back
+    writer_ids = session.info.pop(DIRTY_WRITERS, None)
+    if writer_ids:
+        writer_index.mark_dirty(*writer_ids)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_rolled_back(session):
+    # A savepoint rollback keeps them: marking a writer too often only costs a reload
+    if not session.in_nested_transaction():
+        session.info.pop(DIRTY_WRITERS, None)
+
+for _event in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(Writer, _event, _writer_changed)
+    event.listen(Order, _event, _order_changed)
+    event.listen(Review, _event, _review_changed)
@@ -0,0 +1,335 @@
+"""
+Writer merit scores.
+
+writer_metrics holds one row of performance counters per writer: orders
+taken, completed, completed on time, sent back for revision, rejected, plus
+earnings, fines that were not waived and a copy of the writer's rating. The
+order and fine listeners in models.py hand each changed row to
+source_changed(), which adjusts those counters with atomic increments inside
+the flush that changes the source row and then recomputes merit_score from
+them (the review listeners refresh the rating copy the same way), so:
+
+    GET /api/writers/<id>/metrics   one primary-key read (rank is an index range count)
+    GET /api/writers/leaderboard    a walk down ix_writer_metrics_merit, highest first
+
+The score uses the weights the bidding UI applied in the browser (see
+merit_score below). Writes that go around the ORM (the Core claims in
+order pick / auto-assign) call recount() for the writers they touched;
+rebuild() recomputes every row (`flask merit rebuild`).
+"""
+from datetime import datetime
+
+from sqlalchemy import and_, bindparam, case, func, inspect, literal, or_, select
+
+from db import db
+from models import (
+    COMPLETED_ORDER_STATUSES, DEFAULT_PAGE_PRICE_KES, MAX_REVISION_SCORE, REJECTED_ORDER_STATUSES,
+    WAIVED_FINE_STATUSES, Fine, Order, Writer, WriterMetric, attribute_values
+)
+from utils import decode_cursor, encode_cursor
+
+# Writers without reviews are scored with the rating the bidding UI assumed for everyone
+DEFAULT_MERIT_RATING = 4.5
+
+# Points off the merit score per fine that was not waived, up to the cap
+FINE_PENALTY = 2.0
+FINE_PENALTY_CAP = 10.0
+
+def order_contributions(writer_id, status, deadline, completed_at, revision_count, revision_score, total_price_kes, pages):
+    """{counter: amount} one order adds to its writer's metrics (empty if unassigned)"""
+    if not writer_id:
+        return {}
+    values = {'total_orders': 1}
+    if revision_count:
+        values['revised_orders'] = 1
+        values['revision_count'] = revision_count
+    if status in COMPLETED_ORDER_STATUSES:
+        values['completed_orders'] = 1
+        if completed_at is not None and deadline is not None and completed_at <= deadline:
+            values['on_time_orders'] = 1
+        values['revision_score_sum'] = revision_score if revision_score is not None else MAX_REVISION_SCORE
+        values['earnings'] = float(total_price_kes or (pages or 0) * DEFAULT_PAGE_PRICE_KES)
+    elif status in REJECTED_ORDER_STATUSES:
+        values['rejected_orders'] = 1
+    return values
+
+def fine_contributions(writer_id, amount, status):
+    """{counter: amount} one fine adds to its writer's metrics (empty if waived)"""
+    if not writer_id or status in WAIVED_FINE_STATUSES:
+        return {}
+    return {'fine_count': 1, 'fine_total': float(amount or 0)}
+
+def writer_performance(values):
+    """Percentages and average rating from a mapping of writer_metrics columns"""
+    total, completed = values['total_orders'], values['completed_orders']
+    return {
+        'completionRate': round(completed / total * 100, 2) if total else 0.0,
+        'onTimeDeliveryRate': round(values['on_time_orders'] / completed * 100, 2) if completed else 100.0,
+        'revisionRate': round(values['revised_orders'] / total * 100, 2) if total else 0.0,
+        'rejectionRate': round(values['rejected_orders'] / total * 100, 2) if total else 0.0,
+        'averageRating': values['rating'] if values['total_reviews'] else DEFAULT_MERIT_RATING
+    }
+
+def merit_score(values):
+    """
+    0-100 score from a mapping of writer_metrics columns. Same weights as the
+    bidding UI (completion 30, rating 25, on time 20, few revisions 15, few
+    rejections 10), less FINE_PENALTY per fine.
+    """
+    rates = writer_performance(values)
+    score = (
+        rates['completionRate'] / 100 * 30 +
+        rates['averageRating'] / 5 * 25 +
+        rates['onTimeDeliveryRate'] / 100 * 20 +
+        max(0.0, (100 - rates['revisionRate']) / 100) * 15 +
+        max(0.0, (100 - rates['rejectionRate']) / 100) * 10 -
+        min(FINE_PENALTY_CAP, values['fine_count'] * FINE_PENALTY)
+    )
+    return round(min(100.0, max(0.0, score)), 2)
+
+def refresh_writer_metrics(connection, writer_id):
+    """
+    Copy the writer's rating onto their metrics row (creating it if needed) and
+    recompute merit_score from the counters. The first UPDATE locks the row, so
+    the counters read next are not overtaken by a concurrent event.
+    """
+    if not writer_id:
+        return
+    table = WriterMetric.__table__
+    writers = Writer.__table__
+    writer_row = select(writers).where(writers.c.id == writer_id)
+    copied = {
+        'rating': db.func.coalesce(writer_row.with_only_columns(writers.c.rating).scalar_subquery(), 0.0),
+        'total_reviews': db.func.coalesce(writer_row.with_only_columns(writers.c.total_reviews).scalar_subquery(), 0)
+    }
+    updated = connection.execute(table.update().where(table.c.writer_id == writer_id).values(copied))
+    if updated.rowcount == 0:
+        connection.execute(table.insert().from_select(
+            ['writer_id', *copied],
+            select(literal(writer_id), *copied.values())
+        ))
+    
+    values = connection.execute(select(table).where(table.c.writer_id == writer_id)).mappings().one()
+    connection.execute(
+        table.update().where(table.c.writer_id == writer_id)
+        .values(merit_score=merit_score(values), updated_at=datetime.utcnow())
+    )
+
+def apply_metric_deltas(connection, writer_id, contributions, sign):
+    """Add (sign=1) or remove (sign=-1) one row's contributions, then refresh the merit score"""
+    if not contributions:
+        return
+    table = WriterMetric.__table__
+    deltas = {name: sign * value for name, value in contributions.items()}
+    updated = connection.execute(
+        table.update()
+        .where(table.c.writer_id == writer_id)
+        .values({name: table.c[name] + delta for name, delta in deltas.items()})
+    )
+    if updated.rowcount == 0 and sign > 0:
+        connection.execute(table.insert().values(writer_id=writer_id, **deltas))
+    refresh_writer_metrics(connection, writer_id)
+
+# Incremental upkeep, called from the mapper listeners in models.py
+
+ORDER_METRIC_FIELDS = ('writer_id', 'status', 'deadline', 'completed_at', 'revision_count', 'revision_score',
+                       'total_price_kes', 'pages')
+FINE_METRIC_FIELDS = ('writer_id', 'amount', 'status')
+
+# Rows whose changes move writer_metrics: model -> (contributing columns, contributions function)
+SOURCES = {
+    Order: (ORDER_METRIC_FIELDS, order_contributions),
+    Fine: (FINE_METRIC_FIELDS, fine_contributions),
+}
+
+def source_changed(connection, target, change):
+    """
+    Mapper listener body (models.py) for an insert, update or delete of a
+    writer, order or fine: moves the row's contribution between writers'
+    counters. An update that touched no contributing column costs nothing.
+    """
+    if isinstance(target, Writer):
+        if change == 'insert':
+            refresh_writer_metrics(connection, target.id)
+        elif change == 'delete':
+            table = WriterMetric.__table__
+            connection.execute(table.delete().where(table.c.writer_id == target.id))
+        return
+    
+    fields, contributions = SOURCES[type(target)]
+    if change != 'update':
+        writer_id, *rest = attribute_values(target, fields)
+        apply_metric_deltas(connection, writer_id, contributions(writer_id, *rest), 1 if change == 'insert' else -1)
+        return
+    state = inspect(target)
+    if not any(state.attrs[name].history.has_changes() for name in fields):
+        return
+    old_writer, *old_rest = attribute_values(target, fields, previous=True)
+    new_writer, *new_rest = attribute_values(target, fields)
+    old, new = contributions(old_writer, *old_rest), contributions(new_writer, *new_rest)
+    if old_writer == new_writer:
+        # One net adjustment instead of a remove and an add on the same row
+        net = {name: new.get(name, 0) - old.get(name, 0) for name in {*old, *new}}
+        apply_metric_deltas(connection, new_writer, {name: delta for name, delta in net.items() if delta}, 1)
+    else:
+        apply_metric_deltas(connection, old_writer, old, -1)
+        apply_metric_deltas(connection, new_writer, new, 1)
+
+# Rebuilds
+
+COUNTERS = ('total_orders', 'completed_orders', 'on_time_orders', 'revised_orders', 'revision_count',
+            'revision_score_sum', 'rejected_orders', 'earnings', 'fine_count', 'fine_total')
+
+def _order_totals(writer_ids=None):
+    """{writer_id: {counter: value}} from one grouped pass over orders"""
+    completed = Order.status.in_(COMPLETED_ORDER_STATUSES)
+    query = select(
+        Order.writer_id,
+        func.count(),
+        func.sum(case((completed, 1), else_=0)),
+        func.sum(case((and_(completed, Order.completed_at <= Order.deadline), 1), else_=0)),
+        func.sum(case((Order.revision_count > 0, 1), else_=0)),
+        func.sum(case((Order.revision_count > 0, Order.revision_count), else_=0)),
+        func.sum(case((completed, func.coalesce(Order.revision_score, MAX_REVISION_SCORE)), else_=0)),
+        func.sum(case((Order.status.in_(REJECTED_ORDER_STATUSES), 1), else_=0)),
+        func.sum(case((completed, func.coalesce(
+            func.nullif(Order.total_price_kes, 0), func.coalesce(Order.pages, 0) * DEFAULT_PAGE_PRICE_KES
+        )), else_=0.0))
+    ).where(Order.writer_id.isnot(None), Order.writer_id != '').group_by(Order.writer_id)
+    if writer_ids is not None:
+        query = query.where(Order.writer_id.in_(writer_ids))
+    return {row[0]: dict(zip(COUNTERS[:8], (v or 0 for v in row[1:]))) for row in db.session.execute(query)}
+
+def _fine_totals(writer_ids=None):
+    query = select(Fine.writer_id, func.count(), func.coalesce(func.sum(Fine.amount), 0.0)).where(
+        Fine.writer_id.isnot(None), Fine.writer_id != '',
+        or_(Fine.status.is_(None), Fine.status.notin_(WAIVED_FINE_STATUSES))
+    ).group_by(Fine.writer_id)
+    if writer_ids is not None:
+        query = query.where(Fine.writer_id.in_(writer_ids))
+    return {writer_id: {'fine_count': count, 'fine_total': total} for writer_id, count, total in db.session.execute(query)}
+
+def _computed_rows(writer_ids=None):
+    """writer_metrics rows for `writer_ids` (None = all) computed from orders, fines and writers"""
+    orders = _order_totals(writer_ids)
+    fines = _fine_totals(writer_ids)
+    writers = select(Writer.id, Writer.rating, Writer.total_reviews)
+    if writer_ids is not None:
+        writers = writers.where(Writer.id.in_(writer_ids))
+    ratings = {writer_id: (rating, reviews) for writer_id, rating, reviews in db.session.execute(writers)}
+    
+    now = datetime.utcnow()
+    rows = []
+    for writer_id in {*ratings, *orders, *fines}:
+        rating, reviews = ratings.get(writer_id, (0.0, 0))
+        row = {name: 0 for name in COUNTERS}
+        row.update(orders.get(writer_id, {}), **fines.get(writer_id, {}))
+        row.update(writer_id=writer_id, rating=rating or 0.0, total_reviews=reviews or 0, updated_at=now)
+        row['merit_score'] = merit_score(row)
+        rows.append(row)
+    return rows
+
+def _recompute(writer_ids=None):
+    """Replace the writer_metrics rows for `writer_ids` (None = all) with recomputed ones"""
+    rows = _computed_rows(writer_ids)
+    table = WriterMetric.__table__
+    connection = db.session.connection()
+    delete = table.delete()
+    if writer_ids is not None:
+        delete = delete.where(table.c.writer_id.in_(writer_ids))
+    connection.execute(delete)
+    if rows:
+        connection.execute(table.insert(), rows)
+    return len(rows)
+
+def rebuild():
+    """
+    Recompute every writer_metrics row from orders, fines and writers. Runs in
+    the caller's transaction; the caller commits. Returns the row count.
+    """
+    return _recompute()
+
+def recount(writer_ids):
+    """
+    Recompute the rows of a few writers after a write that skipped the ORM
+    listeners. Runs in the caller's transaction; the caller commits.
+    """
+    writer_ids = [writer_id for writer_id in set(writer_ids) if writer_id]
+    if writer_ids:
+        _recompute(writer_ids)
+
+def refresh_scores():
+    """Recompute merit_score for every row from its stored counters and the writers' current ratings (caller commits)"""
+    table = WriterMetric.__table__
+    writers = Writer.__table__
+    connection = db.session.connection()
+    connection.execute(table.update().values(
+        rating=func.coalesce(select(writers.c.rating).where(writers.c.id == table.c.writer_id).scalar_subquery(), 0.0),
+        total_reviews=func.coalesce(select(writers.c.total_reviews).where(writers.c.id == table.c.writer_id).scalar_subquery(), 0)
+    ))
+    rows = connection.execute(select(table)).mappings().all()
+    if rows:
+        connection.execute(
+            table.update().where(table.c.writer_id == bindparam('key')).values(merit_score=bindparam('score')),
+            [{'key': row['writer_id'], 'score': merit_score(row)} for row in rows]
+        )
+    return len(rows)
+
+def _ranked(query):
+    return query.join(Writer, Writer.id == WriterMetric.writer_id)
+
+def rank_of(metric):
+    """1-based leaderboard position (ties ordered as the leaderboard orders them)"""
+    ahead = _ranked(db.session.query(func.count(WriterMetric.writer_id))).filter(or_(
+        WriterMetric.merit_score > metric.merit_score,
+        and_(WriterMetric.merit_score == metric.merit_score, WriterMetric.writer_id > metric.writer_id)
+    ))
+    return ahead.scalar() + 1
+
+def writer_metrics(writer_id):
+    """Metrics and rank for one writer, or None if the writer does not exist"""
+    writer = db.session.get(Writer, writer_id)
+    if not writer:
+        return None
+    metric = db.session.get(WriterMetric, writer_id)
+    if metric is None:
+        # Writer predates writer_metrics and no rebuild has run yet. Compute the row for
+        # this response without storing it; the listeners and rebuild() own the table.
+        row, = _computed_rows([writer_id])
+        metric = WriterMetric(**row)
+    return {**metric.to_dict(), 'writerName': writer.name, 'rank': rank_of(metric)}
+
+def leaderboard(limit, cursor=None, status=None, min_completed=None):
+    """
+    (entries, next cursor) highest merit first. The cursor carries the last
+    score, writer id and rank, so later pages are keyset reads as well.
+    """
+    query = _ranked(db.session.query(WriterMetric, Writer.name))
+    if status:
+        query = query.filter(Writer.status == status)
+    if min_completed:
+        query = query.filter(WriterMetric.completed_orders >= min_completed)
+    
+    rank = 0
+    if cursor:
+        try:
+            last_score, last_writer, rank = decode_cursor(cursor, datetime_positions=())
+            rank = int(rank)
+        except (ValueError, TypeError):
+            raise ValueError('Invalid cursor')
+        query = query.filter(or_(
+            WriterMetric.merit_score < last_score,
+            and_(WriterMetric.merit_score == last_score, WriterMetric.writer_id < last_writer)
+        ))
+    
+    rows = query.order_by(WriterMetric.merit_score.desc(), WriterMetric.writer_id.desc()).limit(limit + 1).all()
+    entries = []
+    for metric, name in rows[:limit]:
+        rank += 1
+        entries.append({'rank': rank, 'writerName': name, **metric.to_dict()})
+    
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1][0]
+        next_cursor = encode_cursor(last.merit_score, last.writer_id, rank)
+    return entries, next_cursor
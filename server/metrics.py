@@ -0,0 +1,39 @@
+"""
+In-process counters and timings, exposed at GET /api/metrics.
+Values are per worker process and reset on restart.
+"""
+import threading
+from collections import defaultdict
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_timings = {}
+
+def increment(name, amount=1):
+    """Add to a named counter"""
+    with _lock:
+        _counters[name] += amount
+
+def observe(name, seconds):
+    """Record one duration sample under `name` (count / total / max)"""
+    with _lock:
+        timing = _timings.setdefault(name, {'count': 0, 'total': 0.0, 'max': 0.0})
+        timing['count'] += 1
+        timing['total'] += seconds
+        timing['max'] = max(timing['max'], seconds)
+
+def snapshot():
+    """Copy of all metrics, safe to serialize"""
+    with _lock:
+        return {
+            'counters': dict(_counters),
+            'timings': {
+                name: dict(t, avg=t['total'] / t['count'] if t['count'] else 0.0)
+                for name, t in _timings.items()
+            }
+        }
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _timings.clear()
@@ -0,0 +1,321 @@
+"""
+Create the base tables.
+
+The tables as they were before the later steps, which add their own columns
+and indexes. Tables that already exist are left alone.
+"""
+from db import db
+
+def upgrade(op):
+    op.create_table(
+        'users',
+        db.Column('id', db.String(50), primary_key=True),
+        db.Column('name', db.String(200), nullable=False),
+        db.Column('email', db.String(200), nullable=False, unique=True),
+        db.Column('password', db.String(200), nullable=False),
+        db.Column('role', db.String(20), nullable=False),
+        db.Column('created_at', db.DateTime())
+    )
+    op.create_table(
+        'writers',
+        db.Column('id', db.String(50), primary_key=True),
+        db.Column('email', db.String(200), nullable=False, unique=True),
+        db.Column('name', db.String(200), nullable=False),
+        db.Column('phone', db.String(50)),
+        db.Column('status', db.String(50)),
+        db.Column('role', db.String(20)),
+        db.Column('national_id', db.String(50)),
+        db.Column('date_of_birth', db.String(20)),
+        db.Column('gender', db.String(20)),
+        db.Column('address', db.Text()),
+        db.Column('education', db.Text()),
+        db.Column('experience', db.Text()),
+        db.Column('specializations', db.Text()),
+        db.Column('languages', db.Text()),
+        db.Column('timezone', db.String(100)),
+        db.Column('country', db.String(100)),
+        db.Column('rating', db.Float()),
+        db.Column('total_reviews', db.Integer()),
+        db.Column('completed_orders', db.Integer()),
+        db.Column('total_earnings', db.Float()),
+        db.Column('success_rate', db.Float()),
+        db.Column('max_concurrent_orders', db.Integer()),
+        db.Column('preferred_payment_method', db.String(50)),
+        db.Column('payment_details', db.Text()),
+        db.Column('bio', db.Text()),
+        db.Column('documents', db.Text()),
+        db.Column('email_notifications', db.Boolean()),
+        db.Column('sms_notifications', db.Boolean()),
+        db.Column('whatsapp_notifications', db.Boolean()),
+        db.Column('is_email_verified', db.Boolean()),
+        db.Column('is_phone_verified', db.Boolean()),
+        db.Column('is_document_verified', db.Boolean()),
+        db.Column('created_at', db.DateTime()),
+        db.Column('last_active_at', db.DateTime()),
+        db.Column('application_submitted_at', db.DateTime()),
+        db.Column('application_reviewed_at', db.DateTime()),
+        db.Column('application_reviewed_by', db.String(50))
+    )
+    op.create_table(
+        'orders',
+        db.Column('id', db.String(50), primary_key=True),
+        db.Column('order_number', db.String(4), unique=True),
+        db.Column('title', db.String(500), nullable=False),
+        db.Column('description', db.Text()),
+        db.Column('subject', db.String(200)),
+        db.Column('discipline', db.String(200)),
+        db.Column('paper_type', db.String(100)),
+        db.Column('pages', db.Integer()),
+        db.Column('words', db.Integer()),
+        db.Column('format', db.String(50)),
+        db.Column('price', db.Float()),
+        db.Column('price_kes', db.Float()),
+        db.Column('cpp', db.Float()),
+        db.Column('total_price_kes', db.Float()),
+        db.Column('deadline', db.DateTime()),
+        db.Column('status', db.String(50)),
+        db.Column('client_id', db.String(50)),
+        db.Column('client_name', db.String(200)),
+        db.Column('client_email', db.String(200)),
+        db.Column('client_phone', db.String(50)),
+        db.Column('requirements', db.Text()),
+        db.Column('writer_id', db.String(50)),
+        db.Column('assigned_writer', db.String(200)),
+        db.Column('assigned_at', db.DateTime()),
+        db.Column('started_at', db.DateTime()),
+        db.Column('submitted_at', db.DateTime()),
+        db.Column('completed_at', db.DateTime()),
+        db.Column('attachments', db.Text()),
+        db.Column('revision_requests', db.Text()),
+        db.Column('reviews', db.Text()),
+        db.Column('client_messages', db.Text()),
+        db.Column('admin_messages', db.Text()),
+        db.Column('last_admin_edit', db.Text()),
+        db.Column('created_at', db.DateTime()),
+        db.Column('updated_at', db.DateTime())
+    )
+    op.create_table(
+        'order_activities',
+        db.Column('id', db.String(50), primary_key=True),
+        db.Column('order_id', db.String(50), db.ForeignKey('orders.id'), nullable=False),
+        db.Column('order_number', db.String(4)),
+        db.Column('action_type', db.String(50), nullable=False),
+        db.Column('action_by', db.String(50), nullable=False),
+        db.Column('action_by_name', db.String(200)),
+        db.Column('action_by_role', db.String(20)),
+        db.Column('old_status', db.String(50)),
+        db.Column('new_status', db.String(50)),
+        db.Column('description', db.Text()),
+        db.Column('action_metadata', db.Text()),
+        db.Column('created_at', db.DateTime())
+    )
+    op.create_table(
+        'pod_orders',
+        db.Column('id', db.String(50), primary_key=True),
+        db.Column('title', db.String(500), nullable=False),
+        db.Column('description', db.Text()),
+        db.Column('subject', db.String(200)),
+        db.Column('discipline', db.String(200)),
+        db.Column('paper_type', db.String(100)),
+        db.Column('pages', db.Integer()),
+        db.Column('words', db.Integer()),
+        db.Column('format', db.String(50)),
+        db.Column('price', db.Float()),
+        db.Column('price_kes', db.Float()),
+        db.Column('cpp', db.Float()),
+        db.Column('deadline', db.DateTime()),
+        db.Column('deadline_hours', db.Integer()),
+        db.Column('status', db.String(50)),
+        db.Column('writer_id', db.String(50)),
+        db.Column('assigned_writer', db.String(200)),
+        db.Column('pod_amount', db.Float()),
+        db.Column('delivery_date', db.DateTime()),
+        db.Column('payment_received_at', db.DateTime()),
+        db.Column('delivery_notes', db.Text()),
+        db.Column('client_signature', db.Text()),
+        db.Column('admin_review_notes', db.Text()),
+        db.Column('admin_reviewed_at', db.DateTime()),
+        db.Column('admin_reviewed_by', db.String(50)),
+        db.Column('revision_notes', db.Text()),
+        db.Column('revision_requested_at', db.DateTime()),
+        db.Column('revision_requested_by', db.String(50)),
+        db.Column('revision_count', db.Integer()),
+        db.Column('client_messages', db.Text()),
+        db.Column('uploaded_files', db.Text()),
+        db.Column('additional_instructions', db.Text()),
+        db.Column('is_overdue', db.Boolean()),
+        db.Column('created_at', db.DateTime()),
+        db.Column('updated_at', db.DateTime())
+    )
+    op.create_table(
+        'reviews',
+        db.Column('id', db.String(50), primary_key=True),
+        db.Column('order_id', db.String(50)),
+        db.Column('writer_id', db.String(50)),
+        db.Column('writer_name', db.String(200)),
+        db.Column('client_id', db.String(50)),
+        db.Column('client_name', db.String(200)),
+        db.Column('rating', db.Integer()),
+        db.Column('comment', db.Text()),
+        db.Column('categories', db.Text()),
+        db.Column('status', db.String(50)),
+        db.Column('is_verified', db.Boolean()),
+        db.Column('admin_notes', db.Text()),
+        db.Column('order_title', db.String(500)),
+        db.Column('order_pages', db.Integer()),
+        db.Column('order_value', db.Float()),
+        db.Column('created_at', db.DateTime()),
+        db.Column('updated_at', db.DateTime())
+    )
+    op.create_table(
+        'invoices',
+        db.Column('id', db.String(50), primary_key=True),
+        db.Column('order_id', db.String(50)),
+        db.Column('order_title', db.String(500)),
+        db.Column('writer_id', db.String(50)),
+        db.Column('writer_name', db.String(200)),
+        db.Column('amount', db.Float()),
+        db.Column('currency', db.String(10)),
+        db.Column('status', db.String(50)),
+        db.Column('type', db.String(50)),
+        db.Column('order_pages', db.Integer()),
+        db.Column('order_deadline', db.DateTime()),
+        db.Column('order_completed_at', db.DateTime()),
+        db.Column('approved_at', db.DateTime()),
+        db.Column('paid_at', db.DateTime()),
+        db.Column('approved_by', db.String(50)),
+        db.Column('payment_method', db.String(50)),
+        db.Column('payment_reference', db.String(200)),
+        db.Column('notes', db.Text()),
+        db.Column('created_at', db.DateTime())
+    )
+    op.create_table(
+        'fines',
+        db.Column('id', db.String(50), primary_key=True),
+        db.Column('order_id', db.String(50)),
+        db.Column('writer_id', db.String(50)),
+        db.Column('writer_name', db.String(200)),
+        db.Column('amount', db.Float()),
+        db.Column('currency', db.String(10)),
+        db.Column('reason', db.String(200)),
+        db.Column('type', db.String(50)),
+        db.Column('status', db.String(50)),
+        db.Column('order_title', db.String(500)),
+        db.Column('notes', db.Text()),
+        db.Column('applied_at', db.DateTime()),
+        db.Column('applied_by', db.String(50)),
+        db.Column('waived_at', db.DateTime()),
+        db.Column('waived_by', db.String(50)),
+        db.Column('waived_reason', db.Text())
+    )
+    op.create_table(
+        'payments',
+        db.Column('id', db.String(50), primary_key=True),
+        db.Column('writer_id', db.String(50)),
+        db.Column('writer_name', db.String(200)),
+        db.Column('amount', db.Float()),
+        db.Column('currency', db.String(10)),
+        db.Column('type', db.String(50)),
+        db.Column('status', db.String(50)),
+        db.Column('method', db.String(50)),
+        db.Column('reference', db.String(200)),
+        db.Column('related_order_id', db.String(50)),
+        db.Column('related_invoice_id', db.String(50)),
+        db.Column('notes', db.Text()),
+        db.Column('processed_by', db.String(50)),
+        db.Column('created_at', db.DateTime()),
+        db.Column('processed_at', db.DateTime()),
+        db.Column('completed_at', db.DateTime())
+    )
+    op.create_table(
+        'client_payments',
+        db.Column('id', db.String(50), primary_key=True),
+        db.Column('order_id', db.String(50)),
+        db.Column('order_title', db.String(500)),
+        db.Column('client_id', db.String(50)),
+        db.Column('client_name', db.String(200)),
+        db.Column('amount', db.Float()),
+        db.Column('currency', db.String(10)),
+        db.Column('status', db.String(50)),
+        db.Column('method', db.String(50)),
+        db.Column('reference', db.String(200)),
+        db.Column('notes', db.Text()),
+        db.Column('received_at', db.DateTime()),
+        db.Column('created_at', db.DateTime())
+    )
+    op.create_table(
+        'platform_funds',
+        db.Column('id', db.String(50), primary_key=True),
+        db.Column('amount', db.Float()),
+        db.Column('currency', db.String(10)),
+        db.Column('source', db.String(50)),
+        db.Column('added_by', db.String(50)),
+        db.Column('reference', db.String(200)),
+        db.Column('notes', db.Text()),
+        db.Column('status', db.String(50)),
+        db.Column('added_at', db.DateTime())
+    )
+    op.create_table(
+        'withdrawal_requests',
+        db.Column('id', db.String(50), primary_key=True),
+        db.Column('writer_id', db.String(50)),
+        db.Column('writer_name', db.String(200)),
+        db.Column('amount', db.Float()),
+        db.Column('currency', db.String(10)),
+        db.Column('status', db.String(50)),
+        db.Column('method', db.String(50)),
+        db.Column('account_details', db.Text()),
+        db.Column('approved_by', db.String(50)),
+        db.Column('approved_at', db.DateTime()),
+        db.Column('rejected_by', db.String(50)),
+        db.Column('rejected_at', db.DateTime()),
+        db.Column('rejection_reason', db.Text()),
+        db.Column('paid_by', db.String(50)),
+        db.Column('paid_at', db.DateTime()),
+        db.Column('payment_reference', db.String(200)),
+        db.Column('invoice_id', db.String(50)),
+        db.Column('notes', db.Text()),
+        db.Column('requested_at', db.DateTime())
+    )
+    op.create_table(
+        'transaction_logs',
+        db.Column('id', db.String(50), primary_key=True),
+        db.Column('type', db.String(50)),
+        db.Column('amount', db.Float()),
+        db.Column('currency', db.String(10)),
+        db.Column('description', db.Text()),
+        db.Column('performed_by', db.String(50)),
+        db.Column('related_entity_id', db.String(50)),
+        db.Column('balance_before', db.Float()),
+        db.Column('balance_after', db.Float()),
+        db.Column('performed_at', db.DateTime())
+    )
+    op.create_table(
+        'notifications',
+        db.Column('id', db.String(50), primary_key=True),
+        db.Column('user_id', db.String(50)),
+        db.Column('type', db.String(50)),
+        db.Column('title', db.String(200)),
+        db.Column('message', db.Text()),
+        db.Column('related_entity_id', db.String(50)),
+        db.Column('related_entity_type', db.String(50)),
+        db.Column('is_read', db.Boolean()),
+        db.Column('read_at', db.DateTime()),
+        db.Column('created_at', db.DateTime())
+    )
+    op.create_table(
+        'messages',
+        db.Column('id', db.String(50), primary_key=True),
+        db.Column('sender_id', db.String(50)),
+        db.Column('sender_name', db.String(200)),
+        db.Column('sender_role', db.String(20)),
+        db.Column('recipient_id', db.String(50)),
+        db.Column('recipient_name', db.String(200)),
+        db.Column('recipient_role', db.String(20)),
+        db.Column('subject', db.String(500)),
+        db.Column('content', db.Text()),
+        db.Column('related_order_id', db.String(50)),
+        db.Column('is_read', db.Boolean()),
+        db.Column('read_at', db.DateTime()),
+        db.Column('created_at', db.DateTime())
+    )
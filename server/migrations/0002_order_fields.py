@@ -0,0 +1,47 @@
+"""
+Add the assignment, review, revision, reassignment and fine columns to orders.
+
+Formerly migrate_add_order_fields.py.
+"""
+from db import db
+
+COLUMNS = (
+    ('assigned_by', db.Text(), None),
+    ('picked_by', db.Text(), None),
+    ('requires_confirmation', db.Boolean(), '0'),
+    ('confirmed_at', db.DateTime(), None),
+    ('confirmed_by', db.Text(), None),
+    ('assignment_notes', db.Text(), None),
+    ('assignment_priority', db.Text(), None),
+    ('assignment_deadline', db.DateTime(), None),
+    ('submitted_to_admin_at', db.DateTime(), None),
+    ('submission_notes', db.Text(), None),
+    ('files_uploaded_at', db.DateTime(), None),
+    ('revision_explanation', db.Text(), None),
+    ('revision_score', db.Integer(), '10'),
+    ('revision_count', db.Integer(), '0'),
+    ('revision_submitted_at', db.DateTime(), None),
+    ('revision_response_notes', db.Text(), None),
+    ('admin_review_notes', db.Text(), None),
+    ('admin_reviewed_at', db.DateTime(), None),
+    ('admin_reviewed_by', db.Text(), None),
+    ('reassignment_reason', db.Text(), None),
+    ('reassigned_at', db.DateTime(), None),
+    ('reassigned_by', db.Text(), None),
+    ('original_writer_id', db.Text(), None),
+    ('made_available_at', db.DateTime(), None),
+    ('made_available_by', db.Text(), None),
+    ('fine_amount', db.Float(), '0'),
+    ('fine_reason', db.Text(), None),
+    ('fine_history', db.Text(), None),
+)
+
+def upgrade(op):
+    with op.batch_alter_table('orders') as batch:
+        for name, type_, default in COLUMNS:
+            batch.add_column(name, type_, server_default=default)
+
+def downgrade(op):
+    with op.batch_alter_table('orders') as batch:
+        for name, _, _ in COLUMNS:
+            batch.drop_column(name)
@@ -0,0 +1,12 @@
+"""
+Add orders.bids (JSON array of writer bids).
+
+Formerly migrate_add_bids.py.
+"""
+from db import db
+
+def upgrade(op):
+    op.add_column('orders', 'bids', db.Text())
+
+def downgrade(op):
+    op.drop_column('orders', 'bids')
@@ -0,0 +1,16 @@
+"""
+Add orders.original_files and orders.revision_files.
+
+Formerly migrate_add_revision_files.py.
+"""
+from db import db
+
+def upgrade(op):
+    with op.batch_alter_table('orders') as batch:
+        batch.add_column('original_files', db.Text())
+        batch.add_column('revision_files', db.Text())
+
+def downgrade(op):
+    with op.batch_alter_table('orders') as batch:
+        batch.drop_column('original_files')
+        batch.drop_column('revision_files')
@@ -0,0 +1,109 @@
+"""
+Add conversation threads for messages.
+
+Creates message_threads / message_thread_participants, adds messages.thread_id
+and the inbox indexes, and backfills threads from the message history.
+Formerly migrate_add_message_threads.py.
+"""
+import uuid
+
+from db import db
+from models import Message, MessageThread, MessageThreadParticipant
+from routes.messages import make_thread_key
+
+def backfill_threads():
+    """Walk unthreaded messages oldest first so the thread pointers end on the latest one"""
+    threads = {t.thread_key: t for t in MessageThread.query.all()}
+    participants = {(p.thread_id, p.user_id): p for p in MessageThreadParticipant.query.all()}
+    pending = Message.query.filter(
+        Message.thread_id.is_(None),
+        Message.sender_id.isnot(None),
+        Message.recipient_id.isnot(None)
+    ).order_by(Message.created_at, Message.id).all()
+    
+    for message in pending:
+        key = make_thread_key(message.sender_id, message.recipient_id, message.related_order_id)
+        thread = threads.get(key)
+        if not thread:
+            first, second = sorted([
+                (message.sender_id, message.sender_name, message.sender_role),
+                (message.recipient_id, message.recipient_name, message.recipient_role)
+            ], key=lambda p: p[0])
+            thread = MessageThread(
+                id=f"THR-{uuid.uuid4().hex[:10].upper()}",
+                thread_key=key,
+                participant_a_id=first[0],
+                participant_a_name=first[1],
+                participant_a_role=first[2],
+                participant_b_id=second[0],
+                participant_b_name=second[1],
+                participant_b_role=second[2],
+                related_order_id=message.related_order_id,
+                subject=message.subject,
+                message_count=0,
+                created_at=message.created_at
+            )
+            db.session.add(thread)
+            threads[key] = thread
+        
+        for user_id in {message.sender_id, message.recipient_id}:
+            if (thread.id, user_id) not in participants:
+                participant = MessageThreadParticipant(thread_id=thread.id, user_id=user_id, unread_count=0)
+                db.session.add(participant)
+                participants[(thread.id, user_id)] = participant
+            participants[(thread.id, user_id)].last_message_at = message.created_at
+        
+        message.thread_id = thread.id
+        thread.last_message_id = message.id
+        thread.last_message_at = message.created_at
+        thread.last_message_preview = (message.content or '')[:200]
+        thread.last_sender_id = message.sender_id
+        thread.message_count = (thread.message_count or 0) + 1
+        if not message.is_read and message.recipient_id != message.sender_id:
+            recipient = participants[(thread.id, message.recipient_id)]
+            recipient.unread_count = (recipient.unread_count or 0) + 1
+    db.session.flush()
+    return len(pending)
+
+def upgrade(op):
+    op.create_table(
+        'message_threads',
+        db.Column('id', db.String(50), primary_key=True),
+        db.Column('thread_key', db.String(200), nullable=False, unique=True),
+        db.Column('participant_a_id', db.String(50), nullable=False),
+        db.Column('participant_a_name', db.String(200)),
+        db.Column('participant_a_role', db.String(20)),
+        db.Column('participant_b_id', db.String(50), nullable=False),
+        db.Column('participant_b_name', db.String(200)),
+        db.Column('participant_b_role', db.String(20)),
+        db.Column('related_order_id', db.String(50), index=True),
+        db.Column('subject', db.String(500)),
+        db.Column('last_message_id', db.String(50)),
+        db.Column('last_message_at', db.DateTime()),
+        db.Column('last_message_preview', db.String(200)),
+        db.Column('last_sender_id', db.String(50)),
+        db.Column('message_count', db.Integer()),
+        db.Column('created_at', db.DateTime())
+    )
+    op.create_table(
+        'message_thread_participants',
+        db.Column('thread_id', db.String(50), db.ForeignKey('message_threads.id'), primary_key=True),
+        db.Column('user_id', db.String(50), primary_key=True),
+        db.Column('unread_count', db.Integer()),
+        db.Column('last_message_at', db.DateTime()),
+        db.Column('last_read_at', db.DateTime()),
+        db.Index('ix_thread_participants_inbox', 'user_id', 'last_message_at', 'thread_id')
+    )
+    op.add_column('messages', 'thread_id', db.String(50))
+    op.create_index('ix_messages_thread_created', 'messages', ['thread_id', 'created_at', 'id'])
+    op.create_index('ix_messages_sender_id', 'messages', ['sender_id'])
+    op.create_index('ix_messages_recipient_id', 'messages', ['recipient_id'])
+    count = backfill_threads()
+    if count:
+        op.echo(f"threaded {count} messages")
+
+def downgrade(op):
+    for name in ('ix_messages_thread_created', 'ix_messages_sender_id', 'ix_messages_recipient_id'):
+        op.drop_index(name, 'messages')
+    op.drop_column('messages', 'thread_id')
+    op.drop_tables('message_thread_participants', 'message_threads')
@@ -0,0 +1,32 @@
+"""
+Track updates for delta sync (/api/sync).
+
+Adds updated_at to invoices and notifications (starting from created_at),
+indexes updated_at on every synced table and creates the tombstones table.
+Formerly migrate_add_sync_tracking.py.
+"""
+from db import db
+
+SYNCED_TABLES = ('orders', 'pod_orders', 'invoices', 'notifications')
+ADDED_TO = ('invoices', 'notifications')
+
+def upgrade(op):
+    op.create_table(
+        'tombstones',
+        db.Column('id', db.String(50), primary_key=True),
+        db.Column('table_name', db.String(50), nullable=False),
+        db.Column('record_id', db.String(50), nullable=False),
+        db.Column('deleted_at', db.DateTime(), nullable=False),
+        db.Index('ix_tombstones_deleted_at', 'deleted_at', 'table_name')
+    )
+    for table in SYNCED_TABLES:
+        if op.add_column(table, 'updated_at', db.DateTime()):
+            op.execute(f"UPDATE {table} SET updated_at = created_at WHERE updated_at IS NULL")
+        op.create_index(f"ix_{table}_updated_at", table, ['updated_at'])
+
+def downgrade(op):
+    for table in SYNCED_TABLES:
+        op.drop_index(f"ix_{table}_updated_at", table)
+    for table in ADDED_TO:
+        op.drop_column(table, 'updated_at')
+    op.drop_tables('tombstones')
@@ -0,0 +1,18 @@
+"""
+Add optimistic-locking version columns to orders and pod_orders.
+
+Existing rows start at version 1. Formerly migrate_add_version_columns.py.
+"""
+from db import db
+
+TABLES = ('orders', 'pod_orders')
+
+def upgrade(op):
+    for table in TABLES:
+        op.add_column(table, 'version', db.Integer(), nullable=False, server_default='1')
+        # The version check compares with '=', so NULL versions would never match
+        op.execute(f"UPDATE {table} SET version = 1 WHERE version IS NULL")
+
+def downgrade(op):
+    for table in TABLES:
+        op.drop_column(table, 'version')
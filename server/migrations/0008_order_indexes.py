@@ -0,0 +1,19 @@
+"""
+Index orders.status and orders.writer_id.
+
+Both are used by every capacity check (pick, auto-assign, candidates) and by
+the order list filters. Formerly migrate_add_order_indexes.py.
+"""
+
+INDEXES = {
+    'ix_orders_status': 'status',
+    'ix_orders_writer_id': 'writer_id'
+}
+
+def upgrade(op):
+    for name, column in INDEXES.items():
+        op.create_index(name, 'orders', [column])
+
+def downgrade(op):
+    for name in INDEXES:
+        op.drop_index(name, 'orders')
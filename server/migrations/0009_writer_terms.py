@@ -0,0 +1,32 @@
+"""
+Normalize writer specializations and languages into join tables.
+
+Creates writer_specializations / writer_languages and fills them from the
+JSON arrays on writers. Formerly migrate_add_writer_terms.py.
+"""
+from db import db
+from models import Writer, WRITER_TERM_TABLES, write_writer_terms
+
+def upgrade(op):
+    op.create_table(
+        'writer_specializations',
+        db.Column('writer_id', db.String(50), db.ForeignKey('writers.id'), primary_key=True),
+        db.Column('term', db.String(200), primary_key=True),
+        db.Column('name', db.String(200), nullable=False),
+        db.Index('ix_writer_specializations_term', 'term', 'writer_id')
+    )
+    op.create_table(
+        'writer_languages',
+        db.Column('writer_id', db.String(50), db.ForeignKey('writers.id'), primary_key=True),
+        db.Column('term', db.String(200), primary_key=True),
+        db.Column('name', db.String(200), nullable=False),
+        db.Index('ix_writer_languages_term', 'term', 'writer_id')
+    )
+    writers = db.session.query(Writer.id, *[getattr(Writer, column) for column in WRITER_TERM_TABLES]).all()
+    for row in writers:
+        for column in WRITER_TERM_TABLES:
+            write_writer_terms(op.connection, row.id, column, getattr(row, column))
+    op.echo(f"wrote terms for {len(writers)} writers")
+
+def downgrade(op):
+    op.drop_tables(*(model.__tablename__ for model in WRITER_TERM_TABLES.values()))
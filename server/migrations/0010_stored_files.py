@@ -0,0 +1,26 @@
+"""
+Add server-side file storage.
+
+Creates stored_files (upload metadata; the bytes live under STORAGE_ROOT,
+content-addressed by SHA-256) and the storage directory.
+Formerly migrate_add_stored_files.py.
+"""
+from db import db
+from storage import get_storage
+
+def upgrade(op):
+    op.create_table(
+        'stored_files',
+        db.Column('id', db.String(50), primary_key=True),
+        db.Column('sha256', db.String(64), nullable=False, index=True),
+        db.Column('size', db.BigInteger(), nullable=False),
+        db.Column('original_name', db.String(500)),
+        db.Column('content_type', db.String(200)),
+        db.Column('uploaded_by', db.String(50)),
+        db.Column('related_order_id', db.String(50), index=True),
+        db.Column('created_at', db.DateTime())
+    )
+    get_storage()
+
+def downgrade(op):
+    op.drop_tables('stored_files')
@@ -0,0 +1,33 @@
+"""
+Add resumable upload sessions.
+
+Creates upload_sessions and the chunk directory under UPLOAD_SESSION_ROOT.
+Formerly migrate_add_upload_sessions.py.
+"""
+import os
+
+from flask import current_app
+
+from db import db
+
+def upgrade(op):
+    op.create_table(
+        'upload_sessions',
+        db.Column('id', db.String(50), primary_key=True),
+        db.Column('filename', db.String(500), nullable=False),
+        db.Column('content_type', db.String(200)),
+        db.Column('total_size', db.BigInteger(), nullable=False),
+        db.Column('chunk_size', db.Integer(), nullable=False),
+        db.Column('sha256', db.String(64)),
+        db.Column('order_id', db.String(50), index=True),
+        db.Column('target', db.String(30)),
+        db.Column('uploaded_by', db.String(50)),
+        db.Column('status', db.String(20), nullable=False),
+        db.Column('file_id', db.String(50)),
+        db.Column('created_at', db.DateTime()),
+        db.Column('expires_at', db.DateTime(), nullable=False, index=True)
+    )
+    os.makedirs(current_app.config['UPLOAD_SESSION_ROOT'], exist_ok=True)
+
+def downgrade(op):
+    op.drop_tables('upload_sessions')
@@ -0,0 +1,29 @@
+"""
+Keep writer ratings incrementally.
+
+Creates writer_rating_stats and the reviews writer_id / created_at indexes.
+The stats are filled by 0013, because the rebuild also refreshes the merit
+scores in writer_metrics. Formerly migrate_add_writer_rating_stats.py.
+"""
+from db import db
+
+def upgrade(op):
+    op.create_table(
+        'writer_rating_stats',
+        db.Column('writer_id', db.String(50), primary_key=True),
+        db.Column('category', db.String(50), primary_key=True),
+        db.Column('rating_sum', db.Float(), nullable=False),
+        db.Column('rating_count', db.Integer(), nullable=False),
+        db.Column('stars_1', db.Integer(), nullable=False),
+        db.Column('stars_2', db.Integer(), nullable=False),
+        db.Column('stars_3', db.Integer(), nullable=False),
+        db.Column('stars_4', db.Integer(), nullable=False),
+        db.Column('stars_5', db.Integer(), nullable=False)
+    )
+    for column in ('writer_id', 'created_at'):
+        op.create_index(f"ix_reviews_{column}", 'reviews', [column])
+
+def downgrade(op):
+    for column in ('writer_id', 'created_at'):
+        op.drop_index(f"ix_reviews_{column}", 'reviews')
+    op.drop_tables('writer_rating_stats')
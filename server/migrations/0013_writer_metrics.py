@@ -0,0 +1,37 @@
+"""
+Materialize writer metrics and merit scores.
+
+Creates writer_metrics and fills it from orders, fines and writers, then
+rebuilds writer_rating_stats and writers.rating / total_reviews from reviews
+(which refreshes the merit scores). Formerly migrate_add_writer_metrics.py.
+"""
+from db import db
+import merit
+import ratings
+
+def upgrade(op):
+    op.create_table(
+        'writer_metrics',
+        db.Column('writer_id', db.String(50), primary_key=True),
+        db.Column('total_orders', db.Integer(), nullable=False),
+        db.Column('completed_orders', db.Integer(), nullable=False),
+        db.Column('on_time_orders', db.Integer(), nullable=False),
+        db.Column('revised_orders', db.Integer(), nullable=False),
+        db.Column('revision_count', db.Integer(), nullable=False),
+        db.Column('revision_score_sum', db.Integer(), nullable=False),
+        db.Column('rejected_orders', db.Integer(), nullable=False),
+        db.Column('earnings', db.Float(), nullable=False),
+        db.Column('fine_count', db.Integer(), nullable=False),
+        db.Column('fine_total', db.Float(), nullable=False),
+        db.Column('rating', db.Float(), nullable=False),
+        db.Column('total_reviews', db.Integer(), nullable=False),
+        db.Column('merit_score', db.Float(), nullable=False),
+        db.Column('updated_at', db.DateTime()),
+        db.Index('ix_writer_metrics_merit', 'merit_score', 'writer_id')
+    )
+    metrics = merit.rebuild()
+    writers, rows = ratings.rebuild()
+    op.echo(f"metrics for {metrics} writers, ratings for {writers} writers ({rows} stat rows)")
+
+def downgrade(op):
+    op.drop_tables('writer_metrics')
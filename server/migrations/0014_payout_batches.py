@@ -0,0 +1,33 @@
+"""
+Add payout batches.
+
+Creates payout_batches, adds withdrawal_requests.payout_batch_id and indexes
+it and (status, approved_at). Formerly migrate_add_payout_batches.py.
+"""
+from db import db
+
+def upgrade(op):
+    op.create_table(
+        'payout_batches',
+        db.Column('id', db.String(50), primary_key=True),
+        db.Column('idempotency_key', db.String(200), nullable=False, unique=True),
+        db.Column('request_hash', db.String(64), nullable=False),
+        db.Column('status', db.String(20), nullable=False),
+        db.Column('method', db.String(50)),
+        db.Column('currency', db.String(10)),
+        db.Column('withdrawal_count', db.Integer(), nullable=False),
+        db.Column('total_amount', db.Float(), nullable=False),
+        db.Column('settlement_file_id', db.String(50)),
+        db.Column('created_by', db.String(50)),
+        db.Column('notes', db.Text()),
+        db.Column('created_at', db.DateTime(), index=True)
+    )
+    op.add_column('withdrawal_requests', 'payout_batch_id', db.String(50))
+    op.create_index('ix_withdrawal_requests_payout_batch_id', 'withdrawal_requests', ['payout_batch_id'])
+    op.create_index('ix_withdrawal_requests_status', 'withdrawal_requests', ['status', 'approved_at'])
+
+def downgrade(op):
+    op.drop_index('ix_withdrawal_requests_status', 'withdrawal_requests')
+    op.drop_index('ix_withdrawal_requests_payout_batch_id', 'withdrawal_requests')
+    op.drop_column('withdrawal_requests', 'payout_batch_id')
+    op.drop_tables('payout_batches')
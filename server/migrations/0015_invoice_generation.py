@@ -0,0 +1,22 @@
+"""
+Support automatic invoice generation.
+
+Creates job_watermarks and indexes orders.completed_at and invoices
+(order_id, type). Formerly migrate_add_invoice_generation.py.
+"""
+from db import db
+
+def upgrade(op):
+    op.create_table(
+        'job_watermarks',
+        db.Column('name', db.String(100), primary_key=True),
+        db.Column('position', db.DateTime()),
+        db.Column('updated_at', db.DateTime())
+    )
+    op.create_index('ix_orders_completed_at', 'orders', ['completed_at'])
+    op.create_index('ix_invoices_order_type', 'invoices', ['order_id', 'type'])
+
+def downgrade(op):
+    op.drop_index('ix_invoices_order_type', 'invoices')
+    op.drop_index('ix_orders_completed_at', 'orders')
+    op.drop_tables('job_watermarks')
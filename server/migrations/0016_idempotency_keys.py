@@ -0,0 +1,21 @@
+"""
+Store responses for Idempotency-Key replays.
+
+Creates idempotency_keys. Formerly migrate_add_idempotency_keys.py.
+"""
+from db import db
+
+def upgrade(op):
+    op.create_table(
+        'idempotency_keys',
+        db.Column('key', db.String(64), primary_key=True),
+        db.Column('request_hash', db.String(64), nullable=False),
+        db.Column('status_code', db.Integer()),
+        db.Column('content_type', db.String(100)),
+        db.Column('body', db.Text()),
+        db.Column('created_at', db.DateTime()),
+        db.Column('expires_at', db.DateTime(), nullable=False, index=True)
+    )
+
+def downgrade(op):
+    op.drop_tables('idempotency_keys')
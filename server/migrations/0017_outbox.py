@@ -0,0 +1,59 @@
+"""
+Add the transactional outbox.
+
+Creates outbox_events and platform_balance and computes the starting
+balance from existing funds and withdrawals. Formerly migrate_add_outbox.py.
+
+The balance is summed here in SQL rather than with outbox.rebuild_balance(),
+which relays pending events and commits in the middle of the step.
+"""
+from datetime import datetime
+
+from db import db
+
+BALANCE_ID = 'platform'
+
+def upgrade(op):
+    op.create_table(
+        'outbox_events',
+        db.Column('id', db.Integer(), primary_key=True),
+        db.Column('topic', db.String(100), nullable=False),
+        db.Column('aggregate_id', db.String(50)),
+        db.Column('payload', db.Text()),
+        db.Column('created_at', db.DateTime()),
+        db.Column('processed_at', db.DateTime()),
+        db.Column('attempts', db.Integer(), nullable=False),
+        db.Column('last_error', db.Text()),
+        db.Index('ix_outbox_events_pending', 'processed_at', 'id')
+    )
+    op.create_table(
+        'platform_balance',
+        db.Column('id', db.String(20), primary_key=True),
+        db.Column('total_funds', db.Float(), nullable=False),
+        db.Column('reserved_funds', db.Float(), nullable=False),
+        db.Column('total_withdrawn', db.Float(), nullable=False),
+        db.Column('updated_at', db.DateTime())
+    )
+    if op.execute("SELECT 1 FROM platform_balance WHERE id = :id", id=BALANCE_ID).first():
+        return
+    if op.execute("SELECT 1 FROM outbox_events WHERE processed_at IS NULL").first():
+        # Those events would be counted again when relayed
+        op.echo("pending outbox events: run `flask outbox rebuild-balance` after the upgrade")
+        return
+    funds = op.execute(
+        "SELECT COALESCE(SUM(amount), 0) FROM platform_funds WHERE status = 'confirmed'"
+    ).scalar()
+    reserved, withdrawn = op.execute(
+        "SELECT COALESCE(SUM(CASE WHEN status IN ('pending', 'approved') THEN amount END), 0), "
+        "COALESCE(SUM(CASE WHEN status = 'paid' THEN amount END), 0) FROM withdrawal_requests"
+    ).one()
+    op.execute(
+        "INSERT INTO platform_balance (id, total_funds, reserved_funds, total_withdrawn, updated_at) "
+        "VALUES (:id, :funds, :reserved, :withdrawn, :now)",
+        id=BALANCE_ID, funds=funds, reserved=reserved, withdrawn=withdrawn, now=datetime.utcnow()
+    )
+    available = max(0.0, funds - withdrawn - reserved)
+    op.echo(f"platform balance KES {available:,.2f} available")
+
+def downgrade(op):
+    op.drop_tables('outbox_events', 'platform_balance')
@@ -0,0 +1,17 @@
+"""
+Add orphan_blobs.
+
+Deleting a file's last stored_files row now queues its blob there instead of
+deleting it inline; `flask files gc` removes the blobs later.
+"""
+from db import db
+
+def upgrade(op):
+    op.create_table(
+        'orphan_blobs',
+        db.Column('sha256', db.String(64), primary_key=True),
+        db.Column('orphaned_at', db.DateTime(), nullable=False, index=True)
+    )
+
+def downgrade(op):
+    op.drop_tables('orphan_blobs')
@@ -0,0 +1,377 @@
+"""
+Versioned schema migrations.
+
+Each file in migrations/ is one step, named <version>_<name>.py (e.g.
+0008_order_indexes.py), with a docstring saying what it does and
+
+    def upgrade(op): ...
+    def downgrade(op): ...      # optional; without it the step is irreversible
+
+`op` is an Operations object over the app's database (SQLite or PostgreSQL).
+Its schema operations check the current schema first, so a step also works
+on a database that already has some of its changes, e.g. one created by
+db.create_all() or by the old migrate_* scripts. `flask db upgrade` runs the
+pending steps in version order and records each one in schema_migrations
+with how long it took.
+
+A step spells out the tables it creates (op.create_table with its own
+columns) instead of using models.py: the models describe the latest schema,
+and a step has to build the shape the steps after it expect.
+
+Large tables:
+    op.create_index     PostgreSQL: CREATE INDEX CONCURRENTLY (no write lock),
+                        outside the transaction; an invalid leftover from a
+                        failed build is dropped and rebuilt
+    op.batch_alter_table  SQLite: one table rebuild (copy once) for any mix of
+                        drops and type changes; adds alone stay plain ALTERs.
+                        PostgreSQL: a single ALTER TABLE statement
+
+`flask db rehearse` runs the pending steps against a copy of a SQLite
+database and prints their timings, and benchmarks/bench_migrations.py times
+every step on a large fixture, so the downtime is known before running the
+real thing.
+"""
+import importlib.util
+import os
+import re
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import Column, ForeignKey, MetaData, Table, inspect, text
+from sqlalchemy.schema import CreateTable
+
+from db import db
+from models import SchemaMigration
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+FILENAME = re.compile(r'^(\d{4})_(\w+)\.py$')
+
+class MigrationError(Exception):
+    pass
+
+class Migration:
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+        self._module = None
+    
+    @property
+    def module(self):
+        if self._module is None:
+            spec = importlib.util.spec_from_file_location(f"migrations_{self.version}_{self.name}", self.path)
+            self._module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(self._module)
+        return self._module
+    
+    @property
+    def description(self):
+        doc = (self.module.__doc__ or '').strip()
+        return doc.splitlines()[0].rstrip('.') if doc else self.name.replace('_', ' ')
+    
+    @property
+    def reversible(self):
+        return hasattr(self.module, 'downgrade')
+
+def discover():
+    """Every migration in migrations/, oldest first"""
+    found = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = FILENAME.match(filename)
+        if match:
+            found.append(Migration(match.group(1), match.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+    versions = [migration.version for migration in found]
+    if len(versions) != len(set(versions)):
+        raise MigrationError(f"Duplicate migration versions in {MIGRATIONS_DIR}")
+    return found
+
+class Operations:
+    """Schema operations for migrations, adapted to the database in use"""
+    def __init__(self, echo=None):
+        self.echo = echo or (lambda message: None)
+    
+    @property
+    def connection(self):
+        return db.session.connection()
+    
+    @property
+    def dialect(self):
+        return db.engine.dialect.name
+    
+    def _inspector(self):
+        return inspect(self.connection)
+    
+    def has_table(self, table):
+        return self._inspector().has_table(table)
+    
+    def columns(self, table):
+        return {column['name'] for column in self._inspector().get_columns(table)}
+    
+    def indexes(self, table):
+        return {index['name'] for index in self._inspector().get_indexes(table)}
+    
+    def execute(self, sql, **params):
+        return self.connection.execute(text(sql), params)
+    
+    def commit(self):
+        db.session.commit()
+    
+    # Tables
+    
+    def create_table(self, name, *columns):
+        """
+        Create a table (with its indexes) unless it exists.
+        
+        `columns` are the Column / Index objects as of this step, spelled out in
+        the migration rather than taken from models.py, so the step keeps building
+        the same table after the model changes. Foreign keys to tables from
+        earlier steps resolve against the reflected schema.
+        """
+        if self.has_table(name):
+            return False
+        metadata = MetaData()
+        table = Table(name, metadata, *columns)
+        for key in table.foreign_keys:
+            target = key.target_fullname.split('.')[0]
+            if target not in metadata.tables:
+                Table(target, metadata, autoload_with=self.connection)
+        table.create(bind=self.connection)
+        self.echo(f"created {name}")
+        return True
+    
+    def drop_tables(self, *names):
+        for name in names:
+            if self.has_table(name):
+                self.execute(f"DROP TABLE {name}")
+                self.echo(f"dropped {name}")
+    
+    # Columns
+    
+    def _column_ddl(self, name, type_, nullable=True, server_default=None):
+        ddl = f"{name} {type_.compile(dialect=db.engine.dialect)}"
+        if server_default is not None:
+            ddl += f" DEFAULT {server_default}"
+        if not nullable:
+            ddl += " NOT NULL"
+        return ddl
+    
+    def add_column(self, table, name, type_, nullable=True, server_default=None):
+        """ADD COLUMN unless it exists (a metadata-only change on both databases)"""
+        if name in self.columns(table):
+            return False
+        self.execute(f"ALTER TABLE {table} ADD COLUMN {self._column_ddl(name, type_, nullable, server_default)}")
+        self.echo(f"added {table}.{name}")
+        return True
+    
+    def drop_column(self, table, name):
+        with self.batch_alter_table(table) as batch:
+            batch.drop_column(name)
+    
+    @contextmanager
+    def batch_alter_table(self, table):
+        """Collect column changes for `table` and apply them together on exit"""
+        batch = BatchAlter(self, table)
+        yield batch
+        batch.apply()
+    
+    # Indexes
+    
+    def create_index(self, name, table, columns, unique=False):
+        """Create an index unless it exists; concurrently on PostgreSQL"""
+        unique_sql = 'UNIQUE ' if unique else ''
+        column_sql = ', '.join(columns)
+        if self.dialect != 'postgresql':
+            if name not in self.indexes(table):
+                self.execute(f"CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON {table} ({column_sql})")
+                self.echo(f"indexed {table} ({column_sql})")
+            return
+        
+        # CONCURRENTLY cannot run inside a transaction: commit, then build on an autocommit connection
+        db.session.commit()
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            valid = connection.execute(text(
+                "SELECT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid WHERE c.relname = :name"
+            ), {'name': name}).scalar()
+            if valid:
+                return
+            if valid is False:
+                # Left behind by a build that failed or was cancelled
+                connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+            connection.execute(text(f"CREATE {unique_sql}INDEX CONCURRENTLY {name} ON {table} ({column_sql})"))
+        self.echo(f"indexed {table} ({column_sql}) concurrently")
+    
+    def drop_index(self, name, table):
+        if name not in self.indexes(table):
+            return
+        if self.dialect == 'postgresql':
+            db.session.commit()
+            with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+                connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        else:
+            self.execute(f"DROP INDEX {name}")
+        self.echo(f"dropped index {name}")
+
+class BatchAlter:
+    """Column changes for one table, applied in as few table rewrites as the database allows"""
+    def __init__(self, op, table):
+        self.op = op
+        self.table = table
+        self.adds = []
+        self.drops = []
+        self.types = {}
+    
+    def add_column(self, name, type_, nullable=True, server_default=None):
+        self.adds.append((name, type_, nullable, server_default))
+    
+    def drop_column(self, name):
+        self.drops.append(name)
+    
+    def alter_column_type(self, name, type_):
+        self.types[name] = type_
+    
+    def apply(self):
+        existing = self.op.columns(self.table)
+        adds = [add for add in self.adds if add[0] not in existing]
+        drops = [name for name in self.drops if name in existing]
+        types = {name: type_ for name, type_ in self.types.items() if name in existing}
+        if not (adds or drops or types):
+            return
+        
+        if self.op.dialect == 'postgresql':
+            clauses = [f"ADD COLUMN {self.op._column_ddl(*add)}" for add in adds]
+            clauses += [f"DROP COLUMN {name}" for name in drops]
+            clauses += [f"ALTER COLUMN {name} TYPE {type_.compile(dialect=db.engine.dialect)}" for name, type_ in types.items()]
+            self.op.execute(f"ALTER TABLE {self.table} {', '.join(clauses)}")
+        elif drops or types:
+            self._rebuild(adds, drops, types)
+        else:
+            for add in adds:
+                self.op.add_column(self.table, *add)
+            return
+        self.op.echo(f"altered {self.table}: {len(adds)} added, {len(drops)} dropped, {len(types)} retyped")
+    
+    def _rebuild(self, adds, drops, types):
+        """SQLite: create the new shape, copy the rows once, swap the tables, recreate the indexes"""
+        connection = self.op.connection
+        old = Table(self.table, MetaData(), autoload_with=connection)
+        indexes = [index for index in inspect(connection).get_indexes(self.table)
+                   if not set(index['column_names']) & set(drops)]
+        
+        temporary = f"_batch_{self.table}"
+        # Same MetaData as the reflected table, so foreign keys resolve against the reflected targets
+        new = Table(temporary, old.metadata)
+        kept = []
+        for column in old.columns:
+            if column.name in drops:
+                continue
+            foreign_keys = [ForeignKey(key.target_fullname) for key in column.foreign_keys]
+            new.append_column(Column(column.name, types.get(column.name, column.type), *foreign_keys,
+                                     primary_key=column.primary_key,
+                                     nullable=column.nullable,
+                                     server_default=column.server_default.arg if column.server_default is not None else None))
+            kept.append(column.name)
+        for name, type_, nullable, server_default in adds:
+            new.append_column(Column(name, type_, nullable=nullable,
+                                     server_default=text(server_default) if server_default is not None else None))
+        
+        column_sql = ', '.join(kept)
+        connection.execute(text(f"DROP TABLE IF EXISTS {temporary}"))
+        connection.execute(CreateTable(new))
+        connection.execute(text(f"INSERT INTO {temporary} ({column_sql}) SELECT {column_sql} FROM {self.table}"))
+        connection.execute(text(f"DROP TABLE {self.table}"))
+        connection.execute(text(f"ALTER TABLE {temporary} RENAME TO {self.table}"))
+        for index in indexes:
+            unique = 'UNIQUE ' if index.get('unique') else ''
+            connection.execute(text(
+                f"CREATE {unique}INDEX {index['name']} ON {self.table} ({', '.join(index['column_names'])})"
+            ))
+
+# Runner
+
+def _ensure_version_table():
+    SchemaMigration.__table__.create(bind=db.session.connection(), checkfirst=True)
+    db.session.commit()
+
+def applied():
+    """{version: SchemaMigration} for every recorded step"""
+    _ensure_version_table()
+    return {row.version: row for row in SchemaMigration.query.all()}
+
+def current_version():
+    done = applied()
+    return max(done) if done else None
+
+def pending(target=None):
+    done = applied()
+    return [migration for migration in discover()
+            if migration.version not in done and (target is None or migration.version <= target)]
+
+def _find(version):
+    for migration in discover():
+        if migration.version == version:
+            return migration
+    raise MigrationError(f"No migration with version {version}")
+
+def upgrade(target=None, echo=print):
+    """Run pending steps up to `target` (default: all); returns [(migration, seconds)]"""
+    if target is not None:
+        _find(target)
+    results = []
+    for migration in pending(target):
+        echo(f"⬆️  {migration.version} {migration.description}")
+        op = Operations(echo=lambda message: echo(f"     {message}"))
+        began = time.perf_counter()
+        try:
+            migration.module.upgrade(op)
+            elapsed = time.perf_counter() - began
+            db.session.add(SchemaMigration(version=migration.version, name=migration.name,
+                                           applied_at=datetime.utcnow(), duration_ms=round(elapsed * 1000, 1)))
+            db.session.commit()
+        except BaseException:
+            db.session.rollback()
+            raise
+        echo(f"     done in {elapsed:.2f}s")
+        results.append((migration, elapsed))
+    return results
+
+def downgrade(target, echo=print):
+    """Undo applied steps newer than `target` (None = all reversible), newest first"""
+    done = applied()
+    steps = [migration for migration in reversed(discover())
+             if migration.version in done and (target is None or migration.version > target)]
+    irreversible = [migration.version for migration in steps if not migration.reversible]
+    if irreversible:
+        raise MigrationError(f"Cannot downgrade past {irreversible[0]}: it has no downgrade()")
+    results = []
+    for migration in steps:
+        echo(f"⬇️  {migration.version} {migration.description}")
+        op = Operations(echo=lambda message: echo(f"     {message}"))
+        began = time.perf_counter()
+        try:
+            migration.module.downgrade(op)
+            SchemaMigration.query.filter_by(version=migration.version).delete()
+            db.session.commit()
+        except BaseException:
+            db.session.rollback()
+            raise
+        results.append((migration, time.perf_counter() - began))
+    return results
+
+def head():
+    migrations = discover()
+    return migrations[-1].version if migrations else None
+
+def stamp_head():
+    """Record every migration as applied, for a schema just built by db.create_all()"""
+    if head() is not None:
+        stamp(head())
+
+def stamp(version):
+    """Record every step up to `version` as applied without running it"""
+    _find(version)
+    done = applied()
+    for migration in discover():
+        if migration.version <= version and migration.version not in done:
+            db.session.add(SchemaMigration(version=migration.version, name=migration.name, applied_at=datetime.utcnow()))
+    db.session.commit()
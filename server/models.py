@@ -1,5 +1,9 @@
 from datetime import datetime
 import json
+import uuid
+from sqlalchemy import event, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import column_property, deferred, undefer
 from db import db
 
 # User Model
@@ -104,6 +108,124 @@ class Writer(db.Model):
             'applicationReviewedAt': self.application_reviewed_at.isoformat() if self.application_reviewed_at else None,
             'applicationReviewedBy': self.application_reviewed_by
         }
+    
+    def to_summary_dict(self):
+        """Fields for writer lists and pickers; skips the profile/payment JSON blobs"""
+        return {
+            'id': self.id,
+            'email': self.email,
+            'name': self.name,
+            'status': self.status,
+            'role': self.role,
+            'specializations': json.loads(self.specializations) if self.specializations else [],
+            'languages': json.loads(self.languages) if self.languages else [],
+            'timezone': self.timezone,
+            'country': self.country,
+            'rating': self.rating,
+            'totalReviews': self.total_reviews,
+            'completedOrders': self.completed_orders,
+            'successRate': self.success_rate,
+            'maxConcurrentOrders': self.max_concurrent_orders,
+            'lastActiveAt': self.last_active_at.isoformat() if self.last_active_at else None
+        }
+
+# Writer profile terms, normalized out of the JSON columns so they can be filtered in SQL.
+# Writer.specializations / languages stay the source of truth for to_dict(); these rows
+# are rewritten whenever those columns change.
+class WriterSpecialization(db.Model):
+    __tablename__ = 'writer_specializations'
+    __table_args__ = (
+        db.Index('ix_writer_specializations_term', 'term', 'writer_id'),
+    )
+    
+    writer_id = db.Column(db.String(50), db.ForeignKey('writers.id'), primary_key=True)
+    term = db.Column(db.String(200), primary_key=True)  # Lowercased for matching
+    name = db.Column(db.String(200), nullable=False)  # As entered
+
+class WriterLanguage(db.Model):
+    __tablename__ = 'writer_languages'
+    __table_args__ = (
+        db.Index('ix_writer_languages_term', 'term', 'writer_id'),
+    )
+    
+    writer_id = db.Column(db.String(50), db.ForeignKey('writers.id'), primary_key=True)
+    term = db.Column(db.String(200), primary_key=True)
+    name = db.Column(db.String(200), nullable=False)
+
+def normalize_term(value):
+    return str(value).strip().lower()
+
+def writer_terms(raw):
+    """JSON array column -> {normalized term: name as entered}"""
+    if not raw:
+        return {}
+    try:
+        values = json.loads(raw) if isinstance(raw, str) else raw
+    except ValueError:
+        return {}
+    if not isinstance(values, list):
+        return {}
+    terms = {}
+    for value in values:
+        name = str(value).strip()
+        if name:
+            terms.setdefault(normalize_term(name), name)
+    return terms
+
+# JSON column -> join table kept in step with it
+WRITER_TERM_TABLES = {
+    'specializations': WriterSpecialization,
+    'languages': WriterLanguage
+}
+
+def write_writer_terms(connection, writer_id, column, raw):
+    """Replace one writer's rows in the join table backing `column`"""
+    table = WRITER_TERM_TABLES[column].__table__
+    connection.execute(table.delete().where(table.c.writer_id == writer_id))
+    rows = [{'writer_id': writer_id, 'term': term, 'name': name} for term, name in writer_terms(raw).items()]
+    if rows:
+        connection.execute(table.insert(), rows)
+
+def _insert_writer_terms(mapper, connection, target):
+    """Write join rows on the same connection so they commit with the writer"""
+    for column in WRITER_TERM_TABLES:
+        write_writer_terms(connection, target.id, column, getattr(target, column))
+
+def _update_writer_terms(mapper, connection, target):
+    state = inspect(target)
+    for column in WRITER_TERM_TABLES:
+        if state.attrs[column].history.has_changes():
+            write_writer_terms(connection, target.id, column, getattr(target, column))
+
+def _delete_writer_terms(mapper, connection, target):
+    for model in WRITER_TERM_TABLES.values():
+        table = model.__table__
+        connection.execute(table.delete().where(table.c.writer_id == target.id))
+
+event.listen(Writer, 'after_insert', _insert_writer_terms)
+event.listen(Writer, 'after_update', _update_writer_terms)
+event.listen(Writer, 'before_delete', _delete_writer_terms)
+
+# Long text and JSON columns on Order / PODOrder are deferred in three groups:
+#   'details' - free-text notes, 'files' - file arrays, 'history' - message/revision/bid arrays.
+# Plain queries (lists, counts, stats, summaries) never read them; touching one
+# attribute loads its whole group. Views that call to_dict() should load with
+# FULL_ROW so every group comes in with the row instead of one query per group.
+FULL_ROW = undefer('*')
+
+def reload_full(obj):
+    """
+    Re-read an instance with every column group in one query. Commit expires
+    everything, and refresh() skips deferred columns, so handlers that return
+    to_dict() after a commit use this instead of paying one query per group.
+    """
+    model = type(obj)
+    return db.session.execute(
+        select(model).where(model.id == obj.id).options(FULL_ROW).execution_options(populate_existing=True)
+    ).scalar_one()
+
+# Order statuses that count against a writer's max_concurrent_orders
+ACTIVE_ORDER_STATUSES = ('Assigned', 'In Progress', 'Revision')
 
 # Order Model
 class Order(db.Model):
@@ -112,25 +234,27 @@ class Order(db.Model):
     id = db.Column(db.String(50), primary_key=True)
     order_number = db.Column(db.String(4), unique=True)  # 4-character order number (e.g., A001, B002)
     title = db.Column(db.String(500), nullable=False)
-    description = db.Column(db.Text)
+    description = deferred(db.Column(db.Text), group='details')
     subject = db.Column(db.String(200))
     discipline = db.Column(db.String(200))
     paper_type = db.Column(db.String(100))
-    pages = db.Column(db.Integer)
+    # Columns wrapped in column_property(active_history=True) feed the writer metric
+    # listeners, which need the value being replaced to undo its contribution
+    pages = column_property(db.Column(db.Integer), active_history=True)
     words = db.Column(db.Integer)
     format = db.Column(db.String(50))
     price = db.Column(db.Float)
     price_kes = db.Column(db.Float)
     cpp = db.Column(db.Float)
-    total_price_kes = db.Column(db.Float)
-    deadline = db.Column(db.DateTime)
-    status = db.Column(db.String(50), default='Available')
+    total_price_kes = column_property(db.Column(db.Float), active_history=True)
+    deadline = column_property(db.Column(db.DateTime), active_history=True)
+    status = column_property(db.Column(db.String(50), default='Available', index=True), active_history=True)
     client_id = db.Column(db.String(50))
     client_name = db.Column(db.String(200))
     client_email = db.Column(db.String(200))
     client_phone = db.Column(db.String(50))
-    requirements = db.Column(db.Text)
-    writer_id = db.Column(db.String(50))
+    requirements = deferred(db.Column(db.Text), group='details')
+    writer_id = column_property(db.Column(db.String(50), index=True), active_history=True)
     assigned_writer = db.Column(db.String(200))
     assigned_at = db.Column(db.DateTime)
     assigned_by = db.Column(db.String(50))  # 'admin' or 'writer'
@@ -138,33 +262,33 @@ class Order(db.Model):
     requires_confirmation = db.Column(db.Boolean, default=False)
     confirmed_at = db.Column(db.DateTime)
     confirmed_by = db.Column(db.String(50))
-    assignment_notes = db.Column(db.Text)
+    assignment_notes = deferred(db.Column(db.Text), group='details')
     assignment_priority = db.Column(db.String(20))  # 'low', 'medium', 'high', 'urgent'
     assignment_deadline = db.Column(db.DateTime)
     started_at = db.Column(db.DateTime)
     submitted_at = db.Column(db.DateTime)
     submitted_to_admin_at = db.Column(db.DateTime)
-    submission_notes = db.Column(db.Text)
+    submission_notes = deferred(db.Column(db.Text), group='details')
     files_uploaded_at = db.Column(db.DateTime)
-    completed_at = db.Column(db.DateTime)
-    attachments = db.Column(db.Text)  # JSON array string (for requirements/instructions)
-    original_files = db.Column(db.Text)  # JSON array string - Original submission files
-    revision_files = db.Column(db.Text)  # JSON array string - Revision submission files
-    revision_requests = db.Column(db.Text)  # JSON array string
-    revision_explanation = db.Column(db.Text)  # Admin's explanation for revision
-    revision_score = db.Column(db.Integer, default=10)  # Starts at 10, reduces with each revision
-    revision_count = db.Column(db.Integer, default=0)
+    completed_at = column_property(db.Column(db.DateTime, index=True), active_history=True)
+    attachments = deferred(db.Column(db.Text), group='files')  # JSON array string (for requirements/instructions)
+    original_files = deferred(db.Column(db.Text), group='files')  # JSON array string - Original submission files
+    revision_files = deferred(db.Column(db.Text), group='files')  # JSON array string - Revision submission files
+    revision_requests = deferred(db.Column(db.Text), group='history')  # JSON array string
+    revision_explanation = deferred(db.Column(db.Text), group='details')  # Admin's explanation for revision
+    revision_score = column_property(db.Column(db.Integer, default=10), active_history=True)  # Starts at 10, reduces with each revision
+    revision_count = column_property(db.Column(db.Integer, default=0), active_history=True)
     revision_submitted_at = db.Column(db.DateTime)
-    revision_response_notes = db.Column(db.Text)  # Writer's notes on revision submission
-    reviews = db.Column(db.Text)  # JSON array string
-    client_messages = db.Column(db.Text)  # JSON array string
-    admin_messages = db.Column(db.Text)  # JSON array string
-    admin_review_notes = db.Column(db.Text)
+    revision_response_notes = deferred(db.Column(db.Text), group='details')  # Writer's notes on revision submission
+    reviews = deferred(db.Column(db.Text), group='history')  # JSON array string
+    client_messages = deferred(db.Column(db.Text), group='history')  # JSON array string
+    admin_messages = deferred(db.Column(db.Text), group='history')  # JSON array string
+    admin_review_notes = deferred(db.Column(db.Text), group='details')
     admin_reviewed_at = db.Column(db.DateTime)
     admin_reviewed_by = db.Column(db.String(50))
-    last_admin_edit = db.Column(db.Text)  # JSON string
+    last_admin_edit = deferred(db.Column(db.Text), group='details')  # JSON string
     # Reassignment tracking
-    reassignment_reason = db.Column(db.Text)
+    reassignment_reason = deferred(db.Column(db.Text), group='details')
     reassigned_at = db.Column(db.DateTime)
     reassigned_by = db.Column(db.String(50))
     original_writer_id = db.Column(db.String(50))
@@ -172,12 +296,15 @@ class Order(db.Model):
     made_available_by = db.Column(db.String(50))
     # Fine tracking
     fine_amount = db.Column(db.Float, default=0)
-    fine_reason = db.Column(db.Text)
-    fine_history = db.Column(db.Text)  # JSON array string
+    fine_reason = deferred(db.Column(db.Text), group='details')
+    fine_history = deferred(db.Column(db.Text), group='history')  # JSON array string
     # Bidding system - multiple writers can bid on same order
-    bids = db.Column(db.Text)  # JSON array string - Array of bid objects
+    bids = deferred(db.Column(db.Text), group='history')  # JSON array string - Array of bid objects
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    version = db.Column(db.Integer, nullable=False, default=1)  # Optimistic lock, bumped on every write
+    
+    __mapper_args__ = {'version_id_col': version}
     
     def to_dict(self):
         return {
@@ -248,7 +375,37 @@ class Order(db.Model):
             'lastAdminEdit': json.loads(self.last_admin_edit) if self.last_admin_edit else None,
             'bids': json.loads(self.bids) if self.bids else [],
             'createdAt': self.created_at.isoformat() if self.created_at else None,
-            'updatedAt': self.updated_at.isoformat() if self.updated_at else None
+            'updatedAt': self.updated_at.isoformat() if self.updated_at else None,
+            'version': self.version
+        }
+    
+    def to_summary_dict(self):
+        """Fields for order tables and boards; no long text or JSON arrays"""
+        return {
+            'id': self.id,
+            'orderNumber': self.order_number,
+            'title': self.title,
+            'subject': self.subject,
+            'discipline': self.discipline,
+            'paperType': self.paper_type,
+            'pages': self.pages,
+            'words': self.words,
+            'priceKES': self.price_kes,
+            'cpp': self.cpp,
+            'totalPriceKES': self.total_price_kes,
+            'deadline': self.deadline.isoformat() if self.deadline else None,
+            'status': self.status,
+            'clientName': self.client_name,
+            'writerId': self.writer_id,
+            'assignedWriter': self.assigned_writer,
+            'assignedAt': self.assigned_at.isoformat() if self.assigned_at else None,
+            'assignmentPriority': self.assignment_priority,
+            'revisionCount': self.revision_count,
+            'fineAmount': self.fine_amount if self.fine_amount else 0,
+            'completedAt': self.completed_at.isoformat() if self.completed_at else None,
+            'createdAt': self.created_at.isoformat() if self.created_at else None,
+            'updatedAt': self.updated_at.isoformat() if self.updated_at else None,
+            'version': self.version
         }
 
 # Order Activity Model - Tracks all actions on orders
@@ -290,7 +447,7 @@ class PODOrder(db.Model):
     
     id = db.Column(db.String(50), primary_key=True)
     title = db.Column(db.String(500), nullable=False)
-    description = db.Column(db.Text)
+    description = deferred(db.Column(db.Text), group='details')
     subject = db.Column(db.String(200))
     discipline = db.Column(db.String(200))
     paper_type = db.Column(db.String(100))
@@ -308,21 +465,24 @@ class PODOrder(db.Model):
     pod_amount = db.Column(db.Float)
     delivery_date = db.Column(db.DateTime)
     payment_received_at = db.Column(db.DateTime)
-    delivery_notes = db.Column(db.Text)
-    client_signature = db.Column(db.Text)
-    admin_review_notes = db.Column(db.Text)
+    delivery_notes = deferred(db.Column(db.Text), group='details')
+    client_signature = deferred(db.Column(db.Text), group='details')
+    admin_review_notes = deferred(db.Column(db.Text), group='details')
     admin_reviewed_at = db.Column(db.DateTime)
     admin_reviewed_by = db.Column(db.String(50))
-    revision_notes = db.Column(db.Text)
+    revision_notes = deferred(db.Column(db.Text), group='details')
     revision_requested_at = db.Column(db.DateTime)
     revision_requested_by = db.Column(db.String(50))
     revision_count = db.Column(db.Integer, default=0)
-    client_messages = db.Column(db.Text)  # JSON array string
-    uploaded_files = db.Column(db.Text)  # JSON array string
-    additional_instructions = db.Column(db.Text)
+    client_messages = deferred(db.Column(db.Text), group='history')  # JSON array string
+    uploaded_files = deferred(db.Column(db.Text), group='files')  # JSON array string
+    additional_instructions = deferred(db.Column(db.Text), group='details')
     is_overdue = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    version = db.Column(db.Integer, nullable=False, default=1)  # Optimistic lock, bumped on every write
+    
+    __mapper_args__ = {'version_id_col': version}
     
     def to_dict(self):
         return {
@@ -360,7 +520,31 @@ class PODOrder(db.Model):
             'additionalInstructions': self.additional_instructions,
             'isOverdue': self.is_overdue,
             'createdAt': self.created_at.isoformat() if self.created_at else None,
-            'updatedAt': self.updated_at.isoformat() if self.updated_at else None
+            'updatedAt': self.updated_at.isoformat() if self.updated_at else None,
+            'version': self.version
+        }
+    
+    def to_summary_dict(self):
+        """Fields for POD order tables; no notes, messages or file lists"""
+        return {
+            'id': self.id,
+            'title': self.title,
+            'subject': self.subject,
+            'paperType': self.paper_type,
+            'pages': self.pages,
+            'priceKES': self.price_kes,
+            'cpp': self.cpp,
+            'deadline': self.deadline.isoformat() if self.deadline else None,
+            'status': self.status,
+            'writerId': self.writer_id,
+            'assignedWriter': self.assigned_writer,
+            'podAmount': self.pod_amount,
+            'deliveryDate': self.delivery_date.isoformat() if self.delivery_date else None,
+            'revisionCount': self.revision_count,
+            'isOverdue': self.is_overdue,
+            'createdAt': self.created_at.isoformat() if self.created_at else None,
+            'updatedAt': self.updated_at.isoformat() if self.updated_at else None,
+            'version': self.version
         }
 
 # Review Model
@@ -369,20 +553,21 @@ class Review(db.Model):
     
     id = db.Column(db.String(50), primary_key=True)
     order_id = db.Column(db.String(50))
-    writer_id = db.Column(db.String(50))
+    # active_history keeps the old value on change so the rating listeners can subtract it
+    writer_id = column_property(db.Column(db.String(50), index=True), active_history=True)
     writer_name = db.Column(db.String(200))
     client_id = db.Column(db.String(50))
     client_name = db.Column(db.String(200))
-    rating = db.Column(db.Integer)
+    rating = column_property(db.Column(db.Integer), active_history=True)
     comment = db.Column(db.Text)
-    categories = db.Column(db.Text)  # JSON array string
-    status = db.Column(db.String(50), default='pending')
+    categories = column_property(db.Column(db.Text), active_history=True)  # JSON array string
+    status = column_property(db.Column(db.String(50), default='pending'), active_history=True)
     is_verified = db.Column(db.Boolean, default=False)
     admin_notes = db.Column(db.Text)
     order_title = db.Column(db.String(500))
     order_pages = db.Column(db.Integer)
     order_value = db.Column(db.Float)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def to_dict(self):
@@ -406,9 +591,152 @@ class Review(db.Model):
             'updatedAt': self.updated_at.isoformat() if self.updated_at else None
         }
 
+# Running rating totals per writer, kept in step with reviews (see review listeners below).
+# category is REVIEW_RATING for the review's own star rating, otherwise a Review.categories name.
+class WriterRatingStat(db.Model):
+    __tablename__ = 'writer_rating_stats'
+    
+    writer_id = db.Column(db.String(50), primary_key=True)
+    category = db.Column(db.String(50), primary_key=True)
+    rating_sum = db.Column(db.Float, nullable=False, default=0.0)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    stars_1 = db.Column(db.Integer, nullable=False, default=0)
+    stars_2 = db.Column(db.Integer, nullable=False, default=0)
+    stars_3 = db.Column(db.Integer, nullable=False, default=0)
+    stars_4 = db.Column(db.Integer, nullable=False, default=0)
+    stars_5 = db.Column(db.Integer, nullable=False, default=0)
+    
+    @property
+    def average(self):
+        return round(self.rating_sum / self.rating_count, 2) if self.rating_count else 0.0
+    
+    def distribution(self):
+        return {star: getattr(self, f'stars_{star}') for star in range(1, 6)}
+
+REVIEW_RATING = 'review'
+
+# Hidden reviews are moderated out and do not count towards a writer's rating
+UNCOUNTED_REVIEW_STATUSES = ('hidden',)
+
+def review_contributions(writer_id, rating, categories, status):
+    """{category: rating} a review adds to its writer's stats (empty if it does not count)"""
+    if not writer_id or status in UNCOUNTED_REVIEW_STATUSES:
+        return {}
+    values = {}
+    if rating is not None:
+        values[REVIEW_RATING] = float(rating)
+    try:
+        entries = json.loads(categories) if isinstance(categories, str) and categories else (categories or [])
+    except ValueError:
+        entries = []
+    for entry in entries if isinstance(entries, list) else []:
+        if isinstance(entry, dict) and entry.get('category') and isinstance(entry.get('rating'), (int, float)):
+            values[str(entry['category'])] = float(entry['rating'])
+    return values
+
+def _star_column(value):
+    return f"stars_{min(5, max(1, int(round(value))))}"
+
+UPSERT_DIALECTS = {'postgresql': postgresql, 'sqlite': sqlite}
+
+def increment_row(connection, table, key, deltas):
+    """
+    Insert the row for `key` with `deltas` as its values, or add them to the
+    row already there. One INSERT ... ON CONFLICT DO UPDATE, so two first
+    writes for the same key cannot both miss the row and collide on insert.
+    """
+    statement = UPSERT_DIALECTS[connection.dialect.name].insert(table).values({**key, **deltas})
+    connection.execute(statement.on_conflict_do_update(
+        index_elements=list(key),
+        set_={name: table.c[name] + statement.excluded[name] for name in deltas}
+    ))
+
+def apply_rating_deltas(connection, writer_id, contributions, sign):
+    """
+    Add (sign=1) or remove (sign=-1) one review's contributions with atomic
+    increments, then copy the overall average onto writers.rating / total_reviews
+    and the writer's metrics row.
+    """
+    if not contributions:
+        return
+    table = WriterRatingStat.__table__
+    for category, value in contributions.items():
+        star = _star_column(value)
+        deltas = {'rating_sum': sign * value, 'rating_count': sign, star: sign}
+        if sign > 0:
+            increment_row(connection, table, {'writer_id': writer_id, 'category': category}, deltas)
+        else:
+            # A counted review always has its row; removals never create one
+            connection.execute(
+                table.update()
+                .where(table.c.writer_id == writer_id, table.c.category == category)
+                .values({name: table.c[name] + delta for name, delta in deltas.items()})
+            )
+    sync_writer_rating(connection, writer_id)
+    import merit  # merit imports this module
+    merit.refresh_writer_metrics(connection, writer_id)
+
+def sync_writer_rating(connection, writer_id=None):
+    """
+    writers.rating / total_reviews from the precomputed REVIEW_RATING row (all
+    writers if writer_id is None). Writers without such a row keep what they have.
+    """
+    stats = WriterRatingStat.__table__
+    writers = Writer.__table__
+    row = select(stats).where(stats.c.writer_id == writers.c.id, stats.c.category == REVIEW_RATING)
+    counted = row.where(stats.c.rating_count > 0)
+    statement = writers.update().where(row.exists()).values(
+        rating=db.func.coalesce(
+            counted.with_only_columns(db.func.round(stats.c.rating_sum / stats.c.rating_count, 2)).scalar_subquery(), 0.0
+        ),
+        total_reviews=db.func.coalesce(counted.with_only_columns(stats.c.rating_count).scalar_subquery(), 0)
+    )
+    if writer_id is not None:
+        statement = statement.where(writers.c.id == writer_id)
+    connection.execute(statement)
+
+REVIEW_RATING_FIELDS = ('writer_id', 'rating', 'categories', 'status')
+
+def attribute_values(target, names, previous=False):
+    """Current values of `names`, or with previous=True the values being replaced in this flush"""
+    state = inspect(target)
+    values = []
+    for name in names:
+        history = state.attrs[name].history
+        if previous and history.deleted:
+            values.append(history.deleted[0])
+        else:
+            values.append(getattr(target, name))
+    return values
+
+def _insert_review_rating(mapper, connection, target):
+    writer_id, *rest = attribute_values(target, REVIEW_RATING_FIELDS)
+    apply_rating_deltas(connection, writer_id, review_contributions(writer_id, *rest), 1)
+
+def _update_review_rating(mapper, connection, target):
+    state = inspect(target)
+    if not any(state.attrs[name].history.has_changes() for name in REVIEW_RATING_FIELDS):
+        return
+    old_writer, *old_rest = attribute_values(target, REVIEW_RATING_FIELDS, previous=True)
+    new_writer, *new_rest = attribute_values(target, REVIEW_RATING_FIELDS)
+    apply_rating_deltas(connection, old_writer, review_contributions(old_writer, *old_rest), -1)
+    apply_rating_deltas(connection, new_writer, review_contributions(new_writer, *new_rest), 1)
+
+def _delete_review_rating(mapper, connection, target):
+    writer_id, *rest = attribute_values(target, REVIEW_RATING_FIELDS)
+    apply_rating_deltas(connection, writer_id, review_contributions(writer_id, *rest), -1)
+
+event.listen(Review, 'after_insert', _insert_review_rating)
+event.listen(Review, 'after_update', _update_review_rating)
+event.listen(Review, 'before_delete', _delete_review_rating)
+
 # Financial Models
 class Invoice(db.Model):
     __tablename__ = 'invoices'
+    __table_args__ = (
+        # The invoicing engine checks for an existing invoice per order and type
+        db.Index('ix_invoices_order_type', 'order_id', 'type'),
+    )
     
     id = db.Column(db.String(50), primary_key=True)
     order_id = db.Column(db.String(50))
@@ -417,7 +745,7 @@ class Invoice(db.Model):
     writer_name = db.Column(db.String(200))
     amount = db.Column(db.Float)
     currency = db.Column(db.String(10), default='KES')
-    status = db.Column(db.String(50), default='pending')
+    status = column_property(db.Column(db.String(50), default='pending'), active_history=True)
     type = db.Column(db.String(50))
     order_pages = db.Column(db.Integer)
     order_deadline = db.Column(db.DateTime)
@@ -429,6 +757,7 @@ class Invoice(db.Model):
     payment_reference = db.Column(db.String(200))
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     def to_dict(self):
         return {
@@ -450,7 +779,8 @@ class Invoice(db.Model):
             'paymentMethod': self.payment_method,
             'paymentReference': self.payment_reference,
             'notes': self.notes,
-            'createdAt': self.created_at.isoformat() if self.created_at else None
+            'createdAt': self.created_at.isoformat() if self.created_at else None,
+            'updatedAt': self.updated_at.isoformat() if self.updated_at else None
         }
 
 class Fine(db.Model):
@@ -458,13 +788,14 @@ class Fine(db.Model):
     
     id = db.Column(db.String(50), primary_key=True)
     order_id = db.Column(db.String(50))
-    writer_id = db.Column(db.String(50))
+    # active_history: see the writer metric listeners
+    writer_id = column_property(db.Column(db.String(50)), active_history=True)
     writer_name = db.Column(db.String(200))
-    amount = db.Column(db.Float)
+    amount = column_property(db.Column(db.Float), active_history=True)
     currency = db.Column(db.String(10), default='KES')
     reason = db.Column(db.String(200))
     type = db.Column(db.String(50))
-    status = db.Column(db.String(50), default='pending')
+    status = column_property(db.Column(db.String(50), default='pending'), active_history=True)
     order_title = db.Column(db.String(500))
     notes = db.Column(db.Text)
     applied_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -493,6 +824,80 @@ class Fine(db.Model):
             'waivedReason': self.waived_reason
         }
 
+# Per-writer performance counters behind the merit score (see merit.py). Order, fine
+# and review listeners adjust them in the flush that changes the source row, and
+# merit_score is recomputed from the counters straight after, so the leaderboard
+# is a walk down ix_writer_metrics_merit rather than a scan of every order.
+class WriterMetric(db.Model):
+    __tablename__ = 'writer_metrics'
+    __table_args__ = (
+        db.Index('ix_writer_metrics_merit', 'merit_score', 'writer_id'),
+    )
+    
+    writer_id = db.Column(db.String(50), primary_key=True)
+    total_orders = db.Column(db.Integer, nullable=False, default=0)
+    completed_orders = db.Column(db.Integer, nullable=False, default=0)
+    on_time_orders = db.Column(db.Integer, nullable=False, default=0)  # completed by the deadline
+    revised_orders = db.Column(db.Integer, nullable=False, default=0)  # sent back for revision at least once
+    revision_count = db.Column(db.Integer, nullable=False, default=0)  # revisions across all orders
+    revision_score_sum = db.Column(db.Integer, nullable=False, default=0)  # Order.revision_score over completed orders
+    rejected_orders = db.Column(db.Integer, nullable=False, default=0)
+    earnings = db.Column(db.Float, nullable=False, default=0.0)
+    fine_count = db.Column(db.Integer, nullable=False, default=0)  # fines not waived
+    fine_total = db.Column(db.Float, nullable=False, default=0.0)
+    rating = db.Column(db.Float, nullable=False, default=0.0)  # copied from writers.rating
+    total_reviews = db.Column(db.Integer, nullable=False, default=0)
+    merit_score = db.Column(db.Float, nullable=False, default=0.0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        from merit import writer_performance  # merit imports this module
+        values = {column.name: getattr(self, column.name) or 0 for column in self.__table__.columns}
+        return {
+            'writerId': self.writer_id,
+            'meritScore': self.merit_score,
+            **writer_performance(values),
+            'totalOrders': self.total_orders,
+            'completedOrders': self.completed_orders,
+            'onTimeOrders': self.on_time_orders,
+            'revisedOrders': self.revised_orders,
+            'revisionCount': self.revision_count,
+            'averageRevisionScore': round(self.revision_score_sum / self.completed_orders, 2) if self.completed_orders else None,
+            'rejectedOrders': self.rejected_orders,
+            'totalEarnings': round(self.earnings or 0.0, 2),
+            'fineCount': self.fine_count,
+            'fineTotal': round(self.fine_total or 0.0, 2),
+            'totalReviews': self.total_reviews,
+            'updatedAt': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+COMPLETED_ORDER_STATUSES = ('Completed', 'Approved')
+REJECTED_ORDER_STATUSES = ('Rejected',)
+WAIVED_FINE_STATUSES = ('waived',)
+
+# Order.revision_score starts here and drops with each revision
+MAX_REVISION_SCORE = 10
+
+# Earnings fallback for orders without a KES total, as the client has always used
+DEFAULT_PAGE_PRICE_KES = 350
+
+# writer_metrics follows orders, fines and writers. The listeners only hand the
+# row to merit.py, which skips it unless a column the metrics count changed.
+
+def _metric_listener(change):
+    def listener(mapper, connection, target):
+        import merit  # merit imports this module
+        merit.source_changed(connection, target, change)
+    return listener
+
+for _model in (Order, Fine):
+    event.listen(_model, 'after_insert', _metric_listener('insert'))
+    event.listen(_model, 'after_update', _metric_listener('update'))
+    event.listen(_model, 'before_delete', _metric_listener('delete'))
+# Every writer gets a row (and so a place on the leaderboard) from the start
+event.listen(Writer, 'after_insert', _metric_listener('insert'))
+event.listen(Writer, 'before_delete', _metric_listener('delete'))
+
 class Payment(db.Model):
     __tablename__ = 'payments'
     
@@ -502,7 +907,7 @@ class Payment(db.Model):
     amount = db.Column(db.Float)
     currency = db.Column(db.String(10), default='KES')
     type = db.Column(db.String(50))
-    status = db.Column(db.String(50), default='pending')
+    status = column_property(db.Column(db.String(50), default='pending'), active_history=True)
     method = db.Column(db.String(50))
     reference = db.Column(db.String(200))
     related_order_id = db.Column(db.String(50))
@@ -571,13 +976,13 @@ class PlatformFunds(db.Model):
     __tablename__ = 'platform_funds'
     
     id = db.Column(db.String(50), primary_key=True)
-    amount = db.Column(db.Float)
+    amount = column_property(db.Column(db.Float), active_history=True)
     currency = db.Column(db.String(10), default='KES')
     source = db.Column(db.String(50))
     added_by = db.Column(db.String(50))
     reference = db.Column(db.String(200))
     notes = db.Column(db.Text)
-    status = db.Column(db.String(50), default='pending')
+    status = column_property(db.Column(db.String(50), default='pending'), active_history=True)
     added_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def to_dict(self):
@@ -595,13 +1000,17 @@ class PlatformFunds(db.Model):
 
 class WithdrawalRequest(db.Model):
     __tablename__ = 'withdrawal_requests'
+    __table_args__ = (
+        # Payout batches pick approved withdrawals oldest approval first
+        db.Index('ix_withdrawal_requests_status', 'status', 'approved_at'),
+    )
     
     id = db.Column(db.String(50), primary_key=True)
     writer_id = db.Column(db.String(50))
     writer_name = db.Column(db.String(200))
-    amount = db.Column(db.Float)
+    amount = column_property(db.Column(db.Float), active_history=True)
     currency = db.Column(db.String(10), default='KES')
-    status = db.Column(db.String(50), default='pending')
+    status = column_property(db.Column(db.String(50), default='pending'), active_history=True)
     method = db.Column(db.String(50))
     account_details = db.Column(db.Text)  # JSON string
     approved_by = db.Column(db.String(50))
@@ -613,6 +1022,7 @@ class WithdrawalRequest(db.Model):
     paid_at = db.Column(db.DateTime)
     payment_reference = db.Column(db.String(200))
     invoice_id = db.Column(db.String(50))
+    payout_batch_id = db.Column(db.String(50), index=True)  # PayoutBatch that paid it
     notes = db.Column(db.Text)
     requested_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -635,10 +1045,44 @@ class WithdrawalRequest(db.Model):
             'paidAt': self.paid_at.isoformat() if self.paid_at else None,
             'paymentReference': self.payment_reference,
             'invoiceId': self.invoice_id,
+            'payoutBatchId': self.payout_batch_id,
             'notes': self.notes,
             'requestedAt': self.requested_at.isoformat() if self.requested_at else None
         }
 
+# One payday run: approved withdrawals paid together, with their settlement file (see payouts.py)
+class PayoutBatch(db.Model):
+    __tablename__ = 'payout_batches'
+    
+    id = db.Column(db.String(50), primary_key=True)
+    idempotency_key = db.Column(db.String(200), unique=True, nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)  # SHA-256 of the selection, to catch reused keys
+    status = db.Column(db.String(20), nullable=False, default='completed')
+    method = db.Column(db.String(50))  # None = every method
+    currency = db.Column(db.String(10), default='KES')
+    withdrawal_count = db.Column(db.Integer, nullable=False, default=0)
+    total_amount = db.Column(db.Float, nullable=False, default=0.0)
+    settlement_file_id = db.Column(db.String(50))  # StoredFile with the settlement CSV
+    created_by = db.Column(db.String(50))
+    notes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'idempotencyKey': self.idempotency_key,
+            'status': self.status,
+            'method': self.method,
+            'currency': self.currency,
+            'withdrawalCount': self.withdrawal_count,
+            'totalAmount': self.total_amount,
+            'settlementFileId': self.settlement_file_id,
+            'settlementUrl': f"/api/files/{self.settlement_file_id}" if self.settlement_file_id else None,
+            'createdBy': self.created_by,
+            'notes': self.notes,
+            'createdAt': self.created_at.isoformat() if self.created_at else None
+        }
+
 class TransactionLog(db.Model):
     __tablename__ = 'transaction_logs'
     
@@ -681,6 +1125,7 @@ class Notification(db.Model):
     is_read = db.Column(db.Boolean, default=False)
     read_at = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     def to_dict(self):
         return {
@@ -693,17 +1138,23 @@ class Notification(db.Model):
             'relatedEntityType': self.related_entity_type,
             'isRead': self.is_read,
             'readAt': self.read_at.isoformat() if self.read_at else None,
-            'createdAt': self.created_at.isoformat() if self.created_at else None
+            'createdAt': self.created_at.isoformat() if self.created_at else None,
+            'updatedAt': self.updated_at.isoformat() if self.updated_at else None
         }
 
 class Message(db.Model):
     __tablename__ = 'messages'
+    __table_args__ = (
+        # Keyset pagination inside a thread walks (created_at, id) newest first
+        db.Index('ix_messages_thread_created', 'thread_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.String(50), primary_key=True)
-    sender_id = db.Column(db.String(50))
+    thread_id = db.Column(db.String(50), db.ForeignKey('message_threads.id'))
+    sender_id = db.Column(db.String(50), index=True)
     sender_name = db.Column(db.String(200))
     sender_role = db.Column(db.String(20))
-    recipient_id = db.Column(db.String(50))
+    recipient_id = db.Column(db.String(50), index=True)
     recipient_name = db.Column(db.String(200))
     recipient_role = db.Column(db.String(20))
     subject = db.Column(db.String(500))
@@ -716,6 +1167,7 @@ class Message(db.Model):
     def to_dict(self):
         return {
             'id': self.id,
+            'threadId': self.thread_id,
             'senderId': self.sender_id,
             'senderName': self.sender_name,
             'senderRole': self.sender_role,
@@ -730,3 +1182,308 @@ class Message(db.Model):
             'createdAt': self.created_at.isoformat() if self.created_at else None
         }
 
+# Message threads - one conversation per participant pair (+ related order)
+class MessageThread(db.Model):
+    __tablename__ = 'message_threads'
+    
+    id = db.Column(db.String(50), primary_key=True)
+    thread_key = db.Column(db.String(200), unique=True, nullable=False)  # "<low id>|<high id>|<order id or empty>"
+    participant_a_id = db.Column(db.String(50), nullable=False)  # Lower of the two participant IDs
+    participant_a_name = db.Column(db.String(200))
+    participant_a_role = db.Column(db.String(20))
+    participant_b_id = db.Column(db.String(50), nullable=False)  # Higher of the two participant IDs
+    participant_b_name = db.Column(db.String(200))
+    participant_b_role = db.Column(db.String(20))
+    related_order_id = db.Column(db.String(50), index=True)
+    subject = db.Column(db.String(500))
+    last_message_id = db.Column(db.String(50))
+    last_message_at = db.Column(db.DateTime)
+    last_message_preview = db.Column(db.String(200))
+    last_sender_id = db.Column(db.String(50))
+    message_count = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self, participant=None):
+        data = {
+            'id': self.id,
+            'participants': [
+                {'id': self.participant_a_id, 'name': self.participant_a_name, 'role': self.participant_a_role},
+                {'id': self.participant_b_id, 'name': self.participant_b_name, 'role': self.participant_b_role}
+            ],
+            'relatedOrderId': self.related_order_id,
+            'subject': self.subject,
+            'lastMessageId': self.last_message_id,
+            'lastMessageAt': self.last_message_at.isoformat() if self.last_message_at else None,
+            'lastMessagePreview': self.last_message_preview,
+            'lastSenderId': self.last_sender_id,
+            'messageCount': self.message_count or 0,
+            'createdAt': self.created_at.isoformat() if self.created_at else None
+        }
+        if participant is not None:
+            data['unreadCount'] = participant.unread_count or 0
+            data['lastReadAt'] = participant.last_read_at.isoformat() if participant.last_read_at else None
+        return data
+
+class MessageThreadParticipant(db.Model):
+    __tablename__ = 'message_thread_participants'
+    __table_args__ = (
+        # Inbox listing is a range scan over one user's threads, newest activity first
+        db.Index('ix_thread_participants_inbox', 'user_id', 'last_message_at', 'thread_id'),
+    )
+    
+    thread_id = db.Column(db.String(50), db.ForeignKey('message_threads.id'), primary_key=True)
+    user_id = db.Column(db.String(50), primary_key=True)
+    unread_count = db.Column(db.Integer, default=0)
+    last_message_at = db.Column(db.DateTime)  # Copied from the thread so the inbox index covers the sort
+    last_read_at = db.Column(db.DateTime)
+
+# Uploaded files - metadata only; the bytes live in storage.py under their SHA-256,
+# so several rows (re-uploads of the same brief) can share one blob
+class StoredFile(db.Model):
+    __tablename__ = 'stored_files'
+    
+    id = db.Column(db.String(50), primary_key=True)
+    sha256 = db.Column(db.String(64), nullable=False, index=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    original_name = db.Column(db.String(500))
+    content_type = db.Column(db.String(200))
+    uploaded_by = db.Column(db.String(50))
+    related_order_id = db.Column(db.String(50), index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        # Same shape as the client's UploadedFile so it can go straight into originalFiles etc.
+        return {
+            'id': self.id,
+            'filename': self.original_name,
+            'originalName': self.original_name,
+            'size': self.size,
+            'type': self.content_type,
+            'url': f'/api/files/{self.id}',
+            'sha256': self.sha256,
+            'uploadedBy': self.uploaded_by,
+            'relatedOrderId': self.related_order_id,
+            'uploadedAt': self.created_at.isoformat() if self.created_at else None
+        }
+
+class OrphanBlob(db.Model):
+    """A blob whose last stored file was deleted, waiting for `flask files gc`"""
+    __tablename__ = 'orphan_blobs'
+    
+    sha256 = db.Column(db.String(64), primary_key=True)
+    orphaned_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+# Resumable upload sessions - chunks live on disk under UPLOAD_SESSION_ROOT until finalized (see uploads.py)
+
+class UploadSession(db.Model):
+    __tablename__ = 'upload_sessions'
+    
+    id = db.Column(db.String(50), primary_key=True)
+    filename = db.Column(db.String(500), nullable=False)
+    content_type = db.Column(db.String(200))
+    total_size = db.Column(db.BigInteger, nullable=False)
+    chunk_size = db.Column(db.Integer, nullable=False)
+    sha256 = db.Column(db.String(64))  # Expected digest of the whole file, checked on finalize
+    order_id = db.Column(db.String(50), index=True)
+    target = db.Column(db.String(30))  # originalFiles, revisionFiles or podFiles
+    uploaded_by = db.Column(db.String(50))
+    status = db.Column(db.String(20), nullable=False, default='uploading')  # uploading, finalizing, complete, aborted
+    file_id = db.Column(db.String(50))  # StoredFile created on finalize
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    
+    @property
+    def chunk_count(self):
+        return max(1, -(-self.total_size // self.chunk_size))
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'contentType': self.content_type,
+            'size': self.total_size,
+            'chunkSize': self.chunk_size,
+            'chunkCount': self.chunk_count,
+            'sha256': self.sha256,
+            'orderId': self.order_id,
+            'target': self.target,
+            'uploadedBy': self.uploaded_by,
+            'status': self.status,
+            'fileId': self.file_id,
+            'createdAt': self.created_at.isoformat() if self.created_at else None,
+            'expiresAt': self.expires_at.isoformat() if self.expires_at else None
+        }
+
+# Responses to POSTs sent with an Idempotency-Key, replayed on retry until they expire (see idempotency.py)
+class IdempotencyKey(db.Model):
+    __tablename__ = 'idempotency_keys'
+    
+    key = db.Column(db.String(64), primary_key=True)  # sha256 of endpoint and client key
+    request_hash = db.Column(db.String(64), nullable=False)  # sha256 of the request body
+    status_code = db.Column(db.Integer)  # None while the first request is still running
+    content_type = db.Column(db.String(100))
+    body = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+# Schema migrations applied to this database (see migrator.py)
+class SchemaMigration(db.Model):
+    __tablename__ = 'schema_migrations'
+    
+    version = db.Column(db.String(20), primary_key=True)
+    name = db.Column(db.String(200))
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+    duration_ms = db.Column(db.Float)  # None when stamped rather than run
+    
+    def to_dict(self):
+        return {
+            'version': self.version,
+            'name': self.name,
+            'appliedAt': self.applied_at.isoformat() if self.applied_at else None,
+            'durationMs': self.duration_ms
+        }
+
+# Progress markers for incremental jobs, e.g. the invoicing engine's completion watermark
+class JobWatermark(db.Model):
+    __tablename__ = 'job_watermarks'
+    
+    name = db.Column(db.String(100), primary_key=True)
+    position = db.Column(db.DateTime)  # everything up to here has been processed
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'position': self.position.isoformat() if self.position else None,
+            'updatedAt': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+# Transactional outbox - financial changes recorded in the transaction that made them,
+# then applied to logs, the platform balance and notifications by the relay (see outbox.py)
+class OutboxEvent(db.Model):
+    __tablename__ = 'outbox_events'
+    __table_args__ = (
+        # The relay walks unprocessed events in id order
+        db.Index('ix_outbox_events_pending', 'processed_at', 'id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    topic = db.Column(db.String(100), nullable=False)  # e.g. invoice.updated, payout_batch.completed
+    aggregate_id = db.Column(db.String(50))
+    payload = db.Column(db.Text)  # JSON: {'before': changed fields or None, 'after': the record}
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'topic': self.topic,
+            'aggregateId': self.aggregate_id,
+            'payload': json.loads(self.payload) if self.payload else None,
+            'createdAt': self.created_at.isoformat() if self.created_at else None,
+            'processedAt': self.processed_at.isoformat() if self.processed_at else None,
+            'attempts': self.attempts,
+            'lastError': self.last_error
+        }
+
+# Platform balance maintained by the outbox relay (one row, id 'platform')
+class PlatformBalance(db.Model):
+    __tablename__ = 'platform_balance'
+    
+    id = db.Column(db.String(20), primary_key=True, default='platform')
+    total_funds = db.Column(db.Float, nullable=False, default=0.0)  # confirmed platform funds
+    reserved_funds = db.Column(db.Float, nullable=False, default=0.0)  # pending + approved withdrawals
+    total_withdrawn = db.Column(db.Float, nullable=False, default=0.0)  # paid withdrawals
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    @property
+    def available_funds(self):
+        return max(0.0, (self.total_funds or 0) - (self.total_withdrawn or 0) - (self.reserved_funds or 0))
+    
+    def to_dict(self):
+        return {
+            'totalFunds': self.total_funds,
+            'availableFunds': self.available_funds,
+            'pendingWithdrawals': self.reserved_funds,
+            'reservedFunds': self.reserved_funds,
+            'totalWithdrawn': self.total_withdrawn,
+            'lastUpdated': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+def emit_event(connection, topic, aggregate_id, payload):
+    """Queue an outbox event on `connection`, so it commits (or rolls back) with the change it describes"""
+    connection.execute(OutboxEvent.__table__.insert().values(
+        topic=topic,
+        aggregate_id=aggregate_id,
+        payload=json.dumps(payload, default=str),
+        created_at=datetime.utcnow(),
+        attempts=0
+    ))
+
+def _outbox_listeners(model, aggregate, fields, omit=()):
+    """Emit <aggregate>.created on insert and <aggregate>.updated when one of `fields` changes"""
+    def snapshot(target):
+        return {key: value for key, value in target.to_dict().items() if key not in omit}
+    
+    def after_insert(mapper, connection, target):
+        emit_event(connection, f"{aggregate}.created", target.id, {'before': None, 'after': snapshot(target)})
+    
+    def after_update(mapper, connection, target):
+        state = inspect(target)
+        if not any(state.attrs[name].history.has_changes() for name in fields):
+            return
+        before = dict(zip(fields, attribute_values(target, fields, previous=True)))
+        emit_event(connection, f"{aggregate}.updated", target.id, {'before': before, 'after': snapshot(target)})
+    
+    event.listen(model, 'after_insert', after_insert)
+    event.listen(model, 'after_update', after_update)
+
+# What the relay reacts to; other columns change without an event. Account
+# details stay out of event payloads.
+OUTBOX_SOURCES = (
+    (Invoice, 'invoice', ('status',), ()),
+    (Payment, 'payment', ('status',), ()),
+    (PlatformFunds, 'platform_fund', ('status', 'amount'), ()),
+    (WithdrawalRequest, 'withdrawal', ('status', 'amount'), ('accountDetails',)),
+    (Fine, 'fine', ('status', 'amount'), ()),
+)
+
+for _model, _aggregate, _fields, _omit in OUTBOX_SOURCES:
+    _outbox_listeners(_model, _aggregate, _fields, _omit)
+
+# Tombstones - record deletes so /api/sync can tell clients which rows disappeared
+class Tombstone(db.Model):
+    __tablename__ = 'tombstones'
+    __table_args__ = (
+        db.Index('ix_tombstones_deleted_at', 'deleted_at', 'table_name'),
+    )
+    
+    id = db.Column(db.String(50), primary_key=True)
+    table_name = db.Column(db.String(50), nullable=False)
+    record_id = db.Column(db.String(50), nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'tableName': self.table_name,
+            'recordId': self.record_id,
+            'deletedAt': self.deleted_at.isoformat() if self.deleted_at else None
+        }
+
+def _record_tombstone(mapper, connection, target):
+    """Write the tombstone on the same connection so it commits (or rolls back) with the delete"""
+    connection.execute(Tombstone.__table__.insert().values(
+        id=f"TMB-{uuid.uuid4().hex[:12].upper()}",
+        table_name=mapper.local_table.name,
+        record_id=target.id,
+        deleted_at=datetime.utcnow()
+    ))
+
+# Tables mirrored by the client through /api/sync
+SYNCED_MODELS = (Order, PODOrder, Invoice, Notification)
+
+for _model in SYNCED_MODELS:
+    event.listen(_model, 'after_delete', _record_tombstone)
@@ -0,0 +1,359 @@
+"""
+Transactional outbox relay.
+
+Invoices, payments, platform funds, withdrawals and fines emit an
+outbox_events row from a mapper event in the same flush that changes them
+(models.OUTBOX_SOURCES), and payout batches add one for the whole batch, so
+an event exists exactly when its change committed. relay() applies what
+follows from those changes, which clients used to chain as extra requests:
+
+    platform_fund.*         confirmed funds move the platform balance; 'fund_added' log
+    withdrawal.*            reserved / withdrawn totals; approval and payment logs;
+                            the writer is notified of approval, rejection and payment
+    payout_batch.completed  reserved -> withdrawn for the batch; writers notified
+                            (the batch already wrote its own logs)
+    invoice.updated         approval creates the pending order payment; paying it
+                            logs 'invoice_paid'; the writer is notified
+    fine.*                  'fine_applied' / 'fine_waived' logs and a notification
+
+Events are handled BATCH_SIZE at a time in id order. processed_at for the
+batch, the derived rows and the balance update commit together. processed_at
+is set first and only counts rows that were still unprocessed, so a batch
+that another relay got to first is rolled back before it writes anything:
+every event is applied exactly once. Derived rows also take ids from the event id
+(OBX-<event>-n), so a replay would collide rather than duplicate.
+
+An event whose handler raises is left unprocessed with attempts and
+last_error set, and is skipped after MAX_ATTEMPTS; `flask outbox status`
+lists those. Run the relay with `flask outbox relay [--follow]`.
+"""
+import json
+import time
+from datetime import datetime
+
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.exc import IntegrityError
+
+from db import db
+from models import Notification, OutboxEvent, Payment, PlatformBalance, PlatformFunds, TransactionLog, WithdrawalRequest
+
+# Events applied per transaction
+BATCH_SIZE = 500
+
+# Failed handler runs before an event is parked for inspection
+MAX_ATTEMPTS = 5
+
+BALANCE_ID = 'platform'
+RESERVED_WITHDRAWAL_STATUSES = ('pending', 'approved')
+
+events = OutboxEvent.__table__
+
+class Batch:
+    """Derived writes collected while handling one batch of events"""
+    def __init__(self, balance):
+        self.totals = {name: balance[name] or 0.0 for name in ('total_funds', 'reserved_funds', 'total_withdrawn')}
+        self.changed = False
+        self.rows = {TransactionLog: [], Notification: [], Payment: []}
+        self.event_id = None
+        self.sequence = 0
+        self.now = datetime.utcnow()
+    
+    def next_id(self, prefix):
+        self.sequence += 1
+        return f"{prefix}-OBX-{self.event_id}-{self.sequence}"
+    
+    @property
+    def available(self):
+        return max(0.0, self.totals['total_funds'] - self.totals['total_withdrawn'] - self.totals['reserved_funds'])
+    
+    def adjust(self, **deltas):
+        """Apply balance deltas; returns the available funds (before, after)"""
+        before = self.available
+        for name, delta in deltas.items():
+            if delta:
+                self.totals[name] += delta
+                self.changed = True
+        return before, self.available
+    
+    def log(self, type_, amount, description, performed_by, related_id, balance=None):
+        before, after = balance or (self.available, self.available)
+        self.rows[TransactionLog].append({
+            'id': self.next_id('TXN'), 'type': type_, 'amount': amount, 'currency': 'KES',
+            'description': description, 'performed_by': performed_by, 'related_entity_id': related_id,
+            'balance_before': before, 'balance_after': after, 'performed_at': self.now
+        })
+    
+    def notify(self, user_id, type_, title, message, related_id, related_type):
+        if not user_id:
+            return
+        self.rows[Notification].append({
+            'id': self.next_id('NTF'), 'user_id': user_id, 'type': type_, 'title': title, 'message': message,
+            'related_entity_id': related_id, 'related_entity_type': related_type, 'is_read': False,
+            'created_at': self.now, 'updated_at': self.now
+        })
+    
+    def pay(self, **row):
+        self.rows[Payment].append({'id': self.next_id('PAY'), 'created_at': self.now, **row})
+
+HANDLERS = {}
+
+def handles(*topics):
+    def register(handler):
+        for topic in topics:
+            HANDLERS[topic] = handler
+        return handler
+    return register
+
+def _status_change(payload):
+    """(old status, new status); old is None for a new record"""
+    before = payload.get('before') or {}
+    return before.get('status'), payload['after'].get('status')
+
+def _amount(value):
+    return float(value or 0)
+
+def _kes(amount):
+    return f"KES {_amount(amount):,.2f}"
+
+@handles('platform_fund.created', 'platform_fund.updated')
+def _platform_fund(batch, payload):
+    fund, before = payload['after'], payload.get('before')
+    old_status, new_status = _status_change(payload)
+    old = _amount(before.get('amount', fund['amount'])) if before and old_status == 'confirmed' else 0.0
+    new = _amount(fund['amount']) if new_status == 'confirmed' else 0.0
+    balance = batch.adjust(total_funds=new - old)
+    if new_status == 'confirmed' and old_status != 'confirmed':
+        batch.log('fund_added', new, f"Platform funds added from {fund.get('source') or 'unknown source'}",
+                  fund.get('addedBy'), fund['id'], balance)
+
+def _withdrawal_totals(status, amount):
+    return {
+        'reserved_funds': amount if status in RESERVED_WITHDRAWAL_STATUSES else 0.0,
+        'total_withdrawn': amount if status == 'paid' else 0.0
+    }
+
+WITHDRAWAL_NOTICES = {
+    'approved': ('Withdrawal approved', 'Your withdrawal of {amount} has been approved.'),
+    'rejected': ('Withdrawal rejected', 'Your withdrawal of {amount} was rejected.'),
+    'paid': ('Withdrawal paid', 'Your withdrawal of {amount} has been paid.'),
+}
+
+@handles('withdrawal.created', 'withdrawal.updated')
+def _withdrawal(batch, payload):
+    withdrawal, before = payload['after'], payload.get('before')
+    old_status, new_status = _status_change(payload)
+    old = _withdrawal_totals(old_status, _amount(before.get('amount', withdrawal['amount']))) if before else {}
+    new = _withdrawal_totals(new_status, _amount(withdrawal['amount']))
+    balance = batch.adjust(**{name: new[name] - old.get(name, 0.0) for name in new})
+    if new_status == old_status:
+        return
+    
+    amount = _amount(withdrawal['amount'])
+    writer = withdrawal.get('writerName') or withdrawal.get('writerId')
+    if new_status == 'approved':
+        batch.log('withdrawal_approved', amount, f"Withdrawal {withdrawal['id']} for {writer} approved",
+                  withdrawal.get('approvedBy'), withdrawal['id'], balance)
+    elif new_status == 'paid':
+        batch.log('withdrawal_paid', amount, f"Withdrawal {withdrawal['id']} paid to {writer}",
+                  withdrawal.get('paidBy'), withdrawal['id'], balance)
+    if new_status in WITHDRAWAL_NOTICES:
+        title, message = WITHDRAWAL_NOTICES[new_status]
+        batch.notify(withdrawal.get('writerId'), 'payment', title, message.format(amount=_kes(amount)),
+                     withdrawal['id'], 'withdrawal')
+
+@handles('payout_batch.completed')
+def _payout_batch(batch, payload):
+    total = _amount(payload['totalAmount'])
+    batch.adjust(reserved_funds=-total, total_withdrawn=total)
+    paid = db.session.execute(
+        select(WithdrawalRequest.id, WithdrawalRequest.writer_id, WithdrawalRequest.amount)
+        .where(WithdrawalRequest.payout_batch_id == payload['id'])
+    )
+    title, message = WITHDRAWAL_NOTICES['paid']
+    for withdrawal_id, writer_id, amount in paid:
+        batch.notify(writer_id, 'payment', title, message.format(amount=_kes(amount)), withdrawal_id, 'withdrawal')
+
+@handles('invoice.updated')
+def _invoice(batch, payload):
+    invoice = payload['after']
+    old_status, new_status = _status_change(payload)
+    if new_status == old_status:
+        return
+    amount = _amount(invoice['amount'])
+    if new_status == 'approved':
+        batch.pay(writer_id=invoice.get('writerId'), writer_name=invoice.get('writerName'), amount=amount,
+                  currency=invoice.get('currency') or 'KES', type='order_payment', status='pending',
+                  method=invoice.get('paymentMethod'), related_order_id=invoice.get('orderId'),
+                  related_invoice_id=invoice['id'], processed_by=invoice.get('approvedBy'))
+        batch.notify(invoice.get('writerId'), 'payment', 'Invoice approved',
+                     f"Your invoice for \"{invoice.get('orderTitle') or invoice.get('orderId')}\" ({_kes(amount)}) was approved.",
+                     invoice['id'], 'invoice')
+    elif new_status == 'paid':
+        batch.log('invoice_paid', amount, f"Invoice {invoice['id']} paid to {invoice.get('writerName') or invoice.get('writerId')}",
+                  invoice.get('approvedBy'), invoice['id'])
+        batch.notify(invoice.get('writerId'), 'payment', 'Invoice paid',
+                     f"Your invoice for \"{invoice.get('orderTitle') or invoice.get('orderId')}\" ({_kes(amount)}) was paid.",
+                     invoice['id'], 'invoice')
+
+@handles('payment.created', 'payment.updated')
+def _payment(batch, payload):
+    payment = payload['after']
+    old_status, new_status = _status_change(payload)
+    if new_status == 'completed' and old_status != 'completed':
+        batch.notify(payment.get('writerId'), 'payment', 'Payment completed',
+                     f"A payment of {_kes(payment['amount'])} has been sent to you.", payment['id'], 'payment')
+
+@handles('fine.created', 'fine.updated')
+def _fine(batch, payload):
+    fine = payload['after']
+    old_status, new_status = _status_change(payload)
+    amount = _amount(fine['amount'])
+    if payload.get('before') is None and new_status != 'waived':
+        batch.log('fine_applied', amount, f"Fine on {fine.get('writerName') or fine.get('writerId')}: {fine.get('reason') or fine.get('type')}",
+                  fine.get('appliedBy'), fine['id'])
+        batch.notify(fine.get('writerId'), 'fine', 'Fine applied',
+                     f"A fine of {_kes(amount)} was applied: {fine.get('reason') or fine.get('type')}", fine['id'], 'fine')
+    elif new_status == 'waived' and old_status != 'waived':
+        batch.log('fine_waived', amount, f"Fine {fine['id']} waived", fine.get('waivedBy'), fine['id'])
+        batch.notify(fine.get('writerId'), 'fine', 'Fine waived', f"Your fine of {_kes(amount)} was waived.", fine['id'], 'fine')
+
+def _balance_row():
+    """Lock (on PostgreSQL) and return the balance row, creating it empty if missing"""
+    table = PlatformBalance.__table__
+    query = select(table).where(table.c.id == BALANCE_ID).with_for_update()
+    row = db.session.execute(query).mappings().first()
+    if row is None:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(table.insert().values(id=BALANCE_ID, total_funds=0.0, reserved_funds=0.0,
+                                                         total_withdrawn=0.0, updated_at=datetime.utcnow()))
+        except IntegrityError:
+            pass  # another relay created it first
+        row = db.session.execute(query).mappings().one()
+    return row
+
+def _pending(limit):
+    return db.session.execute(
+        select(events.c.id, events.c.topic, events.c.payload)
+        .where(events.c.processed_at.is_(None), events.c.attempts < MAX_ATTEMPTS)
+        .order_by(events.c.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+
+def _record_failures(failures):
+    db.session.rollback()
+    for event_id, error in failures.items():
+        db.session.execute(events.update().where(events.c.id == event_id).values(
+            attempts=events.c.attempts + 1, last_error=error[:2000]
+        ))
+    db.session.commit()
+
+def _handle(pending):
+    """Run the handlers over `pending`; returns (batch, processed ids, {failed id: error})"""
+    batch = Batch(_balance_row())
+    processed, failures = [], {}
+    for event in pending:
+        handler = HANDLERS.get(event.topic)
+        batch.event_id, batch.sequence = event.id, 0
+        try:
+            if handler is not None:
+                handler(batch, json.loads(event.payload))
+        except Exception as e:
+            failures[event.id] = f"{type(e).__name__}: {e}"
+            continue
+        processed.append(event.id)
+    return batch, processed, failures
+
+def relay_batch(limit=BATCH_SIZE):
+    """Apply up to `limit` pending events in one transaction; returns how many were processed"""
+    skipped = set()
+    while True:
+        pending = [event for event in _pending(limit + len(skipped)) if event.id not in skipped][:limit]
+        if not pending:
+            db.session.rollback()
+            return 0
+        batch, processed, failures = _handle(pending)
+        if not failures:
+            break
+        # A failed handler may have adjusted the balance before raising; redo the batch without it
+        _record_failures(failures)
+        skipped.update(failures)
+    
+    # Claim the events before writing anything: a relay that got to them first
+    # makes this count short (on PostgreSQL after waiting for its commit)
+    connection = db.session.connection()
+    marked = connection.execute(
+        events.update()
+        .where(events.c.id.in_(bindparam('ids', expanding=True)), events.c.processed_at.is_(None))
+        .values(processed_at=batch.now),
+        {'ids': processed}
+    ).rowcount
+    if marked != len(processed):
+        db.session.rollback()
+        return 0
+    for model, rows in batch.rows.items():
+        if rows:
+            connection.execute(model.__table__.insert(), rows)
+    if batch.changed:
+        connection.execute(PlatformBalance.__table__.update().where(PlatformBalance.__table__.c.id == BALANCE_ID)
+                           .values(**batch.totals, updated_at=batch.now))
+    db.session.commit()
+    return len(processed)
+
+def relay(limit=None):
+    """Apply pending events batch by batch until none are left (or `limit` were applied)"""
+    total = 0
+    while limit is None or total < limit:
+        count = relay_batch(BATCH_SIZE if limit is None else min(BATCH_SIZE, limit - total))
+        if not count:
+            break
+        total += count
+    return total
+
+def follow(interval=1.0, on_batch=None):
+    """Relay forever, polling every `interval` seconds when the outbox is empty"""
+    while True:
+        count = relay()
+        if count and on_batch:
+            on_batch(count)
+        if not count:
+            time.sleep(interval)
+
+def status():
+    """Pending / parked counts and the oldest pending event's age"""
+    pending = events.c.processed_at.is_(None)
+    waiting, oldest = db.session.execute(
+        select(func.count(), func.min(events.c.created_at)).where(pending, events.c.attempts < MAX_ATTEMPTS)
+    ).one()
+    parked = db.session.execute(
+        select(events).where(pending, events.c.attempts >= MAX_ATTEMPTS).order_by(events.c.id).limit(50)
+    ).mappings().all()
+    processed = db.session.execute(select(func.count()).where(events.c.processed_at.isnot(None))).scalar()
+    return {
+        'pending': waiting,
+        'oldestPendingAgeSeconds': round((datetime.utcnow() - oldest).total_seconds(), 1) if oldest else None,
+        'processed': processed,
+        'parked': [{'id': row['id'], 'topic': row['topic'], 'aggregateId': row['aggregate_id'],
+                    'attempts': row['attempts'], 'lastError': row['last_error']} for row in parked]
+    }
+
+def rebuild_balance():
+    """
+    Recompute the platform balance from platform_funds and withdrawal_requests.
+    Drains the outbox first, so pending events are not counted twice.
+    """
+    relay()
+    confirmed = db.session.execute(
+        select(func.coalesce(func.sum(PlatformFunds.amount), 0.0)).where(PlatformFunds.status == 'confirmed')
+    ).scalar()
+    reserved, withdrawn = db.session.execute(select(
+        func.coalesce(func.sum(WithdrawalRequest.amount).filter(WithdrawalRequest.status.in_(RESERVED_WITHDRAWAL_STATUSES)), 0.0),
+        func.coalesce(func.sum(WithdrawalRequest.amount).filter(WithdrawalRequest.status == 'paid'), 0.0)
+    )).one()
+    _balance_row()
+    db.session.execute(PlatformBalance.__table__.update().where(PlatformBalance.id == BALANCE_ID).values(
+        total_funds=confirmed, reserved_funds=reserved, total_withdrawn=withdrawn, updated_at=datetime.utcnow()
+    ))
+    db.session.commit()
+    return db.session.get(PlatformBalance, BALANCE_ID)
@@ -0,0 +1,195 @@
+"""
+Declarative field maps for partial updates.
+
+A field map ties each API key (camelCase) to a model column and says how an
+incoming value is coerced. Update routes apply a whole payload with
+apply_fields(); PATCH routes apply JSON-Patch style operations with
+apply_patch(). Both only assign columns whose value actually changes, so
+SQLAlchemy writes just the dirty columns, and both return a diff keyed by
+API name instead of the full to_dict().
+"""
+import json
+from datetime import datetime
+
+def parse_datetime(value):
+    """Parse an ISO datetime string (a trailing 'Z' is accepted)"""
+    if not value:
+        return None
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return value
+
+class PatchError(ValueError):
+    """Raised for malformed patch operations; routes turn it into a 400"""
+    pass
+
+class Field:
+    """
+    How one API key maps onto a column.
+    
+    kind:
+        'raw'      - stored as given
+        'optional' - empty values are stored as NULL
+        'datetime' - ISO string parsed to datetime, empty -> NULL
+        'json'     - JSON array/object serialized into a Text column, empty -> NULL
+        'int' / 'float' - numeric, None -> default
+        'bool'     - coerced with bool()
+    skip_empty: ignore the key entirely when its value is empty (e.g. deadline)
+    alias_of: legacy key that is only honoured when the canonical key is absent
+    """
+    def __init__(self, column, kind='optional', default=None, skip_empty=False, alias_of=None):
+        self.column = column
+        self.kind = kind
+        self.default = default
+        self.skip_empty = skip_empty
+        self.alias_of = alias_of
+    
+    def coerce(self, value):
+        if self.kind == 'raw':
+            return value
+        if self.kind == 'optional':
+            return value if value else None
+        if self.kind == 'datetime':
+            return parse_datetime(value)
+        if self.kind == 'json':
+            return json.dumps(value) if value else None
+        if self.kind == 'int':
+            return int(value) if value is not None else self.default
+        if self.kind == 'float':
+            return float(value) if value is not None else self.default
+        if self.kind == 'bool':
+            return bool(value)
+        raise ValueError(f"Unknown field kind: {self.kind}")
+    
+    def serialize(self, stored):
+        """Column value -> API value, matching what to_dict() would emit"""
+        if self.kind == 'datetime':
+            return stored.isoformat() if stored else None
+        if self.kind == 'json':
+            return json.loads(stored) if stored else []
+        if self.kind in ('int', 'float') and stored is None:
+            return self.default
+        return stored
+    
+    def load_list(self, obj):
+        stored = getattr(obj, self.column)
+        value = json.loads(stored) if stored else []
+        if not isinstance(value, list):
+            raise PatchError(f"Field {self.column} is not an array")
+        return value
+
+def _assign(obj, field, stored):
+    """Set the column only if the value differs; returns True when it changed"""
+    if getattr(obj, field.column) == stored:
+        return False
+    setattr(obj, field.column, stored)
+    return True
+
+def apply_fields(obj, fields, data):
+    """
+    Apply a plain payload (PUT / merge-style PATCH).
+    Unknown keys are ignored. Returns {apiKey: newValue} for changed columns.
+    """
+    changes = {}
+    for key, field in fields.items():
+        if key not in data:
+            continue
+        if field.alias_of and field.alias_of in data:
+            continue
+        value = data[key]
+        if field.skip_empty and not value:
+            continue
+        if _assign(obj, field, field.coerce(value)):
+            changes[field.alias_of or key] = field.serialize(getattr(obj, field.column))
+    return changes
+
+def apply_patch(obj, fields, operations):
+    """
+    Apply JSON-Patch style operations (RFC 6902 subset).
+    
+    Supported:
+        {"op": "replace", "path": "/status", "value": "In Progress"}
+        {"op": "add", "path": "/revisionRequests/-", "value": {...}}   # append
+        {"op": "add", "path": "/bids/0", "value": {...}}               # insert
+        {"op": "replace", "path": "/bids/2", "value": {...}}
+        {"op": "remove", "path": "/fineHistory/1"}
+        {"op": "remove", "path": "/assignmentNotes"}                   # clear
+    
+    Returns (changes, appended): `changes` holds new values for scalar fields
+    and for arrays edited in place; `appended` holds only the items appended
+    to arrays that were otherwise untouched.
+    """
+    if not isinstance(operations, list):
+        raise PatchError('Patch must be a list of operations')
+    
+    changes = {}
+    appended = {}
+    lists = {}  # key -> working copy of an array column
+    
+    for operation in operations:
+        if not isinstance(operation, dict):
+            raise PatchError('Each patch operation must be an object')
+        op = operation.get('op')
+        path = operation.get('path', '')
+        if op not in ('add', 'replace', 'remove'):
+            raise PatchError(f"Unsupported op: {op}")
+        if not path.startswith('/'):
+            raise PatchError(f"Invalid path: {path}")
+        if op != 'remove' and 'value' not in operation:
+            raise PatchError(f"Missing value for {op} {path}")
+        
+        parts = path[1:].split('/')
+        key = parts[0]
+        field = fields.get(key)
+        if not field or field.alias_of:
+            raise PatchError(f"Unknown field: {key}")
+        
+        if len(parts) == 1:
+            value = operation.get('value') if op != 'remove' else None
+            lists.pop(key, None)
+            appended.pop(key, None)
+            if _assign(obj, field, field.coerce(value)):
+                changes[key] = field.serialize(getattr(obj, field.column))
+            continue
+        
+        if field.kind != 'json' or len(parts) != 2:
+            raise PatchError(f"Invalid path: {path}")
+        
+        if key not in lists:
+            lists[key] = field.load_list(obj)
+        items = lists[key]
+        index = parts[1]
+        
+        if index == '-':
+            if op != 'add':
+                raise PatchError(f"'-' is only valid with add: {path}")
+            items.append(operation['value'])
+            if key not in changes:
+                appended.setdefault(key, []).append(operation['value'])
+            continue
+        
+        try:
+            position = int(index)
+        except ValueError:
+            raise PatchError(f"Invalid array index: {path}")
+        limit = len(items) + 1 if op == 'add' else len(items)
+        if position < 0 or position >= limit:
+            raise PatchError(f"Array index out of range: {path}")
+        
+        if op == 'add':
+            items.insert(position, operation['value'])
+        elif op == 'replace':
+            items[position] = operation['value']
+        else:
+            items.pop(position)
+        # An in-place edit means the client needs the whole array back
+        appended.pop(key, None)
+        changes[key] = items
+    
+    for key, items in lists.items():
+        field = fields[key]
+        setattr(obj, field.column, json.dumps(items) if items else None)
+        if key in changes:
+            changes[key] = items
+    
+    return changes, appended
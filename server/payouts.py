@@ -0,0 +1,232 @@
+"""
+Payout batches: pay approved withdrawals in bulk.
+
+Paying withdrawals one by one costs a withdrawal update, a Payment and a
+TransactionLog per request, each its own round trip and commit. A batch
+does the whole run in one transaction:
+
+    1. insert the PayoutBatch row (its idempotency key is unique)
+    2. claim the approved withdrawals with one UPDATE ... RETURNING, whose
+       candidate subquery locks rows FOR UPDATE SKIP LOCKED on PostgreSQL,
+       so two batches never pay the same withdrawal
+    3. bulk-insert one Payment and one 'withdrawal_paid' TransactionLog each
+    4. write the settlement CSV (what the bank / mobile money upload needs)
+       to file storage and link it to the batch
+
+Retrying with the same idempotency key returns the batch that was already
+made instead of paying again. Because the batch row is written first, a
+concurrent duplicate waits on the unique key and then gets that batch too.
+A key reused with a different selection is rejected.
+"""
+import csv
+import hashlib
+import io
+import json
+import tempfile
+import uuid
+from datetime import datetime
+
+from sqlalchemy import literal, select, update
+from sqlalchemy.exc import IntegrityError
+
+from db import db
+from files import record_file
+from models import Payment, PayoutBatch, TransactionLog, WithdrawalRequest, emit_event
+from patching import parse_datetime
+from storage import get_storage
+
+# Largest number of withdrawals one batch pays
+MAX_BATCH_SIZE = 50000
+
+# Rows per bulk INSERT statement
+INSERT_CHUNK = 1000
+
+# The settlement file stays in memory up to this size, then spills to disk
+SPOOL_BYTES = 8 * 1024 * 1024
+
+SETTLEMENT_COLUMNS = ('reference', 'withdrawalId', 'writerId', 'writerName', 'amount', 'currency', 'method',
+                      'bankName', 'accountNumber', 'mobileNumber', 'paypalEmail')
+
+class PayoutError(Exception):
+    """Client-visible payout failure; routes return {'error': message} with `status`"""
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+def parse_selection(data):
+    """Which approved withdrawals a batch pays, normalized so equal requests hash equally"""
+    try:
+        limit = int(data.get('limit') or MAX_BATCH_SIZE)
+    except (TypeError, ValueError):
+        raise PayoutError('limit must be an integer')
+    if not 1 <= limit <= MAX_BATCH_SIZE:
+        raise PayoutError(f"limit must be between 1 and {MAX_BATCH_SIZE}")
+    try:
+        approved_before = parse_datetime(data.get('approvedBefore'))
+    except ValueError as e:
+        raise PayoutError(f"Invalid approvedBefore: {e}")
+    for key in ('writerIds', 'withdrawalIds'):
+        if data.get(key) is not None and not isinstance(data[key], list):
+            raise PayoutError(f"{key} must be a list")
+    return {
+        'method': data.get('method') or None,
+        'currency': data.get('currency') or 'KES',
+        'writerIds': sorted(set(data.get('writerIds') or [])) or None,
+        'withdrawalIds': sorted(set(data.get('withdrawalIds') or [])) or None,
+        'approvedBefore': approved_before.isoformat() if approved_before else None,
+        'limit': limit
+    }
+
+def selection_hash(selection):
+    return hashlib.sha256(json.dumps(selection, sort_keys=True).encode()).hexdigest()
+
+def _claim(batch_id, selection, paid_by, now):
+    """Mark the selected approved withdrawals paid by this batch; returns the claimed rows"""
+    table = WithdrawalRequest.__table__
+    unpaid = (table.c.status == 'approved', table.c.payout_batch_id.is_(None), table.c.currency == selection['currency'])
+    candidates = select(table.c.id).where(*unpaid)
+    if selection['method']:
+        candidates = candidates.where(table.c.method == selection['method'])
+    if selection['writerIds']:
+        candidates = candidates.where(table.c.writer_id.in_(selection['writerIds']))
+    if selection['withdrawalIds']:
+        candidates = candidates.where(table.c.id.in_(selection['withdrawalIds']))
+    if selection['approvedBefore']:
+        candidates = candidates.where(table.c.approved_at < parse_datetime(selection['approvedBefore']))
+    candidates = candidates.order_by(table.c.approved_at, table.c.id).limit(selection['limit']).with_for_update(skip_locked=True)
+    
+    result = db.session.execute(
+        update(table)
+        .where(table.c.id.in_(candidates), *unpaid)
+        .values(
+            status='paid',
+            payout_batch_id=batch_id,
+            paid_by=paid_by,
+            paid_at=now,
+            payment_reference=literal(f"{batch_id}-") + table.c.id
+        )
+        .returning(table.c.id, table.c.writer_id, table.c.writer_name, table.c.amount, table.c.currency,
+                   table.c.method, table.c.account_details, table.c.payment_reference)
+    )
+    return sorted(result.all(), key=lambda row: row.id)
+
+def _insert_chunked(model, rows):
+    connection = db.session.connection()
+    for offset in range(0, len(rows), INSERT_CHUNK):
+        connection.execute(model.__table__.insert(), rows[offset:offset + INSERT_CHUNK])
+
+def _ledger_rows(batch_id, claimed, paid_by, now):
+    payments, logs = [], []
+    for row in claimed:
+        payments.append({
+            'id': f"PMT-{uuid.uuid4().hex[:12].upper()}",
+            'writer_id': row.writer_id,
+            'writer_name': row.writer_name,
+            'amount': row.amount,
+            'currency': row.currency,
+            'type': 'withdrawal',
+            'status': 'completed',
+            'method': row.method,
+            'reference': row.payment_reference,
+            'notes': f"Payout batch {batch_id}",
+            'processed_by': paid_by,
+            'created_at': now,
+            'processed_at': now,
+            'completed_at': now
+        })
+        logs.append({
+            'id': f"TXN-{uuid.uuid4().hex[:12].upper()}",
+            'type': 'withdrawal_paid',
+            'amount': row.amount,
+            'currency': row.currency,
+            'description': f"Withdrawal {row.id} paid to {row.writer_name or row.writer_id} in payout batch {batch_id}",
+            'performed_by': paid_by,
+            'related_entity_id': row.id,
+            'performed_at': now
+        })
+    return payments, logs
+
+def _store_settlement(batch_id, claimed, created_by):
+    """Write the settlement CSV to file storage and return its StoredFile"""
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES) as spool:
+        text = io.TextIOWrapper(spool, encoding='utf-8', newline='')
+        writer = csv.writer(text)
+        writer.writerow(SETTLEMENT_COLUMNS)
+        for row in claimed:
+            try:
+                account = json.loads(row.account_details) if row.account_details else {}
+            except ValueError:
+                account = {}
+            writer.writerow([row.payment_reference, row.id, row.writer_id, row.writer_name, row.amount, row.currency,
+                             row.method, account.get('bankName'), account.get('accountNumber'),
+                             account.get('mobileNumber'), account.get('paypalEmail')])
+        text.flush()
+        spool.seek(0)
+        sha256, size, _ = get_storage().put_stream(spool)
+        text.detach()
+    return record_file(sha256, size, f"settlement-{batch_id}.csv", 'text/csv', uploaded_by=created_by)
+
+def _existing(idempotency_key, request_hash):
+    batch = PayoutBatch.query.filter_by(idempotency_key=idempotency_key).first()
+    if batch is not None and batch.request_hash != request_hash:
+        raise PayoutError('Idempotency key was already used for a different payout selection', 422)
+    return batch
+
+def create_batch(idempotency_key, data, created_by=None):
+    """
+    Pay the selected approved withdrawals. Returns (batch, created); created
+    is False when the key had already produced a batch and that one is returned.
+    """
+    if not idempotency_key:
+        raise PayoutError('An Idempotency-Key header (or idempotencyKey field) is required')
+    selection = parse_selection(data)
+    request_hash = selection_hash(selection)
+    existing = _existing(idempotency_key, request_hash)
+    if existing is not None:
+        return existing, False
+    
+    now = datetime.utcnow()
+    batch = PayoutBatch(
+        id=f"PB-{uuid.uuid4().hex[:12].upper()}",
+        idempotency_key=idempotency_key,
+        request_hash=request_hash,
+        status='completed',
+        method=selection['method'],
+        currency=selection['currency'],
+        created_by=created_by,
+        notes=data.get('notes'),
+        created_at=now
+    )
+    try:
+        # Taking the key first makes a concurrent retry wait here rather than pay other withdrawals
+        db.session.add(batch)
+        db.session.flush()
+        
+        claimed = _claim(batch.id, selection, created_by, now)
+        if not claimed:
+            raise PayoutError('No approved withdrawals match this payout selection', 409)
+        
+        payments, logs = _ledger_rows(batch.id, claimed, created_by, now)
+        _insert_chunked(Payment, payments)
+        _insert_chunked(TransactionLog, logs)
+        
+        stored = _store_settlement(batch.id, claimed, created_by)
+        db.session.flush()
+        batch.settlement_file_id = stored.id
+        batch.withdrawal_count = len(claimed)
+        batch.total_amount = round(sum(row.amount or 0 for row in claimed), 2)
+        # The claim skipped the withdrawal listeners; the relay moves the balance and notifies writers
+        emit_event(db.session.connection(), 'payout_batch.completed', batch.id, {
+            'id': batch.id, 'withdrawalCount': batch.withdrawal_count, 'totalAmount': batch.total_amount
+        })
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        existing = _existing(idempotency_key, request_hash)
+        if existing is None:
+            raise
+        return existing, False
+    except BaseException:
+        db.session.rollback()
+        raise
+    return batch, True
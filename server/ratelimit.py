@@ -0,0 +1,210 @@
+"""
+Token-bucket rate limiting per client and route.
+
+Every request takes one token from the bucket for (scope, client):
+
+    scope   the first of `<blueprint>.<view>`, `<blueprint>` and `default`
+            that has an entry in the limits (DEFAULT_LIMITS, overridden by
+            the RATE_LIMITS config / env JSON)
+    client  the client address. Nothing the client sends (headers, query
+            params) picks the bucket, so it cannot be rotated to get fresh
+            ones. Behind a proxy set PROXY_FIX_X_FOR (app.py) so the address
+            is the client's and not the proxy's.
+
+A limit is written '<rate>/<second|minute|hour> [burst <n>]': buckets refill at
+`rate` and hold `burst` tokens (default: the rate). A limit of null disables
+limiting for that scope. An empty bucket gets a 429 with `Retry-After`
+(seconds until the next token) and the view does not run.
+
+Buckets live in one of two stores (RATE_LIMIT_STORE):
+
+    memory   this process only (default); each worker limits on its own
+    redis    shared by every worker and host (RATE_LIMIT_REDIS_URL, needs the
+             redis package); the bucket update is one Lua script, so it is
+             atomic, and a Redis error lets the request through
+
+Any object with take(key, limit) -> (allowed, retry_after) can be plugged in
+as a store with init_app(app, store=...).
+"""
+import json
+import math
+import re
+import threading
+import time
+from collections import namedtuple
+
+from flask import jsonify, request
+
+import metrics
+
+Limit = namedtuple('Limit', 'rate burst')
+
+DEFAULT_LIMITS = {
+    'default': '20/second burst 40',
+    # List and filter queries here are the heaviest reads on the SQLite writer
+    'orders': '5/second burst 20',
+    # Password guessing
+    'auth': '10/minute burst 10',
+    # Load balancer checks
+    'health': None
+}
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600}
+LIMIT_FORMAT = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*/\s*(second|minute|hour)\s*(?:burst\s+(\d+))?\s*$')
+
+class RateLimitError(Exception):
+    pass
+
+def parse_limit(value):
+    """'10/second burst 20' -> Limit(rate per second, burst); None stays None"""
+    if value is None:
+        return None
+    match = LIMIT_FORMAT.match(value)
+    if not match:
+        raise RateLimitError(f"Invalid rate limit {value!r} (expected e.g. '10/second burst 20')")
+    count, period, burst = match.groups()
+    rate = float(count) / PERIODS[period]
+    return Limit(rate, int(burst) if burst else max(1, math.ceil(float(count))))
+
+class MemoryStore:
+    """Buckets in this process, as key -> [tokens, updated at]"""
+    # Full buckets are dropped this often; a missing bucket counts as full
+    SWEEP_INTERVAL = 60.0
+    
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._next_sweep = clock() + self.SWEEP_INTERVAL
+    
+    def take(self, key, limit):
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(limit.burst), now, limit]
+            else:
+                bucket[0] = min(limit.burst, bucket[0] + (now - bucket[1]) * limit.rate)
+                bucket[1] = now
+            if now >= self._next_sweep:
+                self._sweep(now)
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return True, 0.0
+            return False, (1 - bucket[0]) / limit.rate
+    
+    def _sweep(self, now):
+        self._next_sweep = now + self.SWEEP_INTERVAL
+        full = [key for key, (tokens, updated, limit) in self._buckets.items()
+                if tokens + (now - updated) * limit.rate >= limit.burst]
+        for key in full:
+            del self._buckets[key]
+    
+    def __len__(self):
+        return len(self._buckets)
+
+class RedisStore:
+    """Buckets in Redis, shared by every process; Redis' clock is the only clock"""
+    SCRIPT = """
+        local rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+        local time = redis.call('TIME')
+        local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+        local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+        local tokens = tonumber(bucket[1]) or burst
+        if bucket[2] then tokens = math.min(burst, tokens + (now - tonumber(bucket[2])) * rate) end
+        local allowed = 0
+        if tokens >= 1 then
+            tokens = tokens - 1
+            allowed = 1
+        end
+        redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'at', tostring(now))
+        redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+        return {allowed, tostring(tokens)}
+    """
+    
+    def __init__(self, url, prefix='ratelimit:'):
+        try:
+            import redis
+        except ImportError:
+            raise RateLimitError('RATE_LIMIT_STORE=redis requires redis (pip install redis)')
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._take = self.client.register_script(self.SCRIPT)
+    
+    def take(self, key, limit):
+        allowed, tokens = self._take(keys=[self.prefix + key], args=[limit.rate, limit.burst])
+        if allowed:
+            return True, 0.0
+        return False, (1 - float(tokens)) / limit.rate
+
+class RateLimiter:
+    def __init__(self, limits, store):
+        self.limits = {scope: parse_limit(value) for scope, value in limits.items()}
+        self.store = store
+        self._scopes = {}  # endpoint -> (scope, limit)
+    
+    def scope_for(self, endpoint, blueprint):
+        """The configured scope and limit for an endpoint (cached)"""
+        resolved = self._scopes.get(endpoint)
+        if resolved is None:
+            for scope in (endpoint, blueprint, 'default'):
+                if scope in self.limits:
+                    resolved = (scope, self.limits[scope])
+                    break
+            else:
+                resolved = (None, None)
+            self._scopes[endpoint] = resolved
+        return resolved
+    
+    def retry_after(self, endpoint, blueprint, client):
+        """None if `client` may call `endpoint` now, else the seconds until its bucket has a token"""
+        scope, limit = self.scope_for(endpoint, blueprint)
+        if limit is None:
+            return None
+        try:
+            allowed, retry_after = self.store.take(f"{scope}:{client}", limit)
+        except Exception:
+            # A shared store being down must not take the API down with it
+            metrics.increment('ratelimit.store_errors')
+            return None
+        if allowed:
+            return None
+        metrics.increment(f'ratelimit.limited.{scope}')
+        return retry_after
+    
+    def check(self):
+        """before_request hook: None to go on, or a 429 response"""
+        if request.method == 'OPTIONS' or request.endpoint is None:
+            return None
+        retry_after = self.retry_after(request.endpoint, request.blueprint, request.remote_addr)
+        if retry_after is None:
+            return None
+        body, header = too_many_requests(retry_after)
+        response = jsonify(body)
+        response.status_code = 429
+        response.headers['Retry-After'] = header
+        return response
+
+def too_many_requests(retry_after):
+    """(JSON body, Retry-After header value) of a 429"""
+    return {'error': 'Too many requests', 'retryAfter': round(retry_after, 3)}, str(max(1, math.ceil(retry_after)))
+
+def create_store(config):
+    backend = config.get('RATE_LIMIT_STORE', 'memory')
+    if backend == 'memory':
+        return MemoryStore()
+    if backend == 'redis':
+        return RedisStore(config['RATE_LIMIT_REDIS_URL'])
+    raise RateLimitError(f"Unknown RATE_LIMIT_STORE: {backend}")
+
+def init_app(app, store=None):
+    """Limit every request of `app`, unless RATE_LIMIT_ENABLED is off"""
+    if not app.config.get('RATE_LIMIT_ENABLED', True):
+        return None
+    configured = app.config.get('RATE_LIMITS') or {}
+    if isinstance(configured, str):
+        configured = json.loads(configured)
+    limiter = RateLimiter({**DEFAULT_LIMITS, **configured}, store or create_store(app.config))
+    app.extensions['ratelimit'] = limiter
+    app.before_request(limiter.check)
+    return limiter
@@ -0,0 +1,162 @@
+"""
+Writer rating aggregates.
+
+writer_rating_stats holds, per writer and category, the running sum and
+count of ratings plus a 1-5 star histogram. The review listeners in
+models.py keep it current inside the same flush that writes the review
+(atomic `sum = sum + x` increments, so concurrent reviews do not lose
+updates) and copy the overall average onto writers.rating / total_reviews.
+Reading a writer's rating, distribution or category averages is then a
+primary-key lookup instead of a scan over reviews.
+
+rebuild() recomputes everything from the reviews table with grouped queries
+(`flask ratings rebuild`), for the first deploy or after bulk edits that
+bypassed the ORM, and refreshes the merit scores that include the rating.
+A writer whose rating no counted review backs (imported or seeded profiles)
+keeps it: rebuild() turns writers.rating / total_reviews into that writer's
+REVIEW_RATING row, so later reviews average in with it. Once the writer has
+reviews of their own, a rebuild counts only those.
+"""
+from sqlalchemy import bindparam, func, or_, select, text
+
+from db import db
+import merit
+from models import (
+    REVIEW_RATING, UNCOUNTED_REVIEW_STATUSES, Review, Writer, WriterRatingStat,
+    review_contributions, sync_writer_rating
+)
+
+# Category stats straight from the JSON column, where the database can expand JSON arrays
+CATEGORY_QUERIES = {
+    'sqlite': """
+        SELECT r.writer_id, json_extract(c.value, '$.category'), json_extract(c.value, '$.rating'), count(*)
+        FROM reviews r, json_each(CASE WHEN json_valid(r.categories) AND json_type(r.categories) = 'array'
+                                       THEN r.categories ELSE '[]' END) c
+        WHERE r.writer_id IS NOT NULL AND (r.status IS NULL OR r.status NOT IN :uncounted)
+          AND json_extract(c.value, '$.category') IS NOT NULL
+          AND json_type(c.value, '$.rating') IN ('integer', 'real')
+        GROUP BY 1, 2, 3
+    """,
+    'postgresql': """
+        SELECT r.writer_id, c->>'category', (c->>'rating')::float, count(*)
+        FROM reviews r CROSS JOIN LATERAL json_array_elements(COALESCE(NULLIF(r.categories, ''), '[]')::json) c
+        WHERE r.writer_id IS NOT NULL AND (r.status IS NULL OR r.status NOT IN :uncounted)
+          AND c->>'category' IS NOT NULL AND json_typeof(c->'rating') = 'number'
+        GROUP BY 1, 2, 3
+    """,
+}
+
+def _counted(query):
+    return query.where(Review.writer_id.isnot(None), or_(Review.status.is_(None), Review.status.notin_(UNCOUNTED_REVIEW_STATUSES)))
+
+def _category_rows():
+    """(writer_id, category, rating, count) for every category rating in counted reviews"""
+    sql = CATEGORY_QUERIES.get(db.engine.dialect.name)
+    if sql is not None:
+        statement = text(sql).bindparams(bindparam('uncounted', expanding=True))
+        return db.session.execute(statement, {'uncounted': list(UNCOUNTED_REVIEW_STATUSES)}).all()
+    
+    # Other databases: stream the column and group in Python
+    totals = {}
+    rows = db.session.execute(
+        select(Review.writer_id, Review.categories, Review.status).execution_options(yield_per=1000)
+    )
+    for writer_id, categories, status in rows:
+        for category, value in review_contributions(writer_id, None, categories, status).items():
+            key = (writer_id, category, value)
+            totals[key] = totals.get(key, 0) + 1
+    return [(*key, count) for key, count in totals.items()]
+
+def rebuild():
+    """
+    Replace every writer_rating_stats row with totals recomputed from reviews
+    and resync writers.rating / total_reviews. Runs in the caller's
+    transaction; the caller commits. Returns (writers, stat rows).
+    """
+    overall = db.session.execute(
+        _counted(select(Review.writer_id, Review.rating, func.count()).where(Review.rating.isnot(None)))
+        .group_by(Review.writer_id, Review.rating)
+    ).all()
+    rows = [(writer_id, REVIEW_RATING, rating, count) for writer_id, rating, count in overall]
+    rows += _category_rows()
+    
+    stats = {}
+    for writer_id, category, rating, count in rows:
+        entry = stats.setdefault((writer_id, category), {
+            'writer_id': writer_id, 'category': category, 'rating_sum': 0.0, 'rating_count': 0,
+            'stars_1': 0, 'stars_2': 0, 'stars_3': 0, 'stars_4': 0, 'stars_5': 0
+        })
+        rating = float(rating)
+        entry['rating_sum'] += rating * count
+        entry['rating_count'] += count
+        entry[f"stars_{min(5, max(1, int(round(rating))))}"] += count
+    
+    # Ratings without reviews behind them become the writer's starting totals
+    imported = db.session.execute(
+        select(Writer.id, Writer.rating, Writer.total_reviews).where(Writer.total_reviews > 0, Writer.rating.isnot(None))
+    ).all()
+    for writer_id, rating, count in imported:
+        if (writer_id, REVIEW_RATING) not in stats:
+            entry = stats[(writer_id, REVIEW_RATING)] = {
+                'writer_id': writer_id, 'category': REVIEW_RATING, 'rating_sum': float(rating) * count, 'rating_count': count,
+                'stars_1': 0, 'stars_2': 0, 'stars_3': 0, 'stars_4': 0, 'stars_5': 0
+            }
+            entry[f"stars_{min(5, max(1, int(round(rating))))}"] = count
+    
+    connection = db.session.connection()
+    connection.execute(WriterRatingStat.__table__.delete())
+    if stats:
+        connection.execute(WriterRatingStat.__table__.insert(), list(stats.values()))
+    sync_writer_rating(connection)
+    # Merit scores include the rating, so bring them in line too
+    merit.refresh_scores()
+    return len({writer_id for writer_id, _ in stats}), len(stats)
+
+def rating_summary(writer_id=None):
+    """Totals, star distribution and per-category averages for one writer or the platform"""
+    query = db.session.query(
+        WriterRatingStat.category,
+        func.sum(WriterRatingStat.rating_sum),
+        func.sum(WriterRatingStat.rating_count),
+        *[func.sum(getattr(WriterRatingStat, f'stars_{star}')) for star in range(1, 6)]
+    ).group_by(WriterRatingStat.category)
+    if writer_id:
+        query = query.filter(WriterRatingStat.writer_id == writer_id)
+    
+    by_category = {}
+    for category, rating_sum, rating_count, *stars in query.all():
+        by_category[category] = {
+            'average': round(rating_sum / rating_count, 2) if rating_count else 0.0,
+            'count': int(rating_count or 0),
+            'distribution': {star: int(stars[star - 1] or 0) for star in range(1, 6)}
+        }
+    
+    overall = by_category.pop(REVIEW_RATING, {'average': 0.0, 'count': 0, 'distribution': {star: 0 for star in range(1, 6)}})
+    return {
+        'totalReviews': overall['count'],
+        'averageRating': overall['average'],
+        'ratingDistribution': overall['distribution'],
+        'categoryAverages': {category: values['average'] for category, values in by_category.items()},
+        'categoryCounts': {category: values['count'] for category, values in by_category.items()}
+    }
+
+def review_stats(writer_id=None):
+    """ReviewStats for the API: rating_summary() plus the latest reviews and top-rated writers"""
+    recent = Review.query
+    if writer_id:
+        recent = recent.filter(Review.writer_id == writer_id)
+    top = Writer.query.with_entities(Writer.id, Writer.name, Writer.rating, Writer.total_reviews).filter(
+        Writer.total_reviews > 0
+    ).order_by(Writer.rating.desc(), Writer.total_reviews.desc(), Writer.id).limit(10)
+    
+    return {
+        'writerId': writer_id,
+        **rating_summary(writer_id),
+        'recentReviews': [r.to_dict() for r in recent.order_by(Review.created_at.desc()).limit(5)],
+        'topPerformers': [{
+            'writerId': w.id,
+            'writerName': w.name,
+            'averageRating': w.rating,
+            'totalReviews': w.total_reviews
+        } for w in top]
+    }
@@ -0,0 +1,99 @@
+from flask import Blueprint, current_app, request, jsonify
+from models import StoredFile
+from db import db
+from files import record_file, remove_file
+from listing import ListQuery
+from storage import get_storage, StorageError, UploadTooLarge
+import metrics
+import os
+from urllib.parse import unquote
+
+bp = Blueprint('files', __name__, url_prefix='/api/files')
+
+FILE_LIST = ListQuery(StoredFile, filters={
+    'relatedOrderId': StoredFile.related_order_id,
+    'uploadedBy': StoredFile.uploaded_by,
+    'sha256': StoredFile.sha256,
+    'createdAt': StoredFile.created_at,
+}, sorts={
+    'createdAt': StoredFile.created_at,
+    'size': StoredFile.size,
+}, default_sort='-createdAt')
+
+@bp.route('', methods=['GET'])
+def get_files():
+    return FILE_LIST.respond(request.args)
+
+@bp.route('', methods=['POST'])
+def upload_file():
+    """
+    Streaming upload. Either send the raw bytes as the body (name in the
+    X-Filename header, percent-encoded, or ?filename=) or a multipart form with a `file` field.
+    Optional: orderId and uploadedBy as query params or form fields.
+    """
+    if request.mimetype == 'multipart/form-data':
+        # Werkzeug spools large parts to a temp file, so this still streams
+        upload = request.files.get('file')
+        if not upload:
+            return jsonify({'error': 'No file field in form'}), 400
+        stream = upload.stream
+        original_name = upload.filename
+        content_type = upload.mimetype
+        fields = request.form
+    else:
+        stream = request.stream
+        # Header values are latin-1, so clients percent-encode non-ASCII names
+        original_name = unquote(request.headers.get('X-Filename', '')) or request.args.get('filename')
+        content_type = request.mimetype
+        fields = request.args
+    
+    if not original_name:
+        return jsonify({'error': 'Filename is required'}), 400
+    
+    try:
+        sha256, size, created = get_storage().put_stream(stream, max_bytes=current_app.config.get('MAX_UPLOAD_BYTES'))
+    except UploadTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    except StorageError as e:
+        return jsonify({'error': str(e)}), 500
+    
+    stored = record_file(
+        sha256, size, os.path.basename(original_name), content_type,
+        uploaded_by=fields.get('uploadedBy'),
+        related_order_id=fields.get('orderId')
+    )
+    db.session.commit()
+    metrics.increment('files.uploaded')
+    metrics.increment('files.deduplicated' if not created else 'files.stored')
+    
+    result = stored.to_dict()
+    result['deduplicated'] = not created
+    return jsonify(result), 201
+
+@bp.route('/<file_id>', methods=['GET'])
+def download_file(file_id):
+    """Download with Range support (resumable downloads, media seeking)"""
+    stored = StoredFile.query.get(file_id)
+    if not stored:
+        return jsonify({'error': 'File not found'}), 404
+    try:
+        return get_storage().download_response(stored.sha256, stored.original_name or stored.id, stored.content_type)
+    except StorageError as e:
+        return jsonify({'error': str(e)}), 410
+
+@bp.route('/<file_id>/info', methods=['GET'])
+def get_file_info(file_id):
+    stored = StoredFile.query.get(file_id)
+    if not stored:
+        return jsonify({'error': 'File not found'}), 404
+    return jsonify(stored.to_dict()), 200
+
+@bp.route('/<file_id>', methods=['DELETE'])
+def delete_file(file_id):
+    stored = StoredFile.query.get(file_id)
+    if not stored:
+        return jsonify({'error': 'File not found'}), 404
+    
+    remove_file(stored)
+    db.session.commit()
+    return jsonify({'message': 'File deleted'}), 200
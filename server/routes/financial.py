@@ -1,27 +1,65 @@
-from flask import Blueprint, request, jsonify
-from models import Invoice, Fine, Payment, ClientPayment, PlatformFunds, WithdrawalRequest, TransactionLog
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from models import Invoice, Fine, Payment, ClientPayment, PlatformFunds, WithdrawalRequest, TransactionLog, PayoutBatch, PlatformBalance
 from db import db
+from listing import ListQuery
+from patching import Field, apply_fields
+import invoicing
+import outbox
+import payouts
+from payouts import PayoutError
+import statements
+from statements import StatementError
 import json as json_lib
 from datetime import datetime
+from idempotency import idempotent
 
 bp = Blueprint('financial', __name__, url_prefix='/api/financial')
 
+def update_record(model, record_id, fields, stamps, label):
+    """
+    PUT for financial records: apply `fields`, stamp the time column for a
+    status in `stamps` if the client left it empty, and commit. Status changes
+    reach the outbox (models.OUTBOX_SOURCES) in the same transaction, and the
+    relay makes the payments, logs, balance moves and notifications that follow.
+    """
+    record = model.query.get(record_id)
+    if not record:
+        return jsonify({'error': f'{label} not found'}), 404
+    data = request.get_json(silent=True) or {}
+    try:
+        apply_fields(record, fields, data)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid value: {e}'}), 400
+    column = stamps.get(record.status)
+    if column and getattr(record, column) is None:
+        setattr(record, column, datetime.utcnow())
+    db.session.commit()
+    return jsonify(record.to_dict()), 200
+
 # Invoices
+INVOICE_LIST = ListQuery(Invoice, filters={
+    'writerId': Invoice.writer_id,
+    'orderId': Invoice.order_id,
+    'status': Invoice.status,
+    'type': Invoice.type,
+    'amount': Invoice.amount,
+    'createdAt': Invoice.created_at,
+    'updatedAt': Invoice.updated_at,
+    'approvedAt': Invoice.approved_at,
+    'paidAt': Invoice.paid_at,
+}, sorts={
+    'createdAt': Invoice.created_at,
+    'updatedAt': Invoice.updated_at,
+    'paidAt': Invoice.paid_at,
+    'amount': Invoice.amount,
+}, default_sort='-createdAt')
+
 @bp.route('/invoices', methods=['GET'])
 def get_invoices():
-    writer_id = request.args.get('writerId')
-    status = request.args.get('status')
-    
-    query = Invoice.query
-    if writer_id:
-        query = query.filter_by(writer_id=writer_id)
-    if status:
-        query = query.filter_by(status=status)
-    
-    invoices = query.all()
-    return jsonify([invoice.to_dict() for invoice in invoices]), 200
+    return INVOICE_LIST.respond(request.args)
 
 @bp.route('/invoices', methods=['POST'])
+@idempotent
 def create_invoice():
     data = request.get_json()
     import uuid
@@ -44,17 +82,59 @@ def create_invoice():
     db.session.commit()
     return jsonify(invoice.to_dict()), 201
 
+INVOICE_FIELDS = {
+    'status': Field('status', 'raw', skip_empty=True),
+    'approvedBy': Field('approved_by'),
+    'approvedAt': Field('approved_at', 'datetime'),
+    'paidAt': Field('paid_at', 'datetime'),
+    'paymentMethod': Field('payment_method'),
+    'paymentReference': Field('payment_reference'),
+    'notes': Field('notes'),
+}
+
+@bp.route('/invoices/<invoice_id>', methods=['PUT'])
+def update_invoice(invoice_id):
+    return update_record(Invoice, invoice_id, INVOICE_FIELDS, {'approved': 'approved_at', 'paid': 'paid_at'}, 'Invoice')
+
+@bp.route('/invoices/generate', methods=['POST'])
+def generate_invoices():
+    """
+    Create order_completion invoices for completed orders. Body: mode
+    ('incremental', the default: since the last run; or 'backfill'), and for
+    backfill optional from / to (completedAt range) and dryRun.
+    """
+    data = request.get_json(silent=True) or {}
+    mode = data.get('mode') or 'incremental'
+    if mode == 'incremental':
+        return jsonify(invoicing.run_incremental()), 200
+    if mode != 'backfill':
+        return jsonify({'error': "mode must be 'incremental' or 'backfill'"}), 400
+    try:
+        start = invoicing.parse_bound(data.get('from'))
+        end = invoicing.parse_bound(data.get('to'))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid date: {e}'}), 400
+    return jsonify(invoicing.backfill(start, end, dry_run=bool(data.get('dryRun')))), 200
+
 # Fines
+FINE_LIST = ListQuery(Fine, filters={
+    'writerId': Fine.writer_id,
+    'orderId': Fine.order_id,
+    'status': Fine.status,
+    'type': Fine.type,
+    'amount': Fine.amount,
+    'appliedAt': Fine.applied_at,
+}, sorts={
+    'appliedAt': Fine.applied_at,
+    'amount': Fine.amount,
+}, default_sort='-appliedAt')
+
 @bp.route('/fines', methods=['GET'])
 def get_fines():
-    writer_id = request.args.get('writerId')
-    query = Fine.query
-    if writer_id:
-        query = query.filter_by(writer_id=writer_id)
-    fines = query.all()
-    return jsonify([fine.to_dict() for fine in fines]), 200
+    return FINE_LIST.respond(request.args)
 
 @bp.route('/fines', methods=['POST'])
+@idempotent
 def create_fine():
     data = request.get_json()
     import uuid
@@ -76,17 +156,40 @@ def create_fine():
     db.session.commit()
     return jsonify(fine.to_dict()), 201
 
+FINE_FIELDS = {
+    'status': Field('status', 'raw', skip_empty=True),
+    'waivedBy': Field('waived_by'),
+    'waivedReason': Field('waived_reason'),
+    'notes': Field('notes'),
+}
+
+@bp.route('/fines/<fine_id>', methods=['PUT'])
+def update_fine(fine_id):
+    return update_record(Fine, fine_id, FINE_FIELDS, {'waived': 'waived_at'}, 'Fine')
+
 # Payments
+PAYMENT_LIST = ListQuery(Payment, filters={
+    'writerId': Payment.writer_id,
+    'status': Payment.status,
+    'type': Payment.type,
+    'method': Payment.method,
+    'relatedOrderId': Payment.related_order_id,
+    'relatedInvoiceId': Payment.related_invoice_id,
+    'amount': Payment.amount,
+    'createdAt': Payment.created_at,
+    'completedAt': Payment.completed_at,
+}, sorts={
+    'createdAt': Payment.created_at,
+    'completedAt': Payment.completed_at,
+    'amount': Payment.amount,
+}, default_sort='-createdAt')
+
 @bp.route('/payments', methods=['GET'])
 def get_payments():
-    writer_id = request.args.get('writerId')
-    query = Payment.query
-    if writer_id:
-        query = query.filter_by(writer_id=writer_id)
-    payments = query.all()
-    return jsonify([payment.to_dict() for payment in payments]), 200
+    return PAYMENT_LIST.respond(request.args)
 
 @bp.route('/payments', methods=['POST'])
+@idempotent
 def create_payment():
     data = request.get_json()
     import uuid
@@ -106,15 +209,40 @@ def create_payment():
     db.session.add(payment)
     db.session.commit()
     return jsonify(payment.to_dict()), 201
+PAYMENT_FIELDS = {
+    'status': Field('status', 'raw', skip_empty=True),
+    'method': Field('method'),
+    'reference': Field('reference'),
+    'notes': Field('notes'),
+    'processedBy': Field('processed_by'),
+}
+
+@bp.route('/payments/<payment_id>', methods=['PUT'])
+def update_payment(payment_id):
+    return update_record(Payment, payment_id, PAYMENT_FIELDS, {'processing': 'processed_at', 'completed': 'completed_at'}, 'Payment')
+
 
 # Client Payments
+CLIENT_PAYMENT_LIST = ListQuery(ClientPayment, filters={
+    'orderId': ClientPayment.order_id,
+    'clientId': ClientPayment.client_id,
+    'status': ClientPayment.status,
+    'method': ClientPayment.method,
+    'amount': ClientPayment.amount,
+    'receivedAt': ClientPayment.received_at,
+    'createdAt': ClientPayment.created_at,
+}, sorts={
+    'createdAt': ClientPayment.created_at,
+    'receivedAt': ClientPayment.received_at,
+    'amount': ClientPayment.amount,
+}, default_sort='-createdAt')
+
 @bp.route('/clientPayments', methods=['GET'])
 def get_client_payments():
-    query = ClientPayment.query
-    payments = query.all()
-    return jsonify([p.to_dict() for p in payments]), 200
+    return CLIENT_PAYMENT_LIST.respond(request.args)
 
 @bp.route('/clientPayments', methods=['POST'])
+@idempotent
 def create_client_payment():
     data = request.get_json()
     import uuid
@@ -137,13 +265,22 @@ def create_client_payment():
     return jsonify(payment.to_dict()), 201
 
 # Platform Funds
+PLATFORM_FUNDS_LIST = ListQuery(PlatformFunds, filters={
+    'source': PlatformFunds.source,
+    'status': PlatformFunds.status,
+    'amount': PlatformFunds.amount,
+    'addedAt': PlatformFunds.added_at,
+}, sorts={
+    'addedAt': PlatformFunds.added_at,
+    'amount': PlatformFunds.amount,
+}, default_sort='-addedAt')
+
 @bp.route('/platformFunds', methods=['GET'])
 def get_platform_funds():
-    query = PlatformFunds.query
-    funds = query.all()
-    return jsonify([f.to_dict() for f in funds]), 200
+    return PLATFORM_FUNDS_LIST.respond(request.args)
 
 @bp.route('/platformFunds', methods=['POST'])
+@idempotent
 def create_platform_fund():
     data = request.get_json()
     import uuid
@@ -163,14 +300,42 @@ def create_platform_fund():
     db.session.commit()
     return jsonify(fund.to_dict()), 201
 
+PLATFORM_FUND_FIELDS = {
+    'status': Field('status', 'raw', skip_empty=True),
+    'amount': Field('amount', 'float', skip_empty=True),
+    'reference': Field('reference'),
+    'notes': Field('notes'),
+}
+
+@bp.route('/platformFunds/<fund_id>', methods=['PUT'])
+def update_platform_fund(fund_id):
+    return update_record(PlatformFunds, fund_id, PLATFORM_FUND_FIELDS, {}, 'Platform fund')
+
+@bp.route('/balance', methods=['GET'])
+def get_platform_balance():
+    """Platform balance kept by the outbox relay (confirmed funds, reserved and withdrawn)"""
+    balance = db.session.get(PlatformBalance, outbox.BALANCE_ID) or PlatformBalance(
+        total_funds=0.0, reserved_funds=0.0, total_withdrawn=0.0)
+    return jsonify({**balance.to_dict(), 'pendingEvents': outbox.status()['pending']}), 200
+
 # Transaction Logs
+TRANSACTION_LOG_LIST = ListQuery(TransactionLog, filters={
+    'type': TransactionLog.type,
+    'performedBy': TransactionLog.performed_by,
+    'relatedEntityId': TransactionLog.related_entity_id,
+    'amount': TransactionLog.amount,
+    'performedAt': TransactionLog.performed_at,
+}, sorts={
+    'performedAt': TransactionLog.performed_at,
+    'amount': TransactionLog.amount,
+}, default_sort='-performedAt')
+
 @bp.route('/transactionLogs', methods=['GET'])
 def get_transaction_logs():
-    query = TransactionLog.query
-    logs = query.all()
-    return jsonify([log.to_dict() for log in logs]), 200
+    return TRANSACTION_LOG_LIST.respond(request.args)
 
 @bp.route('/transactionLogs', methods=['POST'])
+@idempotent
 def create_transaction_log():
     data = request.get_json()
     import uuid
@@ -192,23 +357,29 @@ def create_transaction_log():
     return jsonify(log.to_dict()), 201
 
 # Withdrawal Requests
+WITHDRAWAL_LIST = ListQuery(WithdrawalRequest, filters={
+    'writerId': WithdrawalRequest.writer_id,
+    'status': WithdrawalRequest.status,
+    'method': WithdrawalRequest.method,
+    'amount': WithdrawalRequest.amount,
+    'requestedAt': WithdrawalRequest.requested_at,
+    'approvedAt': WithdrawalRequest.approved_at,
+    'paidAt': WithdrawalRequest.paid_at,
+    'payoutBatchId': WithdrawalRequest.payout_batch_id,
+}, sorts={
+    'requestedAt': WithdrawalRequest.requested_at,
+    'paidAt': WithdrawalRequest.paid_at,
+    'amount': WithdrawalRequest.amount,
+}, default_sort='-requestedAt')
+
 @bp.route('/withdrawals', methods=['GET'])
 @bp.route('/withdrawalRequests', methods=['GET'])  # Alias for compatibility
 def get_withdrawals():
-    writer_id = request.args.get('writerId')
-    status = request.args.get('status')
-    
-    query = WithdrawalRequest.query
-    if writer_id:
-        query = query.filter_by(writer_id=writer_id)
-    if status:
-        query = query.filter_by(status=status)
-    
-    withdrawals = query.all()
-    return jsonify([w.to_dict() for w in withdrawals]), 200
+    return WITHDRAWAL_LIST.respond(request.args)
 
 @bp.route('/withdrawals', methods=['POST'])
 @bp.route('/withdrawalRequests', methods=['POST'])  # Alias for compatibility
+@idempotent
 def create_withdrawal():
     data = request.get_json()
     import uuid
@@ -228,3 +399,115 @@ def create_withdrawal():
     db.session.commit()
     return jsonify(withdrawal.to_dict()), 201
 
+WITHDRAWAL_FIELDS = {
+    'status': Field('status', 'raw', skip_empty=True),
+    'approvedBy': Field('approved_by'),
+    'rejectedBy': Field('rejected_by'),
+    'rejectionReason': Field('rejection_reason'),
+    'paidBy': Field('paid_by'),
+    'paymentReference': Field('payment_reference'),
+    'notes': Field('notes'),
+}
+
+@bp.route('/withdrawals/<withdrawal_id>', methods=['PUT'])
+@bp.route('/withdrawalRequests/<withdrawal_id>', methods=['PUT'])  # Alias for compatibility
+def update_withdrawal(withdrawal_id):
+    return update_record(WithdrawalRequest, withdrawal_id, WITHDRAWAL_FIELDS,
+                         {'approved': 'approved_at', 'rejected': 'rejected_at', 'paid': 'paid_at'}, 'Withdrawal request')
+
+# Payout batches
+PAYOUT_BATCH_LIST = ListQuery(PayoutBatch, filters={
+    'status': PayoutBatch.status,
+    'method': PayoutBatch.method,
+    'createdBy': PayoutBatch.created_by,
+    'createdAt': PayoutBatch.created_at,
+}, sorts={
+    'createdAt': PayoutBatch.created_at,
+    'totalAmount': PayoutBatch.total_amount,
+}, default_sort='-createdAt')
+
+@bp.route('/payout-batches', methods=['GET'])
+def get_payout_batches():
+    return PAYOUT_BATCH_LIST.respond(request.args)
+
+@bp.route('/payout-batches', methods=['POST'])
+def create_payout_batch():
+    """
+    Pay approved withdrawals in one transaction and produce a settlement CSV.
+    Body (all optional): method, currency, writerIds, withdrawalIds,
+    approvedBefore, limit, processedBy, notes. Requires an Idempotency-Key
+    header; repeating it returns the original batch with 200.
+    """
+    data = request.get_json(silent=True) or {}
+    key = request.headers.get('Idempotency-Key') or data.get('idempotencyKey')
+    try:
+        batch, created = payouts.create_batch(key, data, created_by=data.get('processedBy'))
+    except PayoutError as e:
+        return jsonify({'error': str(e)}), e.status
+    
+    response = jsonify(batch.to_dict())
+    if not created:
+        response.headers['Idempotent-Replay'] = 'true'
+    return response, 201 if created else 200
+
+@bp.route('/payout-batches/<batch_id>', methods=['GET'])
+def get_payout_batch(batch_id):
+    batch = PayoutBatch.query.get(batch_id)
+    if not batch:
+        return jsonify({'error': 'Payout batch not found'}), 404
+    return jsonify(batch.to_dict()), 200
+
+# Outbox
+@bp.route('/outbox', methods=['GET'])
+def get_outbox_status():
+    """Pending and parked outbox events (see outbox.py)"""
+    return jsonify(outbox.status()), 200
+
+# Statements
+
+def statement_params(args):
+    """(start, end, writerId, sections) from ?from=&to=&writerId=&sections="""
+    start, end = statements.parse_range(args.get('from'), args.get('to'))
+    writer_id = args.get('writerId') or None
+    return start, end, writer_id, statements.parse_sections(args.get('sections'), writer_id)
+
+@bp.route('/statement', methods=['GET'])
+def get_statement():
+    """Counts and totals per section (and by status) for a date range, platform-wide or for ?writerId="""
+    try:
+        start, end, writer_id, sections = statement_params(request.args)
+    except StatementError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'writerId': writer_id,
+        'sections': statements.summary(start, end, writer_id, sections)
+    }), 200
+
+@bp.route('/statement/export', methods=['GET'])
+def export_statement():
+    """Stream the ledger for a date range as CSV (default) or Parquet (?format=parquet, needs pyarrow)"""
+    try:
+        start, end, writer_id, sections = statement_params(request.args)
+    except StatementError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    export_format = request.args.get('format', 'csv')
+    if export_format == 'csv':
+        body = statements.export_csv(start, end, writer_id, sections)
+        mimetype = 'text/csv'
+    elif export_format == 'parquet':
+        if not statements.parquet_available():
+            return jsonify({'error': 'Parquet export requires pyarrow (pip install pyarrow)'}), 501
+        body = statements.export_parquet(start, end, writer_id, sections)
+        mimetype = 'application/vnd.apache.parquet'
+    else:
+        return jsonify({'error': 'format must be csv or parquet'}), 400
+    
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    filename = statements.statement_filename(start, end, writer_id, export_format)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
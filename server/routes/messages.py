@@ -1,25 +1,117 @@
 from flask import Blueprint, request, jsonify
-from models import Message
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from models import Message, MessageThread, MessageThreadParticipant
 from db import db
+from datetime import datetime
+from utils import encode_cursor, decode_cursor, parse_limit
+from idempotency import idempotent
+from listing import ListQuery
 
 bp = Blueprint('messages', __name__, url_prefix='/api/messages')
 
+MESSAGE_LIST = ListQuery(Message, filters={
+    'senderId': Message.sender_id,
+    'recipientId': Message.recipient_id,
+    'relatedOrderId': Message.related_order_id,
+    'threadId': Message.thread_id,
+    'isRead': Message.is_read,
+    'createdAt': Message.created_at,
+}, sorts={
+    'createdAt': Message.created_at,
+}, default_sort='-createdAt')
+
+# Page size for ?userId= when the caller does not pass a limit
+USER_HISTORY_PAGE = 50
+
+def make_thread_key(user_a, user_b, related_order_id=None):
+    """Threads are keyed by the unordered participant pair plus the related order"""
+    low, high = sorted([user_a, user_b])
+    return f"{low}|{high}|{related_order_id or ''}"
+
+def get_or_create_thread(message):
+    """
+    Find the thread a new message belongs to, creating it (and its two
+    participant rows) on first contact. Does not commit.
+    
+    Two first messages between the same pair race on the unique thread_key;
+    the insert runs in a savepoint so the loser rolls back only that and
+    picks up the winner's thread.
+    """
+    import uuid
+    
+    thread_key = make_thread_key(message.sender_id, message.recipient_id, message.related_order_id)
+    thread = MessageThread.query.filter_by(thread_key=thread_key).first()
+    if thread:
+        return thread
+    
+    sender = (message.sender_id, message.sender_name, message.sender_role)
+    recipient = (message.recipient_id, message.recipient_name, message.recipient_role)
+    first, second = sorted([sender, recipient], key=lambda p: p[0])
+    
+    thread = MessageThread(
+        id=f"THR-{uuid.uuid4().hex[:10].upper()}",
+        thread_key=thread_key,
+        participant_a_id=first[0],
+        participant_a_name=first[1],
+        participant_a_role=first[2],
+        participant_b_id=second[0],
+        participant_b_name=second[1],
+        participant_b_role=second[2],
+        related_order_id=message.related_order_id,
+        subject=message.subject,
+        message_count=0
+    )
+    try:
+        with db.session.begin_nested():
+            db.session.add(thread)
+            for user_id in {message.sender_id, message.recipient_id}:
+                db.session.add(MessageThreadParticipant(thread_id=thread.id, user_id=user_id, unread_count=0))
+    except IntegrityError:
+        thread = MessageThread.query.filter_by(thread_key=thread_key).first()
+        if thread is None:
+            raise
+    return thread
+
+def record_message_in_thread(thread, message):
+    """Move the thread's last-message pointer and bump the recipient's unread count"""
+    sent_at = message.created_at or datetime.utcnow()
+    message.created_at = sent_at
+    message.thread_id = thread.id
+    
+    thread.last_message_id = message.id
+    thread.last_message_at = sent_at
+    thread.last_message_preview = (message.content or '')[:200]
+    thread.last_sender_id = message.sender_id
+    thread.message_count = MessageThread.message_count + 1
+    
+    MessageThreadParticipant.query.filter_by(thread_id=thread.id).update(
+        {'last_message_at': sent_at}, synchronize_session=False
+    )
+    if message.recipient_id != message.sender_id:
+        MessageThreadParticipant.query.filter_by(thread_id=thread.id, user_id=message.recipient_id).update(
+            {'unread_count': MessageThreadParticipant.unread_count + 1}, synchronize_session=False
+        )
+
 @bp.route('', methods=['GET'])
 def get_messages():
+    """
+    Flat message list (the inbox is /threads). A ?userId= history, sent or
+    received, comes back one page at a time, newest first, with the next
+    page's cursor in X-Next-Cursor.
+    """
     user_id = request.args.get('userId')
-    related_order_id = request.args.get('relatedOrderId')
-    
-    query = Message.query
-    
-    if user_id:
-        query = query.filter((Message.sender_id == user_id) | (Message.recipient_id == user_id))
-    if related_order_id:
-        query = query.filter_by(related_order_id=related_order_id)
+    if not user_id:
+        return MESSAGE_LIST.respond(request.args)
     
-    messages = query.all()
-    return jsonify([m.to_dict() for m in messages]), 200
+    args = request.args.copy()
+    if 'limit' not in args:
+        args['limit'] = str(USER_HISTORY_PAGE)
+    query = Message.query.filter(or_(Message.sender_id == user_id, Message.recipient_id == user_id))
+    return MESSAGE_LIST.respond(args, query, filtered=True)
 
 @bp.route('', methods=['POST'])
+@idempotent
 def create_message():
     data = request.get_json()
     import uuid
@@ -38,6 +130,11 @@ def create_message():
         is_read=False
     )
     
+    # Messages without both participants (e.g. system broadcasts) stay unthreaded
+    if message.sender_id and message.recipient_id:
+        thread = get_or_create_thread(message)
+        record_message_in_thread(thread, message)
+    
     db.session.add(message)
     db.session.commit()
     return jsonify(message.to_dict()), 201
@@ -48,10 +145,131 @@ def mark_message_read(message_id):
     if not message:
         return jsonify({'error': 'Message not found'}), 404
     
+    if not message.is_read and message.thread_id:
+        MessageThreadParticipant.query.filter(
+            MessageThreadParticipant.thread_id == message.thread_id,
+            MessageThreadParticipant.user_id == message.recipient_id,
+            MessageThreadParticipant.unread_count > 0
+        ).update({'unread_count': MessageThreadParticipant.unread_count - 1}, synchronize_session=False)
+    
     message.is_read = True
-    from datetime import datetime
     message.read_at = datetime.utcnow()
     db.session.commit()
     
     return jsonify(message.to_dict()), 200
 
+# Threads
+@bp.route('/threads', methods=['GET'])
+def get_threads():
+    """
+    Inbox for one user, newest activity first.
+    Paginated with an opaque `cursor`; cost depends on page size, not on message volume.
+    """
+    user_id = request.args.get('userId')
+    if not user_id:
+        return jsonify({'error': 'userId is required'}), 400
+    
+    limit = parse_limit(request.args.get('limit'), default=20, maximum=100)
+    cursor = request.args.get('cursor')
+    
+    query = db.session.query(MessageThreadParticipant, MessageThread).join(
+        MessageThread, MessageThread.id == MessageThreadParticipant.thread_id
+    ).filter(MessageThreadParticipant.user_id == user_id)
+    
+    if request.args.get('unreadOnly', '').lower() == 'true':
+        query = query.filter(MessageThreadParticipant.unread_count > 0)
+    
+    if cursor:
+        try:
+            last_at, last_id = decode_cursor(cursor)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        query = query.filter(
+            (MessageThreadParticipant.last_message_at < last_at) |
+            ((MessageThreadParticipant.last_message_at == last_at) & (MessageThreadParticipant.thread_id < last_id))
+        )
+    
+    rows = query.order_by(
+        MessageThreadParticipant.last_message_at.desc(),
+        MessageThreadParticipant.thread_id.desc()
+    ).limit(limit + 1).all()
+    
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more:
+        last_participant = rows[-1][0]
+        next_cursor = encode_cursor(last_participant.last_message_at, last_participant.thread_id)
+    
+    return jsonify({
+        'threads': [thread.to_dict(participant) for participant, thread in rows],
+        'nextCursor': next_cursor
+    }), 200
+
+@bp.route('/threads/<thread_id>', methods=['GET'])
+def get_thread(thread_id):
+    thread = MessageThread.query.get(thread_id)
+    if not thread:
+        return jsonify({'error': 'Thread not found'}), 404
+    
+    participant = None
+    user_id = request.args.get('userId')
+    if user_id:
+        participant = MessageThreadParticipant.query.get((thread_id, user_id))
+    return jsonify(thread.to_dict(participant)), 200
+
+@bp.route('/threads/<thread_id>/messages', methods=['GET'])
+def get_thread_messages(thread_id):
+    """One page of a thread, newest first. Pass `cursor` from the previous page to go further back."""
+    if not MessageThread.query.get(thread_id):
+        return jsonify({'error': 'Thread not found'}), 404
+    
+    limit = parse_limit(request.args.get('limit'), default=50, maximum=200)
+    cursor = request.args.get('cursor')
+    
+    query = Message.query.filter(Message.thread_id == thread_id)
+    if cursor:
+        try:
+            last_at, last_id = decode_cursor(cursor)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        query = query.filter(
+            (Message.created_at < last_at) |
+            ((Message.created_at == last_at) & (Message.id < last_id))
+        )
+    
+    messages = query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit + 1).all()
+    
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    next_cursor = encode_cursor(messages[-1].created_at, messages[-1].id) if has_more else None
+    
+    return jsonify({
+        'messages': [m.to_dict() for m in messages],
+        'nextCursor': next_cursor
+    }), 200
+
+@bp.route('/threads/<thread_id>/read', methods=['PUT'])
+def mark_thread_read(thread_id):
+    """Mark every message addressed to `userId` in this thread as read"""
+    data = request.get_json(silent=True) or {}
+    user_id = data.get('userId') or request.args.get('userId')
+    if not user_id:
+        return jsonify({'error': 'userId is required'}), 400
+    
+    participant = MessageThreadParticipant.query.get((thread_id, user_id))
+    if not participant:
+        return jsonify({'error': 'Thread not found'}), 404
+    
+    now = datetime.utcnow()
+    Message.query.filter(
+        Message.thread_id == thread_id,
+        Message.recipient_id == user_id,
+        Message.is_read == False  # noqa: E712
+    ).update({'is_read': True, 'read_at': now}, synchronize_session=False)
+    
+    participant.unread_count = 0
+    participant.last_read_at = now
+    db.session.commit()
+    
+    return jsonify(MessageThread.query.get(thread_id).to_dict(participant)), 200
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from db import db
 import json as json_lib
+import metrics
 
 bp = Blueprint('misc', __name__, url_prefix='/api')
 
@@ -20,17 +21,10 @@ def get_assignment_history():
 @bp.route('/podOrders', methods=['GET'])
 def get_pod_orders_alt():
     # Alias for pod-orders endpoint
-    from models import PODOrder
-    status = request.args.get('status')
-    writer_id = request.args.get('writerId')
-    
-    query = PODOrder.query
-    
-    if status:
-        query = query.filter_by(status=status)
-    if writer_id:
-        query = query.filter_by(writer_id=writer_id)
-    
-    orders = query.all()
-    return jsonify([order.to_dict() for order in orders]), 200
+    from routes.pod_orders import list_pod_orders
+    return list_pod_orders(request.args)
 
+@bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    # In-process counters/timings (e.g. orders.version_conflicts) for this worker
+    return jsonify(metrics.snapshot()), 200
@@ -1,26 +1,47 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from models import Notification
 from db import db
+from listing import ListQuery
 from datetime import datetime
+from idempotency import idempotent
+import live
 
 bp = Blueprint('notifications', __name__, url_prefix='/api/notifications')
 
+NOTIFICATION_LIST = ListQuery(Notification, filters={
+    'userId': Notification.user_id,
+    'isRead': Notification.is_read,
+    'type': Notification.type,
+    'relatedEntityId': Notification.related_entity_id,
+    'relatedEntityType': Notification.related_entity_type,
+    'createdAt': Notification.created_at,
+    'updatedAt': Notification.updated_at,
+}, sorts={
+    'createdAt': Notification.created_at,
+    'updatedAt': Notification.updated_at,
+}, default_sort='-createdAt')
+
 @bp.route('', methods=['GET'])
 def get_notifications():
-    user_id = request.args.get('userId')
-    is_read = request.args.get('isRead')
-    
-    query = Notification.query
-    
-    if user_id:
-        query = query.filter_by(user_id=user_id)
-    if is_read is not None:
-        query = query.filter_by(is_read=is_read.lower() == 'true')
-    
-    notifications = query.all()
-    return jsonify([n.to_dict() for n in notifications]), 200
+    return NOTIFICATION_LIST.respond(request.args)
+
+@bp.route('/stream', methods=['GET'])
+def stream_notifications():
+    """
+    Server-Sent Events: the user's new and updated notifications as they happen.
+    Holds a worker thread for as long as the client listens; asgi.py serves it on the event loop instead.
+    """
+    try:
+        user_id, position = live.stream_start(request.args, request.headers)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    response = Response(stream_with_context(live.notification_events(user_id, position)), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 @bp.route('', methods=['POST'])
+@idempotent
 def create_notification():
     data = request.get_json()
     import uuid
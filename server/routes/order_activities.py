@@ -1,34 +1,43 @@
 from flask import Blueprint, request, jsonify
 from models import OrderActivity, Order
 from db import db
+from listing import ListQuery
+from sqlalchemy import select
 import json as json_lib
 from datetime import datetime
 import uuid
+from idempotency import idempotent
 
 bp = Blueprint('order_activities', __name__, url_prefix='/api/order-activities')
 
+ACTIVITY_LIST = ListQuery(OrderActivity, filters={
+    'orderId': OrderActivity.order_id,
+    'actionType': OrderActivity.action_type,
+    'actionBy': OrderActivity.action_by,
+    'actionByRole': OrderActivity.action_by_role,
+    'newStatus': OrderActivity.new_status,
+    'createdAt': OrderActivity.created_at,
+}, sorts={
+    'createdAt': OrderActivity.created_at,
+}, default_sort='-createdAt')
+
 @bp.route('', methods=['GET'])
 def get_activities():
     """Get order activities, optionally filtered by order_id or writer_id"""
-    order_id = request.args.get('orderId')
     writer_id = request.args.get('writerId')
-    action_type = request.args.get('actionType')
     
-    query = OrderActivity.query
+    query = OrderActivity.query.order_by(OrderActivity.created_at.desc())
     
-    if order_id:
-        query = query.filter_by(order_id=order_id)
     if writer_id:
-        # Get activities for orders assigned to this writer
-        order_ids = [o.id for o in Order.query.filter_by(writer_id=writer_id).all()]
-        query = query.filter(OrderActivity.order_id.in_(order_ids))
-    if action_type:
-        query = query.filter_by(action_type=action_type)
+        # Activities on orders currently assigned to this writer
+        query = query.filter(OrderActivity.order_id.in_(
+            select(Order.id).where(Order.writer_id == writer_id)
+        ))
     
-    activities = query.order_by(OrderActivity.created_at.desc()).all()
-    return jsonify([activity.to_dict() for activity in activities]), 200
+    return ACTIVITY_LIST.respond(request.args, query, filtered=bool(writer_id))
 
 @bp.route('', methods=['POST'])
+@idempotent
 def create_activity():
     """Create a new order activity record"""
     data = request.get_json()
@@ -1,35 +1,148 @@
-from flask import Blueprint, request, jsonify
-from models import Order, OrderActivity
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from models import Order, OrderActivity, Writer, FULL_ROW, reload_full
 from db import db
+from sqlalchemy import select, update
+import merit
+import metrics
+from matching import writer_index
+from assignment import active_orders_subquery, auto_assign
+from bundles import bundle_filename, stream_bundle
 import json as json_lib
 from datetime import datetime
-from utils import generate_order_number
+from listing import ListQuery, ListQueryError
+from utils import generate_order_number, parse_limit, parse_view, serialize
+from patching import Field, PatchError, apply_fields, apply_patch
+from versioning import expected_version, etag, check_version, commit_versioned
+from idempotency import idempotent
 
 bp = Blueprint('orders', __name__, url_prefix='/api/orders')
 
+# Largest selection GET /api/orders/bundle will export in one ZIP
+MAX_BUNDLE_ORDERS = 5000
+
+ORDER_LIST = ListQuery(Order, filters={
+    'status': Order.status,
+    'writerId': Order.writer_id,
+    'clientId': Order.client_id,
+    'subject': Order.subject,
+    'discipline': Order.discipline,
+    'paperType': Order.paper_type,
+    'assignmentPriority': Order.assignment_priority,
+    'pages': Order.pages,
+    'totalPriceKES': Order.total_price_kes,
+    'deadline': Order.deadline,
+    'createdAt': Order.created_at,
+    'updatedAt': Order.updated_at,
+    'completedAt': Order.completed_at,
+}, sorts={
+    'deadline': Order.deadline,
+    'createdAt': Order.created_at,
+    'updatedAt': Order.updated_at,
+    'completedAt': Order.completed_at,
+    'pages': Order.pages,
+    'totalPriceKES': Order.total_price_kes,
+    'orderNumber': Order.order_number,
+    'status': Order.status,
+}, default_sort='createdAt')
+
 @bp.route('', methods=['GET'])
 def get_orders():
-    status = request.args.get('status')
-    writer_id = request.args.get('writerId')
+    """Filters, sort and pagination as described in listing.py; view=summary (default) or full"""
+    try:
+        view = parse_view(request.args.get('view'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    query = Order.query
+    query = Order.query.options(FULL_ROW) if view == 'full' else Order.query
+    return ORDER_LIST.respond(request.args, query, lambda order: serialize(order, view))
+
+@bp.route('/auto-assign', methods=['POST'])
+def auto_assign_orders():
+    """
+    Assign a batch of Available orders in one go.
+    Body: orderIds (optional, defaults to every Available order up to maxOrders),
+    maxOrders (default 5000), language, assignedBy, assignedByName, dryRun.
+    """
+    data = request.get_json(silent=True) or {}
     
-    if status:
-        query = query.filter_by(status=status)
-    if writer_id:
-        query = query.filter_by(writer_id=writer_id)
+    query = Order.query.filter(Order.status == 'Available')
+    if data.get('orderIds'):
+        query = query.filter(Order.id.in_(data['orderIds']))
+    orders = query.order_by(Order.deadline, Order.created_at).limit(
+        parse_limit(data.get('maxOrders'), default=5000, maximum=20000)
+    ).all()
     
-    orders = query.all()
-    return jsonify([order.to_dict() for order in orders]), 200
+    result = auto_assign(
+        orders,
+        assigned_by=data.get('assignedBy', 'admin'),
+        assigned_by_name=data.get('assignedByName', 'Admin'),
+        language=data.get('language'),
+        dry_run=bool(data.get('dryRun', False))
+    )
+    metrics.increment('orders.auto_assign.assigned', len(result['assigned']) if not result['dryRun'] else 0)
+    return jsonify(result), 200
+
+def bundle_response(query):
+    """Stream the ZIP for `query` as it is built"""
+    response = Response(stream_with_context(stream_bundle(query)), mimetype='application/zip')
+    response.headers['Content-Disposition'] = f'attachment; filename="{bundle_filename(query)}"'
+    response.headers['X-Accel-Buffering'] = 'no'  # Let nginx pass chunks through instead of spooling the ZIP
+    return response
+
+@bp.route('/bundle', methods=['GET'])
+def get_orders_bundle():
+    """
+    ZIP export of several orders: ?ids=a,b,c and/or any list filter, e.g.
+    ?status=Completed&completedAt>=2025-06-01&completedAt<2025-07-01
+    """
+    base = Order.query
+    try:
+        query = ORDER_LIST.filter(base, request.args)
+    except ListQueryError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    ids = [i for i in request.args.get('ids', '').split(',') if i]
+    if ids:
+        query = query.filter(Order.id.in_(ids))
+    elif query is base:
+        return jsonify({'error': 'Select orders with ids or at least one filter'}), 400
+    
+    count = query.count()
+    if count == 0:
+        return jsonify({'error': 'No orders match'}), 404
+    if count > MAX_BUNDLE_ORDERS:
+        return jsonify({'error': f'Selection has {count} orders; export at most {MAX_BUNDLE_ORDERS} at a time'}), 400
+    
+    metrics.increment('orders.bundles')
+    return bundle_response(query.order_by(Order.created_at, Order.id))
+
+@bp.route('/<order_id>/bundle', methods=['GET'])
+def get_order_bundle(order_id):
+    """ZIP of one order's original and revision files, order.json and activities.json"""
+    query = Order.query.filter(Order.id == order_id)
+    if not db.session.query(query.exists()).scalar():
+        return jsonify({'error': 'Order not found'}), 404
+    
+    metrics.increment('orders.bundles')
+    return bundle_response(query)
 
 @bp.route('/<order_id>', methods=['GET'])
 def get_order(order_id):
-    order = Order.query.get(order_id)
+    try:
+        view = parse_view(request.args.get('view'), default='full')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    query = Order.query.options(FULL_ROW) if view == 'full' else Order.query
+    order = query.get(order_id)
     if not order:
         return jsonify({'error': 'Order not found'}), 404
-    return jsonify(order.to_dict()), 200
+    response = jsonify(serialize(order, view))
+    response.headers['ETag'] = etag(order)
+    return response, 200
 
 @bp.route('', methods=['POST'])
+@idempotent
 def create_order():
     data = request.get_json()
     import uuid
@@ -124,124 +237,242 @@ def create_order():
     db.session.add(activity)
     db.session.commit()
     
-    return jsonify(order.to_dict()), 201
+    return jsonify(reload_full(order).to_dict()), 201
+
+# API key -> column mapping shared by PUT and PATCH
+ORDER_FIELDS = {
+    'title': Field('title', 'raw'),
+    'description': Field('description', 'raw'),
+    'status': Field('status', 'raw'),
+    'writerId': Field('writer_id'),
+    'assignedWriter': Field('assigned_writer'),
+    'assignedAt': Field('assigned_at', 'datetime'),
+    'assignedBy': Field('assigned_by'),
+    'pickedBy': Field('picked_by'),
+    'requiresConfirmation': Field('requires_confirmation', 'bool'),
+    'confirmedAt': Field('confirmed_at', 'datetime'),
+    'confirmedBy': Field('confirmed_by'),
+    'assignmentNotes': Field('assignment_notes'),
+    'assignmentPriority': Field('assignment_priority'),
+    'assignmentDeadline': Field('assignment_deadline', 'datetime'),
+    'startedAt': Field('started_at', 'datetime'),
+    'submittedAt': Field('submitted_at', 'datetime'),
+    'submittedToAdminAt': Field('submitted_to_admin_at', 'datetime'),
+    'submissionNotes': Field('submission_notes'),
+    'filesUploadedAt': Field('files_uploaded_at', 'datetime'),
+    'completedAt': Field('completed_at', 'datetime'),
+    'deadline': Field('deadline', 'datetime', skip_empty=True),
+    'attachments': Field('attachments', 'json'),
+    'originalFiles': Field('original_files', 'json'),
+    'revisionFiles': Field('revision_files', 'json'),
+    # For backward compatibility: uploadedFiles is used as originalFiles when originalFiles is not sent
+    'uploadedFiles': Field('original_files', 'json', alias_of='originalFiles'),
+    'revisionRequests': Field('revision_requests', 'json'),
+    'revisionExplanation': Field('revision_explanation'),
+    'revisionScore': Field('revision_score', 'int', default=10),
+    'revisionCount': Field('revision_count', 'int', default=0),
+    'revisionSubmittedAt': Field('revision_submitted_at', 'datetime'),
+    'revisionResponseNotes': Field('revision_response_notes'),
+    'clientMessages': Field('client_messages', 'json'),
+    'adminMessages': Field('admin_messages', 'json'),
+    'adminReviewNotes': Field('admin_review_notes'),
+    'adminReviewedAt': Field('admin_reviewed_at', 'datetime'),
+    'adminReviewedBy': Field('admin_reviewed_by'),
+    'reassignmentReason': Field('reassignment_reason'),
+    'reassignedAt': Field('reassigned_at', 'datetime'),
+    'reassignedBy': Field('reassigned_by'),
+    'originalWriterId': Field('original_writer_id'),
+    'madeAvailableAt': Field('made_available_at', 'datetime'),
+    'madeAvailableBy': Field('made_available_by'),
+    'fineAmount': Field('fine_amount', 'float', default=0),
+    'fineReason': Field('fine_reason'),
+    'fineHistory': Field('fine_history', 'json'),
+    'bids': Field('bids', 'json'),
+}
 
 @bp.route('/<order_id>', methods=['PUT'])
 def update_order(order_id):
-    order = Order.query.get(order_id)
+    # Every field can change and the full order is returned, so load all column groups up front
+    order = Order.query.options(FULL_ROW).get(order_id)
     if not order:
         return jsonify({'error': 'Order not found'}), 404
     
     data = request.get_json()
     
-    # Helper function to parse datetime
-    def parse_datetime(value):
-        if not value:
-            return None
-        if isinstance(value, str):
-            return datetime.fromisoformat(value.replace('Z', '+00:00'))
-        return value
-    
-    # Update all possible fields
-    if 'title' in data:
-        order.title = data['title']
-    if 'description' in data:
-        order.description = data['description']
-    if 'status' in data:
-        order.status = data['status']
-    if 'writerId' in data:
-        order.writer_id = data['writerId'] if data['writerId'] else None
-    if 'assignedWriter' in data:
-        order.assigned_writer = data['assignedWriter'] if data['assignedWriter'] else None
-    if 'assignedAt' in data:
-        order.assigned_at = parse_datetime(data['assignedAt'])
-    if 'assignedBy' in data:
-        order.assigned_by = data['assignedBy'] if data['assignedBy'] else None
-    if 'pickedBy' in data:
-        order.picked_by = data['pickedBy'] if data['pickedBy'] else None
-    if 'requiresConfirmation' in data:
-        order.requires_confirmation = bool(data['requiresConfirmation'])
-    if 'confirmedAt' in data:
-        order.confirmed_at = parse_datetime(data['confirmedAt'])
-    if 'confirmedBy' in data:
-        order.confirmed_by = data['confirmedBy'] if data['confirmedBy'] else None
-    if 'assignmentNotes' in data:
-        order.assignment_notes = data['assignmentNotes'] if data['assignmentNotes'] else None
-    if 'assignmentPriority' in data:
-        order.assignment_priority = data['assignmentPriority'] if data['assignmentPriority'] else None
-    if 'assignmentDeadline' in data:
-        order.assignment_deadline = parse_datetime(data['assignmentDeadline'])
-    if 'startedAt' in data:
-        order.started_at = parse_datetime(data['startedAt'])
-    if 'submittedAt' in data:
-        order.submitted_at = parse_datetime(data['submittedAt'])
-    if 'submittedToAdminAt' in data:
-        order.submitted_to_admin_at = parse_datetime(data['submittedToAdminAt'])
-    if 'submissionNotes' in data:
-        order.submission_notes = data['submissionNotes'] if data['submissionNotes'] else None
-    if 'filesUploadedAt' in data:
-        order.files_uploaded_at = parse_datetime(data['filesUploadedAt'])
-    if 'completedAt' in data:
-        order.completed_at = parse_datetime(data['completedAt'])
-    if 'deadline' in data and data['deadline']:
-        order.deadline = parse_datetime(data['deadline'])
-    if 'attachments' in data:
-        order.attachments = json_lib.dumps(data['attachments']) if data['attachments'] else None
-    if 'originalFiles' in data:
-        order.original_files = json_lib.dumps(data['originalFiles']) if data['originalFiles'] else None
-    if 'revisionFiles' in data:
-        order.revision_files = json_lib.dumps(data['revisionFiles']) if data['revisionFiles'] else None
-    if 'uploadedFiles' in data:
-        # For backward compatibility: if uploadedFiles is provided and originalFiles is not set, use it as originalFiles
-        if 'originalFiles' not in data:
-            order.original_files = json_lib.dumps(data['uploadedFiles']) if data['uploadedFiles'] else None
-    if 'revisionRequests' in data:
-        order.revision_requests = json_lib.dumps(data['revisionRequests']) if data['revisionRequests'] else None
-    if 'revisionExplanation' in data:
-        order.revision_explanation = data['revisionExplanation'] if data['revisionExplanation'] else None
-    if 'revisionScore' in data:
-        order.revision_score = int(data['revisionScore']) if data['revisionScore'] is not None else 10
-    if 'revisionCount' in data:
-        order.revision_count = int(data['revisionCount']) if data['revisionCount'] is not None else 0
-    if 'revisionSubmittedAt' in data:
-        order.revision_submitted_at = parse_datetime(data['revisionSubmittedAt'])
-    if 'revisionResponseNotes' in data:
-        order.revision_response_notes = data['revisionResponseNotes'] if data['revisionResponseNotes'] else None
-    if 'clientMessages' in data:
-        order.client_messages = json_lib.dumps(data['clientMessages']) if data['clientMessages'] else None
-    if 'adminMessages' in data:
-        order.admin_messages = json_lib.dumps(data['adminMessages']) if data['adminMessages'] else None
-    if 'adminReviewNotes' in data:
-        order.admin_review_notes = data['adminReviewNotes'] if data['adminReviewNotes'] else None
-    if 'adminReviewedAt' in data:
-        order.admin_reviewed_at = parse_datetime(data['adminReviewedAt'])
-    if 'adminReviewedBy' in data:
-        order.admin_reviewed_by = data['adminReviewedBy'] if data['adminReviewedBy'] else None
-    if 'reassignmentReason' in data:
-        order.reassignment_reason = data['reassignmentReason'] if data['reassignmentReason'] else None
-    if 'reassignedAt' in data:
-        order.reassigned_at = parse_datetime(data['reassignedAt'])
-    if 'reassignedBy' in data:
-        order.reassigned_by = data['reassignedBy'] if data['reassignedBy'] else None
-    if 'originalWriterId' in data:
-        order.original_writer_id = data['originalWriterId'] if data['originalWriterId'] else None
-    if 'madeAvailableAt' in data:
-        order.made_available_at = parse_datetime(data['madeAvailableAt'])
-    if 'madeAvailableBy' in data:
-        order.made_available_by = data['madeAvailableBy'] if data['madeAvailableBy'] else None
-    if 'fineAmount' in data:
-        order.fine_amount = float(data['fineAmount']) if data['fineAmount'] is not None else 0
-    if 'fineReason' in data:
-        order.fine_reason = data['fineReason'] if data['fineReason'] else None
-    if 'fineHistory' in data:
-        order.fine_history = json_lib.dumps(data['fineHistory']) if data['fineHistory'] else None
-    if 'bids' in data:
-        order.bids = json_lib.dumps(data['bids']) if data['bids'] else None
+    conflict = check_version(order, expected_version(data), 'orders')
+    if conflict:
+        return conflict
     
+    apply_fields(order, ORDER_FIELDS, data)
     order.updated_at = datetime.utcnow()
     
+    conflict = commit_versioned(order, 'orders')
+    if conflict:
+        return conflict
+    order = reload_full(order)
+    response = jsonify(order.to_dict())
+    response.headers['ETag'] = etag(order)
+    return response, 200
+
+@bp.route('/<order_id>', methods=['PATCH'])
+def patch_order(order_id):
+    """
+    Partial update. The body is either a JSON-Patch style list of operations
+    (use `add` with `/revisionRequests/-` to append one item) or a plain object
+    of fields to set. Only changed columns are written.
+    
+    Returns a diff: {id, updatedAt, version, changes, appended}. Send
+    `Prefer: return=representation` to get the full order instead.
+    Send `If-Match` (or `version` in an object body) to reject stale edits with 409.
+    """
+    order = Order.query.get(order_id)
+    if not order:
+        return jsonify({'error': 'Order not found'}), 404
+    
+    data = request.get_json()
+    
+    conflict = check_version(order, expected_version(data), 'orders')
+    if conflict:
+        return conflict
+    
+    try:
+        if isinstance(data, list):
+            changes, appended = apply_patch(order, ORDER_FIELDS, data)
+        elif isinstance(data, dict):
+            unknown = [key for key in data if key not in ORDER_FIELDS and key != 'version']
+            if unknown:
+                raise PatchError(f"Unknown fields: {', '.join(unknown)}")
+            changes, appended = apply_fields(order, ORDER_FIELDS, data), {}
+        else:
+            raise PatchError('Patch body must be a list of operations or an object')
+    except (PatchError, ValueError) as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    
+    if changes or appended:
+        order.updated_at = datetime.utcnow()
+        conflict = commit_versioned(order, 'orders')
+        if conflict:
+            return conflict
+    
+    if 'return=representation' in request.headers.get('Prefer', ''):
+        order = reload_full(order)
+        response = jsonify(order.to_dict())
+    else:
+        response = jsonify({
+            'id': order.id,
+            'updatedAt': order.updated_at.isoformat() if order.updated_at else None,
+            'version': order.version,
+            'changes': changes,
+            'appended': appended
+        })
+    response.headers['ETag'] = etag(order)
+    return response, 200
+
+@bp.route('/<order_id>/pick', methods=['POST'])
+def pick_order(order_id):
+    """
+    Atomically claim an Available order for a writer.
+    
+    One conditional UPDATE does the claim: it only matches while the order is
+    still Available and the writer is below max_concurrent_orders, so when many
+    writers race exactly one wins and the rest get 409. The pick activity is
+    written in the same transaction.
+    """
+    import uuid
+    data = request.get_json(silent=True) or {}
+    writer_id = data.get('writerId')
+    if not writer_id:
+        return jsonify({'error': 'writerId is required'}), 400
+    
+    # Row lock on the writer serialises a writer's own concurrent picks (no-op on SQLite, which locks the database)
+    writer = Writer.query.filter_by(id=writer_id).with_for_update().first()
+    if not writer:
+        db.session.rollback()
+        return jsonify({'error': 'Writer not found'}), 404
+    if writer.status != 'active':
+        db.session.rollback()
+        return jsonify({'error': 'Writer is not active'}), 403
+    
+    max_orders = writer.max_concurrent_orders or 3
+    writer_name = data.get('writerName') or writer.name
+    now = datetime.utcnow()
+    
+    result = db.session.execute(
+        update(Order)
+        .where(Order.id == order_id, Order.status == 'Available', active_orders_subquery(writer_id) < max_orders)
+        .values(
+            status='Assigned',
+            writer_id=writer_id,
+            assigned_writer=writer_name,
+            assigned_at=now,
+            assigned_by='writer',
+            picked_by='writer',
+            updated_at=now,
+            version=Order.version + 1
+        )
+        .execution_options(synchronize_session=False)
+    )
+    
+    if result.rowcount != 1:
+        db.session.rollback()
+        order = Order.query.get(order_id)
+        if not order:
+            return jsonify({'error': 'Order not found'}), 404
+        if order.status != 'Available':
+            metrics.increment('orders.pick.lost')
+            return jsonify({'error': 'Order is no longer available', 'status': order.status}), 409
+        metrics.increment('orders.pick.at_capacity')
+        return jsonify({'error': f'Writer already has the maximum of {max_orders} active orders'}), 409
+    
+    order = db.session.execute(
+        select(Order).where(Order.id == order_id).options(FULL_ROW).execution_options(populate_existing=True)
+    ).scalar_one()
+    activity = OrderActivity(
+        id=f"ACT-{uuid.uuid4().hex[:8].upper()}",
+        order_id=order.id,
+        order_number=order.order_number,
+        action_type='pick',
+        action_by=writer_id,
+        action_by_name=writer_name,
+        action_by_role='writer',
+        old_status='Available',
+        new_status='Assigned',
+        description=f"Order {order.order_number} picked by {writer_name}",
+        action_metadata=json_lib.dumps({'maxConcurrentOrders': max_orders})
+    )
+    db.session.add(activity)
+    # The claim bypassed the ORM listeners, so recount the writer's merit metrics with it
+    merit.recount([writer_id])
     db.session.commit()
-    return jsonify(order.to_dict()), 200
+    metrics.increment('orders.pick.claimed')
+    # The claim bypassed the ORM, so tell the matching index about the new load
+    writer_index.mark_dirty(writer_id)
+    
+    response = jsonify(order.to_dict())
+    response.headers['ETag'] = etag(order)
+    return response, 200
+
+@bp.route('/<order_id>/candidates', methods=['GET'])
+def get_order_candidates(order_id):
+    """
+    Writers ranked for this order by the matching engine.
+    Query params: limit (default 10), language, timezone (IANA name of the
+    client), includeFull (also rank writers at max_concurrent_orders).
+    """
+    order = Order.query.get(order_id)
+    if not order:
+        return jsonify({'error': 'Order not found'}), 404
+    
+    candidates = writer_index.rank(
+        order,
+        limit=parse_limit(request.args.get('limit'), default=10, maximum=100),
+        language=request.args.get('language'),
+        timezone=request.args.get('timezone'),
+        include_full=request.args.get('includeFull', '').lower() == 'true',
+        exclude=[order.writer_id] if order.writer_id else ()
+    )
+    return jsonify({'orderId': order.id, 'candidates': candidates}), 200
 
 @bp.route('/<order_id>', methods=['DELETE'])
 def delete_order(order_id):
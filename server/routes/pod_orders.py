@@ -1,34 +1,66 @@
 from flask import Blueprint, request, jsonify
-from models import PODOrder
+from models import PODOrder, FULL_ROW, reload_full
 from db import db
 import json as json_lib
 from datetime import datetime
+from listing import ListQuery
+from utils import parse_view, serialize
+from versioning import expected_version, etag, check_version, commit_versioned
+from idempotency import idempotent
 
 bp = Blueprint('pod_orders', __name__, url_prefix='/api/pod-orders')
 
+POD_ORDER_LIST = ListQuery(PODOrder, filters={
+    'status': PODOrder.status,
+    'writerId': PODOrder.writer_id,
+    'subject': PODOrder.subject,
+    'paperType': PODOrder.paper_type,
+    'pages': PODOrder.pages,
+    'isOverdue': PODOrder.is_overdue,
+    'deadline': PODOrder.deadline,
+    'deliveryDate': PODOrder.delivery_date,
+    'createdAt': PODOrder.created_at,
+    'updatedAt': PODOrder.updated_at,
+}, sorts={
+    'deadline': PODOrder.deadline,
+    'deliveryDate': PODOrder.delivery_date,
+    'createdAt': PODOrder.created_at,
+    'updatedAt': PODOrder.updated_at,
+    'podAmount': PODOrder.pod_amount,
+    'status': PODOrder.status,
+}, default_sort='createdAt')
+
+def list_pod_orders(args):
+    """Shared by /api/pod-orders and the /api/podOrders alias"""
+    try:
+        view = parse_view(args.get('view'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    query = PODOrder.query.options(FULL_ROW) if view == 'full' else PODOrder.query
+    return POD_ORDER_LIST.respond(args, query, lambda order: serialize(order, view))
+
 @bp.route('', methods=['GET'])
 def get_pod_orders():
-    status = request.args.get('status')
-    writer_id = request.args.get('writerId')
-    
-    query = PODOrder.query
-    
-    if status:
-        query = query.filter_by(status=status)
-    if writer_id:
-        query = query.filter_by(writer_id=writer_id)
-    
-    orders = query.all()
-    return jsonify([order.to_dict() for order in orders]), 200
+    return list_pod_orders(request.args)
 
 @bp.route('/<order_id>', methods=['GET'])
 def get_pod_order(order_id):
-    order = PODOrder.query.get(order_id)
+    try:
+        view = parse_view(request.args.get('view'), default='full')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    query = PODOrder.query.options(FULL_ROW) if view == 'full' else PODOrder.query
+    order = query.get(order_id)
     if not order:
         return jsonify({'error': 'POD Order not found'}), 404
-    return jsonify(order.to_dict()), 200
+    response = jsonify(serialize(order, view))
+    response.headers['ETag'] = etag(order)
+    return response, 200
 
 @bp.route('', methods=['POST'])
+@idempotent
 def create_pod_order():
     data = request.get_json()
     import uuid
@@ -58,16 +90,20 @@ def create_pod_order():
     
     db.session.add(order)
     db.session.commit()
-    return jsonify(order.to_dict()), 201
+    return jsonify(reload_full(order).to_dict()), 201
 
 @bp.route('/<order_id>', methods=['PUT'])
 def update_pod_order(order_id):
-    order = PODOrder.query.get(order_id)
+    order = PODOrder.query.options(FULL_ROW).get(order_id)
     if not order:
         return jsonify({'error': 'POD Order not found'}), 404
     
     data = request.get_json()
     
+    conflict = check_version(order, expected_version(data), 'pod_orders')
+    if conflict:
+        return conflict
+    
     if 'status' in data:
         order.status = data['status']
     if 'writerId' in data:
@@ -79,6 +115,11 @@ def update_pod_order(order_id):
     
     order.updated_at = datetime.utcnow()
     
-    db.session.commit()
-    return jsonify(order.to_dict()), 200
+    conflict = commit_versioned(order, 'pod_orders')
+    if conflict:
+        return conflict
+    order = reload_full(order)
+    response = jsonify(order.to_dict())
+    response.headers['ETag'] = etag(order)
+    return response, 200
 
@@ -1,24 +1,34 @@
 from flask import Blueprint, request, jsonify
 from models import Review
 from db import db
+from listing import ListQuery
+from ratings import review_stats
 import json as json_lib
+from idempotency import idempotent
 
 bp = Blueprint('reviews', __name__, url_prefix='/api/reviews')
 
+REVIEW_LIST = ListQuery(Review, filters={
+    'writerId': Review.writer_id,
+    'orderId': Review.order_id,
+    'clientId': Review.client_id,
+    'status': Review.status,
+    'rating': Review.rating,
+    'isVerified': Review.is_verified,
+    'createdAt': Review.created_at,
+}, sorts={
+    'createdAt': Review.created_at,
+    'rating': Review.rating,
+}, default_sort='-createdAt')
+
 @bp.route('', methods=['GET'])
 def get_reviews():
-    writer_id = request.args.get('writerId')
-    order_id = request.args.get('orderId')
-    
-    query = Review.query
-    
-    if writer_id:
-        query = query.filter_by(writer_id=writer_id)
-    if order_id:
-        query = query.filter_by(order_id=order_id)
-    
-    reviews = query.all()
-    return jsonify([review.to_dict() for review in reviews]), 200
+    return REVIEW_LIST.respond(request.args)
+
+@bp.route('/stats', methods=['GET'])
+def get_review_stats():
+    """Precomputed totals, star distribution and category averages (?writerId= for one writer)"""
+    return jsonify(review_stats(request.args.get('writerId'))), 200
 
 @bp.route('/<review_id>', methods=['GET'])
 def get_review(review_id):
@@ -28,6 +38,7 @@ def get_review(review_id):
     return jsonify(review.to_dict()), 200
 
 @bp.route('', methods=['POST'])
+@idempotent
 def create_review():
     data = request.get_json()
     import uuid
@@ -53,3 +64,38 @@ def create_review():
     db.session.commit()
     return jsonify(review.to_dict()), 201
 
+
+@bp.route('/<review_id>', methods=['PUT'])
+def update_review(review_id):
+    review = Review.query.get(review_id)
+    if not review:
+        return jsonify({'error': 'Review not found'}), 404
+    
+    data = request.get_json()
+    
+    # Rating, categories and status changes move the writer's aggregates in the same commit
+    if 'rating' in data:
+        review.rating = data['rating']
+    if 'comment' in data:
+        review.comment = data['comment']
+    if 'categories' in data:
+        review.categories = json_lib.dumps(data['categories'])
+    if 'status' in data:
+        review.status = data['status']
+    if 'isVerified' in data:
+        review.is_verified = data['isVerified']
+    if 'adminNotes' in data:
+        review.admin_notes = data['adminNotes']
+    
+    db.session.commit()
+    return jsonify(review.to_dict()), 200
+
+@bp.route('/<review_id>', methods=['DELETE'])
+def delete_review(review_id):
+    review = Review.query.get(review_id)
+    if not review:
+        return jsonify({'error': 'Review not found'}), 404
+    
+    db.session.delete(review)
+    db.session.commit()
+    return jsonify({'message': 'Review deleted'}), 200
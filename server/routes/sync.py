@@ -0,0 +1,88 @@
+from flask import Blueprint, request, jsonify
+from models import Order, PODOrder, Invoice, Notification, Tombstone, FULL_ROW
+from db import db
+from datetime import datetime, timedelta
+from utils import encode_cursor, decode_cursor
+import live
+
+bp = Blueprint('sync', __name__, url_prefix='/api/sync')
+
+# Response key -> model. Each table needs an indexed updated_at and a tombstone listener (see models.py).
+SYNC_TABLES = {
+    'orders': Order,
+    'podOrders': PODOrder,
+    'invoices': Invoice,
+    'notifications': Notification
+}
+
+# Rows are re-sent if they changed within this window before the watermark. A transaction
+# that started before the watermark but committed after it would otherwise be skipped.
+# Clients upsert by id, so the overlap only costs a few duplicate rows.
+SYNC_OVERLAP = timedelta(seconds=5)
+
+@bp.route('', methods=['GET'])
+def get_changes():
+    """
+    Rows created, updated or deleted since the `since` watermark.
+    Without `since` the full tables are returned (initial load).
+    Optional params: `tables` (comma separated keys of SYNC_TABLES), `userId` (scopes notifications).
+    """
+    since_token = request.args.get('since')
+    user_id = request.args.get('userId')
+    
+    requested = request.args.get('tables')
+    table_keys = [t.strip() for t in requested.split(',') if t.strip()] if requested else list(SYNC_TABLES)
+    unknown = [t for t in table_keys if t not in SYNC_TABLES]
+    if unknown:
+        return jsonify({'error': f"Unknown tables: {', '.join(unknown)}"}), 400
+    
+    since = None
+    if since_token:
+        try:
+            since = decode_cursor(since_token)[0] - SYNC_OVERLAP
+        except (ValueError, IndexError, TypeError):
+            return jsonify({'error': 'Invalid sync token'}), 400
+    
+    # Taken before reading so nothing written during this request falls behind the next watermark
+    watermark = datetime.utcnow()
+    
+    changes = {}
+    for key in table_keys:
+        model = SYNC_TABLES[key]
+        query = model.query.options(FULL_ROW)
+        if since is not None:
+            query = query.filter(model.updated_at > since)
+        if model is Notification and user_id:
+            query = query.filter(Notification.user_id == user_id)
+        updated = query.order_by(model.updated_at).all()
+        
+        deleted = []
+        if since is not None:
+            deleted = [row.record_id for row in db.session.query(Tombstone.record_id).filter(
+                Tombstone.deleted_at > since,
+                Tombstone.table_name == model.__tablename__
+            )]
+        
+        changes[key] = {
+            'updated': [row.to_dict() for row in updated],
+            'deleted': deleted
+        }
+    
+    return jsonify({
+        'changes': changes,
+        'full': since is None,
+        'watermark': encode_cursor(watermark)
+    }), 200
+
+@bp.route('/wait', methods=['GET'])
+def wait_for_changes():
+    """
+    Long-poll: which of the requested tables changed after the `since` watermark.
+    Answers as soon as one has, or with an empty list after `timeout` seconds (default 25, max 60).
+    Under asgi.py this URL is served on the event loop instead (see live.py).
+    """
+    try:
+        table_keys, since, timeout = live.parse_wait(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'changed': live.wait_for_changes(table_keys, since, timeout)}), 200
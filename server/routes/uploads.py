@@ -0,0 +1,96 @@
+from flask import Blueprint, request, jsonify
+from db import db
+from models import UploadSession
+from storage import StorageError
+import metrics
+import uploads
+from uploads import UploadError
+
+bp = Blueprint('uploads', __name__, url_prefix='/api/uploads')
+
+def error_response(e):
+    return jsonify({'error': str(e)}), e.status
+
+def with_offset(result, status):
+    response = jsonify(result)
+    response.headers['Upload-Offset'] = str(result['offset'])
+    return response, status
+
+@bp.route('', methods=['POST'])
+def create_upload():
+    """
+    Start a resumable upload.
+    Body: filename, size, optional contentType, chunkSize, sha256 (whole file),
+    orderId + target (originalFiles | revisionFiles | podFiles), uploadedBy.
+    """
+    data = request.get_json() or {}
+    try:
+        session = uploads.create_session(
+            data.get('filename'), data.get('size'),
+            content_type=data.get('contentType'),
+            chunk_size=data.get('chunkSize'),
+            sha256=data.get('sha256'),
+            order_id=data.get('orderId'),
+            target=data.get('target'),
+            uploaded_by=data.get('uploadedBy')
+        )
+    except UploadError as e:
+        return error_response(e)
+    db.session.commit()
+    metrics.increment('uploads.sessions')
+    
+    response, status = with_offset(uploads.progress(session), 201)
+    response.headers['Location'] = f'/api/uploads/{session.id}'
+    return response, status
+
+@bp.route('/<session_id>', methods=['GET'])
+def get_upload(session_id):
+    """Progress: receivedChunks, missingChunks and the contiguous offset (also in Upload-Offset)"""
+    session = db.session.get(UploadSession, session_id)
+    if not session:
+        return jsonify({'error': 'Upload session not found'}), 404
+    return with_offset(uploads.progress(session), 200)
+
+@bp.route('/<session_id>/chunks/<int:index>', methods=['PUT'])
+def put_chunk(session_id, index):
+    """Raw chunk bytes as the body; optional X-Chunk-SHA256 header is verified"""
+    try:
+        session = uploads.get_active_session(session_id)
+        size = uploads.write_chunk(session, index, request.stream, request.headers.get('X-Chunk-SHA256'))
+        uploads.touch(session)
+    except UploadError as e:
+        if e.status == 422:
+            metrics.increment('uploads.chunk_checksum_failures')
+        return error_response(e)
+    metrics.increment('uploads.chunks')
+    metrics.increment('uploads.chunk_bytes', size)
+    
+    result = uploads.progress(session)
+    result['chunk'] = {'index': index, 'size': size}
+    return with_offset(result, 200)
+
+@bp.route('/<session_id>/finalize', methods=['POST'])
+def finalize_upload(session_id):
+    """Assemble the chunks, verify size / sha256, store the file and link it to the order"""
+    try:
+        session, stored = uploads.finalize(session_id)
+    except UploadError as e:
+        return error_response(e)
+    except StorageError as e:
+        return jsonify({'error': str(e)}), 500
+    metrics.increment('uploads.finalized')
+    
+    return jsonify({'session': session.to_dict(), 'file': stored.to_dict() if stored else None}), 200
+
+@bp.route('/<session_id>', methods=['DELETE'])
+def abort_upload(session_id):
+    session = db.session.get(UploadSession, session_id)
+    if not session:
+        return jsonify({'error': 'Upload session not found'}), 404
+    if session.status == 'complete':
+        return jsonify({'error': 'Upload already finalized'}), 409
+    try:
+        uploads.abort(session)
+    except UploadError as e:
+        return error_response(e)
+    return jsonify({'message': 'Upload aborted'}), 200
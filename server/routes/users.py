@@ -1,13 +1,23 @@
 from flask import Blueprint, request, jsonify
 from models import User
 from db import db
+from listing import ListQuery
+from idempotency import idempotent
 
 bp = Blueprint('users', __name__, url_prefix='/api/users')
 
+USER_LIST = ListQuery(User, filters={
+    'role': User.role,
+    'email': User.email,
+    'createdAt': User.created_at,
+}, sorts={
+    'name': User.name,
+    'createdAt': User.created_at,
+}, default_sort='name')
+
 @bp.route('', methods=['GET'])
 def get_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users]), 200
+    return USER_LIST.respond(request.args)
 
 @bp.route('/<user_id>', methods=['GET'])
 def get_user(user_id):
@@ -17,6 +27,7 @@ def get_user(user_id):
     return jsonify(user.to_dict()), 200
 
 @bp.route('', methods=['POST'])
+@idempotent
 def create_user():
     data = request.get_json()
     import uuid
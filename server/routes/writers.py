@@ -1,23 +1,116 @@
 from flask import Blueprint, request, jsonify
-from models import Writer
+from models import Writer, WriterSpecialization, WriterLanguage, normalize_term
 from db import db
+from sqlalchemy import select
+from listing import ListQuery
+from utils import parse_limit, parse_view, serialize
+import merit
 import json as json_lib
+from idempotency import idempotent
 
 bp = Blueprint('writers', __name__, url_prefix='/api/writers')
 
+# Query param -> join table it filters on
+TERM_FILTERS = {
+    'specialization': WriterSpecialization,
+    'language': WriterLanguage
+}
+
+WRITER_LIST = ListQuery(Writer, filters={
+    'status': Writer.status,
+    'role': Writer.role,
+    'country': Writer.country,
+    'timezone': Writer.timezone,
+    'rating': Writer.rating,
+    'successRate': Writer.success_rate,
+    'completedOrders': Writer.completed_orders,
+    'createdAt': Writer.created_at,
+    'lastActiveAt': Writer.last_active_at,
+}, sorts={
+    'name': Writer.name,
+    'rating': Writer.rating,
+    'successRate': Writer.success_rate,
+    'completedOrders': Writer.completed_orders,
+    'createdAt': Writer.created_at,
+    'lastActiveAt': Writer.last_active_at,
+}, default_sort='name')
+
 @bp.route('', methods=['GET'])
 def get_writers():
-    writers = Writer.query.all()
-    return jsonify([writer.to_dict() for writer in writers]), 200
+    """
+    Filters, sort and pagination as described in listing.py, plus specialization
+    and language. view=summary (default) or full.
+    A comma-separated value matches any of the terms (specialization=Nursing,Biology);
+    repeating a parameter requires all of them (language=English&language=French).
+    """
+    try:
+        view = parse_view(request.args.get('view'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    query = Writer.query
+    filtered = False
+    
+    for param, model in TERM_FILTERS.items():
+        for value in request.args.getlist(param):
+            terms = [normalize_term(v) for v in value.split(',') if v.strip()]
+            if terms:
+                query = query.filter(Writer.id.in_(
+                    select(model.writer_id).where(model.term.in_(terms))
+                ))
+                filtered = True
+    
+    return WRITER_LIST.respond(request.args, query, lambda writer: serialize(writer, view), filtered=filtered)
+
+@bp.route('/leaderboard', methods=['GET'])
+def get_leaderboard():
+    """
+    Writers ranked by merit score, read in index order from writer_metrics.
+    ?limit= (default 50), ?cursor= from X-Next-Cursor, ?status=active,
+    ?minCompleted= to leave out writers with fewer completed orders.
+    """
+    try:
+        min_completed = int(request.args['minCompleted']) if request.args.get('minCompleted') else None
+    except ValueError:
+        return jsonify({'error': 'minCompleted must be an integer'}), 400
+    
+    try:
+        entries, next_cursor = merit.leaderboard(
+            parse_limit(request.args.get('limit')),
+            cursor=request.args.get('cursor'),
+            status=request.args.get('status'),
+            min_completed=min_completed
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    response = jsonify(entries)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response, 200
+
+@bp.route('/<writer_id>/metrics', methods=['GET'])
+def get_writer_metrics(writer_id):
+    """Stored performance counters, rates, merit score and leaderboard rank"""
+    metrics = merit.writer_metrics(writer_id)
+    if metrics is None:
+        return jsonify({'error': 'Writer not found'}), 404
+    return jsonify(metrics), 200
 
 @bp.route('/<writer_id>', methods=['GET'])
 def get_writer(writer_id):
+    try:
+        view = parse_view(request.args.get('view'), default='full')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     writer = Writer.query.get(writer_id)
     if not writer:
         return jsonify({'error': 'Writer not found'}), 404
-    return jsonify(writer.to_dict()), 200
+    return jsonify(serialize(writer, view)), 200
 
 @bp.route('', methods=['POST'])
+@idempotent
 def create_writer():
     data = request.get_json()
     import uuid
@@ -84,8 +177,7 @@ def update_writer(writer_id):
         writer.phone = data['phone']
     if 'status' in data:
         writer.status = data['status']
-    if 'rating' in data:
-        writer.rating = data['rating']
+    # rating / totalReviews are maintained from reviews (see ratings.py), so they are not writable here
     if 'totalEarnings' in data:
         writer.total_earnings = data['totalEarnings']
     if 'completedOrders' in data:
@@ -98,6 +190,8 @@ def update_writer(writer_id):
         writer.experience = json_lib.dumps(data['experience'])
     if 'specializations' in data:
         writer.specializations = json_lib.dumps(data['specializations'])
+    if 'languages' in data:
+        writer.languages = json_lib.dumps(data['languages'])
     if 'paymentDetails' in data:
         writer.payment_details = json_lib.dumps(data['paymentDetails'])
     
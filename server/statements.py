@@ -0,0 +1,214 @@
+"""
+Financial statements: one chronological ledger of invoices, fines, payments,
+withdrawals and transaction logs for a date range, either platform-wide or
+for a single writer.
+
+Each section is read with its own streaming query (yield_per, which uses a
+server-side cursor on PostgreSQL) selecting only the ledger columns, and the
+sections are merged by date with heapq.merge. Rows are written out as they
+come, so a year of transactions exports in bounded memory:
+
+    export_csv(...)      -> generator of CSV text chunks
+    export_parquet(...)  -> generator of Parquet bytes (needs pyarrow)
+    summary(...)         -> per-section counts and totals by status, via SQL aggregates
+
+Transaction logs are not tied to a writer, so per-writer statements leave
+them out.
+"""
+import csv
+import heapq
+import io
+from datetime import datetime, timezone
+
+from sqlalchemy import func, literal, null, select
+
+from db import db
+from models import Fine, Invoice, Payment, TransactionLog, WithdrawalRequest
+from patching import parse_datetime
+
+# Ledger columns, in output order
+COLUMNS = ('date', 'section', 'id', 'writerId', 'writerName', 'type', 'status',
+           'amount', 'currency', 'orderId', 'reference', 'description')
+
+# Rows fetched per round trip while streaming
+BATCH_SIZE = 1000
+
+# CSV rows buffered before a chunk is yielded
+CSV_FLUSH_ROWS = 500
+
+class StatementError(ValueError):
+    """Bad range, writer or format; routes turn it into a 400"""
+    pass
+
+# Per-section mapping onto the ledger columns (None = not applicable)
+SECTIONS = {
+    'invoices': {
+        'model': Invoice, 'date': Invoice.created_at, 'writer': Invoice.writer_id,
+        'columns': (Invoice.id, Invoice.writer_id, Invoice.writer_name, Invoice.type, Invoice.status,
+                    Invoice.amount, Invoice.currency, Invoice.order_id, Invoice.payment_reference, Invoice.order_title)
+    },
+    'fines': {
+        'model': Fine, 'date': Fine.applied_at, 'writer': Fine.writer_id,
+        'columns': (Fine.id, Fine.writer_id, Fine.writer_name, Fine.type, Fine.status,
+                    Fine.amount, Fine.currency, Fine.order_id, None, Fine.reason)
+    },
+    'payments': {
+        'model': Payment, 'date': Payment.created_at, 'writer': Payment.writer_id,
+        'columns': (Payment.id, Payment.writer_id, Payment.writer_name, Payment.type, Payment.status,
+                    Payment.amount, Payment.currency, Payment.related_order_id, Payment.reference, Payment.notes)
+    },
+    'withdrawals': {
+        'model': WithdrawalRequest, 'date': WithdrawalRequest.requested_at, 'writer': WithdrawalRequest.writer_id,
+        'columns': (WithdrawalRequest.id, WithdrawalRequest.writer_id, WithdrawalRequest.writer_name,
+                    WithdrawalRequest.method, WithdrawalRequest.status, WithdrawalRequest.amount,
+                    WithdrawalRequest.currency, None, WithdrawalRequest.payment_reference, WithdrawalRequest.notes)
+    },
+    'transactionLogs': {
+        'model': TransactionLog, 'date': TransactionLog.performed_at, 'writer': None,
+        'columns': (TransactionLog.id, None, None, TransactionLog.type, None,
+                    TransactionLog.amount, TransactionLog.currency, None, TransactionLog.related_entity_id,
+                    TransactionLog.description)
+    },
+}
+
+def parse_range(start, end):
+    """ISO dates -> naive UTC datetimes; `end` is exclusive"""
+    try:
+        bounds = [parse_datetime(value) for value in (start, end)]
+    except ValueError as e:
+        raise StatementError(f"Invalid date: {e}")
+    if not all(bounds):
+        raise StatementError('from and to are required (ISO dates, to is exclusive)')
+    bounds = [b.astimezone(timezone.utc).replace(tzinfo=None) if b.tzinfo else b for b in bounds]
+    if bounds[0] >= bounds[1]:
+        raise StatementError('from must be before to')
+    return bounds
+
+def parse_sections(value, writer_id=None):
+    """Comma-separated section names (default: all that apply)"""
+    names = [s for s in (value or '').split(',') if s] or list(SECTIONS)
+    unknown = [s for s in names if s not in SECTIONS]
+    if unknown:
+        raise StatementError(f"Unknown section: {', '.join(unknown)}; choose from {', '.join(SECTIONS)}")
+    if writer_id:
+        names = [s for s in names if SECTIONS[s]['writer'] is not None]
+    return names
+
+def _section_query(name, start, end, writer_id):
+    spec = SECTIONS[name]
+    date = spec['date']
+    columns = [date.label('date'), literal(name).label('section')]
+    for key, column in zip(COLUMNS[2:], spec['columns']):
+        columns.append((column if column is not None else null()).label(key))
+    query = select(*columns).where(date >= start, date < end)
+    if writer_id:
+        query = query.where(spec['writer'] == writer_id)
+    return query.order_by(date, spec['model'].id)
+
+def iter_ledger(start, end, writer_id=None, sections=None):
+    """Ledger rows (tuples in COLUMNS order) across sections, oldest first"""
+    streams = []
+    for name in (sections if sections is not None else parse_sections(None, writer_id)):
+        result = db.session.execute(
+            _section_query(name, start, end, writer_id),
+            execution_options={'yield_per': BATCH_SIZE}
+        )
+        streams.append(iter(result))
+    return heapq.merge(*streams, key=lambda row: (row[0], row[1], row[2]))
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return '' if value is None else value
+
+def export_csv(start, end, writer_id=None, sections=None):
+    """Generator of CSV text, header first"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    pending = 0
+    for row in iter_ledger(start, end, writer_id, sections):
+        writer.writerow([_csv_value(v) for v in row])
+        pending += 1
+        if pending >= CSV_FLUSH_ROWS:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+class _ByteSink:
+    """Write-only file for ParquetWriter; bytes are handed on as they are written"""
+    
+    def __init__(self):
+        self._chunks = []
+        self.closed = False
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def close(self):
+        self.closed = True
+    
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def export_parquet(start, end, writer_id=None, sections=None):
+    """Generator of Parquet bytes, one row group per BATCH_SIZE rows"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    schema = pa.schema([('date', pa.timestamp('us'))] + [
+        (name, pa.float64() if name == 'amount' else pa.string()) for name in COLUMNS[1:]
+    ])
+    sink = _ByteSink()
+    with pq.ParquetWriter(sink, schema) as parquet:
+        batch = []
+        for row in iter_ledger(start, end, writer_id, sections):
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                parquet.write_batch(pa.RecordBatch.from_pylist([dict(zip(COLUMNS, r)) for r in batch], schema=schema))
+                batch = []
+                yield sink.drain()
+        if batch:
+            parquet.write_batch(pa.RecordBatch.from_pylist([dict(zip(COLUMNS, r)) for r in batch], schema=schema))
+    yield sink.drain()
+
+def summary(start, end, writer_id=None, sections=None):
+    """Per section: row count and amount totals, overall and by status"""
+    result = {}
+    for name in (sections if sections is not None else parse_sections(None, writer_id)):
+        spec = SECTIONS[name]
+        model, date = spec['model'], spec['date']
+        status = getattr(model, 'status', None)
+        grouped = [status] if status is not None else []
+        query = select(*grouped, func.count(), func.coalesce(func.sum(model.amount), 0.0)).where(date >= start, date < end)
+        if writer_id:
+            query = query.where(spec['writer'] == writer_id)
+        if grouped:
+            rows = db.session.execute(query.group_by(status)).all()
+        else:
+            rows = [(None, *db.session.execute(query).one())]
+        result[name] = {
+            'count': sum(row[1] for row in rows),
+            'total': round(sum(row[2] for row in rows), 2),
+            'byStatus': {row[0] or 'unknown': {'count': row[1], 'total': round(row[2], 2)} for row in rows if row[1]}
+        }
+    return result
+
+def statement_filename(start, end, writer_id, extension):
+    scope = writer_id or 'platform'
+    return f"statement-{scope}-{start.date().isoformat()}-{end.date().isoformat()}.{extension}"
@@ -0,0 +1,236 @@
+"""
+Content-addressed file storage.
+
+Blobs are keyed by the SHA-256 of their bytes, so a brief re-uploaded with
+every revision is stored once no matter how many orders point at it. Upload
+metadata (original name, type, uploader) lives in the `stored_files` table;
+this module only deals with bytes.
+
+Uploads are streamed: put_stream() reads the request body in CHUNK_SIZE
+pieces, hashing and writing each one to a temp file, then moves the temp
+file into place under its hash (or drops it if that blob already exists).
+Nothing ever holds a whole file in memory.
+
+Backends:
+    local (default) - files under STORAGE_ROOT/objects/ab/cd/<sha256>.
+                      Downloads go through send_file(), which answers Range
+                      requests and hands the file to the server's sendfile
+                      (wsgi.file_wrapper, or X-Sendfile with USE_X_SENDFILE).
+    s3              - any S3-compatible store (STORAGE_BACKEND=s3, needs boto3).
+                      Downloads redirect to a short-lived presigned URL, and the
+                      object store serves the range requests itself.
+"""
+import hashlib
+import os
+import tempfile
+
+from flask import current_app, redirect, send_file
+
+CHUNK_SIZE = 1024 * 1024  # 1 MiB
+
+class StorageError(Exception):
+    """Raised for storage failures; routes turn it into a 4xx/5xx"""
+    pass
+
+class UploadTooLarge(StorageError):
+    pass
+
+class ChecksumMismatch(StorageError):
+    """The bytes received do not hash to what the client said they would"""
+    pass
+
+def copy_hashed(stream, target, max_bytes=None):
+    """Copy a stream into an open file in chunks. Returns (sha256 hex, size)."""
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if max_bytes is not None and size > max_bytes:
+            raise UploadTooLarge(f"File exceeds the {max_bytes} byte limit")
+        digest.update(chunk)
+        target.write(chunk)
+    return digest.hexdigest(), size
+
+def _check_digest(sha256, expected):
+    if expected and sha256 != expected.lower():
+        raise ChecksumMismatch(f"Checksum mismatch: expected {expected.lower()}, got {sha256}")
+
+class ChainedFiles:
+    """Read-only stream over several files in order, e.g. the chunks of a resumable upload"""
+    
+    def __init__(self, paths):
+        self._paths = list(paths)
+        self._current = None
+    
+    def read(self, size=-1):
+        while True:
+            if self._current is None:
+                if not self._paths:
+                    return b''
+                self._current = open(self._paths.pop(0), 'rb')
+            data = self._current.read(size)
+            if data:
+                return data
+            self._current.close()
+            self._current = None
+    
+    def close(self):
+        if self._current is not None:
+            self._current.close()
+            self._current = None
+
+class LocalStorage:
+    """Blobs on the local filesystem, sharded by the first two bytes of the hash"""
+    
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.tmp_dir = os.path.join(self.root, 'tmp')
+        os.makedirs(self.tmp_dir, exist_ok=True)
+    
+    def path(self, sha256):
+        return os.path.join(self.root, 'objects', sha256[:2], sha256[2:4], sha256)
+    
+    def exists(self, sha256):
+        return os.path.exists(self.path(sha256))
+    
+    def temp_file(self):
+        """Named temp file on the same filesystem, so finished uploads can be renamed into place"""
+        return tempfile.NamedTemporaryFile(dir=self.tmp_dir, delete=False)
+    
+    def commit_temp(self, temp_path, sha256):
+        """
+        Move a fully written temp file to its content address.
+        Returns True if a new blob was stored, False if it already existed.
+        """
+        final = self.path(sha256)
+        if os.path.exists(final):
+            os.remove(temp_path)
+            return False
+        os.makedirs(os.path.dirname(final), exist_ok=True)
+        # Atomic on POSIX; a concurrent identical upload just overwrites with the same bytes
+        os.replace(temp_path, final)
+        return True
+    
+    def put_stream(self, stream, max_bytes=None, expected_sha256=None):
+        """
+        Store a stream. Returns (sha256, size, created). With expected_sha256
+        the blob is only stored if the bytes match it.
+        """
+        temp = self.temp_file()
+        try:
+            with temp:
+                sha256, size = copy_hashed(stream, temp, max_bytes)
+            _check_digest(sha256, expected_sha256)
+            created = self.commit_temp(temp.name, sha256)
+        except BaseException:
+            if os.path.exists(temp.name):
+                os.remove(temp.name)
+            raise
+        return sha256, size, created
+    
+    def open(self, sha256):
+        return open(self.path(sha256), 'rb')
+    
+    def delete(self, sha256):
+        try:
+            os.remove(self.path(sha256))
+        except FileNotFoundError:
+            pass
+    
+    def download_response(self, sha256, download_name, mimetype):
+        path = self.path(sha256)
+        if not os.path.exists(path):
+            raise StorageError('Blob missing from storage')
+        # conditional=True gives Range / If-None-Match support; the hash is a perfect ETag
+        response = send_file(path, mimetype=mimetype, as_attachment=True, download_name=download_name,
+                             conditional=True, etag=sha256, max_age=31536000)
+        response.headers['Accept-Ranges'] = 'bytes'
+        return response
+
+class S3Storage:
+    """
+    S3-compatible object store. Uploads are spooled to a local temp file while
+    hashing (the key is only known once the last byte is read), then sent with
+    boto3's multipart upload_file().
+    """
+    
+    def __init__(self, bucket, prefix='objects/', endpoint_url=None, tmp_dir=None):
+        try:
+            import boto3
+        except ImportError:
+            raise StorageError('STORAGE_BACKEND=s3 requires boto3 (pip install boto3)')
+        self.client = boto3.client('s3', endpoint_url=endpoint_url)
+        self.bucket = bucket
+        self.prefix = prefix
+        self.tmp_dir = tmp_dir
+    
+    def key(self, sha256):
+        return f"{self.prefix}{sha256[:2]}/{sha256}"
+    
+    def exists(self, sha256):
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.key(sha256))
+            return True
+        except ClientError:
+            return False
+    
+    def temp_file(self):
+        return tempfile.NamedTemporaryFile(dir=self.tmp_dir, delete=False)
+    
+    def commit_temp(self, temp_path, sha256):
+        try:
+            if self.exists(sha256):
+                return False
+            self.client.upload_file(temp_path, self.bucket, self.key(sha256))
+            return True
+        finally:
+            os.remove(temp_path)
+    
+    def put_stream(self, stream, max_bytes=None, expected_sha256=None):
+        temp = self.temp_file()
+        try:
+            with temp:
+                sha256, size = copy_hashed(stream, temp, max_bytes)
+            _check_digest(sha256, expected_sha256)
+        except BaseException:
+            os.remove(temp.name)
+            raise
+        return sha256, size, self.commit_temp(temp.name, sha256)
+    
+    def open(self, sha256):
+        return self.client.get_object(Bucket=self.bucket, Key=self.key(sha256))['Body']
+    
+    def delete(self, sha256):
+        self.client.delete_object(Bucket=self.bucket, Key=self.key(sha256))
+    
+    def download_response(self, sha256, download_name, mimetype):
+        url = self.client.generate_presigned_url('get_object', Params={
+            'Bucket': self.bucket,
+            'Key': self.key(sha256),
+            'ResponseContentDisposition': f'attachment; filename="{download_name}"',
+            'ResponseContentType': mimetype or 'application/octet-stream'
+        }, ExpiresIn=300)
+        return redirect(url, code=302)
+
+def get_storage():
+    """The configured backend, created once per app"""
+    app = current_app._get_current_object()
+    storage = app.extensions.get('storage')
+    if storage is None:
+        backend = app.config.get('STORAGE_BACKEND', 'local')
+        if backend == 's3':
+            storage = S3Storage(
+                bucket=app.config['S3_BUCKET'],
+                prefix=app.config.get('S3_PREFIX', 'objects/'),
+                endpoint_url=app.config.get('S3_ENDPOINT_URL')
+            )
+        elif backend == 'local':
+            storage = LocalStorage(app.config['STORAGE_ROOT'])
+        else:
+            raise StorageError(f"Unknown STORAGE_BACKEND: {backend}")
+        app.extensions['storage'] = storage
+    return storage
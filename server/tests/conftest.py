@@ -0,0 +1,61 @@
+"""
+Shared fixtures: every test gets its own app on a throwaway SQLite file.
+
+    python -m pytest tests        (from server/)
+"""
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from db import db  # noqa: E402
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+        'STORAGE_ROOT': str(tmp_path / 'storage'),
+        'UPLOAD_SESSION_ROOT': str(tmp_path / 'sessions'),
+        'RATE_LIMIT_ENABLED': False,
+        'TESTING': True
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def concurrently(app):
+    """run(count, work) calls work(n) from `count` threads released together; returns the results in order"""
+    def run(count, work):
+        start = threading.Barrier(count)
+        results, errors = [None] * count, []
+        
+        def worker(n):
+            with app.app_context():
+                start.wait()
+                try:
+                    results[n] = work(n)
+                except Exception as e:
+                    errors.append(e)
+                finally:
+                    db.session.remove()
+        
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+        return results
+    return run
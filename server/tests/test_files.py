@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from db import db
+from files import collect_orphans
+from models import OrphanBlob
+from storage import get_storage
+
+def upload(client, body=b'brief contents'):
+    response = client.post('/api/files', data=body, headers={'X-Filename': 'brief.txt', 'Content-Type': 'text/plain'})
+    assert response.status_code == 201
+    return response.json
+
+def test_a_shared_blob_is_kept_until_its_last_file_is_gone(client):
+    first, second = upload(client), upload(client)
+    assert second['deduplicated']
+    
+    client.delete(f"/api/files/{first['id']}")
+    assert db.session.get(OrphanBlob, first['sha256']) is None
+    
+    client.delete(f"/api/files/{second['id']}")
+    assert db.session.get(OrphanBlob, first['sha256']) is not None
+
+def test_gc_deletes_orphans_after_the_grace_period(client):
+    stored = upload(client)
+    client.delete(f"/api/files/{stored['id']}")
+    
+    assert collect_orphans() == 0
+    assert get_storage().exists(stored['sha256'])
+    
+    assert collect_orphans(grace=timedelta(0)) == 1
+    assert not get_storage().exists(stored['sha256'])
+    assert db.session.get(OrphanBlob, stored['sha256']) is None
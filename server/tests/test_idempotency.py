@@ -0,0 +1,82 @@
+"""Idempotency-Key on POSTs: replays, reused keys, requests still in flight and concurrent retries"""
+import threading
+
+from flask import jsonify
+from sqlalchemy import func, select
+
+from db import db
+from idempotency import idempotent
+from models import Payment
+
+PAYMENT = {'writerId': 'W1', 'amount': 1500, 'type': 'order_payment'}
+
+def payments():
+    return db.session.scalar(select(func.count()).select_from(Payment))
+
+def test_retry_replays_the_stored_response(client):
+    first = client.post('/api/financial/payments', json=PAYMENT, headers={'Idempotency-Key': 'pay-1'})
+    retry = client.post('/api/financial/payments', json=PAYMENT, headers={'Idempotency-Key': 'pay-1'})
+    
+    assert (first.status_code, retry.status_code) == (201, 201)
+    assert retry.headers['Idempotent-Replay'] == 'true'
+    assert retry.get_json() == first.get_json()
+    assert payments() == 1
+
+def test_key_reused_with_another_body_is_rejected(client):
+    client.post('/api/financial/payments', json=PAYMENT, headers={'Idempotency-Key': 'pay-2'})
+    reused = client.post('/api/financial/payments', json={**PAYMENT, 'amount': 9000}, headers={'Idempotency-Key': 'pay-2'})
+    
+    assert reused.status_code == 422
+    assert payments() == 1
+
+def test_retry_while_the_first_request_runs_gets_409(app):
+    entered, release = threading.Event(), threading.Event()
+    runs = []
+    
+    @idempotent
+    def slow_create():
+        runs.append(1)
+        entered.set()
+        release.wait(5)
+        return jsonify({'id': len(runs)}), 201
+    
+    app.add_url_rule('/api/test/slow', 'slow_create', slow_create, methods=['POST'])
+    first = []
+    thread = threading.Thread(target=lambda: first.append(
+        app.test_client().post('/api/test/slow', json={}, headers={'Idempotency-Key': 'slow-1'})))
+    thread.start()
+    assert entered.wait(5)
+    
+    client = app.test_client()
+    in_flight = client.post('/api/test/slow', json={}, headers={'Idempotency-Key': 'slow-1'})
+    release.set()
+    thread.join()
+    replay = client.post('/api/test/slow', json={}, headers={'Idempotency-Key': 'slow-1'})
+    
+    assert in_flight.status_code == 409
+    assert first[0].status_code == 201
+    assert (replay.status_code, replay.get_json()) == (201, {'id': 1})
+    assert runs == [1]
+
+def test_server_error_releases_the_key(app):
+    statuses = iter([500, 201])
+    
+    @idempotent
+    def flaky_create():
+        return jsonify({}), next(statuses)
+    
+    app.add_url_rule('/api/test/flaky', 'flaky_create', flaky_create, methods=['POST'])
+    client = app.test_client()
+    assert client.post('/api/test/flaky', json={}, headers={'Idempotency-Key': 'flaky-1'}).status_code == 500
+    retry = client.post('/api/test/flaky', json={}, headers={'Idempotency-Key': 'flaky-1'})
+    assert retry.status_code == 201
+    assert 'Idempotent-Replay' not in retry.headers
+
+def test_concurrent_retries_create_one_row(app, concurrently):
+    responses = concurrently(8, lambda n: app.test_client().post(
+        '/api/financial/payments', json=PAYMENT, headers={'Idempotency-Key': 'pay-3'}))
+    
+    assert {response.status_code for response in responses} <= {201, 409}
+    created = {response.get_json()['id'] for response in responses if response.status_code == 201}
+    assert len(created) == 1
+    assert payments() == 1
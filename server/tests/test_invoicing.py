@@ -0,0 +1,45 @@
+"""Invoice generation: per-batch timestamps and retries when concurrent runs collide"""
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from db import db
+from models import Invoice, Order
+import invoicing
+
+def complete_orders(count):
+    completed_at = datetime.utcnow() - timedelta(days=1)
+    db.session.add_all(Order(id=f'ORD-{n}', title=f'Order {n}', pages=2, status='Completed', writer_id='W1',
+                             completed_at=completed_at + timedelta(minutes=n)) for n in range(count))
+    db.session.commit()
+
+def test_each_batch_is_stamped_when_it_is_written(app, monkeypatch):
+    complete_orders(6)
+    monkeypatch.setattr(invoicing, 'BATCH_SIZE', 2)
+    insert_batch = invoicing._insert_batch
+    stamps = []
+    
+    def recording(order_ids, now):
+        stamps.append(now)
+        return insert_batch(order_ids, now)
+    
+    monkeypatch.setattr(invoicing, '_insert_batch', recording)
+    assert invoicing.generate()['batches'] == 3
+    assert stamps == sorted(stamps) and len(set(stamps)) == 3
+    assert sorted({invoice.updated_at for invoice in Invoice.query}) == stamps
+
+def test_batch_is_retried_until_the_collisions_stop(app, monkeypatch):
+    complete_orders(3)
+    insert_batch = invoicing._insert_batch
+    collisions = iter([True, True, False])
+    
+    def racing(order_ids, now):
+        # Other runs keep committing some of these orders between our SELECT and INSERT
+        if next(collisions):
+            raise IntegrityError('INSERT INTO invoices', {}, Exception('UNIQUE constraint failed: invoices.id'))
+        return insert_batch(order_ids, now)
+    
+    monkeypatch.setattr(invoicing, '_insert_batch', racing)
+    result = invoicing.generate()
+    assert result['created'] == 3
+    assert Invoice.query.count() == 3
@@ -0,0 +1,91 @@
+"""Long-poll and SSE: rows that commit late, inside the sync overlap, still wake waits and are streamed once"""
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from db import db
+from models import Notification
+from utils import encode_cursor
+import live
+
+@pytest.fixture(autouse=True)
+def fast_polls(monkeypatch):
+    monkeypatch.setattr(live, 'POLL_INTERVAL', 0.05)
+    monkeypatch.setattr(live, 'KEEPALIVE', 0.0)
+
+def notify(notification_id, updated_at):
+    db.session.add(Notification(id=notification_id, user_id='W1', type='system', title=notification_id,
+                                created_at=updated_at, updated_at=updated_at))
+    db.session.commit()
+
+def test_wait_wakes_for_a_late_commit(app):
+    since = datetime.utcnow()
+    notify('NTF-early', since - timedelta(seconds=2))
+    assert live.wait_for_changes(['notifications'], since, 0.2) == []
+    
+    def commit_late():
+        time.sleep(0.2)
+        with app.app_context():
+            # Stamped before `since`, committed after the wait began
+            notify('NTF-late', since - timedelta(seconds=1))
+    
+    thread = threading.Thread(target=commit_late)
+    thread.start()
+    began = time.monotonic()
+    assert live.wait_for_changes(['notifications'], since, 5) == ['notifications']
+    thread.join()
+    assert time.monotonic() - began < 2
+
+def test_stream_sends_a_late_commit_once(app):
+    position = datetime.utcnow()
+    events = live.notification_events('W1', position)
+    assert next(events) == live.SSE_KEEPALIVE
+    
+    notify('NTF-late', position - timedelta(seconds=1))
+    assert 'NTF-late' in next(events)
+    assert next(events) == live.SSE_KEEPALIVE
+    
+    notify('NTF-new', position + timedelta(seconds=1))
+    assert 'NTF-new' in next(events)
+    assert next(events) == live.SSE_KEEPALIVE
+
+def stream_through_asgi(app, headers, seconds=0.3):
+    """Messages sent by AsyncAPI for one /api/notifications/stream connection held open for `seconds`"""
+    asgi = pytest.importorskip('asgi')
+    api = asgi.AsyncAPI(app)
+    sent = []
+    
+    async def send(message):
+        sent.append(message)
+    
+    async def receive():
+        await asyncio.sleep(seconds)
+        return {'type': 'http.disconnect'}
+    
+    async def run():
+        scope = {'type': 'http', 'method': 'GET', 'path': '/api/notifications/stream', 'query_string': b'userId=W1',
+                 'headers': [(name.encode(), value.encode()) for name, value in headers], 'client': ('127.0.0.1', 50000)}
+        try:
+            await api(scope, receive, send)
+        finally:
+            await api.shutdown()
+    
+    asyncio.run(run())
+    return sent[0]['status'], b''.join(message.get('body', b'') for message in sent[1:]).decode()
+
+def test_asgi_stream_resumes_from_last_event_id(app):
+    last_seen = datetime.utcnow() - timedelta(minutes=1)
+    notify('NTF-missed', last_seen + timedelta(seconds=30))
+    
+    # EventSource sends the header name in lower case, like any HTTP/2 client
+    status, body = stream_through_asgi(app, [('last-event-id', encode_cursor(last_seen))])
+    assert status == 200
+    assert body.count('"id": "NTF-missed"') == 1
+
+def test_asgi_stream_rejects_a_malformed_last_event_id(app):
+    status, body = stream_through_asgi(app, [('last-event-id', 'not-a-token')])
+    assert status == 400
+    assert 'Invalid sync token' in body
@@ -0,0 +1,12 @@
+from matching import _terms
+
+def test_terms_match_the_writer_term_tables():
+    assert _terms('[" Nursing ", "nursing", "History", ""]') == {'nursing', 'history'}
+    assert _terms(['Nursing', 'Law']) == {'nursing', 'law'}
+
+def test_terms_ignore_values_that_are_not_arrays():
+    # A bare JSON string used to be iterated character by character
+    assert _terms('"Nursing"') == set()
+    assert _terms('{"a": 1}') == set()
+    assert _terms('not json') == set()
+    assert _terms(None) == set()
@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta
+
+from db import db
+from models import Order, Writer, WriterMetric
+
+def add_writer_with_orders():
+    deadline = datetime(2025, 3, 1)
+    db.session.add(Writer(id='W1', name='Writer', email='w1@example.com'))
+    db.session.add(Order(id='ORD-1', title='On time', writer_id='W1', status='Completed', pages=2,
+                         deadline=deadline, completed_at=deadline - timedelta(hours=1)))
+    db.session.add(Order(id='ORD-2', title='Open', writer_id='W1', status='In Progress', pages=3, deadline=deadline))
+    db.session.commit()
+
+def test_metrics_come_from_the_stored_row(client):
+    add_writer_with_orders()
+    
+    response = client.get('/api/writers/W1/metrics')
+    
+    assert response.status_code == 200
+    assert (response.json['totalOrders'], response.json['completedOrders'], response.json['onTimeOrders']) == (2, 1, 1)
+    assert response.json['rank'] == 1
+
+def test_metrics_for_a_writer_without_a_row_are_computed_but_not_stored(client):
+    add_writer_with_orders()
+    stored = client.get('/api/writers/W1/metrics').json
+    WriterMetric.query.filter_by(writer_id='W1').delete()
+    db.session.commit()
+    
+    response = client.get('/api/writers/W1/metrics')
+    
+    assert response.status_code == 200
+    assert {key: value for key, value in response.json.items() if key != 'updatedAt'} == \
+        {key: value for key, value in stored.items() if key != 'updatedAt'}
+    db.session.expire_all()
+    assert db.session.get(WriterMetric, 'W1') is None
+
+def test_metrics_for_an_unknown_writer_are_a_404(client):
+    assert client.get('/api/writers/W404/metrics').status_code == 404
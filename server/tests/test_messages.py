@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+
+from db import db
+from models import Message
+from routes.messages import USER_HISTORY_PAGE
+
+def add_messages(count, sender='W1', recipient='admin'):
+    start = datetime(2025, 1, 1)
+    for n in range(count):
+        db.session.add(Message(id=f'MSG-{n:04d}', sender_id=sender, recipient_id=recipient,
+                               content=f'Message {n}', created_at=start + timedelta(minutes=n)))
+    db.session.add(Message(id='MSG-OTHER', sender_id='W2', recipient_id='admin', content='Elsewhere', created_at=start))
+    db.session.commit()
+
+def test_user_history_comes_back_in_pages(client):
+    add_messages(USER_HISTORY_PAGE + 10)
+    
+    first = client.get('/api/messages?userId=W1')
+    assert first.status_code == 200
+    assert len(first.json) == USER_HISTORY_PAGE
+    assert first.json[0]['id'] == f'MSG-{USER_HISTORY_PAGE + 9:04d}'
+    
+    cursor = first.headers['X-Next-Cursor']
+    second = client.get(f'/api/messages?userId=W1&cursor={cursor}')
+    assert [m['id'] for m in second.json] == [f'MSG-{n:04d}' for n in range(9, -1, -1)]
+    assert 'X-Next-Cursor' not in second.headers
+
+def test_user_history_includes_received_messages(client):
+    add_messages(3, sender='admin', recipient='W1')
+    
+    response = client.get('/api/messages?userId=W1&limit=2')
+    assert [m['id'] for m in response.json] == ['MSG-0002', 'MSG-0001']
+    assert 'X-Next-Cursor' in response.headers
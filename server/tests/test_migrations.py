@@ -0,0 +1,46 @@
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+from db import db
+from models import PlatformBalance
+import migrator
+
+def schema():
+    inspector = inspect(db.session.connection())
+    return {table: ({column['name'] for column in inspector.get_columns(table)},
+                    {index['name'] for index in inspector.get_indexes(table)})
+            for table in inspector.get_table_names()}
+
+def empty_database():
+    expected = schema()
+    db.session.commit()
+    db.drop_all()
+    return expected
+
+def test_upgrade_from_an_empty_database_builds_the_model_schema(app):
+    expected = empty_database()
+    
+    migrator.upgrade(echo=lambda message: None)
+    
+    assert schema() == expected
+    assert migrator.current_version() == migrator.head()
+
+def test_outbox_step_starts_the_balance_from_funds_and_withdrawals(app):
+    empty_database()
+    migrator.upgrade('0016', echo=lambda message: None)
+    now = datetime.utcnow()
+    for id, amount, status in (('PF-1', 5000.0, 'confirmed'), ('PF-2', 700.0, 'pending')):
+        db.session.execute(text("INSERT INTO platform_funds (id, amount, status, added_at) VALUES (:id, :amount, :status, :now)"),
+                           {'id': id, 'amount': amount, 'status': status, 'now': now})
+    for id, amount, status in (('WD-1', 300.0, 'pending'), ('WD-2', 200.0, 'approved'), ('WD-3', 1000.0, 'paid')):
+        db.session.execute(text("INSERT INTO withdrawal_requests (id, amount, status, requested_at) VALUES (:id, :amount, :status, :now)"),
+                           {'id': id, 'amount': amount, 'status': status, 'now': now})
+    db.session.commit()
+    
+    migrator.upgrade('0017', echo=lambda message: None)
+    
+    balance = db.session.get(PlatformBalance, 'platform')
+    assert (balance.total_funds, balance.reserved_funds, balance.total_withdrawn) == (5000.0, 500.0, 1000.0)
+    assert balance.available_funds == 3500.0
+    assert db.session.execute(text("SELECT COUNT(*) FROM outbox_events")).scalar() == 0
@@ -0,0 +1,74 @@
+"""Optimistic concurrency on orders: stale versions and lost races are 409s, never lost updates"""
+import threading
+
+import routes.orders
+from db import db
+from models import Order
+
+def create_order(client, **fields):
+    response = client.post('/api/orders', json={'title': 'Essay', 'pages': 2, 'status': 'Available', **fields})
+    assert response.status_code == 201
+    return response.get_json()
+
+def test_stale_if_match_is_rejected(client):
+    order = create_order(client)
+    assert client.put(f"/api/orders/{order['id']}", json={'title': 'Essay v2'},
+                      headers={'If-Match': f'"{order["version"]}"'}).status_code == 200
+    
+    stale = client.put(f"/api/orders/{order['id']}", json={'title': 'Essay v3'}, headers={'If-Match': f'"{order["version"]}"'})
+    assert stale.status_code == 409
+    assert stale.get_json()['currentVersion'] == order['version'] + 1
+    assert stale.headers['ETag'] == f'"{order["version"] + 1}"'
+    assert client.get(f"/api/orders/{order['id']}").get_json()['title'] == 'Essay v2'
+
+def test_write_that_loses_the_race_at_commit_is_rejected(app, client, monkeypatch):
+    order = create_order(client)
+    check_version = routes.orders.check_version
+    
+    def overtaken(obj, expected, label):
+        # Another admin saves between this request's version check and its commit
+        if threading.current_thread() is threading.main_thread():
+            thread = threading.Thread(target=lambda: app.test_client().put(
+                f"/api/orders/{order['id']}", json={'writerId': 'writer-a', 'version': order['version']}))
+            thread.start()
+            thread.join()
+        return check_version(obj, expected, label)
+    
+    monkeypatch.setattr(routes.orders, 'check_version', overtaken)
+    lost = client.put(f"/api/orders/{order['id']}", json={'writerId': 'writer-b', 'version': order['version']})
+    assert lost.status_code == 409
+    assert lost.get_json()['currentVersion'] == order['version'] + 1
+    db.session.expire_all()
+    assert db.session.get(Order, order['id']).writer_id == 'writer-a'
+
+def test_concurrent_versioned_picks_have_one_winner(app, client, concurrently):
+    order = create_order(client)
+    
+    def pick(n):
+        return app.test_client().put(f"/api/orders/{order['id']}", json={
+            'status': 'Assigned', 'writerId': f'writer-{n}', 'pickedBy': 'writer', 'version': order['version']
+        }).status_code
+    
+    statuses = concurrently(8, pick)
+    assert sorted(statuses) == [200] + [409] * 7
+    stored = client.get(f"/api/orders/{order['id']}").get_json()
+    assert stored['writerId'] == f'writer-{statuses.index(200)}'
+    assert stored['version'] == order['version'] + 1
+
+def test_concurrent_increments_lose_no_updates(app, client, concurrently):
+    order = create_order(client, revisionCount=0)
+    
+    def increment(n):
+        writer = app.test_client()
+        written = 0
+        while written < 5:
+            current = writer.get(f"/api/orders/{order['id']}").get_json()
+            response = writer.put(f"/api/orders/{order['id']}", json={
+                'revisionCount': current['revisionCount'] + 1, 'version': current['version']
+            })
+            assert response.status_code in (200, 409)
+            written += response.status_code == 200
+        return written
+    
+    assert sum(concurrently(6, increment)) == 30
+    assert client.get(f"/api/orders/{order['id']}").get_json()['revisionCount'] == 30
@@ -0,0 +1,86 @@
+"""Outbox relay: exactly-once application under concurrent relays, and parking of failing events"""
+import threading
+
+from sqlalchemy import func, select
+
+from db import db
+from models import OutboxEvent, PlatformBalance, PlatformFunds, TransactionLog, WithdrawalRequest
+import outbox
+
+def seed(funds=5, withdrawals=20):
+    db.session.add_all(PlatformFunds(id=f'PF-{n}', amount=10000, status='confirmed', source='bank')
+                       for n in range(funds))
+    db.session.add_all(WithdrawalRequest(id=f'WD-{n}', writer_id=f'W{n}', amount=100, status='pending')
+                       for n in range(withdrawals))
+    db.session.commit()
+    return funds + withdrawals
+
+def balance():
+    db.session.expire_all()
+    row = db.session.get(PlatformBalance, outbox.BALANCE_ID)
+    return row.total_funds, row.reserved_funds, row.total_withdrawn
+
+def unprocessed():
+    return db.session.scalar(select(func.count()).where(OutboxEvent.processed_at.is_(None)))
+
+def test_concurrent_relays_apply_each_event_once(app, concurrently):
+    count = seed()
+    applied = concurrently(4, lambda n: outbox.relay())
+    
+    assert sum(applied) == count
+    assert unprocessed() == 0
+    assert balance() == (50000, 2000, 0)
+    fund_logs = db.session.scalar(select(func.count()).where(TransactionLog.type == 'fund_added'))
+    assert fund_logs == 5
+    assert outbox.relay() == 0
+
+def test_relay_overtaken_mid_batch_rolls_back(app, monkeypatch):
+    count = seed()
+    handle = outbox._handle
+    overtaken = []
+    
+    def run_other_relay():
+        with app.app_context():
+            overtaken.append(outbox.relay())
+            db.session.remove()
+    
+    def other_relay_first(pending):
+        # Another relay commits the same events after this one read them
+        if not overtaken and threading.current_thread() is threading.main_thread():
+            thread = threading.Thread(target=run_other_relay)
+            thread.start()
+            thread.join()
+        return handle(pending)
+    
+    monkeypatch.setattr(outbox, '_handle', other_relay_first)
+    assert outbox.relay() == 0
+    assert overtaken == [count]
+    assert balance() == (50000, 2000, 0)
+    assert db.session.scalar(select(func.count()).where(TransactionLog.type == 'fund_added')) == 5
+
+def test_failing_handler_parks_event_without_touching_balance(app, monkeypatch):
+    def half_applied(batch, payload):
+        batch.adjust(reserved_funds=999)
+        raise ValueError('bank API down')
+    
+    monkeypatch.setitem(outbox.HANDLERS, 'withdrawal.created', half_applied)
+    db.session.add(PlatformFunds(id='PF-1', amount=5000, status='confirmed', source='bank'))
+    db.session.add(WithdrawalRequest(id='WD-1', writer_id='W1', amount=100, status='pending'))
+    db.session.commit()
+    
+    assert outbox.relay() == 1
+    assert balance() == (5000, 0, 0)
+    for _ in range(outbox.MAX_ATTEMPTS):
+        outbox.relay()
+    
+    failed = OutboxEvent.query.filter_by(topic='withdrawal.created').one()
+    assert failed.processed_at is None
+    assert failed.attempts == outbox.MAX_ATTEMPTS
+    assert failed.last_error == 'ValueError: bank API down'
+    assert [row['aggregateId'] for row in outbox.status()['parked']] == ['WD-1']
+    assert balance() == (5000, 0, 0)
+    
+    # Parked events are not retried until someone resets them
+    assert outbox.relay() == 0
+    db.session.refresh(failed)
+    assert failed.attempts == outbox.MAX_ATTEMPTS
@@ -0,0 +1,43 @@
+"""Payout batches: one batch per idempotency key, however many requests race for it"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from db import db
+from models import Payment, PayoutBatch, WithdrawalRequest
+import payouts
+
+def approve_withdrawals(count=10):
+    approved_at = datetime.utcnow() - timedelta(hours=1)
+    db.session.add_all(WithdrawalRequest(id=f'WD-{n}', writer_id=f'W{n}', amount=100, status='approved',
+                                         method='mpesa', approved_at=approved_at) for n in range(count))
+    db.session.commit()
+
+def test_concurrent_same_key_batches_return_one_batch(app, concurrently):
+    approve_withdrawals()
+    
+    def pay(n):
+        batch, created = payouts.create_batch('payday-1', {'method': 'mpesa'}, created_by='admin')
+        return batch.id, created
+    
+    results = concurrently(6, pay)
+    
+    assert len({batch_id for batch_id, _ in results}) == 1
+    assert [created for _, created in results].count(True) == 1
+    assert db.session.scalar(select(func.count()).select_from(PayoutBatch)) == 1
+    assert db.session.scalar(select(func.count()).select_from(Payment)) == 10
+    batch = db.session.get(PayoutBatch, results[0][0])
+    assert (batch.withdrawal_count, batch.total_amount) == (10, 1000)
+    assert {row.payout_batch_id for row in WithdrawalRequest.query} == {batch.id}
+
+def test_retry_replays_and_reused_key_is_rejected(app):
+    approve_withdrawals(3)
+    batch, created = payouts.create_batch('payday-2', {'method': 'mpesa'}, created_by='admin')
+    replay, created_again = payouts.create_batch('payday-2', {'method': 'mpesa'}, created_by='admin')
+    assert created and not created_again
+    assert replay.id == batch.id
+    
+    with pytest.raises(payouts.PayoutError) as raised:
+        payouts.create_batch('payday-2', {'method': 'bank'}, created_by='admin')
+    assert raised.value.status == 422
@@ -0,0 +1,35 @@
+"""POST /api/orders/<id>/pick: one winner per order, capacity held under contention"""
+from sqlalchemy import func, select
+
+from db import db
+from models import Order, OrderActivity, Writer
+
+def seed(orders=1, writers=8, max_concurrent=3):
+    db.session.add_all(Writer(id=f'writer-{n}', email=f'writer{n}@test.local', name=f'Writer {n}', status='active',
+                              max_concurrent_orders=max_concurrent) for n in range(writers))
+    db.session.add_all(Order(id=f'ORD-{n}', title=f'Order {n}', pages=1, status='Available') for n in range(orders))
+    db.session.commit()
+
+def picks(order_id):
+    return db.session.scalar(select(func.count()).where(OrderActivity.order_id == order_id,
+                                                         OrderActivity.action_type == 'pick'))
+
+def test_concurrent_picks_of_one_order_have_one_winner(app, concurrently):
+    seed()
+    statuses = concurrently(8, lambda n: app.test_client().post(
+        '/api/orders/ORD-0/pick', json={'writerId': f'writer-{n}'}).status_code)
+    
+    assert sorted(statuses) == [200] + [409] * 7
+    db.session.expire_all()
+    order = db.session.get(Order, 'ORD-0')
+    assert (order.status, order.writer_id) == ('Assigned', f'writer-{statuses.index(200)}')
+    assert picks('ORD-0') == 1
+
+def test_concurrent_picks_by_one_writer_respect_capacity(app, concurrently):
+    seed(orders=8, writers=1, max_concurrent=3)
+    statuses = concurrently(8, lambda n: app.test_client().post(
+        f'/api/orders/ORD-{n}/pick', json={'writerId': 'writer-0'}).status_code)
+    
+    assert sorted(statuses) == [200] * 3 + [409] * 5
+    assert Order.query.filter_by(writer_id='writer-0', status='Assigned').count() == 3
+    assert Order.query.filter_by(status='Available').count() == 5
@@ -0,0 +1,62 @@
+"""Rate limits key on the client address, through trusted proxies and on the ASGI routes too"""
+import asyncio
+
+import pytest
+
+from app import create_app
+from db import db
+
+def limited_app(tmp_path, **config):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+        'RATE_LIMITS': {'auth': '3/minute', 'sync': '2/minute'},
+        **config
+    })
+    with app.app_context():
+        db.create_all()
+    return app
+
+def login(client, **kwargs):
+    return client.post('/api/auth/login', json={'email': 'nobody@test.local', 'password': 'guess'}, **kwargs).status_code
+
+def test_rotating_claimed_identity_does_not_reset_the_limit(tmp_path):
+    client = limited_app(tmp_path).test_client()
+    statuses = [login(client, query_string={'userId': f'u{n}'}, headers={'X-User-Id': f'u{n}'}) for n in range(5)]
+    assert statuses == [401, 401, 401, 429, 429]
+
+def test_forwarded_for_is_only_trusted_behind_a_configured_proxy(tmp_path):
+    direct = limited_app(tmp_path).test_client()
+    spoofed = [login(direct, headers={'X-Forwarded-For': f'203.0.113.{n}'}) for n in range(4)]
+    assert spoofed[-1] == 429
+    
+    proxied = limited_app(tmp_path, PROXY_FIX_X_FOR=1).test_client()
+    for client_address in ('203.0.113.1', '203.0.113.2'):
+        headers = {'X-Forwarded-For': client_address}
+        assert [login(proxied, headers=headers) for _ in range(4)] == [401, 401, 401, 429]
+
+def test_asgi_routes_share_the_flask_endpoint_limit(tmp_path):
+    asgi = pytest.importorskip('asgi')
+    api = asgi.AsyncAPI(limited_app(tmp_path))
+    
+    async def wait_without_since(client_address):
+        sent = []
+        
+        async def send(message):
+            sent.append(message)
+        
+        async def receive():
+            return {'type': 'http.disconnect'}
+        
+        scope = {'type': 'http', 'method': 'GET', 'path': '/api/sync/wait', 'query_string': b'',
+                 'headers': [], 'client': (client_address, 50000)}
+        await api(scope, receive, send)
+        return sent[0]['status']
+    
+    async def run():
+        try:
+            return ([await wait_without_since('198.51.100.1') for _ in range(3)],
+                    await wait_without_since('198.51.100.2'))
+        finally:
+            await api.shutdown()
+    
+    assert asyncio.run(run()) == ([400, 400, 429], 400)
@@ -0,0 +1,42 @@
+import json
+
+from db import db
+from models import Review, Writer, WriterRatingStat
+
+def add_writer():
+    db.session.add(Writer(id='W1', name='Writer', email='w1@example.com'))
+    db.session.commit()
+
+def review_body(n, rating):
+    return {'id': f'REV-{n}', 'writerId': 'W1', 'rating': rating, 'status': 'approved',
+            'categories': [{'category': 'grammar', 'rating': rating}]}
+
+def test_concurrent_first_reviews_all_count(app, concurrently):
+    add_writer()
+    client = app.test_client()
+    ratings = [5, 4, 3, 5, 2, 4]
+    
+    statuses = concurrently(len(ratings), lambda n: client.post('/api/reviews', json=review_body(n, ratings[n])).status_code)
+    
+    assert statuses == [201] * len(ratings)
+    db.session.expire_all()
+    for category in ('review', 'grammar'):
+        stat = db.session.get(WriterRatingStat, ('W1', category))
+        assert (stat.rating_count, stat.rating_sum) == (len(ratings), float(sum(ratings)))
+        assert stat.distribution() == {1: 0, 2: 1, 3: 1, 4: 2, 5: 2}
+    writer = db.session.get(Writer, 'W1')
+    assert (writer.total_reviews, writer.rating) == (len(ratings), round(sum(ratings) / len(ratings), 2))
+
+def test_removing_a_review_takes_it_back_out(app):
+    add_writer()
+    for n, rating in enumerate((5, 3)):
+        db.session.add(Review(id=f'REV-{n}', writer_id='W1', rating=rating, status='approved',
+                              categories=json.dumps([{'category': 'grammar', 'rating': rating}])))
+    db.session.commit()
+    
+    db.session.delete(db.session.get(Review, 'REV-0'))
+    db.session.commit()
+    
+    stat = db.session.get(WriterRatingStat, ('W1', 'grammar'))
+    assert (stat.rating_count, stat.rating_sum, stat.stars_5, stat.stars_3) == (1, 3.0, 0, 1)
+    assert db.session.get(Writer, 'W1').rating == 3.0
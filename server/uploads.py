@@ -0,0 +1,349 @@
+"""
+Resumable chunked uploads.
+
+A large submission is sent as fixed-size chunks instead of one request, so a
+dropped connection costs at most one chunk:
+
+    POST   /api/uploads                   start a session (filename, size, optional sha256)
+    PUT    /api/uploads/<id>/chunks/<n>   send chunk n (0-based), any order, re-sendable
+    GET    /api/uploads/<id>              which chunks arrived / contiguous offset
+    POST   /api/uploads/<id>/finalize     assemble, verify, store, link to the order
+
+Each chunk is written to its own file under UPLOAD_SESSION_ROOT/<session id>/,
+checked against its expected length (and the client's X-Chunk-SHA256 if
+given), then renamed into place, so a chunk is either fully there or absent
+and retries simply overwrite it. Nothing about chunk progress is written to
+the database; the directory listing is the state.
+
+Finalize first claims the session (status 'finalizing') with a conditional
+UPDATE, so only one request assembles it. It streams the chunks in order
+through the regular storage backend (hashing as it goes), rejects the result
+if the size or whole-file SHA-256 do not match what the session declared,
+and appends the stored file to the order's originalFiles / revisionFiles (or
+a POD order's uploadedFiles) in the same transaction that records it.
+"""
+import json
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import select, update
+from sqlalchemy.orm import undefer_group
+from sqlalchemy.orm.exc import StaleDataError
+
+from db import db
+from files import record_file
+from models import Order, OrderActivity, PODOrder, StoredFile, UploadSession
+from storage import ChainedFiles, ChecksumMismatch, UploadTooLarge, copy_hashed, get_storage
+
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024  # 8 MiB
+MIN_CHUNK_SIZE = 256 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+
+# Where a finalized upload can be attached: API name -> (model, column)
+TARGETS = {
+    'originalFiles': (Order, 'original_files'),
+    'revisionFiles': (Order, 'revision_files'),
+    'podFiles': (PODOrder, 'uploaded_files'),
+}
+
+# Finalize re-reads the order and retries if someone else wrote it in between
+LINK_ATTEMPTS = 3
+
+class UploadError(Exception):
+    """Client-visible upload failure; routes return {'error': message} with `status`"""
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+# Session lifecycle
+
+def session_ttl():
+    return timedelta(hours=current_app.config.get('UPLOAD_SESSION_TTL_HOURS', 24))
+
+def session_dir(session_id):
+    return os.path.join(current_app.config['UPLOAD_SESSION_ROOT'], session_id)
+
+def create_session(filename, size, content_type=None, chunk_size=None, sha256=None,
+                   order_id=None, target=None, uploaded_by=None):
+    """Validate and add (not commit) a new upload session"""
+    if not filename:
+        raise UploadError('filename is required')
+    try:
+        size = int(size)
+        chunk_size = int(chunk_size) if chunk_size else DEFAULT_CHUNK_SIZE
+    except (TypeError, ValueError):
+        raise UploadError('size and chunkSize must be integers')
+    if size <= 0:
+        raise UploadError('size must be positive')
+    max_bytes = current_app.config.get('MAX_UPLOAD_BYTES')
+    if max_bytes and size > max_bytes:
+        raise UploadError(f"File exceeds the {max_bytes} byte limit", 413)
+    if not MIN_CHUNK_SIZE <= chunk_size <= MAX_CHUNK_SIZE:
+        raise UploadError(f"chunkSize must be between {MIN_CHUNK_SIZE} and {MAX_CHUNK_SIZE}")
+    if sha256 and (len(sha256) != 64 or any(c not in '0123456789abcdef' for c in sha256.lower())):
+        raise UploadError('sha256 must be a hex SHA-256 digest')
+    
+    if target is not None:
+        if target not in TARGETS:
+            raise UploadError(f"target must be one of {', '.join(TARGETS)}")
+        if not order_id:
+            raise UploadError('orderId is required with target')
+        model = TARGETS[target][0]
+        if not db.session.get(model, order_id):
+            raise UploadError('Order not found', 404)
+    
+    session = UploadSession(
+        id=f"UPL-{uuid.uuid4().hex[:12].upper()}",
+        filename=os.path.basename(filename),
+        content_type=content_type or 'application/octet-stream',
+        total_size=size,
+        chunk_size=chunk_size,
+        sha256=sha256.lower() if sha256 else None,
+        order_id=order_id,
+        target=target,
+        uploaded_by=uploaded_by,
+        status='uploading',
+        expires_at=datetime.utcnow() + session_ttl()
+    )
+    db.session.add(session)
+    return session
+
+def get_active_session(session_id):
+    """The session if chunks may still be sent to it, else an UploadError"""
+    session = db.session.get(UploadSession, session_id)
+    if not session:
+        raise UploadError('Upload session not found', 404)
+    if session.status != 'uploading':
+        raise UploadError(f"Upload session is {session.status}", 409)
+    if session.expires_at < datetime.utcnow():
+        raise UploadError('Upload session expired', 410)
+    return session
+
+def touch(session):
+    """
+    Push out the expiry of a session that is still receiving chunks. Only
+    written once half the TTL has gone, so most chunks cost no DB write.
+    """
+    ttl = session_ttl()
+    if session.expires_at - datetime.utcnow() < ttl / 2:
+        session.expires_at = datetime.utcnow() + ttl
+        db.session.commit()
+
+# Chunks
+
+def chunk_length(session, index):
+    """Exact byte length chunk `index` must have (the last one may be short)"""
+    if not 0 <= index < session.chunk_count:
+        raise UploadError(f"Chunk index must be between 0 and {session.chunk_count - 1}", 416)
+    return min(session.chunk_size, session.total_size - index * session.chunk_size)
+
+def chunk_path(session, index):
+    return os.path.join(session_dir(session.id), f"{index:08d}.chunk")
+
+def write_chunk(session, index, stream, checksum=None):
+    """
+    Stream one chunk to a temp file, check it, then rename it into place.
+    Re-sending a chunk replaces the previous copy.
+    """
+    expected = chunk_length(session, index)
+    directory = session_dir(session.id)
+    os.makedirs(directory, exist_ok=True)
+    
+    temp = tempfile.NamedTemporaryFile(dir=directory, prefix='.part-', delete=False)
+    try:
+        with temp:
+            sha256, size = copy_hashed(stream, temp, max_bytes=expected)
+        if size != expected:
+            raise UploadError(f"Chunk {index} must be {expected} bytes, got {size}")
+        if checksum and sha256 != checksum.strip().lower():
+            raise UploadError(f"Chunk {index} checksum mismatch", 422)
+        os.replace(temp.name, chunk_path(session, index))
+    except UploadTooLarge:
+        os.remove(temp.name)
+        raise UploadError(f"Chunk {index} must be {expected} bytes", 413)
+    except BaseException:
+        if os.path.exists(temp.name):
+            os.remove(temp.name)
+        raise
+    return size
+
+def received_chunks(session):
+    """Sorted indexes of the chunks on disk"""
+    try:
+        names = os.listdir(session_dir(session.id))
+    except FileNotFoundError:
+        return []
+    return sorted(int(name[:-6]) for name in names if name.endswith('.chunk'))
+
+def progress(session):
+    """Session state for the client: which chunks to (re)send and the contiguous byte offset"""
+    received = received_chunks(session) if session.status == 'uploading' else []
+    have = set(received)
+    contiguous = 0
+    while contiguous in have:
+        contiguous += 1
+    
+    result = session.to_dict()
+    if session.status == 'uploading':
+        result['receivedChunks'] = received
+        result['missingChunks'] = [i for i in range(session.chunk_count) if i not in have]
+        result['offset'] = min(contiguous * session.chunk_size, session.total_size)
+    else:
+        result['receivedChunks'] = []
+        result['missingChunks'] = []
+        result['offset'] = session.total_size if session.status == 'complete' else 0
+    return result
+
+# Finalize
+
+def _link(session, stored):
+    """Append the stored file to the session's target list on the order"""
+    model, column = TARGETS[session.target]
+    record = db.session.execute(
+        select(model).where(model.id == session.order_id)
+        .options(undefer_group('files'))
+        .execution_options(populate_existing=True)
+    ).scalar_one_or_none()
+    if record is None:
+        raise UploadError('Order not found', 404)
+    
+    files = json.loads(getattr(record, column) or '[]')
+    entry = stored.to_dict()
+    entry['uploadedAt'] = entry['uploadedAt'] or datetime.utcnow().isoformat()
+    files.append(entry)
+    setattr(record, column, json.dumps(files))
+    
+    if model is Order:
+        db.session.add(OrderActivity(
+            id=f"ACT-{uuid.uuid4().hex[:8].upper()}",
+            order_id=record.id,
+            order_number=record.order_number,
+            action_type='file_upload',
+            action_by=session.uploaded_by or 'system',
+            action_by_role='writer' if session.uploaded_by and session.uploaded_by == record.writer_id else 'admin',
+            old_status=record.status,
+            new_status=record.status,
+            description=f"{stored.original_name} uploaded to {session.target}",
+            action_metadata=json.dumps({'fileId': stored.id, 'size': stored.size, 'target': session.target})
+        ))
+
+def _claim(session_id):
+    """Move the session from uploading to finalizing; False if another request got there first"""
+    claimed = db.session.execute(
+        update(UploadSession)
+        .where(UploadSession.id == session_id, UploadSession.status == 'uploading')
+        .values(status='finalizing')
+    ).rowcount == 1
+    db.session.commit()
+    return claimed
+
+def _release(session_id):
+    """Put a claimed session back to uploading so the client can fix chunks and retry"""
+    db.session.rollback()
+    db.session.execute(
+        update(UploadSession)
+        .where(UploadSession.id == session_id, UploadSession.status == 'finalizing')
+        .values(status='uploading')
+    )
+    db.session.commit()
+
+def finalize(session_id):
+    """
+    Assemble and store a finished upload. Returns (session, stored file).
+    Finalizing a session that already completed returns the same file again,
+    so a client that lost the response can safely retry. The session is
+    claimed (status 'finalizing') before the chunks are read, so of two
+    concurrent finalizes one does the work and the other gets a 409.
+    """
+    session = db.session.get(UploadSession, session_id)
+    if not session:
+        raise UploadError('Upload session not found', 404)
+    if session.status == 'complete':
+        return session, db.session.get(StoredFile, session.file_id)
+    session = get_active_session(session_id)
+    
+    missing = [i for i in range(session.chunk_count) if not os.path.exists(chunk_path(session, i))]
+    if missing:
+        raise UploadError(f"Missing chunks: {', '.join(str(i) for i in missing[:20])}", 409)
+    
+    if not _claim(session_id):
+        session = db.session.get(UploadSession, session_id)
+        db.session.refresh(session)
+        if session.status == 'complete':
+            return session, db.session.get(StoredFile, session.file_id)
+        raise UploadError(f"Upload session is {session.status}", 409)
+    
+    try:
+        paths = [chunk_path(session, i) for i in range(session.chunk_count)]
+        stream = ChainedFiles(paths)
+        try:
+            sha256, size, _ = get_storage().put_stream(stream, max_bytes=session.total_size, expected_sha256=session.sha256)
+        except ChecksumMismatch as e:
+            raise UploadError(str(e), 422)
+        except UploadTooLarge:
+            raise UploadError('Assembled file is larger than the declared size', 422)
+        finally:
+            stream.close()
+        if size != session.total_size:
+            raise UploadError(f"Assembled file is {size} bytes, expected {session.total_size}", 422)
+        
+        for attempt in range(LINK_ATTEMPTS):
+            session = db.session.get(UploadSession, session_id)
+            stored = record_file(sha256, size, session.filename, session.content_type,
+                                 uploaded_by=session.uploaded_by, related_order_id=session.order_id)
+            db.session.flush()
+            if session.target:
+                _link(session, stored)
+            session.status = 'complete'
+            session.file_id = stored.id
+            try:
+                db.session.commit()
+                break
+            except StaleDataError:
+                # The order changed under us; the blob is stored, so just redo the bookkeeping
+                db.session.rollback()
+        else:
+            raise UploadError('Order is being modified concurrently, retry finalize', 409)
+    except BaseException:
+        _release(session_id)
+        raise
+    
+    shutil.rmtree(session_dir(session.id), ignore_errors=True)
+    return session, stored
+
+def abort(session):
+    # Conditional like _claim, so an abort never deletes chunks a finalize is reading
+    aborted = db.session.execute(
+        update(UploadSession)
+        .where(UploadSession.id == session.id, UploadSession.status.in_(('uploading', 'aborted')))
+        .values(status='aborted')
+    ).rowcount == 1
+    db.session.commit()
+    if not aborted:
+        db.session.refresh(session)
+        raise UploadError(f"Upload session is {session.status}", 409)
+    shutil.rmtree(session_dir(session.id), ignore_errors=True)
+
+def expire_sessions(now=None):
+    """
+    Delete sessions past their expiry along with any chunks, plus chunk
+    directories no session points at. Returns the number of sessions removed.
+    """
+    now = now or datetime.utcnow()
+    expired = UploadSession.query.filter(UploadSession.expires_at < now).all()
+    for session in expired:
+        shutil.rmtree(session_dir(session.id), ignore_errors=True)
+        db.session.delete(session)
+    db.session.commit()
+    
+    root = current_app.config['UPLOAD_SESSION_ROOT']
+    if os.path.isdir(root):
+        names = set(os.listdir(root))
+        known = {row[0] for row in db.session.query(UploadSession.id).filter(UploadSession.id.in_(names))} if names else set()
+        for name in names - known:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+    return len(expired)
@@ -3,6 +3,9 @@ Utility functions for the server
 """
 import string
 import random
+import json
+import base64
+from datetime import datetime
 from models import Order
 
 def generate_order_number():
@@ -31,3 +34,51 @@ def generate_order_number():
     timestamp = str(int(time.time()))[-4:]
     return f"T{timestamp}"
 
+def encode_cursor(*values):
+    """
+    Encode the sort key of the last row on a page into an opaque cursor.
+    Datetimes are stored as ISO strings; decode_cursor() turns them back.
+    """
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, datetime_positions=(0,)):
+    """
+    Decode a cursor produced by encode_cursor().
+    Returns the list of key values, or raises ValueError if the cursor is malformed.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        for position in datetime_positions:
+            if values[position] is not None:
+                values[position] = datetime.fromisoformat(values[position])
+        return values
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def parse_limit(value, default=50, maximum=200):
+    """Parse a page size query parameter, clamped to [1, maximum]"""
+    try:
+        limit = int(value) if value is not None else default
+    except (TypeError, ValueError):
+        limit = default
+    return max(1, min(limit, maximum))
+
+VIEWS = ('summary', 'full')
+
+def parse_view(value, default='summary'):
+    """
+    Parse the ?view= query parameter. Raises ValueError for unknown views.
+    List endpoints default to 'summary', detail endpoints to 'full'.
+    """
+    view = value or default
+    if view not in VIEWS:
+        raise ValueError(f"view must be one of: {', '.join(VIEWS)}")
+    return view
+
+def serialize(obj, view='full'):
+    """to_summary_dict() for summary views when the model has one, else to_dict()"""
+    if view == 'summary' and hasattr(obj, 'to_summary_dict'):
+        return obj.to_summary_dict()
+    return obj.to_dict()
@@ -0,0 +1,64 @@
+"""
+Optimistic concurrency for versioned models (Order, PODOrder).
+
+The models declare `version_id_col`, so every flush runs
+UPDATE ... WHERE id = ? AND version = ? and bumps the version. Clients say
+which version they edited with an `If-Match: "<version>"` header or a
+`version` field in the body; a mismatch, or a write that loses the race
+at commit time, is answered with 409 and counted in metrics.
+"""
+from flask import request, jsonify
+from sqlalchemy import inspect
+from sqlalchemy.orm.exc import StaleDataError
+from db import db
+import metrics
+
+def expected_version(data=None):
+    """Version the client based its edit on, or None if it did not say"""
+    header = request.headers.get('If-Match')
+    if header and header.strip() != '*':
+        value = header.strip()
+        if value.startswith('W/'):
+            value = value[2:]
+        try:
+            return int(value.strip('"'))
+        except ValueError:
+            return None
+    if isinstance(data, dict) and data.get('version') is not None:
+        try:
+            return int(data['version'])
+        except (TypeError, ValueError):
+            return None
+    return None
+
+def etag(obj):
+    return f'"{obj.version}"'
+
+def conflict_response(obj, label):
+    """409 carrying the current version so the client can re-apply its change"""
+    identity = inspect(obj).identity
+    db.session.rollback()
+    metrics.increment(f'{label}.version_conflicts')
+    current = db.session.get(type(obj), identity) if identity else None
+    response = jsonify({
+        'error': 'Version conflict: the record was modified by someone else',
+        'currentVersion': current.version if current else None
+    })
+    if current:
+        response.headers['ETag'] = etag(current)
+    return response, 409
+
+def check_version(obj, expected, label):
+    """Returns a 409 response if the client's version is stale, else None"""
+    if expected is not None and expected != obj.version:
+        return conflict_response(obj, label)
+    return None
+
+def commit_versioned(obj, label):
+    """Commit, turning a lost race on the version check into a 409 response"""
+    try:
+        db.session.commit()
+    except StaleDataError:
+        return conflict_response(obj, label)
+    metrics.increment(f'{label}.writes')
+    return None
@@ -0,0 +1,15 @@
+"""
+WSGI entry point for production servers:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Builds the app and configures the SQLAlchemy mappers at import, so with
+preload_app the master does this once and every forked worker starts with it
+already done (and shares those pages copy-on-write).
+"""
+from sqlalchemy.orm import configure_mappers
+
+from app import create_app
+
+app = create_app()
+configure_mappers()